@@ -1,18 +1,30 @@
-"""Top-level orchestrator for step A (create_RPAsheet)."""
+"""Top-level orchestrator for step A (create_RPAsheet).
+
+The sub-steps are declared as a task graph (step_scheduler): the RPAブック
+copy runs while Ac reads the 管理表, and Ad (Excel) runs while Ae searches
+Outlook.  Af and Ag wait for both.
+"""
 
 from __future__ import annotations
 
+import json
 import logging
+from pathlib import Path
+from typing import List
 
-from common import PathRegistry
+import xlsx_package
 from excel_com import open_workbook
 from module_loader import load_helper
+from rpa_sheet import capture_outputs
+from step_scheduler import StepScheduler, Task
+from warmup import KanriIndex
+
+MAIL_FIELDS = ("selected_mail_entry", "forms_row", "mail_sender", "mail_cc", "mail_bcc", "reply_email_body")
 
 
-def _hide_non_target_sheets(logger: logging.Logger) -> None:
+def _hide_non_target_sheets(logger: logging.Logger, workbook_path: Path) -> None:
     """Hide every sheet except 'RPAシート' and '奉行メール' in the final workbook."""
 
-    workbook_path = PathRegistry().rpa_book_destination
     if not workbook_path.exists():
         logger.warning("RPAブックが見つからないためシートの非表示処理をスキップします: %s", workbook_path)
         return
@@ -42,17 +54,122 @@ def _hide_non_target_sheets(logger: logging.Logger) -> None:
         logger.info("RPAブックで対象外シートを非表示にしました: %s", workbook_path)
 
 
+def _needs_name_katakana(robot) -> tuple:
+    # Ae matches PID attachments by the katakana name that Ad reads from Excel.
+    return ("name_katakana",) if robot._safe_str(robot.state.company_name).upper() == "PID" else ()
+
+
+def _kanri_row(robot) -> str:
+    """The cells Ac takes from the 管理表 (F/G/K of the case's row), re-read from the saved file.
+
+    The checkpoint compares these instead of the whole shared 管理表, which
+    teammates edit all day; "" when the row cannot be found.
+    """
+
+    path = robot.paths.kanri_report_book
+    workbook_values = xlsx_package.read_workbook_values(path)
+    location = KanriIndex.build(path, workbook_values).locate(robot._safe_str(robot.state.tehai_number))
+    if location is None:
+        return ""
+    sheet, row = location
+    values = workbook_values[sheet]
+    return json.dumps([values.get(f"{column}{row}", "") for column in "FGK"], ensure_ascii=False)
+
+
+def _get_mail(robot) -> None:
+    try:
+        load_helper("Ae.get_mail").run(robot)
+    finally:
+        # Ae ran on a pool thread; its mail item and Outlook objects belong to that thread.
+        entry = robot.state.selected_mail_entry
+        if entry is not None:
+            entry.raw_item = None
+        robot.outlook.close()
+
+
+def _finish(robot) -> None:
+    logger = logging.getLogger("chouji_robo")
+    _hide_non_target_sheets(logger, robot.paths.rpa_book_destination)
+    # メール作成 (Eb) 用に D3/D12/D25/D26/D27 を保存済みの値から一括で控えておく。
+    capture_outputs(robot.state, robot.paths.rpa_book_destination)
+
+
+def tasks() -> List[Task]:
+    """Step A as a task graph; inputs/outputs are StepAState fields or files.
+
+    ``reads``/``writes`` name the files behind them for checkpoint.py; Ac is
+    checked by its 管理表 row (``fingerprint``) rather than the whole file.
+    """
+
+    # Loaded here, on one thread, rather than concurrently by the pool.
+    ac, ad, _, af, ag = (
+        load_helper(name)
+        for name in ("Ac.KANRI_spreadsheet", "Ad.tehai_input_sheet", "Ae.get_mail", "Af.chouji_renraku_hyou", "Ag.make_RPA_book")
+    )
+    return [
+        Task(
+            "Ac.KANRI_spreadsheet",
+            ac.run,
+            inputs=("tehai_number",),
+            outputs=("company_name", "pin", "mail_time"),
+            fingerprint=_kanri_row,
+        ),
+        Task(
+            "Ad.copy_rpa_book",
+            ad.copy_rpa_book,
+            outputs=("rpa_local_book_copy",),
+            reads=lambda robot: (robot.paths.panasonic_rpa_book(),),
+            writes=lambda robot: (robot.paths.rpa_local_book,),
+        ),
+        Task(
+            "Ad.tehai_input_sheet",
+            ad.prepare_input_sheet,
+            inputs=("company_name", "pin", "rpa_local_book_copy"),
+            outputs=("name_katakana", "rpa_local_book"),
+            reads=lambda robot: (robot.paths.company_input_sheet(robot.state.company_name),),
+            writes=lambda robot: (robot.paths.rpa_local_book,),
+        ),
+        Task(
+            "Ae.get_mail",
+            _get_mail,
+            inputs=("mail_time", "pin", "company_name"),
+            outputs=MAIL_FIELDS + ("temp_forms_book",),
+            extra_inputs=_needs_name_katakana,
+            reads=lambda robot: (robot.paths.company_forms_sheet(robot.state.company_name),),
+            writes=lambda robot: (robot.paths.temp_forms_book,),
+        ),
+        Task(
+            "Af.chouji_renraku_hyou",
+            af.run,
+            inputs=("temp_forms_book", "rpa_local_book"),
+            outputs=("renraku_hyou",),
+            writes=lambda robot: (robot.paths.rpa_local_book,),
+        ),
+        Task(
+            "Ag.make_RPA_book",
+            ag.run,
+            inputs=("renraku_hyou",) + MAIL_FIELDS,
+            outputs=("rpa_book_destination",),
+            writes=lambda robot: (robot.paths.rpa_book_destination,),
+        ),
+        Task(
+            "A.finish",
+            _finish,
+            inputs=("rpa_book_destination",),
+            outputs=("rpa_outputs",),
+            writes=lambda robot: (robot.paths.rpa_book_destination,),
+        ),
+    ]
+
+
 def run(robot) -> None:
     robot.current_phase = "A.create_RPAsheet"
     logger = logging.getLogger("chouji_robo")
     logger.info("A.create_RPAsheet を開始しました。")
 
-    load_helper("Ac.KANRI_spreadsheet").run(robot)
-    load_helper("Ad.tehai_input_sheet").run(robot)
-    load_helper("Ae.get_mail").run(robot)
-    load_helper("Af.chouji_renraku_hyou").run(robot)
-    load_helper("Ag.make_RPA_book").run(robot)
-
-    _hide_non_target_sheets(logger)
+    report = StepScheduler(tasks()).run(robot)
+    if report.cancelled:
+        logger.info("停止要求のため A.create_RPAsheet を途中で終了しました。")
+        return
 
     logger.info("A.create_RPAsheet のすべてのサブステップが完了しました。")
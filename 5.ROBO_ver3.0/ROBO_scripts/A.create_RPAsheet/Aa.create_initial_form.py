@@ -21,7 +21,7 @@ def build(robot) -> None:
 
     form = tk.Toplevel(robot.root)
     form.title("弔事ロボット")
-    form.geometry("480x260")
+    form.geometry("480x300")
     form.resizable(False, False)
     form.configure(bg="#f7f3ff")
     form.protocol("WM_DELETE_WINDOW", robot._shutdown)
@@ -42,10 +42,19 @@ def build(robot) -> None:
         fg="#666666",
         bg="#f7f3ff",
     )
-    prompt_label.pack(pady=(0, 20))
+    prompt_label.pack(pady=(0, 4))
+
+    hint_label = tk.Label(
+        form,
+        text="複数ある場合は「,」か空白で区切ると続けて処理します",
+        font=("游ゴシック Medium", 10),
+        fg="#888888",
+        bg="#f7f3ff",
+    )
+    hint_label.pack(pady=(0, 12))
 
     input_var = tk.StringVar()
-    entry = ttk.Entry(form, textvariable=input_var, font=("游ゴシック Medium", 16), width=10, justify="center")
+    entry = ttk.Entry(form, textvariable=input_var, font=("游ゴシック Medium", 16), width=20, justify="center")
     entry.pack(pady=(0, 12))
     entry.focus_set()
 
@@ -60,7 +69,15 @@ def build(robot) -> None:
     )
     confirm_btn.grid(row=0, column=0, padx=6)
 
+    pending_btn = ttk.Button(
+        button_frame,
+        text="未処理を一括",
+        command=lambda: robot._handle_pending_submit(form),
+        width=12,
+    )
+    pending_btn.grid(row=0, column=1, padx=6)
+
     cancel_btn = ttk.Button(button_frame, text="終了", command=robot._shutdown, width=12)
-    cancel_btn.grid(row=0, column=1, padx=6)
+    cancel_btn.grid(row=0, column=2, padx=6)
 
     form.bind("<Return>", lambda event: confirm_btn.invoke())
@@ -40,19 +40,34 @@ def _find_row_via_find(sheet, search_values: list) -> int | None:
     return None
 
 
+def _row_matches(sheet, row_idx: int, target_normalized: str, robot: "ChoujiRobo") -> bool:
+    raw_value = sheet.Cells(row_idx, 2).Value
+    cell_normalized = _normalize_tehai_value(raw_value)
+    if target_normalized and cell_normalized:
+        if cell_normalized == target_normalized or cell_normalized.startswith(target_normalized):
+            return True
+    return robot._safe_str(raw_value) == robot._safe_str(robot.state.tehai_number)
+
+
+def _hinted_sheet(workbook, hint, target_normalized: str, robot: "ChoujiRobo"):
+    """The sheet the startup 管理表 index points at, if its row still holds the number."""
+
+    if hint is None:
+        return None
+    sheet_name, row_idx = hint
+    try:
+        sheet = workbook.Worksheets(sheet_name)
+        if _row_matches(sheet, row_idx, target_normalized, robot):
+            return sheet
+    except Exception:
+        pass
+    return None
+
+
 def _find_row_via_scan(sheet, target_normalized: str, robot: "ChoujiRobo") -> int | None:
     row_start, row_end, _, _ = get_used_range_bounds(sheet)
     for row_idx in range(max(2, row_start), row_end + 1):
-        raw_value = sheet.Cells(row_idx, 2).Value
-        cell_normalized = _normalize_tehai_value(raw_value)
-        matched = False
-        if target_normalized and cell_normalized:
-            matched = cell_normalized == target_normalized or cell_normalized.startswith(
-                target_normalized
-            )
-        if not matched:
-            matched = robot._safe_str(raw_value) == robot._safe_str(robot.state.tehai_number)
-        if matched:
+        if _row_matches(sheet, row_idx, target_normalized, robot):
             return row_idx
     return None
 
@@ -82,10 +97,16 @@ def run(robot: "ChoujiRobo") -> None:
         except Exception:
             pass
 
+    warmup = getattr(robot, "warmup", None)
+    hint = warmup.locate(robot.state.tehai_number, source_book) if warmup is not None else None
+
     try:
         with open_workbook(source_book, read_only=True) as workbook:
-            for sheet in workbook.Worksheets:
-                target_row_index = _find_row_via_find(sheet, search_values)
+            hinted = _hinted_sheet(workbook, hint, target_normalized, robot)
+            if hinted is not None:
+                logger.debug("起動時に読み込んだ管理表の位置を使用します: %s %d 行目", hint[0], hint[1])
+            for sheet in [hinted] if hinted is not None else workbook.Worksheets:
+                target_row_index = hint[1] if hinted is not None else _find_row_via_find(sheet, search_values)
                 if target_row_index is None:
                     target_row_index = _find_row_via_scan(sheet, target_normalized, robot)
                 if target_row_index is not None:
@@ -15,14 +15,14 @@ if TYPE_CHECKING:  # pragma: no cover - typing only
 
 
 def run(robot: "ChoujiRobo") -> None:
-    robot.current_phase = "Ad.tehai_input_sheet"
-    logger = logging.getLogger("chouji_robo.excel")
-    logger.info("Ad.tehai_input_sheet: 手配入力シートを準備中…")
+    copy_rpa_book(robot)
+    prepare_input_sheet(robot)
 
-    company_name = robot.state.company_name
-    if not company_name:
-        raise RuntimeError("会社名が設定されていません。")
 
+def copy_rpa_book(robot: "ChoujiRobo") -> None:
+    """Copy the shared RPAブック下処理 to the local folder; needs nothing from Ac."""
+
+    logger = logging.getLogger("chouji_robo.excel")
     source_rpa_book = robot.paths.panasonic_rpa_book()
     target_rpa_book = robot.paths.rpa_local_book
     robot._ensure_directory(target_rpa_book.parent)
@@ -32,6 +32,19 @@ def run(robot: "ChoujiRobo") -> None:
     shutil.copy2(source_rpa_book, target_rpa_book)
     logger.info("RPAブックをローカルへコピーしました。")
 
+
+def prepare_input_sheet(robot: "ChoujiRobo") -> None:
+    """Fill the company's 手配入力シート and copy it into the local RPAブック."""
+
+    robot.current_phase = "Ad.tehai_input_sheet"
+    logger = logging.getLogger("chouji_robo.excel")
+    logger.info("Ad.tehai_input_sheet: 手配入力シートを準備中…")
+
+    company_name = robot.state.company_name
+    if not company_name:
+        raise RuntimeError("会社名が設定されていません。")
+    target_rpa_book = robot.paths.rpa_local_book
+
     company_input_path = robot.paths.company_input_sheet(company_name)
     if not company_input_path.exists():
         raise FileNotFoundError(f"会社別手配入力シートが見つかりません: {company_input_path}")
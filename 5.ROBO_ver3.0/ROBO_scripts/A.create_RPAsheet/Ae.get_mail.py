@@ -8,7 +8,6 @@ import time
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Any, List, Optional, TYPE_CHECKING
-import pythoncom
 SMTP_PROPERTY_URI = "http://schemas.microsoft.com/mapi/proptag/0x39FE001E"
 
 try:
@@ -19,11 +18,8 @@ except Exception:  # pragma: no cover - tkinter should exist on Windows
     messagebox = None  # type: ignore
     simpledialog = None  # type: ignore
 
-try:
-    import win32com.client  # type: ignore
-except Exception:  # pragma: no cover - handled gracefully at runtime
-    win32com = None  # type: ignore
-
+import outlook_session
+from case_queue import OperatorInputRequired
 from excel_com import iter_rows, open_workbook
 
 from common import MailEnvelope
@@ -33,21 +29,8 @@ if TYPE_CHECKING:  # pragma: no cover - typing only
 
 
 def run(robot: "ChoujiRobo") -> None:
-    com_initialized = False
-    try:
-        pythoncom.CoInitialize()
-        com_initialized = True
-    except Exception:
-        pass
-
-    try:
-        _run_mail_session(robot)
-    finally:
-        if com_initialized:
-            try:
-                pythoncom.CoUninitialize()
-            except Exception:
-                pass
+    # The COM apartment is held by the robot's OutlookSession.
+    _run_mail_session(robot)
 
 
 def _run_mail_session(robot: "ChoujiRobo") -> None:
@@ -55,8 +38,7 @@ def _run_mail_session(robot: "ChoujiRobo") -> None:
     logger = logging.getLogger("chouji_robo.mail")
     logger.info("Ae.get_mail: Outlookメールを検索します")
 
-    if win32com is None:
-        raise RuntimeError("pywin32 が見つからないため Outlook にアクセスできません。")
+    session = outlook_session.for_robot(robot)
 
     robot.state.mail_sender = ""
     robot.state.mail_cc = ""
@@ -67,8 +49,7 @@ def _run_mail_session(robot: "ChoujiRobo") -> None:
     if mail_time is None:
         raise RuntimeError("mail_time が設定されていません。")
 
-    namespace = win32com.client.Dispatch("Outlook.Application").GetNamespace("MAPI")
-    mail_sources = _gather_mail_sources(namespace, logger)
+    mail_sources = _gather_mail_sources(session, logger)
     if not mail_sources:
         raise RuntimeError("Outlook のメールフォルダを列挙できませんでした。")
 
@@ -538,7 +519,7 @@ def _find_nearest_message(
     return min(envelopes, key=lambda entry: _seconds_difference(entry.received_at, anchor))
 
 
-def _gather_mail_sources(namespace, logger: logging.Logger):
+def _gather_mail_sources(session, logger: logging.Logger):
     sources: List[tuple[str, Any]] = []
     visited: set[str] = set()
 
@@ -595,11 +576,10 @@ def _gather_mail_sources(namespace, logger: logging.Logger):
             collect(sub, label_chain + [folder_name])
 
     try:
-        stores = getattr(namespace, "Stores", None)
-        if stores is not None:
-            total = stores.Count
-            for index in range(1, total + 1):
-                store = stores.Item(index)
+        namespace = session.namespace()
+        stores = session.stores()
+        if stores:
+            for index, store in enumerate(stores, start=1):
                 store_name = str(
                     getattr(store, "DisplayName", getattr(store, "Name", f"Store{index}"))
                 )
@@ -621,7 +601,7 @@ def _gather_mail_sources(namespace, logger: logging.Logger):
 
     if not sources:
         try:
-            fallback = namespace.GetDefaultFolder(6)
+            fallback = session.default_folder(outlook_session.OL_FOLDER_INBOX)
             collect(fallback, ["DefaultInbox"])
         except Exception as exc:
             logger.debug("デフォルト受信トレイの確保に失敗: %s", exc)
@@ -642,6 +622,10 @@ def _select_target_mail(robot: "ChoujiRobo", candidates: List[MailEnvelope]) ->
             logger.debug("PIN フレーズを含むメールを自動選択しました: %s", entry.subject)
             return entry
 
+    if not getattr(robot, "interactive", True):
+        # 先読み中 (case_queue) はダイアログを出さず、前面で処理するときに選んでもらう。
+        raise OperatorInputRequired(f"メールの選択が必要です (候補 {len(candidates)} 件)。")
+
     descriptions = [
         f"{idx+1}: {entry.received_at:%Y-%m-%d %H:%M} | {entry.subject} | {entry.sender}"
         for idx, entry in enumerate(candidates)
@@ -10,8 +10,11 @@ import logging
 import subprocess
 import sys
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import quote
 
 try:  # pragma: no cover - imported only when type checking
     from main import ChoujiRobo
@@ -21,6 +24,13 @@ except Exception:  # pragma: no cover - during CLI execution main.py is not impo
 SCOPES = ["User.Read.All", "Directory.Read.All"]
 REQUEST_TIMEOUT_SECONDS = 3
 MANAGER_MAX_DEPTH = 15
+# Rounds of $batch for managers that failed (after the client's own 429/503 retries).
+MANAGER_FETCH_ATTEMPTS = 3
+# A device-code sign-in waits for the operator; B itself signs in if the warm-up is still waiting.
+GRAPH_LOGIN_TIMEOUT_SECONDS = 300.0
+EDGE_WARMUP_TIMEOUT_SECONDS = 60.0
+# A sign-in made by the startup warm-up or an earlier case is reused for this long.
+GRAPH_LOGIN_REUSE_SECONDS = float(os.getenv("CHOUJI_GRAPH_LOGIN_REUSE_SECONDS", "2700"))
 
 HERE = Path(__file__).resolve().parent
 ROBO_SCRIPTS_ROOT = HERE.parent
@@ -30,6 +40,31 @@ POWER_SHELL = "pwsh"
 LOGGER = logging.getLogger("chouji_robo.find_my_boss")
 
 from module_loader import load_helper
+from rpa_sheet import RpaSheetModel, capture_outputs
+from step_scheduler import Task
+from throttling import backoff_delay
+from graph_client import (
+    MAX_BATCH_SIZE,
+    USER_SELECT_PROPERTIES,
+    GraphClient,
+    GraphRequestError,
+    env_token_provider,
+    msal_token_provider,
+)
+
+# Shared across resolve_many() calls in the same process: UPN -> manager
+# payload, or None when Graph reports that the user has no manager.
+_MANAGER_MEMO: Dict[str, Optional[Dict[str, Any]]] = {}
+_MANAGER_MEMO_LOCK = threading.Lock()
+
+# warm_graph_login() result and when it was obtained; the lock makes a second
+# caller wait for a sign-in already in progress instead of starting another.
+_GRAPH_LOGIN: Dict[str, Any] = {}
+_GRAPH_LOGIN_LOCK = threading.Lock()
+
+# PowerShell helpers still running, so stop_powershell() can end them on shutdown.
+_ACTIVE_PROCESSES: set = set()
+_ACTIVE_PROCESSES_LOCK = threading.Lock()
 
 
 def _configure_cli_logging() -> None:
@@ -49,8 +84,12 @@ def _configure_cli_logging() -> None:
     root.setLevel(logging.DEBUG)
 
 
-def _run_powershell(script: Path, *extra_args: str) -> Dict[str, Any]:
-    """Execute a PowerShell helper and return its JSON payload."""
+def _run_powershell(script: Path, *extra_args: str, rpa_book: Optional[Path] = None) -> Dict[str, Any]:
+    """Execute a PowerShell helper and return its JSON payload.
+
+    ``rpa_book`` is passed as CHOUJI_RPA_BOOK; the scripts default to the
+    desktop RPAブック.xlsx.
+    """
 
     cmd = [
         POWER_SHELL,
@@ -65,13 +104,20 @@ def _run_powershell(script: Path, *extra_args: str) -> Dict[str, Any]:
 
     LOGGER.info("[STEP] PowerShell 実行開始: %s %s", script.name, " ".join(extra_args))
 
+    env = None
+    if rpa_book is not None:
+        env = dict(os.environ, CHOUJI_RPA_BOOK=str(rpa_book))
+
     process = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
         bufsize=1,
+        env=env,
     )
+    with _ACTIVE_PROCESSES_LOCK:
+        _ACTIVE_PROCESSES.add(process)
 
     stdout_lines: list[str] = []
     stderr_lines: list[str] = []
@@ -106,7 +152,11 @@ def _run_powershell(script: Path, *extra_args: str) -> Dict[str, Any]:
     stdout_thread.start()
     stderr_thread.start()
 
-    return_code = process.wait()
+    try:
+        return_code = process.wait()
+    finally:
+        with _ACTIVE_PROCESSES_LOCK:
+            _ACTIVE_PROCESSES.discard(process)
     stdout_thread.join()
     stderr_thread.join()
 
@@ -153,30 +203,18 @@ def _run_powershell(script: Path, *extra_args: str) -> Dict[str, Any]:
     return data
 
 
-def _execute_workflow(
-    scopes: Optional[list[str]] = None,
-    timeout_seconds: Optional[int] = None,
-    max_depth: Optional[int] = None,
-    prefer_device_auth: Optional[bool] = None,
-    skip_module_install: Optional[bool] = None,
-    include_user_extended: Optional[bool] = None,
-    include_manager_extended: Optional[bool] = None,
-) -> Dict[str, Any]:
-    """Run the full find_my_boss workflow and return collected data."""
-
-    active_scopes = scopes or SCOPES
-    active_timeout = timeout_seconds or REQUEST_TIMEOUT_SECONDS
-    active_depth = max_depth or MANAGER_MAX_DEPTH
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").lower() in {"1", "true", "yes", "on"}
 
-    scope_arg = ",".join(active_scopes)
-    timeout_arg = str(active_timeout)
-    depth_arg = str(active_depth)
 
-    login_script = HERE / "Ba.login_msGraph.ps1"
-    user_script = HERE / "Bb.get_user_data.ps1"
-    boss_script = HERE / "Bc.get_boss_data.ps1"
+def _login_args(
+    scope_arg: str,
+    timeout_arg: str,
+    prefer_device_auth: Optional[bool],
+    skip_module_install: Optional[bool],
+) -> tuple[list[str], bool]:
+    """Arguments for Ba.login_msGraph.ps1 and whether the module install check is skipped."""
 
-    LOGGER.info("[STEP] B.find_my_boss workflowを開始します。")
     login_args = [
         "-Scopes",
         scope_arg,
@@ -193,12 +231,6 @@ def _execute_workflow(
         LOGGER.info("[INFO] Graph module installation check will be skipped (SkipModuleInstall).")
         login_args.append("-SkipModuleInstall")
 
-
-    if include_user_extended is None:
-        include_user_extended = os.getenv("CHOUJI_INCLUDE_USER_EXTENDED", "").lower() in {"1", "true", "yes", "on"}
-    if include_manager_extended is None:
-        include_manager_extended = os.getenv("CHOUJI_INCLUDE_MANAGER_EXTENDED", "").lower() in {"1", "true", "yes", "on"}
-
     device_auth = True
     if prefer_device_auth is not None:
         device_auth = prefer_device_auth
@@ -206,8 +238,7 @@ def _execute_workflow(
         device_env = os.getenv("CHOUJI_USE_DEVICE_AUTH", "")
         if device_env:
             device_auth = device_env.lower() in {"1", "true", "yes", "on"}
-        browser_env = os.getenv("CHOUJI_USE_BROWSER_AUTH", "")
-        if browser_env.lower() in {"1", "true", "yes", "on"}:
+        if _env_flag("CHOUJI_USE_BROWSER_AUTH"):
             device_auth = False
 
     if device_auth:
@@ -215,10 +246,74 @@ def _execute_workflow(
         login_args.append("-UseDeviceAuth")
     else:
         LOGGER.info("[INFO] Browser-based authentication will be used for Microsoft Graph.")
+    return login_args, skip_module_install
+
+
+def warm_graph_login(robot: Optional["ChoujiRobo"] = None) -> Dict[str, Any]:
+    """Sign in to Graph ahead of step B (Ba -LoginOnly) so Ba/Bb/Bc find a cached token.
+
+    A sign-in from the last ``GRAPH_LOGIN_REUSE_SECONDS`` is reused.
+    """
+
+    with _GRAPH_LOGIN_LOCK:
+        if _GRAPH_LOGIN and time.monotonic() - _GRAPH_LOGIN["at"] < GRAPH_LOGIN_REUSE_SECONDS:
+            LOGGER.info("[INFO] 取得済みの Graph サインインを再利用します。")
+            return _GRAPH_LOGIN["result"]
+        login_args, _ = _login_args(",".join(SCOPES), str(REQUEST_TIMEOUT_SECONDS), None, None)
+        result = _run_powershell(HERE / "Ba.login_msGraph.ps1", *login_args, "-LoginOnly")
+        _GRAPH_LOGIN.update(at=time.monotonic(), result=result)
+        return result
+
+
+def stop_powershell() -> None:
+    """Kill PowerShell helpers that are still running (robot shutdown)."""
+
+    with _ACTIVE_PROCESSES_LOCK:
+        processes = list(_ACTIVE_PROCESSES)
+    for process in processes:
+        try:
+            process.kill()
+            LOGGER.info("[INFO] 実行中の PowerShell を終了しました (pid=%s)。", process.pid)
+        except Exception:
+            pass
+
+
+def _execute_workflow(
+    scopes: Optional[list[str]] = None,
+    timeout_seconds: Optional[int] = None,
+    max_depth: Optional[int] = None,
+    prefer_device_auth: Optional[bool] = None,
+    skip_module_install: Optional[bool] = None,
+    include_user_extended: Optional[bool] = None,
+    include_manager_extended: Optional[bool] = None,
+    rpa_book: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Run the full find_my_boss workflow and return collected data."""
+
+    active_scopes = scopes or SCOPES
+    active_timeout = timeout_seconds or REQUEST_TIMEOUT_SECONDS
+    active_depth = max_depth or MANAGER_MAX_DEPTH
+
+    scope_arg = ",".join(active_scopes)
+    timeout_arg = str(active_timeout)
+    depth_arg = str(active_depth)
+
+    login_script = HERE / "Ba.login_msGraph.ps1"
+    user_script = HERE / "Bb.get_user_data.ps1"
+    boss_script = HERE / "Bc.get_boss_data.ps1"
+
+    LOGGER.info("[STEP] B.find_my_boss workflowを開始します。")
+    login_args, skip_module_install = _login_args(scope_arg, timeout_arg, prefer_device_auth, skip_module_install)
+
+    if include_user_extended is None:
+        include_user_extended = _env_flag("CHOUJI_INCLUDE_USER_EXTENDED")
+    if include_manager_extended is None:
+        include_manager_extended = _env_flag("CHOUJI_INCLUDE_MANAGER_EXTENDED")
 
     login_data = _run_powershell(
         login_script,
         *login_args,
+        rpa_book=rpa_book,
     )
 
     mail_honnin = (login_data.get("mail_honnin") or "").strip()
@@ -243,6 +338,7 @@ def _execute_workflow(
     user_data = _run_powershell(
         user_script,
         *user_args,
+        rpa_book=rpa_book,
     )
 
     boss_args = [
@@ -263,6 +359,7 @@ def _execute_workflow(
     bosses_data = _run_powershell(
         boss_script,
         *boss_args,
+        rpa_book=rpa_book,
     )
 
     results: Dict[str, Any] = {
@@ -277,6 +374,17 @@ def _execute_workflow(
     return results
 
 
+def _manager_entries(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The manager chain of Bc's output, which is either {"managers": [...]} or the list itself."""
+
+    managers_wrapper = results.get("managers") or {}
+    if isinstance(managers_wrapper, dict):
+        managers = managers_wrapper.get("managers")
+    else:
+        managers = managers_wrapper
+    return list(managers or [])
+
+
 def _emit_summary(results: Dict[str, Any]) -> None:
     """Log a short summary to match the test script output style."""
 
@@ -295,13 +403,7 @@ def _emit_summary(results: Dict[str, Any]) -> None:
         LOGGER.info("  Department: %s", user_detail.get("department") or "")
         LOGGER.info("  JobTitle: %s", user_detail.get("jobTitle") or "")
 
-    managers_wrapper: Dict[str, Any] = results.get("managers") or {}
-    if isinstance(managers_wrapper, dict):
-        managers = managers_wrapper.get("managers")
-    else:
-        managers = managers_wrapper
-    if managers is None:
-        managers = []
+    managers = _manager_entries(results)
 
     LOGGER.info("Manager chain (count=%s):", len(managers))
     for entry in managers:
@@ -326,7 +428,164 @@ def _emit_summary(results: Dict[str, Any]) -> None:
 
 
 
-def _run_python_helper(module_name: str, phase_name: str, robot: Optional["ChoujiRobo"]) -> Optional[Dict[str, Any]]:
+def create_graph_client(stop_event: Optional[threading.Event] = None) -> GraphClient:
+    """Build the Python Graph client from CHOUJI_GRAPH_TOKEN or MSAL settings."""
+
+    if os.getenv("CHOUJI_GRAPH_TOKEN"):
+        provider = env_token_provider()
+    else:
+        provider = msal_token_provider()
+    return GraphClient(
+        provider,
+        tenant_id=os.getenv("MSAL_TENANT_ID", "default"),
+        timeout=REQUEST_TIMEOUT_SECONDS,
+        stop_event=stop_event,
+    )
+
+
+def _build_name_string(user: Dict[str, Any]) -> str:
+    """Mirror Build-NameString in Bc.get_boss_data.ps1."""
+
+    surname = (user.get("surname") or "").strip()
+    given_name = (user.get("givenName") or "").strip()
+    if not surname and not given_name:
+        return user.get("displayName") or user.get("mail") or user.get("userPrincipalName") or ""
+    return f"{surname}\u3000{given_name}"
+
+
+def _manager_identifier(manager: Dict[str, Any]) -> str:
+    return (manager.get("userPrincipalName") or manager.get("mail") or manager.get("id") or "").strip().lower()
+
+
+def _fetch_managers_level(client: GraphClient, upns: List[str]) -> None:
+    """Resolve the managers of ``upns`` with one $batch per 20 users and memoise them.
+
+    Failed sub-requests are sent again; a manager that still cannot be read
+    raises GraphRequestError, since a chain cut short would pick the wrong boss.
+    """
+
+    select = ",".join(USER_SELECT_PROPERTIES)
+
+    def _send(chunk: List[str]) -> List[str]:
+        failed: List[str] = []
+        requests = [
+            {
+                "id": str(idx),
+                "method": "GET",
+                "url": f"/users/{quote(upn, safe='@')}/manager?$select={select}",
+            }
+            for idx, upn in enumerate(chunk)
+        ]
+        responses = client.batch(requests)
+        with _MANAGER_MEMO_LOCK:
+            for idx, upn in enumerate(chunk):
+                response = responses.get(str(idx)) or {}
+                status = int(response.get("status") or 0)
+                if 200 <= status < 300 and isinstance(response.get("body"), dict):
+                    _MANAGER_MEMO[upn] = response["body"]
+                elif status == 404:
+                    _MANAGER_MEMO[upn] = None
+                else:
+                    LOGGER.warning("[WARNING] manager 取得に失敗しました: %s (status=%s)", upn, status)
+                    failed.append(upn)
+        return failed
+
+    pending = list(upns)
+    for attempt in range(MANAGER_FETCH_ATTEMPTS):
+        if attempt:
+            delay = backoff_delay(attempt)
+            LOGGER.info("[INFO] manager 取得に失敗した %s 件を %.1f 秒後に再試行します。", len(pending), delay)
+            stop_event = getattr(client, "stop_event", None)
+            if stop_event is not None and stop_event.wait(delay):
+                raise GraphRequestError("停止要求を受けたため Graph 呼び出しを中断しました。")
+            if stop_event is None:
+                time.sleep(delay)
+        chunks = [pending[idx : idx + MAX_BATCH_SIZE] for idx in range(0, len(pending), MAX_BATCH_SIZE)]
+        if len(chunks) == 1:
+            pending = _send(chunks[0])
+        else:
+            with ThreadPoolExecutor(max_workers=min(4, len(chunks))) as pool:
+                pending = [upn for failed in pool.map(_send, chunks) for upn in failed]
+        if not pending:
+            return
+    raise GraphRequestError(f"上司を取得できませんでした ({MANAGER_FETCH_ATTEMPTS} 回): {', '.join(pending)}")
+
+
+def resolve_many(
+    emails: Iterable[str],
+    *,
+    client: Optional[GraphClient] = None,
+    max_depth: int = MANAGER_MAX_DEPTH,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Resolve manager chains for many users at once, level by level.
+
+    UPNs are de-duplicated and every level is fetched with ``$batch``;
+    managers already seen (in this call or an earlier one) are not requested
+    again, so the number of Graph calls follows the number of distinct
+    managers rather than users x depth.  Entries use the same keys as the
+    ``managers`` list emitted by Bc.get_boss_data.ps1.
+    """
+
+    users: List[str] = []
+    for email in emails:
+        normalized = (email or "").strip().lower()
+        if normalized and normalized not in users:
+            users.append(normalized)
+    chains: Dict[str, List[Dict[str, Any]]] = {upn: [] for upn in users}
+    if not users:
+        return chains
+
+    client = client or create_graph_client()
+    cursors: Dict[str, str] = {upn: upn for upn in users}
+    visited: Dict[str, set] = {upn: {upn} for upn in users}
+
+    LOGGER.info("[STEP] resolve_many: 対象ユーザー %s 件の上司チェーンを解決します。", len(users))
+    for level in range(max_depth):
+        if not cursors:
+            break
+        with _MANAGER_MEMO_LOCK:
+            frontier = sorted({cursor for cursor in cursors.values() if cursor not in _MANAGER_MEMO})
+        if frontier:
+            LOGGER.info("[INFO] Level %s: %s 件を $batch で取得します。", level, len(frontier))
+            _fetch_managers_level(client, frontier)
+
+        next_cursors: Dict[str, str] = {}
+        for user, cursor in cursors.items():
+            with _MANAGER_MEMO_LOCK:
+                manager = _MANAGER_MEMO.get(cursor)
+            if not manager:
+                continue
+            identifier = _manager_identifier(manager)
+            if not identifier or identifier in visited[user]:
+                if identifier:
+                    LOGGER.warning("[WARNING] %s の上司チェーンでループを検出しました: %s", user, identifier)
+                continue
+            visited[user].add(identifier)
+            chains[user].append(
+                {
+                    "Index": level,
+                    "Identifier": manager.get("id") or identifier,
+                    "DisplayName": _build_name_string(manager),
+                    "Mail": manager.get("mail") or "",
+                    "JobTitle": manager.get("jobTitle"),
+                    "CompanyName": manager.get("companyName"),
+                    "Department": manager.get("department"),
+                    "Detail": manager,
+                }
+            )
+            next_cursors[user] = identifier
+        cursors = next_cursors
+
+    LOGGER.info("[STEP] resolve_many 完了: Graph 統計=%s", client.stats_snapshot())
+    return chains
+
+
+def _run_python_helper(
+    module_name: str,
+    phase_name: str,
+    robot: Optional["ChoujiRobo"],
+    **kwargs: Any,
+) -> Optional[Dict[str, Any]]:
     """Load and execute a sibling Bd/Be helper while updating the UI phase."""
 
     try:
@@ -346,7 +605,7 @@ def _run_python_helper(module_name: str, phase_name: str, robot: Optional["Chouj
 
     LOGGER.info("%s を開始します。", phase_name)
     try:
-        return run_func()
+        return run_func(**kwargs)
     except Exception as exc:
         LOGGER.exception("%s 実行中にエラーが発生しました: %s", phase_name, exc)
         return None
@@ -355,24 +614,90 @@ def _run_python_helper(module_name: str, phase_name: str, robot: Optional["Chouj
             robot.current_phase = previous_phase or "B.find_my_boss"
 
 
+def tasks() -> List[Task]:
+    """Step B for step_scheduler, with the Graph sign-in and Edge start-up as warm-ups that overlap step A.
+
+    B waits for the sign-in, which it needs first.  It does not wait for the
+    Edge start-up: Bd attaches to it later, or launches its own Edge if the
+    warm-up is still stuck (Bd.WARM_UP_WAIT_SECONDS).
+    """
+
+    job_title = load_helper("Bd.find_job_title")
+    return [
+        Task(
+            "B.graph_login",
+            warm_graph_login,
+            outputs=("graph_login",),
+            timeout=GRAPH_LOGIN_TIMEOUT_SECONDS,
+            optional=True,
+        ),
+        Task(
+            "B.edge_warmup",
+            job_title.warm_up,
+            outputs=("edge_session",),
+            timeout=EDGE_WARMUP_TIMEOUT_SECONDS,
+            optional=True,
+        ),
+        Task(
+            "B.find_my_boss",
+            run,
+            inputs=("rpa_outputs", "graph_login"),
+            outputs=("manager_chain", "manager_user_profile"),
+            writes=lambda robot: (robot.paths.rpa_book_destination,),
+        ),
+    ]
+
+
 def run(robot: Optional["ChoujiRobo"] = None) -> Dict[str, Any]:
     """Entry point invoked from the main robot workflow."""
 
     if robot is not None:
         robot.current_phase = "B.find_my_boss"
         LOGGER.info("B.find_my_boss を開始します。")
-    results = _execute_workflow(skip_module_install=True, include_user_extended=True, include_manager_extended=True)
+    rpa_book = robot.paths.rpa_book_destination if robot is not None else None
+    results = _execute_workflow(
+        skip_module_install=True,
+        include_user_extended=True,
+        include_manager_extended=True,
+        rpa_book=rpa_book,
+    )
 
-    job_lookup = _run_python_helper("Bd.find_job_title", "Bd.find_job_title", robot)
+    manager_chain = _manager_entries(results)
+    # One read of RPAシート for Bd and Be; their edits are written once below.
+    try:
+        sheet_model: Optional[RpaSheetModel] = RpaSheetModel.load(rpa_book)
+    except Exception as exc:
+        LOGGER.warning("RPAシートを共有モデルとして読み込めないため、Bd/Be が個別に読み込みます: %s", exc)
+        sheet_model = None
+    helper_argv = ["--book", str(rpa_book)] if rpa_book is not None else None
+
+    job_lookup = _run_python_helper(
+        "Bd.find_job_title",
+        "Bd.find_job_title",
+        robot,
+        argv=helper_argv,
+        manager_chain=manager_chain,
+        stop_event=getattr(robot, "stop_event", None),
+        sheet_model=sheet_model,
+    )
     if job_lookup is not None:
         results["job_title_lookup"] = job_lookup
 
-    kachou_logic = _run_python_helper("Be.Kachou_hantei", "Be.Kachou_hantei", robot)
+    kachou_logic = _run_python_helper(
+        "Be.Kachou_hantei",
+        "Be.Kachou_hantei",
+        robot,
+        argv=helper_argv,
+        sheet_model=sheet_model,
+    )
     if kachou_logic is not None:
         results["kachou_logic"] = kachou_logic
+    if sheet_model is not None:
+        results["sheet_cells_written"] = sheet_model.flush()
     if robot is not None:
-        manager_payload = results.get("managers") or {}
-        setattr(robot.state, "manager_chain", manager_payload.get("managers"))
+        # M/N 列の更新で CC などの数式結果が変わるため、控えを取り直す。
+        capture_outputs(robot.state, robot.paths.rpa_book_destination)
+        setattr(robot.state, "manager_chain", _manager_entries(results))
         setattr(robot.state, "manager_user_profile", results.get("user"))
         LOGGER.info("B.find_my_boss を正常終了しました。")
     return results
@@ -426,8 +751,22 @@ def main(argv: Optional[list[str]] = None) -> int:  # pragma: no cover - CLI sup
         action="store_true",
         help="Include extended manager data (significantly slower).",
     )
+    parser.add_argument(
+        "--resolve-many",
+        help="Comma separated e-mail addresses (or @file with one per line) to resolve in batch via Graph $batch.",
+    )
     args = parser.parse_args(argv)
 
+    if args.resolve_many:
+        source = args.resolve_many
+        if source.startswith("@"):
+            emails = Path(source[1:]).read_text(encoding="utf-8").splitlines()
+        else:
+            emails = source.split(",")
+        chains = resolve_many(emails, max_depth=args.max_depth)
+        print(json.dumps(chains, ensure_ascii=False, indent=2, default=str))
+        return 0
+
     scopes = [scope.strip() for scope in args.scopes.split(",") if scope.strip()]
     timeout = args.timeout
     depth = args.max_depth
@@ -12,7 +12,10 @@ param(
     [switch]$SkipModuleInstall,
 
     [Parameter(Mandatory = $false)]
-    [int]$RequestTimeoutSeconds = 3
+    [int]$RequestTimeoutSeconds = 3,
+
+    [Parameter(Mandatory = $false)]
+    [switch]$LoginOnly
 )
 
 if ($Scopes.Count -eq 1 -and $Scopes[0] -match ',') {
@@ -136,6 +139,9 @@ function Connect-GraphWithFallback {
 }
 
 function Resolve-RpaBookPath {
+    if ($env:CHOUJI_RPA_BOOK) {
+        return $env:CHOUJI_RPA_BOOK
+    }
     return [System.IO.Path]::Combine(
         $env:USERPROFILE,
         'Desktop',
@@ -220,6 +226,15 @@ if ($selectCmd) {
 $ctx = Get-MgContext -ErrorAction SilentlyContinue
 Write-Host "[STEP] Graph authentication completed." -ForegroundColor DarkGreen
 
+if ($LoginOnly) {
+    # Sign-in only (token cache warm-up); the RPA workbook may not exist yet.
+    [ordered]@{
+        graph_connected = [bool]$ctx
+        active_scopes   = if ($ctx) { @($ctx.Scopes) } elseif ($activeScopes) { @($activeScopes) } else { @() }
+    } | ConvertTo-Json -Depth 5
+    return
+}
+
 Write-Host "[STEP] Loading RPA workbook (J5) to retrieve target mail..." -ForegroundColor Cyan
 $workbookPath = Resolve-RpaBookPath
 $mailHonnin = Get-MailFromWorkbook -WorkbookPath $workbookPath
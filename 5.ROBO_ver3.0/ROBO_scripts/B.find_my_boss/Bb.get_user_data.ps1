@@ -166,6 +166,9 @@ function Test-ContextSatisfiesScopes {
 }
 
 function Resolve-RpaBookPath {
+    if ($env:CHOUJI_RPA_BOOK) {
+        return $env:CHOUJI_RPA_BOOK
+    }
     return [System.IO.Path]::Combine(
         $env:USERPROFILE,
         "Desktop",
@@ -175,6 +175,9 @@ function Start-Timer {
 }
 
 function Resolve-RpaBookPath {
+    if ($env:CHOUJI_RPA_BOOK) {
+        return $env:CHOUJI_RPA_BOOK
+    }
     return [System.IO.Path]::Combine(
         $env:USERPROFILE,
         "Desktop",
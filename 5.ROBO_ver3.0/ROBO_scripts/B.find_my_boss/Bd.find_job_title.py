@@ -4,22 +4,28 @@
 from __future__ import annotations
 
 import argparse
+import http.client
 import json
 import logging
 import os
 import sys
+import threading
 import time
-from dataclasses import dataclass
-from datetime import datetime
-from difflib import SequenceMatcher
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Set, Set
-from urllib.parse import quote
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from queue import Empty, LifoQueue
+from urllib.parse import quote, urlsplit
 
 try:
     from selenium import webdriver
-    from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+    from selenium.common.exceptions import TimeoutException, WebDriverException
     from selenium.webdriver.common.by import By
     from selenium.webdriver.common.keys import Keys
     from selenium.webdriver.edge.options import Options as EdgeOptions
@@ -33,8 +39,6 @@ except Exception as exc:  # pragma: no cover - selenium might be missing in CI
 else:  # pragma: no cover - import guard
     SELENIUM_IMPORT_ERROR = None
 
-from excel_com import get_used_range_bounds, open_workbook
-
 SCRIPT_DIR = Path(__file__).resolve().parent
 ROBO_SCRIPTS_ROOT = SCRIPT_DIR.parent
 DEFAULT_DRIVER_PATH = ROBO_SCRIPTS_ROOT.parent / "ROBO_tools" / "msedgedriver.exe"
@@ -46,35 +50,193 @@ try:
 except Exception as exc:  # pragma: no cover - running outside robot root
     raise RuntimeError("common.PathRegistry が読み込めません。実行ディレクトリを確認してください。") from exc
 
+from department_match import department_similarity
+from atomic_io import LockTimeout, read_json, write_json_if_changed
+from edge_session import WarmEdgeSession
+from rpa_sheet import (
+    DEFAULT_SHEET_NAME,
+    DEPT_COL,
+    EMAIL_COL,
+    LABEL_COL,
+    NAME_COL,
+    TITLE_COL,
+    RpaSheetModel,
+)
+from throttling import get_bucket
+from title_cache import DEFAULT_TTL_DAYS, TitleCache, TitleRecord
+
 LOGGER = logging.getLogger("chouji_robo.find_job_title")
-BASE_URL = "https://panasonic.phoneappli.net/front/login?returnTo=%2Ffront%2FinternalContacts%3FapiType%3Dsearch%26page%3D0%26size%3D30"
-SEARCH_URL_TEMPLATE = (
+BASE_URL = os.getenv("CHOUJI_PHONEAPPLI_BASE_URL") or (
+    "https://panasonic.phoneappli.net/front/login?returnTo=%2Ffront%2FinternalContacts%3FapiType%3Dsearch%26page%3D0%26size%3D30"
+)
+SEARCH_URL_TEMPLATE = os.getenv("CHOUJI_PHONEAPPLI_SEARCH_URL") or (
     "https://panasonic.phoneappli.net/front/internalContacts"
     "?apiType=searchByFreeWord&divisionId=&freeWord={email}&freeWordSearchType=ALL&page=0&size=30"
 )
-POSITIONS_CACHE = Path(__file__).with_name("positions_snapshot.json")
-
-LABEL_COL = 8
-NAME_COL = 9
-EMAIL_COL = 10
-COMPANY_COL = 11
-DEPT_COL = 12
-TITLE_COL = 13
-MAIL_TARGET_COL = 14
-FIRST_DATA_ROW = 5
-MAX_CONSECUTIVE_BLANKS = 4
-
+POSITIONS_CACHE = PathRegistry().positions_snapshot
+# Older robots kept the snapshot next to this script inside the synced folder;
+# it is still read (edge_driver_path) until the per-machine file exists.
+LEGACY_POSITIONS_CACHE = Path(__file__).with_name("positions_snapshot.json")
+
+RESULT_SELECTOR = "li.internal-item"
+DIVISION_COLUMN_SELECTORS = ("div._divisionColumn_ls35d_22", "div.internal-item__column--division-position")
+DIVISION_TEXT_SELECTOR = "div._itemText_ls35d_61 span, button span, span"
+POSITION_PREVIEW_SELECTOR = (
+    "div._nameColumn_pij2g_22 span._positionPaddingLarge_pij2g_49 span, "
+    "div[class*='name'] span[class*='position'], "
+    "span[class*='positionPadding'] span, span[class*='positionPadding']"
+)
+PROFILE_BUTTON_SELECTOR = "button.internal-item__column--person, button"
+LOGIN_BUTTON_SELECTOR = ".o365-login-button, .normal_button.o365-login-button"
+SEARCH_BOX_SELECTOR = "input[placeholder*='キーワード']"
+WARM_SESSION_DEFAULT = os.getenv("CHOUJI_EDGE_WARM_SESSION", "0") == "1"
+# How long Bd waits for a warm-up that is still starting the resident Edge.
+WARM_UP_WAIT_SECONDS = 45.0
+PROFILE_DIALOG_SELECTOR = "div.profile-dialog, .profile-dialog__container"
+
+# Condition-based waits: the page counts as settled once the DOM has not
+# changed for SETTLE_QUIET_MS and no fetch/XHR is in flight.  A page that
+# settles without the expected selector (e.g. no search hits) is given up
+# after SETTLE_EMPTY_MS of quiet instead of the full timeout.
+SETTLE_QUIET_MS = 250
+SETTLE_EMPTY_MS = 1500
+BLOCK_RESOURCES_DEFAULT = os.getenv("CHOUJI_PHONEAPPLI_BLOCK_RESOURCES", "1") == "1"
+BLOCKED_URL_PATTERNS = (
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*clarity.ms*", "*hotjar.com*", "*nr-data.net*", "*newrelic.com*", "*sentry.io*",
+)
+EXTRACTION_MODES = ("script", "elements")
+
+# The old loop slept 0.5 s between rows; keep the same request rate overall.
+DEFAULT_LOOKUP_RATE = float(os.getenv("CHOUJI_PHONEAPPLI_RATE", "2.0"))
+DEFAULT_TAB_COUNT = int(os.getenv("CHOUJI_PHONEAPPLI_TABS", "3"))
+TAB_POLL_INTERVAL = 0.2
+
+# Backend search API the SPA calls behind SEARCH_URL_TEMPLATE.  The path is
+# not documented by PHONE APPLI; confirm it in the Edge developer tools
+# (Network tab while searching) and set CHOUJI_PHONEAPPLI_API_URL.  The API
+# client is only enabled when a template is configured.
+API_URL_TEMPLATE = os.getenv("CHOUJI_PHONEAPPLI_API_URL", "")
+API_RATE_PER_SECOND = float(os.getenv("CHOUJI_PHONEAPPLI_API_RATE", "4.0"))
+API_POOL_SIZE = 4
+API_TIMEOUT_SECONDS = 10
+
+# Everything _collect_candidates needs from the result list in one WebDriver
+# round trip.  innerText matches WebElement.text for rendered nodes.
+_EXTRACT_CANDIDATES_JS = """
+const [resultSelector, divisionSelectors, divisionTextSelector, positionSelector, buttonSelector] = arguments;
+const textOf = (el) => ((el && (el.innerText || el.textContent)) || "").trim();
+const joinUnique = (values) => {
+  const seen = new Set();
+  const out = [];
+  for (const value of values) {
+    if (value && !seen.has(value)) { seen.add(value); out.push(value); }
+  }
+  return out.join(" / ");
+};
+const items = [];
+document.querySelectorAll(resultSelector).forEach((node, index) => {
+  const description = textOf(node);
+  if (!description) { return; }
+  let columns = [];
+  for (const selector of divisionSelectors) {
+    columns = Array.from(node.querySelectorAll(selector));
+    if (columns.length) { break; }
+  }
+  const divisions = [];
+  columns.forEach((column) => column.querySelectorAll(divisionTextSelector).forEach((el) => divisions.push(textOf(el))));
+  const positions = Array.from(node.querySelectorAll(positionSelector), textOf);
+  items.push({
+    index: index,
+    description: description,
+    division_text: joinUnique(divisions),
+    position_preview: joinUnique(positions),
+    has_button: node.querySelector(buttonSelector) !== null,
+  });
+});
+return items;
+"""
+
+# Installed on every new document through CDP so that fetch/XHR started
+# during page load are counted as well.
+_NETWORK_TRACKER_JS = """
+(() => {
+  if (window.__choujiNet) { return; }
+  const state = { inflight: 0 };
+  window.__choujiNet = state;
+  const done = () => { state.inflight = Math.max(0, state.inflight - 1); };
+  if (window.fetch) {
+    const originalFetch = window.fetch;
+    window.fetch = function () {
+      state.inflight += 1;
+      return originalFetch.apply(this, arguments).finally(done);
+    };
+  }
+  const originalSend = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function () {
+    state.inflight += 1;
+    this.addEventListener("loadend", done, { once: true });
+    return originalSend.apply(this, arguments);
+  };
+})();
+"""
+
+# execute_async_script: resolve when ``readySelector`` exists and the page is
+# quiet, or when the page has been quiet for ``emptyMs`` without it.
+_WAIT_FOR_SETTLED_JS = """
+const [readySelector, quietMs, emptyMs, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const started = performance.now();
+let lastMutation = started;
+let mutations = 0;
+const observer = new MutationObserver((records) => {
+  mutations += records.length;
+  lastMutation = performance.now();
+});
+// Content changes only: attribute churn (spinners, focus classes) would keep resetting the quiet window.
+observer.observe(document.documentElement, { childList: true, subtree: true, characterData: true });
+const tick = () => {
+  const now = performance.now();
+  const net = window.__choujiNet;
+  const inflight = net ? net.inflight : 0;
+  const idle = inflight === 0 && document.readyState !== "loading";
+  const quietFor = now - lastMutation;
+  const ready = !readySelector || document.querySelector(readySelector) !== null;
+  const settled = idle && quietFor >= quietMs && ready;
+  const empty = idle && quietFor >= emptyMs && !ready;
+  if (settled || empty || now - started >= timeoutMs) {
+    observer.disconnect();
+    done({ waited_ms: Math.round(now - started), mutations: mutations, inflight: inflight, ready: ready, timed_out: !(settled || empty) });
+    return;
+  }
+  setTimeout(tick, 50);
+};
+tick();
+"""
+
+# Tab pool: mark the old document before navigating so that polling never
+# reads the previous result list while the next page is still loading.
+_NAVIGATE_JS = """
+document.documentElement.setAttribute("data-chouji-pending", "1");
+window.location.assign(arguments[0]);
+"""
+_POLL_CANDIDATES_JS = (
+    'if (document.documentElement.hasAttribute("data-chouji-pending") || document.readyState === "loading") {\n'
+    "  return null;\n"
+    "}\n" + _EXTRACT_CANDIDATES_JS
+)
 
 @lru_cache(maxsize=1)
 def _load_cache_payload() -> dict:
-    if not POSITIONS_CACHE.exists():
-        return {}
-    try:
-        payload = json.loads(POSITIONS_CACHE.read_text(encoding="utf-8"))
-        if isinstance(payload, dict):
+    for path in (POSITIONS_CACHE, LEGACY_POSITIONS_CACHE):
+        if not path.exists():
+            continue
+        payload = read_json(path)
+        if payload is not None:
             return payload
-    except Exception as exc:
-        LOGGER.warning("positions_snapshot.json の読み込みに失敗しました: %s", exc)
+        LOGGER.warning("%s の読み込みに失敗しました。", path)
     return {}
 
 
@@ -119,63 +281,49 @@ class PersonEntry:
 
 
 class RpaSheetAccessor:
-    """Convenience wrapper for reading/writing the RPA sheet."""
-
-    def __init__(self, book_path: Optional[Path] = None, sheet_name: str = "RPA�V�[�g") -> None:
-        registry = PathRegistry()
-        target = Path(book_path) if book_path else Path(registry.rpa_book_destination)
-        if not target.exists():
-            raise FileNotFoundError(f"RPA�V�[�g��������܂���: {target}")
-        self.book_path = target
-        self.sheet_name = sheet_name
-        self._cell_cache: Dict[Tuple[int, int], str] = {}
-        self._pending_cells: Dict[Tuple[int, int], str] = {}
-        self._rows = list(self._load_rows())
+    """Bd view of the RPA sheet: rows with a person in H–L, job titles in M.
 
-    def _resolve_sheet(self, workbook):
-        for sheet in workbook.Worksheets:
-            name = str(getattr(sheet, "Name", ""))
-            if name == self.sheet_name:
-                return sheet
-        raise ValueError(f"�V�[�g '{self.sheet_name}' ���u�b�N�ɑ��݂��܂���B")
+    Step B passes its shared ``RpaSheetModel``; then ``save`` leaves the
+    write to B, which flushes once after Be.  Standalone runs load and save
+    their own model.
+    """
+
+    def __init__(
+        self,
+        book_path: Optional[Path] = None,
+        sheet_name: str = DEFAULT_SHEET_NAME,
+        *,
+        model: Optional[RpaSheetModel] = None,
+    ) -> None:
+        self._owns_model = model is None
+        self.model = model if model is not None else RpaSheetModel.load(book_path, sheet_name)
+        self.book_path = self.model.book_path
+        self.sheet_name = self.model.sheet_name
+        self._rows = list(self._load_rows())
 
     def _load_rows(self) -> List[PersonEntry]:
-        people: List[PersonEntry] = []
-        with open_workbook(self.book_path, read_only=True) as workbook:
-            sheet = self._resolve_sheet(workbook)
-            row_start, row_end, _, _ = get_used_range_bounds(sheet)
-            blank_run = 0
-            for row in range(max(FIRST_DATA_ROW, row_start), row_end + 1):
-                label = _normalise(sheet.Cells(row, LABEL_COL).Value)
-                name = _normalise(sheet.Cells(row, NAME_COL).Value)
-                email = _normalise(sheet.Cells(row, EMAIL_COL).Value)
-                department = _normalise(sheet.Cells(row, DEPT_COL).Value)
-                title = _normalise(sheet.Cells(row, TITLE_COL).Value)
-                self._cell_cache[(row, TITLE_COL)] = title
-                if not any([label, name, email, department]):
-                    blank_run += 1
-                    if blank_run >= MAX_CONSECUTIVE_BLANKS:
-                        break
-                    continue
-                blank_run = 0
-                people.append(
-                    PersonEntry(
-                        row=row,
-                        label=label,
-                        name=name,
-                        email=email,
-                        department=department,
-                        job_title=title,
-                    )
-                )
-        return people
+        get = self.model.get
+
+        def _blank(row: int) -> bool:
+            return not any(get(row, column) for column in (LABEL_COL, NAME_COL, EMAIL_COL, DEPT_COL))
+
+        return [
+            PersonEntry(
+                row=row,
+                label=get(row, LABEL_COL),
+                name=get(row, NAME_COL),
+                email=get(row, EMAIL_COL),
+                department=get(row, DEPT_COL),
+                job_title=get(row, TITLE_COL),
+            )
+            for row in self.model.data_rows(_blank)
+        ]
 
     def iter_people(self) -> Iterator[PersonEntry]:
         return iter(self._rows)
 
     def update_title(self, row: int, title: str) -> None:
-        self._cell_cache[(row, TITLE_COL)] = title
-        self._pending_cells[(row, TITLE_COL)] = title
+        self.model.set(row, TITLE_COL, title)
         for person in self._rows:
             if person.row == row:
                 person.job_title = title
@@ -191,24 +339,90 @@ class RpaSheetAccessor:
         return positions
 
     def save(self) -> None:
-        if not self._pending_cells:
-            return
-        with open_workbook(self.book_path) as workbook:
-            sheet = self._resolve_sheet(workbook)
-            for (row, column), value in self._pending_cells.items():
-                sheet.Cells(row, column).Value = value
-            workbook.Save()
-        self._pending_cells.clear()
+        if self._owns_model:
+            self.model.flush()
 
 
 @dataclass
 class Candidate:
     """Represents a search result item inside PHONE APPLI."""
 
-    container: WebElement
+    container: Optional[WebElement]
     description: str
     division_text: str
     position_preview: str = ""
+    index: int = -1
+
+
+@dataclass
+class LookupTimings:
+    """Wait-time breakdown of one lookup in seconds, logged after every lookup."""
+
+    phases: Dict[str, float] = field(default_factory=dict)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def summary(self) -> str:
+        parts = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+        return f"{parts} (計 {self.total * 1000:.0f}ms)"
+
+
+def _join_unique(values: Iterable[str]) -> str:
+    seen: Set[str] = set()
+    filtered: List[str] = []
+    for value in values:
+        if value and value not in seen:
+            seen.add(value)
+            filtered.append(value)
+    return " / ".join(filtered)
+
+
+def _candidates_from_payload(items: Optional[Sequence[dict]]) -> List[Candidate]:
+    candidates: List[Candidate] = []
+    for item in items or []:
+        description = _normalise(item.get("description"))
+        if not description:
+            continue
+        candidates.append(
+            Candidate(
+                container=None,
+                description=description,
+                division_text=_normalise(item.get("division_text")),
+                position_preview=_normalise(item.get("position_preview")),
+                index=int(item.get("index", -1)),
+            )
+        )
+    return candidates
+
+
+def _select_best_candidate(candidates: Sequence[Candidate], department: str) -> Optional[Candidate]:
+    if not candidates:
+        return None
+    if len(candidates) == 1 or not department:
+        return candidates[0]
+
+    best_candidate = candidates[0]
+    best_score = -1.0
+    for candidate in candidates:
+        division_score = department_similarity(department, candidate.division_text) if candidate.division_text else 0.0
+        description_score = department_similarity(department, candidate.description) if candidate.description else 0.0
+        score = division_score if division_score > 0 else description_score
+        LOGGER.debug(
+            "候補 '%s' division_score=%.3f description_score=%.3f",
+            candidate.description.splitlines()[0] if candidate.description else "(no text)",
+            division_score,
+            description_score,
+        )
+        if score > best_score:
+            best_score = score
+            best_candidate = candidate
+    LOGGER.info("部門一致率が最も高い候補を選択しました (score=%.3f)。", best_score)
+    return best_candidate
 
 
 class PhoneAppliClient:
@@ -220,16 +434,57 @@ class PhoneAppliClient:
         headless: bool = False,
         keep_browser_open: bool = False,
         base_url: str = BASE_URL,
+        search_url_template: str = SEARCH_URL_TEMPLATE,
         timeout: int = 25,
+        extraction_mode: str = "script",
+        rate_per_second: float = DEFAULT_LOOKUP_RATE,
+        stop_event: Optional[threading.Event] = None,
+        warm_session: bool = False,
+        block_resources: bool = BLOCK_RESOURCES_DEFAULT,
     ) -> None:
         if webdriver is None or SELENIUM_IMPORT_ERROR:
             raise ImportError("selenium がインストールされていません。pip install selenium を実行してください。") from SELENIUM_IMPORT_ERROR
+        if extraction_mode not in EXTRACTION_MODES:
+            raise ValueError(f"extraction_mode は {EXTRACTION_MODES} のいずれかを指定してください。")
         self.base_url = base_url
+        self.search_url_template = search_url_template
         self.keep_browser_open = keep_browser_open
-        self.driver = self._create_driver(headless=headless)
+        self.timeout = timeout
+        self.extraction_mode = extraction_mode
+        self.stop_event = stop_event
+        # Shared by every client and tab in the process so that parallel tabs
+        # never exceed the request rate of the old one-by-one loop.
+        self.rate_limiter = get_bucket("phoneappli", rate_per_second, 1.0)
+        self.warm_session: Optional[WarmEdgeSession] = None
+        self.driver = self._create_driver(headless=headless, warm=warm_session)
         self.wait = WebDriverWait(self.driver, timeout)
-
-    def _create_driver(self, *, headless: bool) -> webdriver.Edge:
+        self._timings = LookupTimings()
+        self.wait_totals: Dict[str, float] = {}
+        self._async_wait_supported = True
+        self.driver.set_script_timeout(timeout + 5)
+        self._configure_cdp(block_resources)
+
+    def _create_driver(self, *, headless: bool, warm: bool = False) -> webdriver.Edge:
+        if warm and not _WARM_UP_LOCK.acquire(timeout=WARM_UP_WAIT_SECONDS):
+            LOGGER.warning("常駐 Edge の準備が %.0f 秒で終わらないため通常起動に切り替えます。", WARM_UP_WAIT_SECONDS)
+            warm = False
+        if warm:
+            session = WarmEdgeSession(headless=headless, driver_path=_resolve_driver_path())
+            try:
+                driver = session.create_driver(EdgeOptions())
+            except RuntimeError as exc:
+                LOGGER.warning("常駐 Edge を利用できないため通常起動に切り替えます: %s", exc)
+            else:
+                self.warm_session = session
+                LOGGER.info(
+                    "常駐 Edge セッションを使用します (browser=%s, driver=%s)。",
+                    "再利用" if session.reused_browser else "新規",
+                    "再利用" if session.reused_driver else "新規",
+                )
+                return driver
+            finally:
+                # Held so a warm-up still starting Edge is not raced on the same port.
+                _WARM_UP_LOCK.release()
         options = EdgeOptions()
         options.add_argument("--start-maximized")
         options.add_argument("--disable-features=msEdgeDataSharing")
@@ -251,22 +506,39 @@ class PhoneAppliClient:
             raise RuntimeError("Edge WebDriver の起動に失敗しました。Edge がインストールされているか確認してください。") from exc
 
     def close(self) -> None:
+        if self.wait_totals:
+            summary = ", ".join(f"{name}={seconds:.1f}s" for name, seconds in self.wait_totals.items())
+            LOGGER.info("PHONE APPLI 待ち時間合計: %s", summary)
         if self.keep_browser_open:
             return
         try:
+            # For a warm session this only ends the WebDriver session; the
+            # attached browser keeps running for the next run.
             self.driver.quit()
         except Exception:
             pass
 
-    def ensure_ready(self, login_wait: int = 120) -> None:
+    def ensure_ready(self, login_wait: int = 120, *, force: bool = False) -> None:
+        if not force and self.warm_session is not None and self.driver.find_elements(By.CSS_SELECTOR, SEARCH_BOX_SELECTOR):
+            LOGGER.info("常駐 Edge はサインイン済みのため PHONE APPLI へのログインを省略します。")
+            return
         LOGGER.info("PHONE APPLI にアクセスしています: %s", self.base_url)
         self.driver.get(self.base_url)
         try:
-            login_button = WebDriverWait(self.driver, 15).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, ".o365-login-button, .normal_button.o365-login-button"))
+            # Signed-in profiles skip the login page, so stop waiting as soon
+            # as either the login button or the search box shows up.
+            WebDriverWait(self.driver, 15).until(
+                EC.any_of(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, LOGIN_BUTTON_SELECTOR)),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, SEARCH_BOX_SELECTOR)),
+                )
             )
-            login_button.click()
-            LOGGER.info("Microsoft 365 ログインボタンをクリックしました。必要に応じて認証を完了してください。")
+            login_buttons = self.driver.find_elements(By.CSS_SELECTOR, LOGIN_BUTTON_SELECTOR)
+            if login_buttons:
+                login_buttons[0].click()
+                LOGGER.info("Microsoft 365 ログインボタンをクリックしました。必要に応じて認証を完了してください。")
+            else:
+                LOGGER.debug("検索画面が表示されたため、すでにサインイン済みと判断します。")
         except TimeoutException:
             LOGGER.debug("ログインボタンが見つかりませんでした。すでにサインイン済みと判断します。")
         self._wait_for_search_box(login_wait)
@@ -274,22 +546,48 @@ class PhoneAppliClient:
     def _wait_for_search_box(self, login_wait: int) -> None:
         LOGGER.info("検索画面の読み込みを待っています (最大 %s 秒)...", login_wait)
         WebDriverWait(self.driver, login_wait).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "input[placeholder*='キーワード']"))
+            EC.presence_of_element_located((By.CSS_SELECTOR, SEARCH_BOX_SELECTOR))
         )
 
+    def export_session(self) -> Tuple[List[dict], str]:
+        """Return the signed-in cookies and user agent for PhoneAppliApiClient."""
+
+        user_agent = ""
+        try:
+            user_agent = str(self.driver.execute_script("return navigator.userAgent;") or "")
+        except WebDriverException:
+            pass
+        return list(self.driver.get_cookies()), user_agent
+
+    def search_url(self, email: str) -> str:
+        return self.search_url_template.format(email=quote(email, safe=""))
+
     def lookup_job_title(self, email: str, department: str) -> Optional[str]:
         if not email:
             return None
-        LOGGER.info("URL検索: %s (department=%s)", email, department or "-")
-        encoded = quote(email, safe="")
-        target_url = SEARCH_URL_TEMPLATE.format(email=encoded)
-        LOGGER.debug("検索URLへ遷移: %s", target_url)
-        self.driver.get(target_url)
-        time.sleep(0.5)
-        candidates = self._collect_candidates()
-        if not candidates:
-            LOGGER.warning("検索結果が見つかりませんでした。")
-            return None
+        self._timings = LookupTimings()
+        try:
+            with self._phase("rate_limit"):
+                acquired = self.rate_limiter.acquire(stop_event=self.stop_event)
+            if not acquired:
+                LOGGER.warning("停止要求を受けたため PHONE APPLI 検索を中断しました。")
+                return None
+            LOGGER.info("URL検索: %s (department=%s)", email, department or "-")
+            target_url = self.search_url(email)
+            LOGGER.debug("検索URLへ遷移: %s", target_url)
+            with self._phase("navigate"):
+                self.driver.get(target_url)
+            candidates = self._collect_candidates()
+            if not candidates:
+                LOGGER.warning("検索結果が見つかりませんでした。")
+                return None
+            return self.title_from_candidates(candidates, department)
+        finally:
+            self.log_timings(email)
+
+    def title_from_candidates(self, candidates: Sequence[Candidate], department: str) -> Optional[str]:
+        """Pick the best candidate of the current page and read its position."""
+
         target = self._select_candidate(candidates, department)
         if target is None:
             LOGGER.warning("一致する候補を特定できませんでした。")
@@ -299,20 +597,104 @@ class PhoneAppliClient:
         return title
 
     def _collect_candidates(self) -> List[Candidate]:
-        result_selector = "li.internal-item"
+        with self._phase("settle"):
+            state = self._wait_until_settled(RESULT_SELECTOR)
+            if state is None:
+                if not self._wait_for_results():
+                    return []
+            elif not state.get("ready"):
+                return []
+        with self._phase("extract"):
+            if self.extraction_mode == "script":
+                try:
+                    return self._collect_candidates_script()
+                except WebDriverException as exc:
+                    LOGGER.warning("execute_script による一覧取得に失敗したため従来方式に切り替えます: %s", exc)
+                    self.extraction_mode = "elements"
+            return self._collect_candidates_elements()
+
+    @contextmanager
+    def _phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._timings.add(name, time.perf_counter() - started)
+
+    def log_timings(self, email: str) -> None:
+        timings = self._timings
+        if not timings.phases:
+            return
+        LOGGER.info("待ち時間内訳 %s: %s", email, timings.summary())
+        for name, seconds in timings.phases.items():
+            self.wait_totals[name] = self.wait_totals.get(name, 0.0) + seconds
+        self._timings = LookupTimings()
+
+    def _wait_until_settled(self, ready_selector: Optional[str], timeout: Optional[float] = None) -> Optional[dict]:
+        """Wait for DOM quiet + network idle in one round trip; None if unsupported."""
+
+        if not self._async_wait_supported:
+            return None
+        timeout_ms = int((timeout or self.timeout) * 1000)
+        try:
+            state = self.driver.execute_async_script(
+                _WAIT_FOR_SETTLED_JS, ready_selector, SETTLE_QUIET_MS, SETTLE_EMPTY_MS, timeout_ms
+            )
+        except WebDriverException as exc:
+            LOGGER.warning("DOM 監視による待機に失敗したためポーリングに切り替えます: %s", exc)
+            self._async_wait_supported = False
+            return None
+        LOGGER.debug("settled: %s", state)
+        return state if isinstance(state, dict) else None
 
+    def _cdp(self, command: str, params: dict) -> None:
+        execute_cdp = getattr(self.driver, "execute_cdp_cmd", None)
+        if callable(execute_cdp):
+            execute_cdp(command, params)
+            return
+        # webdriver.Remote (resident msedgedriver) lacks the helper; use the
+        # same vendor endpoint selenium's Edge driver registers.
+        self.driver.command_executor._commands.setdefault(
+            "executeCdpCommand", ("POST", "/session/$sessionId/ms/cdp/execute")
+        )
+        self.driver.execute("executeCdpCommand", {"cmd": command, "params": params})
+
+    def _configure_cdp(self, block_resources: bool) -> None:
+        try:
+            self._cdp("Page.addScriptToEvaluateOnNewDocument", {"source": _NETWORK_TRACKER_JS})
+            if block_resources:
+                self._cdp("Network.enable", {})
+                self._cdp("Network.setBlockedURLs", {"urls": list(BLOCKED_URL_PATTERNS)})
+                LOGGER.debug("画像・フォント・解析タグの読み込みをブロックしました。")
+        except Exception as exc:
+            LOGGER.warning("CDP の設定に失敗しました (待機はポーリング相当になります): %s", exc)
+
+    def _wait_for_results(self) -> bool:
         def _has_items(driver: webdriver.Edge) -> bool:
-            nodes = driver.find_elements(By.CSS_SELECTOR, result_selector)
+            nodes = driver.find_elements(By.CSS_SELECTOR, RESULT_SELECTOR)
             return any(node.text.strip() for node in nodes)
 
         try:
             self.wait.until(_has_items)
         except TimeoutException:
-            return []
+            return False
+        return True
+
+    def _collect_candidates_script(self) -> List[Candidate]:
+        items = self.driver.execute_script(
+            _EXTRACT_CANDIDATES_JS,
+            RESULT_SELECTOR,
+            list(DIVISION_COLUMN_SELECTORS),
+            DIVISION_TEXT_SELECTOR,
+            POSITION_PREVIEW_SELECTOR,
+            PROFILE_BUTTON_SELECTOR,
+        )
+        return _candidates_from_payload(items)
 
-        nodes = self.driver.find_elements(By.CSS_SELECTOR, result_selector)
+    def _collect_candidates_elements(self) -> List[Candidate]:
+        nodes = self.driver.find_elements(By.CSS_SELECTOR, RESULT_SELECTOR)
         candidates: List[Candidate] = []
-        for node in nodes:
+        for index, node in enumerate(nodes):
             text = node.text.strip()
             if not text:
                 continue
@@ -320,97 +702,73 @@ class PhoneAppliClient:
             position_preview = ""
             try:
                 division_texts: List[str] = []
-                division_columns = node.find_elements(By.CSS_SELECTOR, "div._divisionColumn_ls35d_22")
-                if not division_columns:
-                    division_columns = node.find_elements(By.CSS_SELECTOR, "div.internal-item__column--division-position")
+                division_columns = []
+                for selector in DIVISION_COLUMN_SELECTORS:
+                    division_columns = node.find_elements(By.CSS_SELECTOR, selector)
+                    if division_columns:
+                        break
                 for column in division_columns:
-                    button_spans = column.find_elements(By.CSS_SELECTOR, "div._itemText_ls35d_61 span, button span, span")
+                    button_spans = column.find_elements(By.CSS_SELECTOR, DIVISION_TEXT_SELECTOR)
                     for elem in button_spans:
                         value = elem.text.strip()
                         if value:
                             division_texts.append(value)
-                seen_divisions: Set[str] = set()
-                filtered = []
-                for value in division_texts:
-                    if value not in seen_divisions:
-                        seen_divisions.add(value)
-                        filtered.append(value)
-                division_text = " / ".join(filtered)
+                division_text = _join_unique(division_texts)
             except Exception:
                 division_text = ""
 
             try:
                 position_values: List[str] = []
-                position_nodes = node.find_elements(
-                    By.CSS_SELECTOR,
-                    "div._nameColumn_pij2g_22 span._positionPaddingLarge_pij2g_49 span, "
-                    "div[class*='name'] span[class*='position'], "
-                    "span[class*='positionPadding'] span, span[class*='positionPadding']",
-                )
+                position_nodes = node.find_elements(By.CSS_SELECTOR, POSITION_PREVIEW_SELECTOR)
                 for elem in position_nodes:
                     value = elem.text.strip()
                     if value:
                         position_values.append(value)
-                seen_positions: Set[str] = set()
-                filtered_positions = []
-                for value in position_values:
-                    if value not in seen_positions:
-                        seen_positions.add(value)
-                        filtered_positions.append(value)
-                position_preview = " / ".join(filtered_positions)
+                position_preview = _join_unique(position_values)
             except Exception:
                 position_preview = ""
 
             candidates.append(
-                Candidate(container=node, description=text, division_text=division_text, position_preview=position_preview)
+                Candidate(
+                    container=node,
+                    description=text,
+                    division_text=division_text,
+                    position_preview=position_preview,
+                    index=index,
+                )
             )
         return candidates
-        return candidates
 
-    def _select_candidate(self, candidates: Sequence[Candidate], department: str) -> Optional[Candidate]:
-        if not candidates:
+    def _result_node(self, index: int) -> Optional[WebElement]:
+        if index < 0:
             return None
-        if len(candidates) == 1 or not department:
-            return candidates[0]
-
-        norm_department = department.strip()
-
-        def _calc_score(text: str) -> float:
-            if not text or not norm_department:
-                return 0.0
-            source = text.strip()
-            return SequenceMatcher(None, source, norm_department).ratio()
-
-        best_candidate = candidates[0]
-        best_score = -1.0
-        for candidate in candidates:
-            division_score = _calc_score(candidate.division_text)
-            description_score = _calc_score(candidate.description)
-            score = division_score if division_score > 0 else description_score
-            LOGGER.debug(
-                "候補 '%s' division_score=%.3f description_score=%.3f",
-                candidate.description.splitlines()[0] if candidate.description else "(no text)",
-                division_score,
-                description_score,
-            )
-            if score > best_score:
-                best_score = score
-                best_candidate = candidate
-        LOGGER.info("部門一致率が最も高い候補を選択しました (score=%.3f)。", best_score)
-        return best_candidate
+        nodes = self.driver.find_elements(By.CSS_SELECTOR, RESULT_SELECTOR)
+        return nodes[index] if index < len(nodes) else None
+
+    def _select_candidate(self, candidates: Sequence[Candidate], department: str) -> Optional[Candidate]:
+        return _select_best_candidate(candidates, department)
+
+    def _find_profile_button(self, candidate: Candidate):
+        try:
+            container = candidate.container or self._result_node(candidate.index)
+            if container is None:
+                return False
+            buttons = container.find_elements(By.CSS_SELECTOR, PROFILE_BUTTON_SELECTOR)
+        except WebDriverException:
+            return False
+        return buttons[0] if buttons else False
 
     def _open_candidate_and_read_position(self, candidate: Candidate) -> Optional[str]:
         if candidate.position_preview:
             LOGGER.debug("一覧の役職を使用: %s", candidate.position_preview)
             return candidate.position_preview
-        button = None
-        button_selector = "button.internal-item__column--person, button"
-        for attempt in range(10):
+        with self._phase("button"):
             try:
-                button = candidate.container.find_element(By.CSS_SELECTOR, button_selector)
-                break
-            except NoSuchElementException:
-                time.sleep(0.5)
+                button = WebDriverWait(self.driver, 5, poll_frequency=0.1).until(
+                    lambda _driver: self._find_profile_button(candidate)
+                )
+            except TimeoutException:
+                button = None
         if button is None:
             LOGGER.error("候補にプロフィールボタンが見つかりません。")
             return None
@@ -425,28 +783,16 @@ class PhoneAppliClient:
 
     def _extract_position_text(self) -> Optional[str]:
         dialog = None
-        try:
-            dialog = self.wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "div.profile-dialog, .profile-dialog__container"))
-            )
-        except TimeoutException:
-            LOGGER.debug("プロフィールダイアログが表示されませんでした。再試行します。")
-            dialog = None
-        if dialog is None:
-            for attempt in range(3):
+        with self._phase("dialog"):
+            state = self._wait_until_settled(PROFILE_DIALOG_SELECTOR)
+            if state is None or state.get("ready"):
                 try:
-                    time.sleep(1.0)
-                    dialog = EC.presence_of_element_located(
-                        (By.CSS_SELECTOR, "div.profile-dialog, .profile-dialog__container")
-                    )(self.driver)
-                    if dialog is not None:
-                        LOGGER.debug("プロフィールダイアログを再試行 %d 回目で検出しました。", attempt + 1)
-                        break
-                except Exception:
+                    dialog = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, PROFILE_DIALOG_SELECTOR)))
+                except TimeoutException:
                     dialog = None
-            else:
-                LOGGER.debug("プロフィールダイアログを検出できませんでした。")
-                return None
+        if dialog is None:
+            LOGGER.debug("プロフィールダイアログを検出できませんでした。")
+            return None
 
         selector_groups = [
             ".detail__position span",
@@ -494,35 +840,641 @@ class PhoneAppliClient:
             "button[aria-label*='閉じる']",
             f"{dialog_selector} button[type='button']",
         ]
-        for selector in close_selectors:
+
+        def _close_button(driver: webdriver.Edge):
+            # One wait for all selectors, still preferring them in this order.
+            for selector in close_selectors:
+                for element in driver.find_elements(By.CSS_SELECTOR, selector):
+                    if element.is_displayed() and element.is_enabled():
+                        return element
+            return False
+
+        with self._phase("close"):
             try:
-                close_button = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
+                WebDriverWait(self.driver, 5, poll_frequency=0.1).until(_close_button).click()
+                WebDriverWait(self.driver, 5, poll_frequency=0.1).until(
+                    EC.invisibility_of_element_located((By.CSS_SELECTOR, dialog_selector))
                 )
-                close_button.click()
-                WebDriverWait(self.driver, 5).until(EC.invisibility_of_element_located((By.CSS_SELECTOR, dialog_selector)))
                 return
-            except TimeoutException:
-                LOGGER.debug("Close selector '%s' が見つからなかったためリトライします。", selector)
+            except (TimeoutException, WebDriverException):
+                LOGGER.debug("close ボタンを検出できなかったため Esc キーでクローズを試みます。")
+            try:
+                self.driver.switch_to.active_element.send_keys(Keys.ESCAPE)
+                WebDriverWait(self.driver, 5).until(EC.invisibility_of_element_located((By.CSS_SELECTOR, dialog_selector)))
+            except Exception:
+                LOGGER.warning("Esc キーによるダイアログクローズも失敗しました。")
+
+
+@dataclass
+class _TabSlot:
+    handle: str
+    person: Optional[PersonEntry] = None
+    started: float = 0.0
+    deadline: float = 0.0
+
+
+class PhoneAppliTabPool:
+    """Run several lookups at once in tabs of one authenticated Edge session.
+
+    WebDriver serialises commands per session, so the tabs are driven
+    round-robin from one thread: navigations are started without waiting for
+    the page load and each tab is polled until its result list is rendered.
+    """
+
+    def __init__(
+        self,
+        client: PhoneAppliClient,
+        *,
+        tabs: int = DEFAULT_TAB_COUNT,
+        stop_event: Optional[threading.Event] = None,
+    ) -> None:
+        self.client = client
+        self.tabs = max(1, tabs)
+        self.stop_event = stop_event if stop_event is not None else client.stop_event
+
+    def _stopped(self) -> bool:
+        return bool(self.stop_event is not None and self.stop_event.is_set())
+
+    def _open_tabs(self) -> List[_TabSlot]:
+        driver = self.client.driver
+        handles = [driver.current_window_handle]
+        while len(handles) < self.tabs:
+            driver.switch_to.new_window("tab")
+            handles.append(driver.current_window_handle)
+        return [_TabSlot(handle=handle) for handle in handles]
+
+    def _close_tabs(self, slots: Sequence[_TabSlot]) -> None:
+        driver = self.client.driver
+        for slot in slots[1:]:
+            try:
+                driver.switch_to.window(slot.handle)
+                driver.close()
+            except WebDriverException:
                 continue
+        try:
+            driver.switch_to.window(slots[0].handle)
+        except WebDriverException:
+            pass
+
+    def _start(self, slot: _TabSlot, person: PersonEntry) -> None:
+        LOGGER.info("URL検索 (tab): %s (department=%s)", person.email, person.department or "-")
+        driver = self.client.driver
+        driver.switch_to.window(slot.handle)
+        driver.execute_script(_NAVIGATE_JS, self.client.search_url(person.email))
+        slot.person = person
+        slot.started = time.monotonic()
+        slot.deadline = slot.started + self.client.timeout
+
+    def _poll(self, slot: _TabSlot) -> Tuple[bool, Optional[str]]:
+        """Return (finished, title) for the lookup running in ``slot``."""
+
+        person = slot.person
+        assert person is not None
+        driver = self.client.driver
+        driver.switch_to.window(slot.handle)
+        items = driver.execute_script(
+            _POLL_CANDIDATES_JS,
+            RESULT_SELECTOR,
+            list(DIVISION_COLUMN_SELECTORS),
+            DIVISION_TEXT_SELECTOR,
+            POSITION_PREVIEW_SELECTOR,
+            PROFILE_BUTTON_SELECTOR,
+        )
+        candidates = _candidates_from_payload(items)
+        if candidates:
+            self.client._timings = LookupTimings()
+            self.client._timings.add("tab_wait", time.monotonic() - slot.started)
+            try:
+                return True, self.client.title_from_candidates(candidates, person.department)
+            finally:
+                self.client.log_timings(person.email)
+        if time.monotonic() >= slot.deadline:
+            LOGGER.warning("検索結果が見つかりませんでした: %s", person.email)
+            return True, None
+        return False, None
+
+    def lookup_many(self, people: Sequence[PersonEntry]) -> Dict[int, Optional[str]]:
+        """Return titles keyed by sheet row; rows not reached before a stop are omitted."""
+
+        queue: Deque[PersonEntry] = deque(person for person in people if person.email)
+        results: Dict[int, Optional[str]] = {}
+        if not queue:
+            return results
+        slots = self._open_tabs()
+        try:
+            while queue or any(slot.person is not None for slot in slots):
+                if self._stopped():
+                    LOGGER.warning("停止要求を受けたため PHONE APPLI 検索を中断しました (未処理 %d 件)。", len(queue))
+                    break
+                for slot in slots:
+                    if slot.person is None:
+                        if queue and self.client.rate_limiter.acquire(timeout=0):
+                            self._start(slot, queue.popleft())
+                        continue
+                    person = slot.person
+                    try:
+                        finished, title = self._poll(slot)
+                    except WebDriverException as exc:
+                        LOGGER.exception("タブでの役職取得中にエラーが発生しました (%s): %s", person.email, exc)
+                        finished, title = True, None
+                    if finished:
+                        results[person.row] = title
+                        slot.person = None
+                if self.stop_event is not None:
+                    self.stop_event.wait(TAB_POLL_INTERVAL)
+                else:
+                    time.sleep(TAB_POLL_INTERVAL)
+        finally:
+            self._close_tabs(slots)
+        return results
+
+
+class PhoneAppliSessionExpired(RuntimeError):
+    """The exported browser cookies are no longer accepted by the API."""
+
 
-        LOGGER.debug("close ボタンを検出できなかったため Esc キーでクローズを試みます。")
+class _ConnectionPool:
+    """Keep-alive HTTP(S) connections to one host, reused across lookups."""
+
+    def __init__(self, scheme: str, netloc: str, size: int, timeout: float) -> None:
+        self._factory = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        self._netloc = netloc
+        self._timeout = timeout
+        self._idle: LifoQueue = LifoQueue(maxsize=size)
+        self.created = 0
+
+    def _new(self) -> http.client.HTTPConnection:
+        self.created += 1
+        return self._factory(self._netloc, timeout=self._timeout)
+
+    @contextmanager
+    def connection(self) -> Iterator[http.client.HTTPConnection]:
+        try:
+            conn = self._idle.get_nowait()
+        except Empty:
+            conn = self._new()
         try:
-            self.driver.switch_to.active_element.send_keys(Keys.ESCAPE)
-            WebDriverWait(self.driver, 5).until(EC.invisibility_of_element_located((By.CSS_SELECTOR, dialog_selector)))
+            yield conn
         except Exception:
-            LOGGER.warning("Esc キーによるダイアログクローズも失敗しました。")
+            conn.close()
+            raise
+        else:
+            try:
+                self._idle.put_nowait(conn)
+            except Exception:
+                conn.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                return
+
+
+def _api_first_text(record: dict, keys: Sequence[str]) -> str:
+    for key in keys:
+        value = record.get(key)
+        if isinstance(value, dict):
+            value = _api_first_text(value, ("name", "displayName", "value"))
+        text = _normalise(value) if not isinstance(value, (list, dict)) else ""
+        if text:
+            return text
+    return ""
 
 
-def persist_positions(positions: Sequence[str], destination: Path = POSITIONS_CACHE) -> None:
+def _api_records(payload: object) -> List[dict]:
+    if isinstance(payload, list):
+        return [item for item in payload if isinstance(item, dict)]
+    if isinstance(payload, dict):
+        for key in ("content", "items", "contacts", "internalContacts", "results", "data"):
+            if key in payload:
+                return _api_records(payload[key])
+    return []
+
+
+def _candidates_from_api(payload: object, email: str) -> List[Candidate]:
+    """Map one search response onto Candidate rows for the usual scoring."""
+
+    candidates: List[Candidate] = []
+    for index, record in enumerate(_api_records(payload)):
+        divisions: List[str] = []
+        positions: List[str] = []
+        for key in ("divisions", "divisionPositions", "organizations"):
+            for entry in record.get(key) or []:
+                if isinstance(entry, dict):
+                    divisions.append(_api_first_text(entry, ("divisionName", "name", "division")))
+                    positions.append(_api_first_text(entry, ("positionName", "position", "title")))
+        divisions.append(_api_first_text(record, ("divisionName", "division", "departmentName", "department")))
+        positions.append(_api_first_text(record, ("positionName", "position", "jobTitle", "title")))
+        name = _api_first_text(record, ("name", "fullName", "displayName"))
+        mail = _api_first_text(record, ("email", "mail", "mailAddress"))
+        division_text = _join_unique(divisions)
+        description = "\n".join(part for part in (name, mail, division_text) if part)
+        if not description:
+            continue
+        candidate = Candidate(
+            container=None,
+            description=description,
+            division_text=division_text,
+            position_preview=_join_unique(positions),
+            index=index,
+        )
+        if mail and mail.lower() == email.strip().lower():
+            # An exact address match beats any division score.
+            return [candidate]
+        candidates.append(candidate)
+    return candidates
+
+
+class PhoneAppliApiClient:
+    """Call the PHONE APPLI search API directly with cookies from a signed-in browser."""
+
+    def __init__(
+        self,
+        session_provider: Callable[[bool], Tuple[List[dict], str]],
+        *,
+        url_template: str = API_URL_TEMPLATE,
+        pool_size: int = API_POOL_SIZE,
+        timeout: float = API_TIMEOUT_SECONDS,
+        rate_per_second: float = API_RATE_PER_SECOND,
+        stop_event: Optional[threading.Event] = None,
+    ) -> None:
+        if not url_template:
+            raise ValueError("PHONE APPLI API の URL (CHOUJI_PHONEAPPLI_API_URL) が設定されていません。")
+        self.session_provider = session_provider
+        self.url_template = url_template
+        parts = urlsplit(url_template.format(email="x"))
+        self.pool = _ConnectionPool(parts.scheme, parts.netloc, pool_size, timeout)
+        self.pool_size = max(1, pool_size)
+        self.rate_limiter = get_bucket("phoneappli-api", rate_per_second, float(self.pool_size))
+        self.stop_event = stop_event
+        self._headers: Dict[str, str] = {}
+        self._session_lock = threading.Lock()
+        self.requests = 0
+
+    def refresh_session(self, *, expired: bool = False, stale: Optional[Dict[str, str]] = None) -> None:
+        """(Re)load cookies from the browser; ``expired`` asks it to sign in again.
+
+        ``stale`` is the header set a failed request used; when another
+        thread has already replaced it, the session is not refreshed twice.
+        """
+
+        with self._session_lock:
+            if stale is not None and self._headers is not stale:
+                return
+            cookies, user_agent = self.session_provider(expired)
+            jar = "; ".join(f"{item['name']}={item['value']}" for item in cookies if item.get("name"))
+            headers = {"Accept": "application/json", "Cookie": jar, "Connection": "keep-alive"}
+            if user_agent:
+                headers["User-Agent"] = user_agent
+            for item in cookies:
+                # Spring / Angular style CSRF protection echoes this cookie as a header.
+                if str(item.get("name", "")).upper() == "XSRF-TOKEN":
+                    headers["X-XSRF-TOKEN"] = str(item.get("value", ""))
+            self._headers = headers
+            LOGGER.info("ブラウザのセッション Cookie を API クライアントに引き継ぎました (%d 件)。", len(cookies))
+
+    def _get(self, path: str) -> Tuple[int, Dict[str, str], bytes]:
+        for attempt in range(2):
+            try:
+                with self.pool.connection() as conn:
+                    conn.request("GET", path, headers=self._headers)
+                    response = conn.getresponse()
+                    body = response.read()
+                    return response.status, {key.lower(): value for key, value in response.getheaders()}, body
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; retry once on a new one.
+                if attempt:
+                    raise
+        raise RuntimeError("unreachable")
+
+    def search(self, email: str) -> object:
+        if not self._headers:
+            self.refresh_session(stale=self._headers)
+        if not self.rate_limiter.acquire(stop_event=self.stop_event):
+            raise InterruptedError("停止要求を受けたため PHONE APPLI API 呼び出しを中断しました。")
+        parts = urlsplit(self.url_template.format(email=quote(email, safe="")))
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        self.requests += 1
+        status, headers, body = self._get(path)
+        content_type = headers.get("content-type", "")
+        if status in (401, 403) or 300 <= status < 400 or "text/html" in content_type:
+            raise PhoneAppliSessionExpired(f"status={status} content-type={content_type or '-'}")
+        if status != 200:
+            raise RuntimeError(f"PHONE APPLI API エラー: status={status}")
+        return json.loads(body.decode("utf-8"))
+
+    def lookup_job_title(self, email: str, department: str) -> Optional[str]:
+        """Return the position of the best match, or None if the API has none."""
+
+        headers = self._headers
+        try:
+            payload = self.search(email)
+        except PhoneAppliSessionExpired as exc:
+            LOGGER.info("API セッションが失効しました (%s)。ブラウザで再ログインします。", exc)
+            self.refresh_session(expired=True, stale=headers)
+            payload = self.search(email)
+        target = _select_best_candidate(_candidates_from_api(payload, email), department)
+        if target is None or not target.position_preview:
+            return None
+        LOGGER.info("API で取得した役職: %s (%s)", target.position_preview, email)
+        return target.position_preview
+
+    def lookup_many(self, people: Sequence[PersonEntry]) -> Dict[int, Optional[str]]:
+        """Look up all rows over the keep-alive pool; failures map to None."""
+
+        def _lookup(person: PersonEntry) -> Tuple[int, Optional[str]]:
+            if self.stop_event is not None and self.stop_event.is_set():
+                return person.row, None
+            try:
+                return person.row, self.lookup_job_title(person.email, person.department)
+            except Exception as exc:
+                LOGGER.warning("API での役職取得に失敗しました (%s): %s", person.email, exc)
+                return person.row, None
+
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            return dict(executor.map(_lookup, [person for person in people if person.email]))
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+AMBIGUOUS_TITLES = frozenset({"", "-", "ー", "なし", "役職未設定", "上司検索失敗"})
+
+# Process-wide title cache (email -> title) so that later rows or cases in the
+# same robot process never look up the same manager twice.
+_TITLE_MEMO: Dict[str, str] = {}
+
+
+def _is_ambiguous_title(title: Optional[str]) -> bool:
+    return _normalise(title) in AMBIGUOUS_TITLES
+
+
+@dataclass
+class SourceStats:
+    """Hit counters for one title source."""
+
+    attempts: int = 0
+    hits: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.attempts if self.attempts else 0.0
+
+
+class TitleSource(ABC):
+    """A place a job title can come from, ordered by lookup cost."""
+
+    name = "base"
+
+    @abstractmethod
+    def lookup(self, person: PersonEntry) -> Optional[str]:
+        """The title of ``person``, or None when this source does not know it."""
+
+    def lookup_many(self, people: Sequence[PersonEntry]) -> Dict[int, Optional[str]]:
+        return {person.row: self.lookup(person) for person in people}
+
+    def close(self) -> None:
+        return None
+
+
+class LocalCacheSource(TitleSource):
+    """Titles of this process (_TITLE_MEMO) and of earlier runs (TitleCache)."""
+
+    name = "cache"
+
+    def __init__(self, title_cache: Optional[TitleCache] = None) -> None:
+        self._title_cache = title_cache
+        self._stored: Dict[str, str] = {}
+
+    def prefetch(self, people: Sequence[PersonEntry]) -> None:
+        """Load every row from the shared cache in one query."""
+
+        if self._title_cache is None:
+            return
+        entries = self._title_cache.get_many((person.email, person.department) for person in people)
+        self._stored = {email: entry.title for email, entry in entries.items()}
+        LOGGER.info("役職キャッシュから %d/%d 件を取得しました。", len(self._stored), len(people))
+
+    def lookup(self, person: PersonEntry) -> Optional[str]:
+        email = person.email.strip().lower()
+        return _TITLE_MEMO.get(email) or self._stored.get(email)
+
+
+class DirectorySource(TitleSource):
+    """JobTitle values already returned by Bc.get_boss_data.ps1 (Graph / AD)."""
+
+    name = "directory"
+
+    def __init__(self, manager_chain: Optional[Iterable[dict]] = None) -> None:
+        self._titles: Dict[str, str] = {}
+        for entry in manager_chain or []:
+            if not isinstance(entry, dict):
+                continue
+            mail = _normalise(entry.get("Mail")).lower()
+            title = _normalise(entry.get("JobTitle"))
+            if mail and title:
+                self._titles[mail] = title
+
+    def lookup(self, person: PersonEntry) -> Optional[str]:
+        return self._titles.get(person.email.strip().lower())
+
+
+class PhoneAppliSource(TitleSource):
+    """Browser scraping; the Edge session is only started on the first miss."""
+
+    name = "phoneappli"
+
+    def __init__(
+        self,
+        *,
+        headless: bool,
+        keep_browser_open: bool,
+        login_wait: int,
+        extraction_mode: str = "script",
+        tabs: int = 1,
+        stop_event: Optional[threading.Event] = None,
+        warm_session: bool = False,
+        block_resources: bool = BLOCK_RESOURCES_DEFAULT,
+    ) -> None:
+        self._headless = headless
+        self._warm_session = warm_session
+        self._block_resources = block_resources
+        self._keep_browser_open = keep_browser_open
+        self._login_wait = login_wait
+        self._extraction_mode = extraction_mode
+        self._tabs = max(1, tabs)
+        self._stop_event = stop_event
+        self._client: Optional[PhoneAppliClient] = None
+
+    def _new_client(self, warm: bool) -> PhoneAppliClient:
+        return PhoneAppliClient(
+            headless=self._headless,
+            keep_browser_open=self._keep_browser_open,
+            extraction_mode=self._extraction_mode,
+            stop_event=self._stop_event,
+            warm_session=warm,
+            block_resources=self._block_resources,
+        )
+
+    def ensure_client(self) -> PhoneAppliClient:
+        if self._client is None:
+            client = self._new_client(self._warm_session)
+            try:
+                client.ensure_ready(login_wait=self._login_wait)
+            except WebDriverException as exc:
+                if client.warm_session is None:
+                    raise
+                # The attached browser died or hung: drop it and start fresh.
+                LOGGER.warning("常駐 Edge が応答しないため破棄して通常起動します: %s", exc)
+                client.warm_session.shutdown()
+                client = self._new_client(False)
+                client.ensure_ready(login_wait=self._login_wait)
+            self._client = client
+        return self._client
+
+    def browser_session(self, expired: bool = False) -> Tuple[List[dict], str]:
+        """Session provider for PhoneAppliApiClient; signs in again when ``expired``."""
+
+        client = self.ensure_client()
+        if expired:
+            client.ensure_ready(login_wait=self._login_wait, force=True)
+        return client.export_session()
+
+    def lookup(self, person: PersonEntry) -> Optional[str]:
+        return self.ensure_client().lookup_job_title(person.email, person.department)
+
+    def lookup_many(self, people: Sequence[PersonEntry]) -> Dict[int, Optional[str]]:
+        if self._tabs > 1:
+            LOGGER.info("PHONE APPLI を %d タブで並列検索します (%d 件)。", self._tabs, len(people))
+            pool = PhoneAppliTabPool(self.ensure_client(), tabs=self._tabs, stop_event=self._stop_event)
+            return pool.lookup_many(people)
+        results: Dict[int, Optional[str]] = {}
+        for person in people:
+            if self._stop_event is not None and self._stop_event.is_set():
+                LOGGER.warning("停止要求を受けたため PHONE APPLI 検索を中断しました。")
+                break
+            try:
+                results[person.row] = self.lookup(person)
+            except Exception as exc:
+                LOGGER.exception("%s での役職取得中にエラーが発生しました: %s", self.name, exc)
+                results[person.row] = None
+        return results
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+class PhoneAppliApiSource(TitleSource):
+    """Search API with the browser's cookies; the browser only signs in (again)."""
+
+    name = "phoneappli_api"
+
+    def __init__(
+        self,
+        browser: PhoneAppliSource,
+        *,
+        url_template: str,
+        stop_event: Optional[threading.Event] = None,
+    ) -> None:
+        self._client = PhoneAppliApiClient(browser.browser_session, url_template=url_template, stop_event=stop_event)
+
+    def lookup(self, person: PersonEntry) -> Optional[str]:
+        return self._client.lookup_job_title(person.email, person.department)
+
+    def lookup_many(self, people: Sequence[PersonEntry]) -> Dict[int, Optional[str]]:
+        results = self._client.lookup_many(people)
+        LOGGER.info("PHONE APPLI API: %d 件を %d 接続で検索しました。", self._client.requests, self._client.pool.created)
+        return results
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class JobTitleResolver:
+    """Try each source in cost order and keep per-source hit statistics."""
+
+    def __init__(self, sources: Sequence[TitleSource]) -> None:
+        self.sources = list(sources)
+        self.stats: Dict[str, SourceStats] = {source.name: SourceStats() for source in self.sources}
+
+    def resolve(self, person: PersonEntry, *, skip: Iterable[str] = ()) -> Tuple[Optional[str], str]:
+        skipped = set(skip)
+        for source in self.sources:
+            if source.name in skipped:
+                continue
+            try:
+                title = source.lookup(person)
+            except Exception as exc:
+                LOGGER.exception("%s での役職取得中にエラーが発生しました: %s", source.name, exc)
+                title = None
+            if self.record(source, person, title):
+                return title, source.name
+        return None, ""
+
+    def record(self, source: TitleSource, person: PersonEntry, title: Optional[str]) -> bool:
+        """Count one lookup of ``source``; True when ``title`` is usable."""
+
+        stats = self.stats[source.name]
+        stats.attempts += 1
+        if not title or _is_ambiguous_title(title):
+            return False
+        stats.hits += 1
+        if source.name != LocalCacheSource.name:
+            _TITLE_MEMO[person.email.strip().lower()] = title
+        return True
+
+    def close(self) -> None:
+        for source in self.sources:
+            source.close()
+
+    def report(self) -> Dict[str, dict]:
+        summary = {
+            name: {"attempts": stats.attempts, "hits": stats.hits, "hit_rate": round(stats.hit_rate, 3)}
+            for name, stats in self.stats.items()
+        }
+        LOGGER.info("役職ソース別ヒット率: %s", summary)
+        return summary
+
+
+def persist_positions(
+    positions: Sequence[str],
+    destination: Path = POSITIONS_CACHE,
+    *,
+    records: Sequence[TitleRecord] = (),
+    title_cache: Optional[TitleCache] = None,
+) -> bool:
+    """Save the snapshot Be reads; an unchanged payload is not rewritten.
+
+    Returns True when the file was written.  A failed write raises, since Be
+    would otherwise read the previous case's positions.
+    """
+
     payload = _load_cache_payload().copy()
     if "edge_driver_path" not in payload and DEFAULT_DRIVER_PATH.exists():
         payload["edge_driver_path"] = str(DEFAULT_DRIVER_PATH)
     payload["generated_at"] = datetime.now().isoformat()
     payload["positions"] = list(positions)
-    destination.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-    _load_cache_payload.cache_clear()
-    LOGGER.info("positions を %s に保存しました。", destination)
+    try:
+        written = write_json_if_changed(destination, payload, ignore=("generated_at",))
+    except (OSError, LockTimeout) as exc:
+        LOGGER.error("positions を %s に保存できませんでした: %s", destination, exc)
+        raise
+    if written:
+        _load_cache_payload.cache_clear()
+        LOGGER.info("positions を %s に保存しました。", destination)
+    else:
+        LOGGER.info("positions に変更が無いため %s は更新しません。", destination)
+    if title_cache is not None and records:
+        stored = title_cache.put_many(records)
+        if stored:
+            LOGGER.info("役職キャッシュ %s に %d 件を書き込みました。", title_cache.path, stored)
+        else:
+            LOGGER.warning("役職キャッシュ %s に書き込めませんでした (%d 件)。", title_cache.path, len(records))
+    return written
 
 
 def configure_logging(verbose: bool) -> None:
@@ -545,54 +1497,199 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     parser.add_argument("--keep-browser-open", action="store_true", help="処理後もブラウザを閉じません。")
     parser.add_argument("--login-wait", type=int, default=120, help="ログイン完了待ちのタイムアウト秒数。")
     parser.add_argument("--verbose", action="store_true", help="詳細ログを有効にします。")
+    parser.add_argument(
+        "--manager-json",
+        type=Path,
+        help="Bc.get_boss_data.ps1 の出力 JSON。JobTitle をディレクトリ情報として利用します。",
+    )
+    parser.add_argument(
+        "--phoneappli-only",
+        action="store_true",
+        help="キャッシュ・ディレクトリ情報を使わず、全行を PHONE APPLI で検索します。",
+    )
+    parser.add_argument(
+        "--tabs",
+        type=int,
+        default=DEFAULT_TAB_COUNT,
+        help="PHONE APPLI を並列検索するタブ数 (1 で従来の逐次検索)。",
+    )
+    parser.add_argument(
+        "--extraction-mode",
+        choices=EXTRACTION_MODES,
+        default="script",
+        help="検索結果の読み取り方式 (script: execute_script 1 回 / elements: 従来の find_elements)。",
+    )
+    parser.add_argument(
+        "--block-resources",
+        action=argparse.BooleanOptionalAction,
+        default=BLOCK_RESOURCES_DEFAULT,
+        help="画像・フォント・解析タグの読み込みを CDP でブロックします。",
+    )
+    parser.add_argument(
+        "--warm-session",
+        action=argparse.BooleanOptionalAction,
+        default=WARM_SESSION_DEFAULT,
+        help="常駐 Edge (専用プロファイル + リモートデバッグ) に接続してログインを再利用します。",
+    )
+    parser.add_argument("--reset-warm-session", action="store_true", help="常駐 Edge と msedgedriver を終了してから開始します。")
+    parser.add_argument("--title-cache", type=Path, help="役職キャッシュ (SQLite) のパス (省略時は既定パス)。")
+    parser.add_argument("--no-title-cache", action="store_true", help="役職キャッシュを読み書きしません。")
+    parser.add_argument(
+        "--title-cache-ttl-days",
+        type=float,
+        default=DEFAULT_TTL_DAYS,
+        help="役職キャッシュの有効日数。",
+    )
+    parser.add_argument(
+        "--api-url",
+        default=API_URL_TEMPLATE,
+        help="PHONE APPLI 検索 API の URL テンプレート ({email} を含む)。指定時はブラウザより先に API で検索します。",
+    )
     return parser.parse_args(argv)
 
 
-def run(argv: Optional[Sequence[str]] = None) -> dict:
+def _load_manager_json(path: Path) -> List[dict]:
+    payload = json.loads(path.read_text(encoding="utf-8-sig"))
+    if isinstance(payload, dict):
+        payload = payload.get("managers") or []
+    return [entry for entry in payload if isinstance(entry, dict)]
+
+
+_WARM_UP_LOCK = threading.Lock()
+
+
+def warm_up(robot: Any = None) -> Optional[str]:
+    """Start or attach to the resident Edge and msedgedriver before Bd needs them.
+
+    Does nothing unless CHOUJI_EDGE_WARM_SESSION=1; returns the debugger address.
+    """
+
+    if not WARM_SESSION_DEFAULT:
+        return None
+    # The startup warm-up and step B may both call this; the second one then attaches.
+    with _WARM_UP_LOCK:
+        session = WarmEdgeSession(driver_path=_resolve_driver_path())
+        address = session.ensure_browser()
+        session.ensure_driver()
+    return address
+
+
+def run(
+    argv: Optional[Sequence[str]] = None,
+    *,
+    manager_chain: Optional[Sequence[dict]] = None,
+    stop_event: Optional[threading.Event] = None,
+    sheet_model: Optional[RpaSheetModel] = None,
+) -> dict:
     args = parse_args(argv)
     configure_logging(args.verbose)
+    if args.reset_warm_session:
+        WarmEdgeSession().shutdown()
 
-    sheet = RpaSheetAccessor(book_path=args.book, sheet_name=args.sheet)
+    sheet = RpaSheetAccessor(book_path=args.book, sheet_name=args.sheet, model=sheet_model)
     people = list(sheet.iter_people())
     if not people:
         LOGGER.warning("処理対象が見つかりませんでした。")
         return {"positions": []}
 
-    client = PhoneAppliClient(
+    if manager_chain is None and args.manager_json:
+        manager_chain = _load_manager_json(args.manager_json)
+
+    targets: List[PersonEntry] = []
+    for idx, person in enumerate(people):
+        if idx == 0:
+            LOGGER.debug("本人行はスキップします。")
+            continue
+        if args.max_rows and len(targets) >= args.max_rows:
+            LOGGER.info("max_rows=%s に達したため処理を終了します。", args.max_rows)
+            break
+        if not person.email:
+            LOGGER.info("Row %s (%s) はメールアドレスが空のためスキップします。", person.row, person.label or person.name)
+            continue
+        targets.append(person)
+
+    title_cache: Optional[TitleCache] = None
+    if not args.no_title_cache:
+        title_cache = TitleCache(
+            args.title_cache or PathRegistry().title_cache_db,
+            ttl=timedelta(days=args.title_cache_ttl_days),
+        )
+
+    sources: List[TitleSource] = []
+    if not args.phoneappli_only:
+        cache_source = LocalCacheSource(title_cache)
+        cache_source.prefetch(targets)
+        sources.append(cache_source)
+        sources.append(DirectorySource(manager_chain))
+    browser = PhoneAppliSource(
         headless=args.headless,
         keep_browser_open=args.keep_browser_open,
+        login_wait=args.login_wait,
+        extraction_mode=args.extraction_mode,
+        tabs=args.tabs,
+        stop_event=stop_event,
+        warm_session=args.warm_session,
+        block_resources=args.block_resources,
     )
-
-    processed = 0
+    # Batch stages run after the cheap per-row sources, each on the rows the
+    # previous stage could not answer.  The browser is always the last one.
+    stages: List[TitleSource] = []
+    if args.api_url:
+        stages.append(PhoneAppliApiSource(browser, url_template=args.api_url, stop_event=stop_event))
+    stages.append(browser)
+    resolver = JobTitleResolver(sources + stages)
+    stage_names = [stage.name for stage in stages]
+
+    resolved: Dict[int, Tuple[Optional[str], str]] = {}
     try:
-        client.ensure_ready(login_wait=args.login_wait)
-        for idx, person in enumerate(people):
-            if idx == 0:
-                LOGGER.debug("本人行はスキップします。")
-                continue
-            if args.max_rows and processed >= args.max_rows:
-                LOGGER.info("max_rows=%s に達したため処理を終了します。", args.max_rows)
+        pending: List[PersonEntry] = []
+        for person in targets:
+            title, source = resolver.resolve(person, skip=stage_names)
+            if title:
+                resolved[person.row] = (title, source)
+            else:
+                pending.append(person)
+        for stage in stages:
+            if not pending:
                 break
-            if not person.email:
-                LOGGER.info("Row %s (%s) はメールアドレスが空のためスキップします。", person.row, person.label or person.name)
-                continue
-            try:
-                title = client.lookup_job_title(person.email, person.department)
-            except Exception as exc:
-                LOGGER.exception("検索中にエラーが発生しました: %s", exc)
-                title = None
-            if not title:
-                title = "上司検索失敗"
-            sheet.update_title(person.row, title)
-            processed += 1
-            time.sleep(0.5)
+            if stop_event is not None and stop_event.is_set():
+                LOGGER.warning("停止要求を受けたため役職取得を中断します。")
+                break
+            found = stage.lookup_many(pending)
+            misses: List[PersonEntry] = []
+            for person in pending:
+                if person.row not in found:
+                    continue
+                title = found[person.row]
+                if resolver.record(stage, person, title):
+                    resolved[person.row] = (title, stage.name)
+                elif stage is browser:
+                    resolved[person.row] = (None, "")
+                else:
+                    misses.append(person)
+            pending = misses
     finally:
-        client.close()
+        resolver.close()
+
+    processed = 0
+    records: List[TitleRecord] = []
+    for person in targets:
+        if person.row not in resolved:
+            continue
+        title, source = resolved[person.row]
+        if not title:
+            title = "上司検索失敗"
+        else:
+            LOGGER.info("Row %s: 役職=%s (source=%s)", person.row, title, source)
+            if source != LocalCacheSource.name:
+                records.append((person.email, title, person.department, source))
+        sheet.update_title(person.row, title)
+        processed += 1
 
     sheet.save()
     positions = sheet.collect_positions(exclude_first=True)
-    persist_positions(positions)
-    return {"positions": positions, "processed": processed}
+    persist_positions(positions, records=records, title_cache=title_cache)
+    return {"positions": positions, "processed": processed, "source_stats": resolver.report()}
 
 
 def main(argv: Optional[Sequence[str]] = None) -> int:  # pragma: no cover - CLI helper
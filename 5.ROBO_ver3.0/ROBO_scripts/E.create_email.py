@@ -12,7 +12,25 @@ from module_loader import load_helper
 LOGGER = logging.getLogger("chouji_robo.email")
 
 
-def run(robot) -> bool:
+def _reset_artifacts(state) -> None:
+    """Forget artifacts of an earlier pass so the first pass always builds fresh ones."""
+
+    state.pdf_fingerprint = ""
+    state.mail_fingerprint = ""
+    state.draft_pdf_fingerprint = ""
+    state.draft_attachment_name = ""
+    state.draft_sink_name = ""
+    state.outlook_draft_entry_id = ""
+    state.outlook_draft_store_id = ""
+
+
+def run(robot, checkpoint=None) -> bool:
+    """``checkpoint`` (checkpoint.Checkpoint) is saved after Ea, Eb and Ec.
+
+    When it was loaded for a resume, the PDF and draft of the earlier run are
+    kept if Ea/Eb find them still current.
+    """
+
     robot.current_phase = "E.create_email"
     LOGGER.info("E.create_email: メール作成フェーズを開始します。")
 
@@ -21,14 +39,25 @@ def run(robot) -> bool:
 
     success = False
     error_message = ""
+    if checkpoint is None or not checkpoint.resumed:
+        _reset_artifacts(robot.state)
+
+    def _checkpoint(phase: str) -> None:
+        if checkpoint is not None:
+            checkpoint.save(robot, phase)
 
     try:
         while True:
+            # Ea/Eb compare content fingerprints and skip or patch in place
+            # whatever the operator's edit in Ec did not touch.
             load_helper("Ea.create_excel_PDF").run(robot)
+            _checkpoint("Ea.create_excel_PDF")
             load_helper("Eb.write_email").run(robot)
+            _checkpoint("Eb.write_email")
             action = load_helper("Ec.show_mail_and_PDF").run(robot)
+            _checkpoint("Ec.show_mail_and_PDF")
             if action == "redo":
-                LOGGER.info("PDFの変更が選択されたため、再度 PDF/メールを生成します。")
+                LOGGER.info("PDFの変更が選択されたため、変更された PDF/メールを更新します。")
                 continue
             break
         success = True
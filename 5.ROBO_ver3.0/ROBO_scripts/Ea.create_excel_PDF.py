@@ -1,20 +1,40 @@
 #!/usr/bin/env python3
-"""Generate PDF/Excel exports for the 弔事連絡票 sheet."""
+"""Generate PDF/Excel exports for the 弔事連絡票 sheet.
+
+Exports are written to a temp file and renamed into place, so Edge, Outlook
+and OneDrive never see a half-written PDF.  Older outputs are no longer
+wiped up front: artifact_manifest removes the robot's stale files in the
+background once the new ones exist.
+"""
 
 from __future__ import annotations
 
 import logging
+import os
 import re
-import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
+import chouji_pdf
+import xlsx_package
+from artifact_manifest import default_cleaner
+from atomic_io import atomic_output, payload_digest
 from excel_com import open_workbook
 
 
 LOGGER = logging.getLogger("chouji_robo.email")
 
+# "excel" (default) exports with ExportAsFixedFormat; "python" renders the
+# sheet headlessly with chouji_pdf and falls back to Excel on any error.
+PDF_RENDERER = os.getenv("CHOUJI_PDF_RENDERER", "excel").strip().lower()
+# "package" (default) cuts the sheet out of the xlsx package on a worker
+# thread while the PDF is exported; "excel" keeps Worksheet.Copy() + SaveAs.
+XLSX_EXPORTER = os.getenv("CHOUJI_XLSX_EXPORTER", "package").strip().lower()
+
+TARGET_SHEET = "弔事連絡票"
+
 
 def _sanitize_filename(value: str) -> str:
     normalized = value.strip()
@@ -39,6 +59,66 @@ def _read_cell(sheet, address: str) -> str:
     return "" if value is None else str(value).strip()
 
 
+def _artifact_fingerprint(snapshot: bytes) -> str:
+    """Fingerprint of everything the PDF/xlsx depend on ("" when the book cannot be read)."""
+
+    try:
+        return payload_digest(
+            {
+                "sheet": xlsx_package.sheet_digest(snapshot, TARGET_SHEET),
+                "file_name": xlsx_package.sheet_digest(snapshot, "RPAシート", ("D13",)),
+            }
+        )
+    except Exception:
+        LOGGER.debug("弔事連絡票のフィンガープリントを取得できませんでした。", exc_info=True)
+        return ""
+
+
+def _outputs_current(robot, fingerprint: str) -> bool:
+    state = robot.state
+    if not fingerprint or fingerprint != state.pdf_fingerprint:
+        return False
+    paths = (state.generated_pdf_path, state.generated_excel_path)
+    return all(path and Path(path).exists() for path in paths)
+
+
+def _start_xlsx_extract(pool: ThreadPoolExecutor, snapshot: bytes, xlsx_path: Path) -> Future:
+    LOGGER.debug("Excel を %s に書き出します (パッケージ抽出)。", xlsx_path)
+    return pool.submit(xlsx_package.extract_sheet, snapshot, TARGET_SHEET, xlsx_path)
+
+
+def _finish_xlsx_extract(future: Optional[Future]) -> bool:
+    if future is None:
+        return False
+    try:
+        future.result()
+    except Exception as exc:
+        LOGGER.warning("パッケージからの Excel 抽出に失敗したため Excel で保存します: %s", exc, exc_info=True)
+        return False
+    return True
+
+
+def _export_headless(rpa_book: Path, snapshot: bytes, output_dir: Path) -> Optional[Tuple[Path, Path]]:
+    if not chouji_pdf.available():
+        LOGGER.warning("openpyxl/reportlab が無いため Excel で PDF を生成します。")
+        return None
+    try:
+        cells = xlsx_package.read_sheet_values(snapshot, "RPAシート")
+        base_name = _sanitize_filename(cells.get("D13", ""))
+        pdf_path = output_dir / f"{base_name}.pdf"
+        xlsx_path = output_dir / f"{base_name}.xlsx"
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="xlsx-extract") as pool:
+            future = _start_xlsx_extract(pool, snapshot, xlsx_path)
+            LOGGER.debug("PDF を %s に描画します。", pdf_path)
+            with atomic_output(pdf_path) as temp_pdf:
+                chouji_pdf.render_sheet_pdf(rpa_book, TARGET_SHEET, temp_pdf)
+            future.result()
+    except Exception as exc:
+        LOGGER.warning("Excel を使わない PDF 生成に失敗したため Excel で生成します: %s", exc, exc_info=True)
+        return None
+    return pdf_path, xlsx_path
+
+
 def run(robot) -> None:
     robot.current_phase = "Ea.create_excel_PDF"
     LOGGER.info("Ea.create_excel_PDF: PDF/Excel の生成を開始します。")
@@ -50,42 +130,54 @@ def run(robot) -> None:
     if not rpa_book.exists():
         raise FileNotFoundError(f"RPAブックが見つかりません: {rpa_book}")
 
-    # 既存ファイルの整理
-    for item in output_dir.iterdir():
-        try:
-            if item.resolve() == rpa_book.resolve():
-                continue
-        except Exception:
-            if item.name == rpa_book.name:
-                continue
-        if item.is_dir():
-            shutil.rmtree(item, ignore_errors=True)
-        else:
-            try:
-                item.unlink()
-            except Exception:
-                LOGGER.warning("ファイル %s の削除に失敗しました。", item, exc_info=True)
-
-    with open_workbook(rpa_book) as workbook:
+    # PDF と xlsx は同じ時点のブック内容から作る (保存済みファイルのスナップショット)。
+    snapshot = rpa_book.read_bytes()
+    fingerprint = _artifact_fingerprint(snapshot)
+    if _outputs_current(robot, fingerprint):
+        LOGGER.info("弔事連絡票に変更が無いため PDF/Excel の再生成をスキップします。")
+        return
+
+    exported = _export_headless(rpa_book, snapshot, output_dir) if PDF_RENDERER == "python" else None
+    if exported is not None:
+        pdf_path, xlsx_path = exported
+        robot.state.generated_pdf_path = str(pdf_path)
+        robot.state.generated_excel_path = str(xlsx_path)
+        robot.state.pdf_fingerprint = fingerprint
+        default_cleaner().record(output_dir, (pdf_path, xlsx_path), keep=(rpa_book,))
+        LOGGER.info("PDF/Excel の生成が完了しました (Excel 不使用): %s, %s", pdf_path, xlsx_path)
+        return
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="xlsx-extract") as pool, open_workbook(rpa_book) as workbook:
         rpa_sheet = _ensure_target_sheet(workbook, "RPAシート")
-        company_sheet = _ensure_target_sheet(workbook, "弔事連絡票")
+        company_sheet = _ensure_target_sheet(workbook, TARGET_SHEET)
 
         base_name = _sanitize_filename(_read_cell(rpa_sheet, "D13"))
         pdf_path = output_dir / f"{base_name}.pdf"
         xlsx_path = output_dir / f"{base_name}.xlsx"
 
-        LOGGER.debug("PDF を %s に書き出します。", pdf_path)
-        company_sheet.ExportAsFixedFormat(0, str(pdf_path))
+        future = _start_xlsx_extract(pool, snapshot, xlsx_path) if XLSX_EXPORTER == "package" else None
 
-        LOGGER.debug("Excel を %s に書き出します。", xlsx_path)
-        excel = workbook.Application
-        company_sheet.Copy()  # 新しいブックとしてコピー
-        copied_book = excel.ActiveWorkbook
-        try:
-            copied_book.SaveAs(str(xlsx_path), FileFormat=51)  # xlOpenXMLWorkbook
-        finally:
-            copied_book.Close(SaveChanges=False)
+        LOGGER.debug("PDF を %s に書き出します。", pdf_path)
+        with atomic_output(pdf_path) as temp_pdf:
+            company_sheet.ExportAsFixedFormat(0, str(temp_pdf))
+
+        if not _finish_xlsx_extract(future):
+            LOGGER.debug("Excel を %s に書き出します。", xlsx_path)
+            excel = workbook.Application
+            company_sheet.Copy()  # 新しいブックとしてコピー
+            copied_book = excel.ActiveWorkbook
+            try:
+                with atomic_output(xlsx_path) as temp_xlsx:
+                    copied_book.SaveAs(str(temp_xlsx), FileFormat=51)  # xlOpenXMLWorkbook
+                    # Excel keeps the saved file open until the book is closed.
+                    copied_book.Close(SaveChanges=False)
+                    copied_book = None
+            finally:
+                if copied_book is not None:
+                    copied_book.Close(SaveChanges=False)
 
     robot.state.generated_pdf_path = str(pdf_path)
     robot.state.generated_excel_path = str(xlsx_path)
+    robot.state.pdf_fingerprint = fingerprint
+    default_cleaner().record(output_dir, (pdf_path, xlsx_path), keep=(rpa_book,))
     LOGGER.info("PDF/Excel の生成が完了しました: %s, %s", pdf_path, xlsx_path)
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-"""Create an Outlook draft populated with data from the RPA sheet."""
+"""Create the mail draft (Outlook, or an .eml spool file) from the RPA sheet."""
 
 from __future__ import annotations
 
@@ -7,10 +7,11 @@ import logging
 from pathlib import Path
 from typing import Dict
 
-import win32com.client  # type: ignore
-
-import pythoncom
+import draft_sink
+from atomic_io import payload_digest
+from common import RpaOutputs
 from excel_com import open_workbook
+from rpa_sheet import OUTPUT_CELLS, read_outputs
 
 
 LOGGER = logging.getLogger("chouji_robo.email")
@@ -29,51 +30,58 @@ def _read_rpa_values(robot, addresses: Dict[str, str]) -> Dict[str, str]:
     return result
 
 
+def _rpa_outputs(robot) -> RpaOutputs:
+    """Values from step A/B while the book is unchanged, else re-read without Excel if possible."""
+
+    book = robot.paths.rpa_book_destination
+    cached = robot.state.rpa_outputs
+    if cached is not None and cached.is_current(book):
+        LOGGER.debug("RPAシートの出力セルは保持済みの値を使用します。")
+        return cached
+    try:
+        outputs = read_outputs(book)
+    except Exception as exc:
+        LOGGER.info("RPAシートの保存済みの値を使えないため Excel で読み込みます: %s", exc)
+        mtime = book.stat().st_mtime_ns
+        outputs = RpaOutputs(source_mtime_ns=mtime, **_read_rpa_values(robot, OUTPUT_CELLS))
+    robot.state.rpa_outputs = outputs
+    return outputs
+
+
 def run(robot) -> None:
     robot.current_phase = "Eb.write_email"
-    LOGGER.info("Eb.write_email: Outlook 下書きを作成します。")
+    LOGGER.info("Eb.write_email: メールの下書きを作成します。")
 
-    pdf_path = robot.state.generated_pdf_path
+    state = robot.state
+    pdf_path = state.generated_pdf_path
     if not pdf_path or not Path(pdf_path).exists():
         raise FileNotFoundError("PDF が見つかりません。Ea.create_excel_PDF を先に実行してください。")
 
-    data = _read_rpa_values(
-        robot,
-        {
-            "to": "D3",
-            "subject": "D12",
-            "cc": "D25",
-            "bcc": "D26",
-            "body": "D27",
-        },
-    )
-
-    com_initialized = False
-    try:
-        pythoncom.CoInitialize()
-        com_initialized = True
-    except Exception:
-        pass
+    fields = _rpa_outputs(robot).mail_fields()
+    mail_fingerprint = payload_digest(fields)
+    mail_changed = mail_fingerprint != state.mail_fingerprint
+    pdf_changed = not state.pdf_fingerprint or state.pdf_fingerprint != state.draft_pdf_fingerprint
 
-    try:
-        outlook = win32com.client.Dispatch("Outlook.Application")
-        mail = outlook.CreateItem(0)
-        mail.To = data["to"]
-        mail.Subject = data["subject"]
-        if data["cc"]:
-            mail.CC = data["cc"]
-        if data["bcc"]:
-            mail.BCC = data["bcc"]
-        mail.Body = data["body"]
-        mail.Attachments.Add(Source=str(pdf_path))
-        mail.Save()
-
-        robot.state.outlook_draft_entry_id = mail.EntryID or ""
-        robot.state.outlook_draft_store_id = getattr(mail, "StoreID", "") or ""
-        LOGGER.info("Outlook 下書きを保存しました。EntryID=%s", robot.state.outlook_draft_entry_id)
-    finally:
-        if com_initialized:
-            try:
-                pythoncom.CoUninitialize()
-            except Exception:
-                pass
+    sink = draft_sink.for_robot(robot)
+    ref = None
+    if state.outlook_draft_entry_id and state.draft_sink_name == sink.name:
+        ref = draft_sink.DraftRef(state.outlook_draft_entry_id, state.outlook_draft_store_id, state.draft_attachment_name)
+    if ref is not None and not mail_changed and not pdf_changed and sink.exists(ref):
+        LOGGER.info("宛先・本文・PDF に変更が無いため既存の下書きをそのまま使用します。")
+        return
+    if ref is not None:
+        if mail_changed:
+            LOGGER.info("RPAシートの宛先・本文が変更されたため下書きを更新します。")
+        if pdf_changed:
+            LOGGER.info("PDF が再生成されたため下書きの添付ファイルを差し替えます。")
+
+    draft = draft_sink.Draft(attachment=Path(pdf_path), **fields)
+    saved = sink.save(draft, ref, fields=mail_changed, attachment=pdf_changed)
+
+    state.outlook_draft_entry_id = saved.entry_id
+    state.outlook_draft_store_id = saved.store_id
+    state.draft_attachment_name = saved.attachment_name
+    state.draft_sink_name = sink.name
+    state.mail_fingerprint = mail_fingerprint
+    state.draft_pdf_fingerprint = state.pdf_fingerprint
+    LOGGER.info("下書きを保存しました (%s)。EntryID=%s", sink.name, state.outlook_draft_entry_id)
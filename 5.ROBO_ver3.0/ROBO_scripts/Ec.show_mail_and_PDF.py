@@ -10,14 +10,21 @@ import subprocess
 from pathlib import Path
 from typing import Literal, Optional
 
-import pythoncom
-import win32com.client  # type: ignore
-import win32con  # type: ignore
-import win32gui  # type: ignore
-import win32process  # type: ignore
 import tkinter as tk
 from tkinter import messagebox
 
+try:
+    import pythoncom
+    import win32com.client  # type: ignore
+    import win32con  # type: ignore
+    import win32gui  # type: ignore
+    import win32process  # type: ignore
+except Exception:  # pragma: no cover - window placement needs pywin32 (Windows only)
+    pythoncom = None  # type: ignore[assignment]
+    win32com = win32con = win32gui = win32process = None  # type: ignore[assignment]
+
+import outlook_session
+
 
 LOGGER = logging.getLogger("chouji_robo.email")
 
@@ -96,8 +103,14 @@ def _close_edge(robot) -> None:
     if pid:
         subprocess.run(["taskkill", "/PID", str(pid), "/F", "/T"], check=False, capture_output=True)
         robot.state.edge_process_pid = None
-    else:
-        subprocess.run(["taskkill", "/IM", "msedge.exe", "/F", "/T"], check=False, capture_output=True)
+        return
+    # Without a pid only an image-wide kill is left, which would also end the
+    # Edge that Bd of the next case is driving while it is prepared.
+    queue = getattr(robot, "case_queue", None)
+    if queue is not None and queue.prefetching():
+        LOGGER.info("次の管理番号の準備で Edge を使用中のため、PDF を表示した Edge は閉じません。")
+        return
+    subprocess.run(["taskkill", "/IM", "msedge.exe", "/F", "/T"], check=False, capture_output=True)
 
 
 def _set_process_window_rect(pid: int, left: int, top: int, width: int, height: int) -> None:
@@ -136,6 +149,8 @@ def _screen_size() -> tuple[int, int]:
 
 
 def _position_outlook_window(draft) -> None:
+    if win32gui is None:
+        return
     try:
         inspector = draft.GetInspector()
         hwnd = inspector.WindowHandle
@@ -155,7 +170,7 @@ def _position_outlook_window(draft) -> None:
 
 def _position_edge_window(robot) -> None:
     pid = robot.state.edge_process_pid
-    if not pid:
+    if not pid or win32gui is None:
         return
     width, height = _screen_size()
     _set_process_window_rect(pid, width // 2, 0, width // 2, height)
@@ -224,6 +239,17 @@ def _prompt_pdf_edit(robot) -> None:
                 pass
 
 
+def _open_eml_draft(eml_path: Path) -> None:
+    startfile = getattr(os, "startfile", None)
+    if startfile is None:
+        LOGGER.info("下書きファイルを作成しました: %s", eml_path)
+        return
+    try:
+        startfile(eml_path)
+    except OSError:
+        LOGGER.warning("下書きファイル %s を開けませんでした。", eml_path, exc_info=True)
+
+
 def run(robot) -> Literal["next", "redo"]:
     robot.current_phase = "Ec.show_mail_and_PDF"
     LOGGER.info("Ec.show_mail_and_PDF: メールとPDFを表示します。")
@@ -232,29 +258,13 @@ def run(robot) -> Literal["next", "redo"]:
     if not entry_id:
         raise RuntimeError("Outlook 下書きが見つかりません。")
 
-    com_initialized = False
-    try:
-        pythoncom.CoInitialize()
-        com_initialized = True
-    except Exception:
-        pass
-
-    try:
-        outlook = win32com.client.Dispatch("Outlook.Application")
-        session = outlook.GetNamespace("MAPI")
-        store_id = robot.state.outlook_draft_store_id or None
-        if store_id:
-            draft = session.GetItemFromID(entry_id, store_id)
-        else:
-            draft = session.GetItemFromID(entry_id)
+    if robot.state.draft_sink_name == "eml":
+        _open_eml_draft(Path(entry_id))
+    else:
+        session = outlook_session.for_robot(robot)
+        draft = session.get_item(entry_id, robot.state.outlook_draft_store_id)
         draft.Display()
         _position_outlook_window(draft)
-    finally:
-        if com_initialized:
-            try:
-                pythoncom.CoUninitialize()
-            except Exception:
-                pass
 
     pdf_path = robot.state.generated_pdf_path
     if pdf_path and Path(pdf_path).exists():
@@ -1,5 +1,11 @@
 #!/usr/bin/env python3
-"""Append execution metadata to error_log.xlsx."""
+"""Record execution metadata for error_log.xlsx.
+
+The run is appended to this machine's run journal (run_journal.py); the
+journal is merged into error_log.xlsx by a compaction started in the
+background, at most once per CHOUJI_RUN_JOURNAL_COMPACT_MINUTES.  The robot
+waits for it before exiting (ChoujiRobo.keep_until_exit).
+"""
 
 from __future__ import annotations
 
@@ -7,7 +13,9 @@ import logging
 from datetime import datetime
 
 import tkinter as tk
-from openpyxl import load_workbook  # type: ignore
+
+import run_journal
+from run_journal import RunJournal, RunRecord
 
 
 LOGGER = logging.getLogger("chouji_robo.email")
@@ -45,21 +53,6 @@ def _ask_feedback(robot) -> str:
     return result["value"]
 
 
-def _first_empty_row(sheet) -> int:
-    row = 2
-    while True:
-        if all((sheet.cell(row=row, column=col).value in (None, "")) for col in range(1, 9)):
-            return row
-        row += 1
-
-
-def _format_duration(start: datetime, end: datetime) -> str:
-    seconds = max(0, int((end - start).total_seconds()))
-    minutes, sec = divmod(seconds, 60)
-    hours, minutes = divmod(minutes, 60)
-    return f"{hours:02}:{minutes:02}:{sec:02}"
-
-
 def run(robot, *, success: bool, error_message: str) -> None:
     robot.current_phase = "Ed.error_log"
     workbook_path = robot.paths.error_log_book
@@ -67,30 +60,21 @@ def run(robot, *, success: bool, error_message: str) -> None:
         LOGGER.warning("error_log.xlsx が見つからないため記録をスキップします: %s", workbook_path)
         return
 
-    start_time = robot.state.workflow_started_at or datetime.now()
-    end_time = robot.state.workflow_finished_at or datetime.now()
-    duration_text = _format_duration(start_time, end_time)
-
-    wb = load_workbook(workbook_path)
-    sheet = wb.active
-
-    target_row = _first_empty_row(sheet)
-
-    sheet.cell(row=target_row, column=1).value = start_time
-    sheet.cell(row=target_row, column=2).value = end_time
-    sheet.cell(row=target_row, column=3).value = duration_text
-    sheet.cell(row=target_row, column=4).value = robot.state.tehai_number or ""
-
-    machine_id = robot._machine_identifier()
-    sheet.cell(row=target_row, column=5).value = machine_id
-    sheet.cell(row=target_row, column=6).value = "〇" if success else "✕"
-    sheet.cell(row=target_row, column=7).value = error_message if not success else ""
-
     feedback = ""
     if success:
         feedback = _ask_feedback(robot)
-    sheet.cell(row=target_row, column=8).value = feedback
     robot.state.workflow_feedback = feedback
 
-    wb.save(workbook_path)
-    LOGGER.info("error_log.xlsx に実行結果を記録しました (row=%s)。", target_row)
+    record = RunRecord(
+        started_at=robot.state.workflow_started_at or datetime.now(),
+        finished_at=robot.state.workflow_finished_at or datetime.now(),
+        tehai_number=robot.state.tehai_number or "",
+        machine=robot._machine_identifier(),
+        success=success,
+        error_message=error_message or "",
+        feedback=feedback,
+    )
+    journal_dir = robot.paths.run_journal_dir
+    path = RunJournal(journal_dir, record.machine).append(record)
+    LOGGER.info("実行結果を実行ジャーナルに記録しました: %s", path)
+    robot.keep_until_exit(run_journal.start_compaction(workbook_path, journal_dir, record.machine))
@@ -1,14 +1,21 @@
 #!/usr/bin/env python3
-"""Optionally archive generated PDF/Excel files."""
+"""Optionally archive generated PDF/Excel files.
+
+The copy runs in the background (archive_catalog.archive_in_background) so
+the final dialog appears right away; the robot waits for it before exiting
+(ChoujiRobo.keep_until_exit).  Files whose content is already in the
+archive folder are not copied again.
+"""
 
 from __future__ import annotations
 
 import logging
-import shutil
 from pathlib import Path
 
 from tkinter import messagebox
 
+from archive_catalog import ArchiveCatalog, archive_in_background
+
 
 LOGGER = logging.getLogger("chouji_robo.email")
 
@@ -36,14 +43,17 @@ def run(robot) -> None:
 
     target_dir = robot.paths.company_archive_dir(company_name)
     robot._ensure_directory(target_dir)
+    sources = [Path(source) for source in (pdf_path, xlsx_path) if source and Path(source).exists()]
     LOGGER.info("PDF/Excel を %s に格納します。", target_dir)
 
-    for source in (pdf_path, xlsx_path):
-        if not source:
-            continue
-        source_path = Path(source)
-        if not source_path.exists():
-            continue
-        destination = target_dir / source_path.name
-        shutil.copy2(source_path, destination)
-        LOGGER.debug("%s を %s にコピーしました。", source_path, destination)
+    state = robot.state
+    worker = archive_in_background(
+        ArchiveCatalog(robot.paths.archive_catalog_db),
+        sources,
+        target_dir,
+        tehai_number=robot._safe_str(state.tehai_number),
+        person=robot._safe_str(state.name_katakana),
+        company=company_name,
+        case_date=state.mail_time.date() if state.mail_time else None,
+    )
+    robot.keep_until_exit(worker)
@@ -0,0 +1,439 @@
+"""SQLite catalog of the files archived by Ee.kakunou (99_ロボ弔事格納).
+
+Each archived file is recorded with its sha256, 手配番号, person, date and
+path.  ``archive`` skips a file whose identical content is already in the
+target folder (a rerun of the same case), copies the rest through a temp
+file + ``os.replace`` so OneDrive never uploads half a file, and uses a
+reflink / ``os.copy_file_range`` where the OS offers one (Linux, macOS
+APFS); Windows falls back to ``shutil.copy2``.
+
+``seed`` fills the catalog from an existing tree (``3. 過去のデータ``) with
+a thread pool of hashers; files whose size and mtime are unchanged since
+the last seed are not hashed again.
+
+The database is per PC (``PathRegistry.archive_catalog_db``, under the
+local state folder): a copy made on another PC is not in it, and is
+found by comparing the file in the target folder instead.  It follows
+TitleCache: short connections, rollback journal and ``BEGIN IMMEDIATE``
+writes.  A failed write is logged and ``put_many`` returns 0; a database
+that cannot be opened disables the catalog for this process unless it was
+only busy (another robot process holds the lock).  Archiving itself still
+happens either way.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+LOGGER = logging.getLogger("chouji_robo.archive_catalog")
+
+BUSY_TIMEOUT_SECONDS = 15.0
+SCHEMA_VERSION = 1
+HASH_CHUNK_BYTES = 1024 * 1024
+SEED_BATCH = 200
+SEED_SUFFIXES = (".pdf", ".xlsx", ".xlsm", ".xls", ".msg", ".eml")
+FICLONE = 0x40049409  # linux/fs.h
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive_files (
+    path          TEXT PRIMARY KEY,
+    sha256        TEXT NOT NULL,
+    size          INTEGER NOT NULL,
+    mtime_ns      INTEGER NOT NULL,
+    tehai_number  TEXT NOT NULL DEFAULT '',
+    person        TEXT NOT NULL DEFAULT '',
+    company       TEXT NOT NULL DEFAULT '',
+    case_date     TEXT NOT NULL DEFAULT '',
+    indexed_at    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archive_files_sha256 ON archive_files (sha256);
+CREATE INDEX IF NOT EXISTS archive_files_tehai ON archive_files (tehai_number);
+"""
+
+_TEHAI_PREFIX = re.compile(r"^(\d{3,})[_\s-]")
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    path: str
+    sha256: str
+    size: int
+    mtime_ns: int
+    tehai_number: str = ""
+    person: str = ""
+    company: str = ""
+    case_date: str = ""
+
+
+@dataclass(frozen=True)
+class ArchiveResult:
+    source: Path
+    destination: Path
+    copied: bool
+    method: str = ""
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as stream:
+        for chunk in iter(lambda: stream.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(source, target) -> bool:
+    try:
+        import fcntl  # type: ignore
+    except ImportError:
+        return False
+    try:
+        fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+    except OSError:
+        return False
+    return True
+
+
+def _copy_range(source, target, size: int) -> bool:
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is None:
+        return False
+    remaining = size
+    try:
+        while remaining > 0:
+            copied = copy_file_range(source.fileno(), target.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    except OSError:
+        # Not supported between these file systems: start over with a plain copy.
+        target.seek(0)
+        target.truncate()
+        return False
+    return remaining == 0
+
+
+def fast_copy(source: Path, destination: Path) -> str:
+    """Copy ``source`` to ``destination`` atomically; return the method that did the work."""
+
+    source, destination = Path(source), Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    handle, temp_name = tempfile.mkstemp(prefix=f".{destination.name}.", suffix=".tmp", dir=str(destination.parent))
+    try:
+        with open(source, "rb") as reader, os.fdopen(handle, "wb") as writer:
+            if _reflink(reader, writer):
+                method = "reflink"
+            elif _copy_range(reader, writer, os.fstat(reader.fileno()).st_size):
+                method = "copy_file_range"
+            else:
+                reader.seek(0)
+                shutil.copyfileobj(reader, writer, HASH_CHUNK_BYTES)
+                method = "copy"
+        shutil.copystat(source, temp_name)
+        os.replace(temp_name, destination)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise
+    return method
+
+
+def guess_tehai_number(path: Path) -> str:
+    match = _TEHAI_PREFIX.match(Path(path).name)
+    return match.group(1) if match else ""
+
+
+def _is_busy(exc: BaseException) -> bool:
+    """SQLITE_BUSY / SQLITE_LOCKED: another connection holds the lock, the file itself is fine."""
+
+    message = str(exc).lower()
+    return isinstance(exc, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+class ArchiveCatalog:
+    def __init__(self, path: Path, *, timeout: float = BUSY_TIMEOUT_SECONDS) -> None:
+        self.path = Path(path)
+        self.timeout = timeout
+        self.available = True
+        self._initialised = False
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        if not self._initialised:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                conn.executescript(_SCHEMA)
+                conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._initialised = True
+        return conn
+
+    @contextmanager
+    def _session(self, write: bool = False, *, swallow: bool = True) -> Iterator[Optional[sqlite3.Connection]]:
+        if not self.available:
+            yield None
+            return
+        try:
+            conn = self._connect()
+        except (sqlite3.Error, OSError) as exc:
+            if _is_busy(exc):
+                LOGGER.warning("格納カタログ %s は使用中のため今回は使用しません: %s", self.path, exc)
+            else:
+                LOGGER.warning("格納カタログ %s を開けないため無効化します: %s", self.path, exc)
+                self.available = False
+            yield None
+            return
+        try:
+            if write:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            if write:
+                conn.execute("COMMIT")
+        except sqlite3.Error as exc:
+            LOGGER.warning("格納カタログ %s の操作に失敗しました: %s", self.path, exc)
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            if not swallow:
+                raise
+        finally:
+            conn.close()
+
+    def put_many(self, entries: Iterable[ArchiveEntry]) -> int:
+        """Upsert ``entries``; the number recorded, 0 when the write failed."""
+
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [
+            (
+                entry.path,
+                entry.sha256,
+                entry.size,
+                entry.mtime_ns,
+                entry.tehai_number,
+                entry.person,
+                entry.company,
+                entry.case_date,
+                now,
+            )
+            for entry in entries
+        ]
+        if not rows:
+            return 0
+        try:
+            stored = self._upsert(rows)
+        except sqlite3.Error:
+            # Already logged by _session; nothing was committed.
+            return 0
+        return len(rows) if stored else 0
+
+    def _upsert(self, rows: Sequence[Tuple[Any, ...]]) -> bool:
+        with self._session(write=True, swallow=False) as conn:
+            if conn is None:
+                return False
+            conn.executemany(
+                """
+                INSERT INTO archive_files (path, sha256, size, mtime_ns, tehai_number, person, company, case_date, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    sha256 = excluded.sha256,
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns,
+                    tehai_number = CASE WHEN excluded.tehai_number = '' THEN archive_files.tehai_number ELSE excluded.tehai_number END,
+                    person = CASE WHEN excluded.person = '' THEN archive_files.person ELSE excluded.person END,
+                    company = CASE WHEN excluded.company = '' THEN archive_files.company ELSE excluded.company END,
+                    case_date = CASE WHEN excluded.case_date = '' THEN archive_files.case_date ELSE excluded.case_date END,
+                    indexed_at = excluded.indexed_at
+                """,
+                rows,
+            )
+        return True
+
+    def find_by_hash(self, sha256: str) -> List[ArchiveEntry]:
+        with self._session() as conn:
+            if conn is None:
+                return []
+            rows = conn.execute(
+                "SELECT path, sha256, size, mtime_ns, tehai_number, person, company, case_date "
+                "FROM archive_files WHERE sha256 = ?",
+                (sha256,),
+            ).fetchall()
+        return [ArchiveEntry(*row) for row in rows]
+
+    def find_by_tehai(self, tehai_number: str) -> List[ArchiveEntry]:
+        with self._session() as conn:
+            if conn is None:
+                return []
+            rows = conn.execute(
+                "SELECT path, sha256, size, mtime_ns, tehai_number, person, company, case_date "
+                "FROM archive_files WHERE tehai_number = ? ORDER BY case_date, path",
+                (tehai_number,),
+            ).fetchall()
+        return [ArchiveEntry(*row) for row in rows]
+
+    def known_files(self, prefix: str) -> Dict[str, Tuple[int, int]]:
+        """{path: (size, mtime_ns)} of entries under ``prefix``."""
+
+        with self._session() as conn:
+            if conn is None:
+                return {}
+            rows = conn.execute(
+                "SELECT path, size, mtime_ns FROM archive_files WHERE path >= ? AND path < ?",
+                (prefix, prefix + "\uffff"),
+            ).fetchall()
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+
+
+def _same_file(candidate: Path, sha256: str, size: int) -> bool:
+    try:
+        return candidate.stat().st_size == size and file_sha256(candidate) == sha256
+    except OSError:
+        return False
+
+
+def archive(
+    catalog: ArchiveCatalog,
+    sources: Sequence[Path],
+    target_dir: Path,
+    *,
+    tehai_number: str = "",
+    person: str = "",
+    company: str = "",
+    case_date: Optional[date] = None,
+) -> List[ArchiveResult]:
+    """Copy ``sources`` into ``target_dir`` unless identical content is already there."""
+
+    target_dir = Path(target_dir)
+    day = (case_date or date.today()).isoformat()
+    results: List[ArchiveResult] = []
+    entries: List[ArchiveEntry] = []
+    for source in sources:
+        source = Path(source)
+        sha256 = file_sha256(source)
+        size = source.stat().st_size
+        destination = target_dir / source.name
+        duplicate: Optional[Path] = None
+        for entry in catalog.find_by_hash(sha256):
+            candidate = Path(entry.path)
+            if candidate.parent == target_dir and candidate.exists() and candidate.stat().st_size == size:
+                duplicate = candidate
+                break
+        if duplicate is None and _same_file(destination, sha256, size):
+            duplicate = destination
+        if duplicate is not None:
+            LOGGER.info("同じ内容のファイルが格納済みのためコピーを省略します: %s", duplicate)
+            results.append(ArchiveResult(source, duplicate, copied=False))
+            target = duplicate
+        else:
+            method = fast_copy(source, destination)
+            LOGGER.debug("%s を %s にコピーしました (%s)。", source, destination, method)
+            results.append(ArchiveResult(source, destination, copied=True, method=method))
+            target = destination
+        entries.append(
+            ArchiveEntry(
+                path=str(target),
+                sha256=sha256,
+                size=size,
+                mtime_ns=target.stat().st_mtime_ns,
+                tehai_number=tehai_number,
+                person=person,
+                company=company,
+                case_date=day,
+            )
+        )
+    if entries and not catalog.put_many(entries):
+        LOGGER.warning("格納カタログに記録できませんでした。次回は格納先のファイルと比較します: %s", target_dir)
+    return results
+
+
+def archive_in_background(
+    catalog: ArchiveCatalog,
+    sources: Sequence[Path],
+    target_dir: Path,
+    **metadata,
+) -> threading.Thread:
+    """Run ``archive`` on a thread; the caller must join it before exiting (the robot ends with ``os._exit``)."""
+
+    def _target() -> None:
+        try:
+            results = archive(catalog, sources, target_dir, **metadata)
+            copied = sum(1 for result in results if result.copied)
+            LOGGER.info("格納が完了しました: コピー %s 件 / 省略 %s 件 (%s)", copied, len(results) - copied, target_dir)
+        except Exception:
+            LOGGER.exception("PDF/Excel の格納に失敗しました: %s", target_dir)
+
+    worker = threading.Thread(target=_target, name="archive-copy", daemon=False)
+    worker.start()
+    return worker
+
+
+def _scan(root: Path, suffixes: Sequence[str]) -> Iterator[os.DirEntry]:
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(tuple(suffixes)) and not entry.name.startswith((".", "~$")):
+                        yield entry
+        except OSError as exc:
+            LOGGER.warning("フォルダを読み込めないためスキップします: %s", exc)
+
+
+def seed(
+    catalog: ArchiveCatalog,
+    root: Path,
+    *,
+    workers: int = 4,
+    suffixes: Sequence[str] = SEED_SUFFIXES,
+) -> Dict[str, int]:
+    """Hash every archive-like file under ``root`` in parallel and record it."""
+
+    root = Path(root)
+    known = catalog.known_files(str(root))
+    todo: List[Tuple[Path, int, int]] = []
+    scanned = 0
+    for entry in _scan(root, suffixes):
+        scanned += 1
+        stat = entry.stat()
+        if known.get(entry.path) == (stat.st_size, stat.st_mtime_ns):
+            continue
+        todo.append((Path(entry.path), stat.st_size, stat.st_mtime_ns))
+
+    def _hash(item: Tuple[Path, int, int]) -> Optional[ArchiveEntry]:
+        path, size, mtime_ns = item
+        try:
+            sha256 = file_sha256(path)
+        except OSError as exc:
+            LOGGER.warning("ハッシュを計算できないためスキップします: %s (%s)", path, exc)
+            return None
+        return ArchiveEntry(str(path), sha256, size, mtime_ns, tehai_number=guess_tehai_number(path))
+
+    recorded = 0
+    batch: List[ArchiveEntry] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="archive-hash") as pool:
+        for result in pool.map(_hash, todo):
+            if result is None:
+                continue
+            batch.append(result)
+            if len(batch) >= SEED_BATCH:
+                recorded += catalog.put_many(batch)
+                batch = []
+    recorded += catalog.put_many(batch)
+    LOGGER.info("格納カタログを更新しました: 走査 %s 件 / 登録 %s 件 (%s)", scanned, recorded, root)
+    return {"scanned": scanned, "hashed": len(todo), "recorded": recorded}
@@ -0,0 +1,152 @@
+"""Which files in an output folder the robot generated, and background removal of stale ones.
+
+Ea used to empty ``2. RPAブック`` (everything except RPAブック.xlsx) before
+each export.  On a synced Desktop that made OneDrive delete and re-upload
+every file and could block for seconds.  Now each export records its files
+in a per-machine manifest (``PathRegistry().artifact_manifest``).  After the
+export, files the manifest lists from earlier runs but that were not
+regenerated are deleted on a single background worker, along with
+abandoned ``~$robo_`` temp files.  Files the robot did not create are left
+alone.
+
+The first time a folder is seen there is no manifest yet; then top-level
+PDF/xlsx files (the old robot outputs) count as robot-owned once.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set
+
+from atomic_io import TEMP_PREFIX, LockTimeout, atomic_write_bytes, file_lock, read_json
+from common import PathRegistry
+
+LOGGER = logging.getLogger("chouji_robo.artifact_manifest")
+
+MANIFEST_VERSION = 1
+LEGACY_SUFFIXES = (".pdf", ".xlsx")
+ABANDONED_TEMP_SECONDS = 600.0
+
+
+def _folder_key(output_dir: Path) -> str:
+    try:
+        return str(Path(output_dir).resolve())
+    except OSError:
+        return str(Path(output_dir).absolute())
+
+
+def _legacy_outputs(output_dir: Path, keep: Set[str]) -> Set[str]:
+    names: Set[str] = set()
+    for item in Path(output_dir).iterdir():
+        if item.name in keep or item.name.startswith("~$") or not item.is_file():
+            continue
+        if item.suffix.lower() in LEGACY_SUFFIXES:
+            names.add(item.name)
+    return names
+
+
+def _abandoned_temps(output_dir: Path, now: float) -> Set[str]:
+    names: Set[str] = set()
+    for item in Path(output_dir).glob(f"{TEMP_PREFIX}*"):
+        try:
+            if now - item.stat().st_mtime > ABANDONED_TEMP_SECONDS:
+                names.add(item.name)
+        except OSError:
+            continue
+    return names
+
+
+class ArtifactCleaner:
+    """Records outputs and deletes stale ones, one job at a time, off the caller's thread."""
+
+    def __init__(self, manifest_path: Optional[Path] = None) -> None:
+        self.manifest_path = Path(manifest_path) if manifest_path else PathRegistry().artifact_manifest
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-cleanup")
+            return self._executor
+
+    def owned(self, output_dir: Path) -> Optional[Set[str]]:
+        """Names recorded for ``output_dir``; None when the folder has no manifest entry yet."""
+
+        folders: Dict[str, Any] = (read_json(self.manifest_path) or {}).get("folders", {})
+        entry = folders.get(_folder_key(output_dir))
+        return None if entry is None else set(entry.get("files", []))
+
+    def record(self, output_dir: Path, outputs: Iterable[Path], keep: Iterable[Path] = ()) -> "Future[Set[str]]":
+        """Schedule: delete stale robot files in ``output_dir``, then record ``outputs``.
+
+        Returns a future with the names that were deleted.
+        """
+
+        current = {Path(path).name for path in outputs}
+        kept = {Path(path).name for path in keep}
+        return self._pool().submit(self._record, Path(output_dir), current, kept)
+
+    def _record(self, output_dir: Path, current: Set[str], keep: Set[str]) -> Set[str]:
+        # Read, delete and write back under one lock: another robot process on
+        # this PC must not drop our folder entry (or we its) in between.
+        try:
+            with file_lock(self.manifest_path):
+                return self._record_locked(output_dir, current, keep)
+        except LockTimeout as exc:
+            LOGGER.info("出力ファイルの記録を次回に持ち越します: %s", exc)
+            return set()
+
+    def _record_locked(self, output_dir: Path, current: Set[str], keep: Set[str]) -> Set[str]:
+        previous = self.owned(output_dir)
+        if previous is None:
+            previous = _legacy_outputs(output_dir, keep | current)
+        stale = (previous | _abandoned_temps(output_dir, time.time())) - current - keep
+        deleted: Set[str] = set()
+        failed: Set[str] = set()
+        for name in sorted(stale):
+            try:
+                (output_dir / name).unlink()
+                deleted.add(name)
+            except FileNotFoundError:
+                continue
+            except OSError as exc:
+                # Still open somewhere (Edge, Excel): keep it listed and retry next run.
+                LOGGER.info("古い出力ファイルを削除できないため次回に再試行します: %s (%s)", name, exc)
+                failed.add(name)
+        if deleted:
+            LOGGER.info("古い出力ファイルを %s 件削除しました: %s", len(deleted), ", ".join(sorted(deleted)))
+
+        payload = read_json(self.manifest_path) or {}
+        folders = dict(payload.get("folders", {}))
+        folders[_folder_key(output_dir)] = {"files": sorted(current | failed)}
+        updated = {"version": MANIFEST_VERSION, "folders": folders}
+        if updated != payload:
+            # write_json_if_changed would take the lock we already hold.
+            atomic_write_bytes(self.manifest_path, json.dumps(updated, ensure_ascii=False, indent=2).encode("utf-8"))
+        return deleted
+
+    def wait(self) -> None:
+        """Block until every scheduled job has finished (tests, shutdown)."""
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+_DEFAULT_CLEANER: Optional[ArtifactCleaner] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_cleaner() -> ArtifactCleaner:
+    global _DEFAULT_CLEANER
+    with _DEFAULT_LOCK:
+        if _DEFAULT_CLEANER is None:
+            _DEFAULT_CLEANER = ArtifactCleaner()
+        return _DEFAULT_CLEANER
@@ -0,0 +1,159 @@
+"""Atomic, lock-protected writes for state files and exports shared by several robots."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping, Optional
+
+LOGGER = logging.getLogger("chouji_robo.atomic_io")
+
+LOCK_TIMEOUT_SECONDS = 10.0
+STALE_LOCK_SECONDS = 60.0
+REPLACE_RETRIES = 20
+# OneDrive does not upload files whose name starts with "~$".
+TEMP_PREFIX = "~$robo_"
+
+
+class LockTimeout(TimeoutError):
+    """Raised when another process keeps the lock longer than the timeout."""
+
+
+@contextmanager
+def file_lock(path: Path, timeout: float = LOCK_TIMEOUT_SECONDS, stale_after: float = STALE_LOCK_SECONDS) -> Iterator[None]:
+    """Exclusive ``<path>.lock`` created with O_EXCL; works on network and synced folders.
+
+    A lock older than ``stale_after`` is assumed to belong to a robot that
+    was killed and is removed.
+    """
+
+    lock_path = Path(str(path) + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while True:
+        try:
+            fd = os.open(str(lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - lock_path.stat().st_mtime > stale_after:
+                    LOGGER.warning("古いロックファイルを削除します: %s", lock_path)
+                    lock_path.unlink()
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() >= deadline:
+                raise LockTimeout(f"ロックを取得できません: {lock_path}")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+            continue
+        try:
+            os.write(fd, f"{os.getpid()}\n".encode("ascii"))
+        finally:
+            os.close(fd)
+        break
+    try:
+        yield
+    finally:
+        try:
+            lock_path.unlink()
+        except OSError:
+            pass
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write to a temp file in the same folder, fsync, then os.replace it over ``path``.
+
+    Readers see either the old or the new file, never a torn one.  Windows
+    refuses the replace while another process has the target open, so it
+    is retried briefly.
+    """
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        replace_with_retry(temp_name, path)
+    finally:
+        if os.path.exists(temp_name):
+            os.unlink(temp_name)
+
+
+def replace_with_retry(source: Path, target: Path) -> None:
+    """``os.replace``, retried briefly while Windows reports the target as in use."""
+
+    for attempt in range(REPLACE_RETRIES):
+        try:
+            os.replace(source, target)
+            return
+        except PermissionError:
+            if attempt == REPLACE_RETRIES - 1:
+                raise
+            time.sleep(0.05)
+
+
+@contextmanager
+def atomic_output(path: Path) -> Iterator[Path]:
+    """Yield a temp path next to ``path`` for a writer that needs a file name (Excel, reportlab).
+
+    The temp file keeps the suffix, so exporters that pick the format from
+    it still work, and replaces ``path`` only when the block succeeds.
+    """
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_name(f"{TEMP_PREFIX}{uuid.uuid4().hex[:8]}_{path.name}")
+    try:
+        yield temp
+        replace_with_retry(temp, path)
+    finally:
+        if temp.exists():
+            try:
+                temp.unlink()
+            except OSError:
+                LOGGER.warning("一時ファイルを削除できませんでした: %s", temp)
+
+
+def payload_digest(payload: Mapping[str, Any], ignore: Iterable[str] = ()) -> str:
+    """sha256 of the canonical JSON of ``payload`` without the ``ignore`` keys."""
+
+    skipped = set(ignore)
+    canonical = json.dumps({k: v for k, v in payload.items() if k not in skipped}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def read_json(path: Path) -> Optional[dict]:
+    try:
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def write_json_if_changed(path: Path, payload: Mapping[str, Any], *, ignore: Iterable[str] = ()) -> bool:
+    """Atomically write ``payload`` unless the file already holds the same content.
+
+    Keys in ``ignore`` (timestamps) do not count as a change.  Returns True
+    when the file was written.
+    """
+
+    ignore = tuple(ignore)
+    digest = payload_digest(payload, ignore)
+    with file_lock(path):
+        current = read_json(path)
+        if current is not None and payload_digest(current, ignore) == digest:
+            return False
+        data = json.dumps(dict(payload), ensure_ascii=False, indent=2).encode("utf-8")
+        atomic_write_bytes(path, data)
+    return True
@@ -0,0 +1,362 @@
+"""Several 管理番号 in one robot run, preparing the next case while the operator reviews.
+
+A single number keeps the original flow (``ChoujiRobo._workflow_entrypoint``).
+With several numbers, ``CaseQueue`` runs them back to back on the same
+robot, so the Outlook session, the warm Edge session and the Graph token
+cache of the PowerShell helpers are reused.  Each case gets its own
+``StepAState`` through a ``CaseContext`` that stands in for the robot.
+
+When a case reaches step E (the operator checks the PDF and mail in Ec),
+steps A and B of the next ``CHOUJI_PREFETCH_DEPTH`` cases (default 1, 0
+turns prefetching off) run on one background worker in a private folder
+(``case_workspace``) instead of the desktop, so they never touch the files
+the operator has open.  Before the case's step E the prepared RPAブック is
+copied to the desktop (``promote``).  A background case never shows a
+dialog: if Ae would have to ask which mail to use, or the preparation
+fails, the case is simply run again in the foreground.
+
+The result of every case is logged and written to
+``local_state_dir/queue/summary_<timestamp>.json``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import types
+import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import xlsx_package
+from atomic_io import atomic_output, atomic_write_bytes
+from common import PathRegistry, StepAState
+from rpa_sheet import capture_outputs
+from run_journal import completed_tehai_numbers
+
+LOGGER = logging.getLogger("chouji_robo.queue")
+
+PREFETCH_DEPTH = int(os.getenv("CHOUJI_PREFETCH_DEPTH", "1"))
+LOOKBACK_DAYS = float(os.getenv("CHOUJI_QUEUE_LOOKBACK_DAYS", "7"))
+WORKSPACE_FOLDERS = ("1. 下処理", "2. RPAブック")
+
+_SEPARATORS = re.compile(r"[\s,、，;；]+")
+
+
+class OperatorInputRequired(RuntimeError):
+    """A background case reached a point where the operator has to choose something."""
+
+
+def parse_tehai_numbers(text: str) -> List[str]:
+    """管理番号 from the form entry: separated by spaces, commas or newlines, in order, without duplicates.
+
+    Raises ValueError when an entry is not made of digits.
+    """
+
+    normalized = unicodedata.normalize("NFKC", text or "")
+    numbers: List[str] = []
+    for token in _SEPARATORS.split(normalized):
+        if not token:
+            continue
+        if not token.isdigit():
+            raise ValueError(f"管理番号は半角数字のみで入力してください: {token}")
+        if token not in numbers:
+            numbers.append(token)
+    return numbers
+
+
+def case_workspace(paths: PathRegistry, tehai_number: str) -> Path:
+    return paths.local_state_dir / "queue" / tehai_number
+
+
+class CaseContext:
+    """Stands in for ``ChoujiRobo`` while one case runs.
+
+    ``state`` and ``paths`` belong to the case.  ChoujiRobo methods are bound
+    to the context, so ``self.state``/``self.paths`` inside them mean the
+    case's; every other attribute (root, outlook, stop_event, helpers, ...)
+    is the robot's.  ``current_phase`` reaches the robot (heartbeat, log
+    window) only while the case is the one in the foreground, and
+    ``keep_until_exit`` always registers the thread with the robot, which
+    joins it at shutdown.
+    ``case_queue`` is the queue running the case in the foreground, if any.
+    """
+
+    def __init__(self, robot: Any, tehai_number: str, *, workspace: Optional[Path] = None) -> None:
+        self._robot = robot
+        self.interactive = workspace is None
+        self._phase = "initialising"
+        self.tehai_number = tehai_number
+        self.state = StepAState(tehai_number=tehai_number, workflow_started_at=datetime.now())
+        self.paths = robot.paths if workspace is None else replace(robot.paths, workspace=workspace)
+        self.case_queue: Optional["CaseQueue"] = None
+
+    @property
+    def current_phase(self) -> str:
+        return self._phase
+
+    @current_phase.setter
+    def current_phase(self, value: str) -> None:
+        self._phase = value
+        if self.interactive:
+            self._robot.current_phase = value
+
+    def keep_until_exit(self, worker: threading.Thread) -> threading.Thread:
+        return self._robot.keep_until_exit(worker)
+
+    def __getattr__(self, name: str) -> Any:
+        function = getattr(type(self._robot), name, None)
+        if isinstance(function, types.FunctionType):
+            return types.MethodType(function, self)
+        return getattr(self._robot, name)
+
+
+@dataclass
+class CaseResult:
+    tehai_number: str
+    success: bool = False
+    error: str = ""
+    phase: str = ""
+    prefetched: bool = False
+    # How long the foreground waited for a prefetch that was still running.
+    waited_seconds: float = 0.0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        payload = asdict(self)
+        for key in ("started_at", "finished_at"):
+            value = payload[key]
+            payload[key] = value.isoformat(timespec="seconds") if value else None
+        return payload
+
+
+def promote(case: CaseContext) -> Path:
+    """Copy a prepared case's RPAブック to the desktop and make the case the foreground one."""
+
+    staged = case.paths.rpa_book_destination
+    target = case._robot.paths.rpa_book_destination
+    with atomic_output(target) as temp:
+        shutil.copy2(staged, temp)
+    workspace = case.paths.desktop_root
+    case.paths = case._robot.paths
+    case.interactive = True
+    entry = case.state.selected_mail_entry
+    if entry is not None:
+        # Belongs to the worker thread's COM apartment.
+        entry.raw_item = None
+    capture_outputs(case.state, target)
+    shutil.rmtree(workspace, ignore_errors=True)
+    return target
+
+
+def pending_tehai_numbers(
+    robot: Any,
+    *,
+    lookback_days: float = LOOKBACK_DAYS,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """管理番号 in the 管理表 with a mail time in the last ``lookback_days`` and no successful run yet.
+
+    Read from the saved workbook (no Excel); oldest mail first.
+    """
+
+    now = now or datetime.now()
+    since = now - timedelta(days=lookback_days)
+    done = completed_tehai_numbers(robot.paths.error_log_book, robot.paths.run_journal_dir)
+    found: Dict[str, datetime] = {}
+    for values in xlsx_package.read_workbook_values(robot.paths.kanri_report_book).values():
+        for reference, text in values.items():
+            if not reference.startswith("B") or not reference[1:].isdigit():
+                continue
+            number = re.sub(r"\.0$", "", unicodedata.normalize("NFKC", text).strip())
+            raw_time = values.get(f"K{reference[1:]}", "")
+            if not number.isdigit() or number in done or not raw_time:
+                continue
+            try:
+                serial = float(raw_time)
+            except ValueError:
+                serial = None
+            try:
+                mail_time = robot._parse_excel_datetime(serial if serial is not None else raw_time)
+            except ValueError:
+                continue
+            if since <= mail_time <= now and number not in found:
+                found[number] = mail_time
+    return sorted(found, key=lambda number: found[number])
+
+
+class CaseQueue:
+    """Runs the cases in order; see the module docstring."""
+
+    def __init__(
+        self,
+        robot: Any,
+        tehai_numbers: Sequence[str],
+        *,
+        prefetch_depth: int = PREFETCH_DEPTH,
+        run_a: Optional[Callable[[Any], Any]] = None,
+        run_b: Optional[Callable[[Any], Any]] = None,
+        run_e: Optional[Callable[[Any], bool]] = None,
+        summary_dir: Optional[Path] = None,
+    ) -> None:
+        self.robot = robot
+        self.numbers = list(tehai_numbers)
+        self.prefetch_depth = max(0, prefetch_depth)
+        self.run_a = run_a or robot.helpers["step_a"].run
+        self.run_b = run_b or robot.helpers["step_b"].run
+        self.run_e = run_e or robot.helpers["step_e"].run
+        self.summary_dir = Path(summary_dir) if summary_dir else robot.paths.local_state_dir / "queue"
+        self.results: List[CaseResult] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._prefetched: Dict[int, "Future[Tuple[CaseContext, Optional[BaseException]]]"] = {}
+
+    # -- background ----------------------------------------------------
+    def _prepare(self, tehai_number: str) -> Tuple[CaseContext, Optional[BaseException]]:
+        workspace = case_workspace(self.robot.paths, tehai_number)
+        shutil.rmtree(workspace, ignore_errors=True)
+        for folder in WORKSPACE_FOLDERS:
+            (workspace / folder).mkdir(parents=True, exist_ok=True)
+        case = CaseContext(self.robot, tehai_number, workspace=workspace)
+        if self.robot.stop_event.is_set():
+            return case, RuntimeError("停止要求のため先読みを中止しました。")
+        LOGGER.info("管理番号 [%s] の A/B を先に実行します。", tehai_number)
+        started = time.perf_counter()
+        try:
+            self.run_a(case)
+            if self.robot.stop_event.is_set():
+                return case, RuntimeError("停止要求のため先読みを中止しました。")
+            self.run_b(case)
+        except Exception as exc:
+            return case, exc
+        LOGGER.info("管理番号 [%s] の A/B を先に実行しました (%.1f 秒)。", tehai_number, time.perf_counter() - started)
+        return case, None
+
+    def _schedule_prefetch(self, index: int) -> None:
+        if self.prefetch_depth == 0:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="case-prefetch")
+        for ahead in range(index + 1, min(index + 1 + self.prefetch_depth, len(self.numbers))):
+            if ahead not in self._prefetched:
+                self._prefetched[ahead] = self._executor.submit(self._prepare, self.numbers[ahead])
+
+    def prefetching(self) -> bool:
+        """True while a next case is being prepared or waits to be (it may be using Edge)."""
+
+        return any(not future.done() for future in self._prefetched.values())
+
+    def _take_prefetched(self, index: int, result: CaseResult) -> Optional[CaseContext]:
+        future = self._prefetched.pop(index, None)
+        if future is None:
+            return None
+        started = time.perf_counter()
+        try:
+            case, error = future.result()
+        except Exception as exc:
+            LOGGER.warning("管理番号 [%s] の先読みに失敗したため改めて実行します: %s", result.tehai_number, exc)
+            return None
+        result.waited_seconds = round(time.perf_counter() - started, 3)
+        if error is None:
+            promote(case)
+            result.prefetched = True
+            return case
+        shutil.rmtree(case.paths.desktop_root, ignore_errors=True)
+        if isinstance(error, OperatorInputRequired):
+            LOGGER.info("管理番号 [%s] は確認が必要なため画面で処理します: %s", case.tehai_number, error)
+        else:
+            LOGGER.warning("管理番号 [%s] の先読みに失敗したため改めて実行します: %s", case.tehai_number, error)
+        return None
+
+    # -- foreground ----------------------------------------------------
+    def _run_case(self, index: int) -> CaseResult:
+        number = self.numbers[index]
+        result = CaseResult(number, started_at=datetime.now())
+        case = self._take_prefetched(index, result)
+        try:
+            if case is None:
+                case = CaseContext(self.robot, number)
+            case.case_queue = self
+            self.robot.state = case.state
+            if not result.prefetched:
+                case.current_phase = "A.create_RPAsheet"
+                self.run_a(case)
+                if self.robot.stop_event.is_set():
+                    raise RuntimeError("停止要求のため B 以降を実行しませんでした。")
+                case.current_phase = "B.find_my_boss"
+                self.run_b(case)
+                if self.robot.stop_event.is_set():
+                    raise RuntimeError("停止要求のため E を実行しませんでした。")
+            self._schedule_prefetch(index)
+            case.current_phase = "E.create_email"
+            result.success = bool(self.run_e(case))
+            result.error = case.state.workflow_error
+        except Exception as exc:
+            LOGGER.exception("管理番号 [%s] の処理でエラーが発生しました: %s", number, exc)
+            result.error = str(exc)
+        result.phase = case.current_phase if case is not None else ""
+        result.finished_at = datetime.now()
+        return result
+
+    def run(self) -> List[CaseResult]:
+        started_at = datetime.now()
+        LOGGER.info("%s 件の管理番号を続けて処理します: %s", len(self.numbers), ", ".join(self.numbers))
+        try:
+            for index, number in enumerate(self.numbers):
+                if self.robot.stop_event.is_set():
+                    self.results.append(CaseResult(number, error="停止要求のため未実行です。"))
+                    continue
+                if index:
+                    self.robot.root.after(0, self.robot._resume_monitoring)
+                self.results.append(self._run_case(index))
+        finally:
+            self._close()
+            self._write_summary(started_at)
+        return self.results
+
+    def _close(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        for future in self._prefetched.values():
+            future.cancel()
+        for future in self._prefetched.values():
+            if not future.cancelled() and future.exception() is None:
+                case, _ = future.result()
+                shutil.rmtree(case.paths.desktop_root, ignore_errors=True)
+        self._prefetched.clear()
+        # The worker opened its own Outlook apartment; release it on that thread.
+        executor.submit(self.robot.outlook.close)
+        executor.shutdown(wait=True)
+
+    def _write_summary(self, started_at: datetime) -> Optional[Path]:
+        for result in self.results:
+            LOGGER.info(
+                "管理番号 [%s]: %s%s%s",
+                result.tehai_number,
+                "成功" if result.success else "失敗",
+                " (先読み)" if result.prefetched else "",
+                f" {result.error}" if result.error else "",
+            )
+        payload = {
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "succeeded": sum(1 for result in self.results if result.success),
+            "cases": [result.to_dict() for result in self.results],
+        }
+        path = self.summary_dir / f"summary_{started_at:%Y%m%d_%H%M%S}.json"
+        try:
+            atomic_write_bytes(path, json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8"))
+        except OSError as exc:
+            LOGGER.warning("処理結果の一覧を保存できませんでした: %s (%s)", path, exc)
+            return None
+        LOGGER.info("処理結果の一覧を保存しました: %s", path)
+        return path
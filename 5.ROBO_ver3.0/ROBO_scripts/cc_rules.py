@@ -0,0 +1,264 @@
+"""Declarative CC-routing rules for Be.Kachou_hantei, compiled to one Aho-Corasick automaton."""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+try:  # C implementation when installed; the pure-Python automaton is equivalent.
+    import ahocorasick  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    ahocorasick = None
+
+LOGGER = logging.getLogger("chouji_robo.cc_rules")
+
+RULES_VERSION = 1
+SCOPES = ("bosses", "all")
+SELECTS = ("first", "all")
+TITLE_SOURCES = ("reference", "sheet")
+
+# Same behaviour as the hard-coded tuples Be used before the rule file existed.
+DEFAULT_RULES: Dict[str, Any] = {
+    "version": RULES_VERSION,
+    "rules": [
+        {
+            "id": "cc_manager",
+            "tag": "ccに含む",
+            "keywords": ["課長", "所長", "主幹"],
+            "scope": "bosses",
+            "title": "reference",
+            "select": "first",
+            "fallback": "first_boss",
+        },
+        {
+            "id": "second_boss",
+            "tag": "ccに含む",
+            "follow": "cc_manager",
+            "offset": 1,
+            "when_cell": {"cell": "N16", "equals": "※二次上司は必要"},
+        },
+        {
+            "id": "high_rank",
+            "tag": "上位役職",
+            "keywords": ["社長", "副社長", "常務", "監査役", "執行役員", "本部長"],
+            "scope": "all",
+            "title": "sheet",
+            "select": "all",
+        },
+    ],
+}
+
+
+class RuleError(ValueError):
+    """Raised when a rule file is malformed."""
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    tag: str
+    keywords: Tuple[str, ...] = ()
+    scope: str = "bosses"
+    title: str = "reference"
+    select: str = "all"
+    fallback: Optional[str] = None
+    follow: Optional[str] = None
+    offset: int = 1
+    when_cell: Optional[Tuple[str, str]] = None
+
+    @classmethod
+    def from_dict(cls, payload: Mapping[str, Any], known: Iterable[str]) -> "Rule":
+        rule_id = str(payload.get("id") or "").strip()
+        tag = str(payload.get("tag") or "").strip()
+        if not rule_id or not tag:
+            raise RuleError(f"id と tag は必須です: {payload}")
+        keywords = tuple(str(word) for word in payload.get("keywords") or () if str(word))
+        follow = payload.get("follow")
+        if follow is not None and follow not in set(known):
+            raise RuleError(f"{rule_id}: follow 先のルール '{follow}' が先に定義されていません。")
+        if follow is None and not keywords:
+            raise RuleError(f"{rule_id}: keywords か follow のどちらかが必要です。")
+        scope = payload.get("scope", "bosses")
+        title = payload.get("title", "reference")
+        select = payload.get("select", "all")
+        if scope not in SCOPES or title not in TITLE_SOURCES or select not in SELECTS:
+            raise RuleError(f"{rule_id}: scope/title/select の値が不正です。")
+        fallback = payload.get("fallback")
+        if fallback not in (None, "first_boss"):
+            raise RuleError(f"{rule_id}: fallback は first_boss のみ指定できます。")
+        condition = payload.get("when_cell")
+        when_cell = (str(condition["cell"]).upper(), str(condition.get("equals", ""))) if condition else None
+        return cls(
+            id=rule_id,
+            tag=tag,
+            keywords=keywords,
+            scope=scope,
+            title=title,
+            select=select,
+            fallback=fallback,
+            follow=follow,
+            offset=int(payload.get("offset", 1)),
+            when_cell=when_cell,
+        )
+
+
+class _PythonAutomaton:
+    """Minimal Aho-Corasick automaton: keyword -> value, iter() yields (end, value)."""
+
+    def __init__(self) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Any]] = [[]]
+
+    def add_word(self, word: str, value: Any) -> None:
+        state = 0
+        for char in word:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(value)
+
+    def make_automaton(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter(self, text: str):
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for value in self._out[state]:
+                yield index, value
+
+
+@dataclass
+class CaseInput:
+    """One RPA sheet: rows in sheet order (the first one is the requester)."""
+
+    rows: Sequence[Tuple[int, str]]
+    positions: Sequence[str] = ()
+    cells: Mapping[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class CaseResult:
+    tags: Dict[int, List[str]] = field(default_factory=dict)
+    rule_rows: Dict[str, List[int]] = field(default_factory=dict)
+    assignments: List[Tuple[str, int]] = field(default_factory=list)
+
+    def add(self, rule: Rule, row: int) -> None:
+        tags = self.tags.setdefault(row, [])
+        if rule.tag not in tags:
+            tags.append(rule.tag)
+        self.rule_rows.setdefault(rule.id, []).append(row)
+        self.assignments.append((rule.tag, row))
+
+    def rows_with(self, tag: str) -> List[int]:
+        """Rows given ``tag``, in the order the rules assigned them."""
+
+        return [row for assigned, row in self.assignments if assigned == tag]
+
+
+class CcRuleEngine:
+    """Rules compiled into a single automaton; titles are matched once and memoised."""
+
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        self.rules = list(rules)
+        automaton = ahocorasick.Automaton() if ahocorasick is not None else _PythonAutomaton()
+        owners: Dict[str, List[str]] = {}
+        for rule in self.rules:
+            for keyword in rule.keywords:
+                owners.setdefault(keyword, []).append(rule.id)
+        for keyword, rule_ids in owners.items():
+            automaton.add_word(keyword, frozenset(rule_ids))
+        if owners:
+            automaton.make_automaton()
+        self._automaton = automaton if owners else None
+        self._memo: Dict[str, FrozenSet[str]] = {}
+
+    @classmethod
+    def from_payload(cls, payload: Mapping[str, Any]) -> "CcRuleEngine":
+        if int(payload.get("version", RULES_VERSION)) != RULES_VERSION:
+            raise RuleError(f"未対応のルールバージョンです: {payload.get('version')}")
+        rules: List[Rule] = []
+        for item in payload.get("rules") or []:
+            rules.append(Rule.from_dict(item, [rule.id for rule in rules]))
+        return cls(rules)
+
+    @classmethod
+    def load(cls, path: Optional[Path]) -> "CcRuleEngine":
+        """Load a rule file; a missing or broken file falls back to DEFAULT_RULES."""
+
+        if path is not None and Path(path).exists():
+            try:
+                return cls.from_payload(json.loads(Path(path).read_text(encoding="utf-8")))
+            except (OSError, ValueError) as exc:
+                LOGGER.warning("CC ルール %s を読み込めないため既定ルールを使用します: %s", path, exc)
+        return cls.from_payload(DEFAULT_RULES)
+
+    def match(self, title: str) -> FrozenSet[str]:
+        """Ids of the keyword rules whose keywords occur in ``title``."""
+
+        if not title or self._automaton is None:
+            return frozenset()
+        hit = self._memo.get(title)
+        if hit is None:
+            found: set = set()
+            for _, rule_ids in self._automaton.iter(title):
+                found.update(rule_ids)
+            hit = self._memo[title] = frozenset(found)
+        return hit
+
+    def evaluate(self, case: CaseInput) -> CaseResult:
+        result = CaseResult()
+        rows = list(case.rows)
+        bosses = rows[1:]
+        for rule in self.rules:
+            if rule.when_cell is not None:
+                cell, expected = rule.when_cell
+                if (case.cells.get(cell) or "").strip() != expected:
+                    continue
+            if rule.follow is not None:
+                anchors = result.rule_rows.get(rule.follow) or []
+                if anchors:
+                    result.add(rule, anchors[-1] + rule.offset)
+                continue
+            candidates = bosses if rule.scope == "bosses" else rows
+            matched = False
+            for idx, (row, sheet_title) in enumerate(candidates):
+                title = sheet_title
+                if rule.title == "reference" and rule.scope == "bosses" and idx < len(case.positions) and case.positions[idx]:
+                    title = str(case.positions[idx])
+                if rule.id not in self.match((title or "").strip()):
+                    continue
+                result.add(rule, row)
+                matched = True
+                if rule.select == "first":
+                    break
+            if not matched and rule.fallback == "first_boss" and bosses:
+                result.add(rule, bosses[0][0])
+        return result
+
+    def evaluate_many(self, cases: Iterable[CaseInput]) -> List[CaseResult]:
+        """Evaluate a batch of cases (e.g. historical sheets) with one compiled automaton."""
+
+        return [self.evaluate(case) for case in cases]
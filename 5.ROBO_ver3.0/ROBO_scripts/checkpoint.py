@@ -0,0 +1,257 @@
+"""Checkpoints of a case so a failed run can be resumed (``main.py --resume <管理番号>``).
+
+The checkpoint is ``PathRegistry.checkpoint_dir/<管理番号>.json`` and is
+rewritten after every A/B task (``StepScheduler.run(on_done=...)``) and
+after Ea, Eb and Ec.  It holds:
+
+- ``StepAState`` as JSON, without the Outlook item of the selected mail
+  (``MailEnvelope.raw_item``) and the Edge process id;
+- for each completed task, the sha256 of the files it read when it ran
+  (``Task.reads``: templates) and the working files it modified
+  (``Task.writes``: RPAブック下処理, temp_弔事連絡票, RPAブック);
+- for tasks with a ``Task.fingerprint``, its value when they ran (Ac: the
+  case's row of the 管理表, so edits to other rows do not count);
+- the sha256 of every working file as of the checkpoint.
+
+On resume a completed task is restored when the files it read are
+unchanged and its fingerprint is the same (an empty one never matches).  A task that was not completed, or whose inputs changed, runs
+again together with the tasks depending on it and every other task that
+modifies the same working files (so a file is rebuilt from the task that
+first creates it); a working file changed since the checkpoint does the
+same for the tasks that wrote it.  Warm-up tasks (``optional``) run only
+if a task depending on them runs.  Step E always runs; Ea and Eb keep
+their PDF and draft when the restored fingerprints still match.
+
+A successful run deletes the checkpoint.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import asdict, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from archive_catalog import file_sha256
+from atomic_io import atomic_write_bytes, read_json
+from common import MailEnvelope, RpaOutputs, StepAState
+from step_scheduler import StepScheduler, Task
+
+LOGGER = logging.getLogger("chouji_robo.checkpoint")
+
+CHECKPOINT_VERSION = 1
+# Process-bound values that mean nothing to a later run.
+EXCLUDED_FIELDS = ("edge_process_pid",)
+MAIL_ENVELOPE_FIELDS = ("entry_id", "subject", "sender", "received_at", "body")
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    # Other COM values (e.g. currency) are kept as their text.
+    return str(value)
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, dict) and "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def state_to_dict(state: StepAState) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {}
+    for item in fields(state):
+        if item.name in EXCLUDED_FIELDS:
+            continue
+        value = getattr(state, item.name)
+        if isinstance(value, MailEnvelope):
+            payload[item.name] = {name: _encode(getattr(value, name)) for name in MAIL_ENVELOPE_FIELDS}
+        elif isinstance(value, RpaOutputs):
+            payload[item.name] = asdict(value)
+        else:
+            payload[item.name] = _encode(value)
+    return payload
+
+
+def state_from_dict(payload: Dict[str, Any]) -> StepAState:
+    state = StepAState()
+    for item in fields(StepAState):
+        if item.name not in payload or item.name in EXCLUDED_FIELDS:
+            continue
+        value = payload[item.name]
+        if item.name == "selected_mail_entry" and value is not None:
+            value = MailEnvelope(raw_item=None, **{name: _decode(value.get(name)) for name in MAIL_ENVELOPE_FIELDS})
+        elif item.name == "rpa_outputs" and value is not None:
+            value = RpaOutputs(**value)
+        else:
+            value = _decode(value)
+        setattr(state, item.name, value)
+    return state
+
+
+def _digest(path: str) -> str:
+    try:
+        return file_sha256(Path(path))
+    except OSError:
+        return ""
+
+
+def _paths(declared: Optional[Any], robot: Any) -> List[str]:
+    if declared is None:
+        return []
+    try:
+        return [str(path) for path in declared(robot)]
+    except Exception as exc:
+        # e.g. company_name is not known yet for a task that never ran.
+        LOGGER.debug("ファイル一覧を取得できませんでした: %s", exc)
+        return []
+
+
+def _fingerprint(task: Task, robot: Any) -> str:
+    try:
+        return str(task.fingerprint(robot) or "")
+    except Exception as exc:
+        LOGGER.debug("%s の内容を確認できませんでした: %s", task.name, exc)
+        return ""
+
+
+class Checkpoint:
+    """The saved progress of one 管理番号."""
+
+    def __init__(self, path: Path, tehai_number: str) -> None:
+        self.path = Path(path)
+        self.tehai_number = tehai_number
+        self.phase = ""
+        self.completed: Dict[str, Dict[str, str]] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self.writes: Dict[str, List[str]] = {}
+        self.files: Dict[str, str] = {}
+        self.resumed = False
+
+    @classmethod
+    def for_robot(cls, robot: Any) -> "Checkpoint":
+        tehai_number = str(robot.state.tehai_number)
+        return cls(robot.paths.checkpoint_dir / f"{tehai_number}.json", tehai_number)
+
+    @classmethod
+    def load(cls, robot: Any, tehai_number: str) -> Optional["Checkpoint"]:
+        """The checkpoint of ``tehai_number``, with its state put on ``robot.state``; None if there is none."""
+
+        path = robot.paths.checkpoint_dir / f"{tehai_number}.json"
+        payload = read_json(path)
+        if not payload:
+            return None
+        if payload.get("version") != CHECKPOINT_VERSION or str(payload.get("tehai_number")) != str(tehai_number):
+            LOGGER.warning("チェックポイントの形式が異なるため使用しません: %s", path)
+            return None
+        checkpoint = cls(path, str(tehai_number))
+        checkpoint.phase = payload.get("phase", "")
+        checkpoint.completed = {name: dict(reads) for name, reads in payload.get("completed", {}).items()}
+        checkpoint.writes = {name: list(paths) for name, paths in payload.get("writes", {}).items()}
+        checkpoint.fingerprints = dict(payload.get("fingerprints", {}))
+        checkpoint.files = dict(payload.get("files", {}))
+        checkpoint.resumed = True
+        robot.state = state_from_dict(payload.get("state", {}))
+        LOGGER.info("チェックポイントを読み込みました (%s 時点): %s", checkpoint.phase or "-", path)
+        return checkpoint
+
+    # -- saving ---------------------------------------------------------
+    def task_done(self, robot: Any, task: Task) -> None:
+        self.completed[task.name] = {path: _digest(path) for path in _paths(task.reads, robot)}
+        self.writes[task.name] = _paths(task.writes, robot)
+        if task.fingerprint is not None:
+            self.fingerprints[task.name] = _fingerprint(task, robot)
+        self.save(robot, task.name)
+
+    def save(self, robot: Any, phase: str) -> None:
+        """Write the checkpoint; a failure is logged and does not stop the run."""
+
+        self.phase = phase
+        working = sorted({path for paths in self.writes.values() for path in paths})
+        self.files = {path: _digest(path) for path in working}
+        payload = {
+            "version": CHECKPOINT_VERSION,
+            "tehai_number": self.tehai_number,
+            "saved_at": datetime.now().isoformat(timespec="seconds"),
+            "phase": phase,
+            "completed": self.completed,
+            "writes": self.writes,
+            "fingerprints": self.fingerprints,
+            "files": self.files,
+            "state": state_to_dict(robot.state),
+        }
+        try:
+            atomic_write_bytes(self.path, json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8"))
+        except (OSError, TypeError, ValueError) as exc:
+            LOGGER.warning("チェックポイントを保存できませんでした: %s (%s)", self.path, exc)
+
+    def forget(self, names: Set[str]) -> None:
+        """Drop tasks that are about to run again, so a failure leaves them marked incomplete."""
+
+        for name in names:
+            self.completed.pop(name, None)
+            self.writes.pop(name, None)
+            self.fingerprints.pop(name, None)
+
+    def delete(self) -> None:
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    # -- resuming -------------------------------------------------------
+    def restorable(self, robot: Any, tasks: Sequence[Task]) -> Set[str]:
+        """Names of the tasks whose results can be reused."""
+
+        scheduler = StepScheduler(tasks)
+        depends = scheduler.dependencies(robot)
+        required = {name for name, task in scheduler.tasks.items() if not task.optional}
+        writers: Dict[str, Set[str]] = {}
+        for name in required:
+            written = self.writes.get(name) if name in self.completed else _paths(scheduler.tasks[name].writes, robot)
+            for path in written or ():
+                writers.setdefault(path, set()).add(name)
+
+        rerun = {name for name in required if name not in self.completed}
+        for name in required & set(self.completed):
+            changed = [path for path, digest in self.completed[name].items() if _digest(path) != digest]
+            if changed:
+                LOGGER.info("%s の入力が変更されているため再実行します: %s", name, ", ".join(changed))
+                rerun.add(name)
+            task = scheduler.tasks[name]
+            if task.fingerprint is not None:
+                recorded = self.fingerprints.get(name, "")
+                if not recorded or _fingerprint(task, robot) != recorded:
+                    LOGGER.info("%s が読んだ内容が変更されているため再実行します。", name)
+                    rerun.add(name)
+        for path, digest in self.files.items():
+            if _digest(path) != digest:
+                LOGGER.info("%s が変更されているため作成し直します。", path)
+                rerun |= writers.get(path, set())
+
+        while True:
+            grown = set(rerun)
+            for name in required:
+                if depends[name] & rerun:
+                    grown.add(name)
+            for name in rerun:
+                for path in self.writes.get(name) or _paths(scheduler.tasks[name].writes, robot):
+                    grown |= writers.get(path, set())
+            if grown == rerun:
+                break
+            rerun = grown
+
+        keep = required - rerun
+        for name, task in scheduler.tasks.items():
+            if task.optional and not any(name in depends[other] for other in rerun):
+                keep.add(name)
+        return keep
+
@@ -0,0 +1,364 @@
+"""Headless PDF export of the 弔事連絡票 sheet without Excel (openpyxl + reportlab).
+
+The sheet itself is the template: column widths, row heights, merged
+cells, borders, fills, fonts and alignment are read with openpyxl (cached
+values, ``data_only``) and drawn as vectors with reportlab, scaled to one
+page like the Excel print setting.  A Japanese TrueType font is embedded
+(subset) so the PDF looks the same on every PC.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import openpyxl
+    from openpyxl.utils import get_column_letter, range_boundaries
+except Exception as exc:  # pragma: no cover - optional dependency
+    openpyxl = None  # type: ignore[assignment]
+    OPENPYXL_IMPORT_ERROR: Optional[Exception] = exc
+else:
+    OPENPYXL_IMPORT_ERROR = None
+
+try:
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+except Exception as exc:  # pragma: no cover - optional dependency
+    canvas = None  # type: ignore[assignment]
+    REPORTLAB_IMPORT_ERROR: Optional[Exception] = exc
+else:
+    REPORTLAB_IMPORT_ERROR = None
+
+LOGGER = logging.getLogger("chouji_robo.chouji_pdf")
+
+FONT_NAME = "ChoujiJP"
+CID_FALLBACK_FONT = "HeiseiKakuGo-W5"
+FONT_CANDIDATES = (
+    "C:/Windows/Fonts/msgothic.ttc",
+    "C:/Windows/Fonts/YuGothM.ttc",
+    "C:/Windows/Fonts/meiryo.ttc",
+    "/usr/share/fonts/opentype/ipafont-gothic/ipag.ttf",
+    "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
+)
+MARGIN_POINTS = 28.0  # about 1 cm, Excel's "narrow" margins
+DEFAULT_COLUMN_WIDTH = 8.43
+DEFAULT_ROW_HEIGHT = 13.5
+DEFAULT_FONT_SIZE = 11.0
+CELL_PADDING = 2.0
+
+
+def available() -> bool:
+    return openpyxl is not None and canvas is not None
+
+
+def _require() -> None:
+    if openpyxl is None:
+        raise RuntimeError("openpyxl が見つからないため PDF を生成できません。") from OPENPYXL_IMPORT_ERROR
+    if canvas is None:
+        raise RuntimeError("reportlab が見つからないため PDF を生成できません。") from REPORTLAB_IMPORT_ERROR
+
+
+_registered_font: Optional[str] = None
+
+
+def register_japanese_font(path: Optional[str] = None) -> str:
+    """Register an embeddable Japanese TTF/TTC (CHOUJI_PDF_FONT first) and return its name."""
+
+    global _registered_font
+    if _registered_font is not None and path is None:
+        return _registered_font
+    candidates = [path or os.getenv("CHOUJI_PDF_FONT", "")] + list(FONT_CANDIDATES)
+    for candidate in candidates:
+        if candidate and Path(candidate).exists():
+            try:
+                pdfmetrics.registerFont(TTFont(FONT_NAME, candidate, subfontIndex=0))
+            except Exception as exc:
+                LOGGER.warning("フォント %s を登録できません: %s", candidate, exc)
+                continue
+            _registered_font = FONT_NAME
+            return FONT_NAME
+    LOGGER.warning("埋め込み用の日本語フォントが見つからないため %s (非埋め込み) を使用します。", CID_FALLBACK_FONT)
+    pdfmetrics.registerFont(UnicodeCIDFont(CID_FALLBACK_FONT))
+    _registered_font = CID_FALLBACK_FONT
+    return CID_FALLBACK_FONT
+
+
+@dataclass
+class CellBox:
+    row: int
+    column: int
+    last_row: int
+    last_column: int
+    text: str = ""
+    size: float = DEFAULT_FONT_SIZE
+    bold: bool = False
+    horizontal: str = "general"
+    vertical: str = "bottom"
+    wrap: bool = False
+    numeric: bool = False
+    fill: Optional[Tuple[float, float, float]] = None
+    borders: Dict[str, bool] = field(default_factory=dict)
+
+
+@dataclass
+class SheetLayout:
+    column_widths: List[float]
+    row_heights: List[float]
+    first_row: int
+    first_column: int
+    cells: List[CellBox]
+    landscape: bool = False
+    center_horizontally: bool = False
+
+    @property
+    def width(self) -> float:
+        return sum(self.column_widths)
+
+    @property
+    def height(self) -> float:
+        return sum(self.row_heights)
+
+
+def _column_points(width: Optional[float]) -> float:
+    """Excel character width -> points (7 px per character + 5 px padding at 96 dpi)."""
+
+    chars = width if width is not None else DEFAULT_COLUMN_WIDTH
+    return max(0.0, (chars * 7 + 5) * 0.75)
+
+
+def _format_value(value: object, number_format: str) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        if value.time() == dt_time(0, 0):
+            value = value.date()
+        else:
+            return value.strftime("%Y/%m/%d %H:%M")
+    if isinstance(value, date):
+        if "年" in (number_format or ""):
+            return f"{value.year}年{value.month}月{value.day}日"
+        return value.strftime("%Y/%m/%d")
+    if isinstance(value, dt_time):
+        return value.strftime("%H:%M")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _rgb(color) -> Optional[Tuple[float, float, float]]:
+    value = getattr(color, "rgb", None)
+    if not isinstance(value, str) or len(value) < 6 or value in ("00000000",):
+        return None
+    value = value[-6:]
+    try:
+        return tuple(int(value[i : i + 2], 16) / 255.0 for i in (0, 2, 4))  # type: ignore[return-value]
+    except ValueError:
+        return None
+
+
+def _print_bounds(sheet) -> Tuple[int, int, int, int]:
+    area = sheet.print_area
+    if area:
+        first = area if isinstance(area, str) else area[0]
+        reference = first.split("!")[-1].replace("$", "").split(",")[0]
+        min_col, min_row, max_col, max_row = range_boundaries(reference)
+        return min_row, min_col, max_row, max_col
+    return sheet.min_row, sheet.min_column, sheet.max_row, sheet.max_column
+
+
+def load_layout(book_path: Path, sheet_name: str) -> SheetLayout:
+    """Read the printable part of ``sheet_name`` (cached values) into a SheetLayout."""
+
+    _require()
+    workbook = openpyxl.load_workbook(str(book_path), data_only=True)
+    try:
+        sheet = workbook[sheet_name]
+        min_row, min_col, max_row, max_col = _print_bounds(sheet)
+        default_width = sheet.sheet_format.defaultColWidth or None
+        widths = []
+        for column in range(min_col, max_col + 1):
+            dimension = sheet.column_dimensions.get(get_column_letter(column))
+            if dimension is not None and dimension.hidden:
+                widths.append(0.0)
+            else:
+                widths.append(_column_points(dimension.width if dimension is not None and dimension.width else default_width))
+        default_height = sheet.sheet_format.defaultRowHeight or DEFAULT_ROW_HEIGHT
+        heights = []
+        for row in range(min_row, max_row + 1):
+            dimension = sheet.row_dimensions.get(row)
+            if dimension is not None and dimension.hidden:
+                heights.append(0.0)
+            else:
+                heights.append(float(dimension.height) if dimension is not None and dimension.height else float(default_height))
+
+        merged: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        covered = set()
+        for merged_range in sheet.merged_cells.ranges:
+            merged[(merged_range.min_row, merged_range.min_col)] = (merged_range.max_row, merged_range.max_col)
+            for row in range(merged_range.min_row, merged_range.max_row + 1):
+                for column in range(merged_range.min_col, merged_range.max_col + 1):
+                    if (row, column) != (merged_range.min_row, merged_range.min_col):
+                        covered.add((row, column))
+
+        cells: List[CellBox] = []
+        for row_cells in sheet.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
+            for cell in row_cells:
+                key = (cell.row, cell.column)
+                if key in covered:
+                    continue
+                last_row, last_column = merged.get(key, key)
+                border = cell.border
+                borders = {
+                    side: bool(getattr(getattr(border, side), "style", None))
+                    for side in ("left", "right", "top", "bottom")
+                }
+                # Merged ranges take their outer edges from the edge cells.
+                if key in merged:
+                    borders["right"] = borders["right"] or bool(sheet.cell(cell.row, last_column).border.right.style)
+                    borders["bottom"] = borders["bottom"] or bool(sheet.cell(last_row, cell.column).border.bottom.style)
+                fill = _rgb(cell.fill.fgColor) if cell.fill is not None and cell.fill.fill_type == "solid" else None
+                text = _format_value(cell.value, cell.number_format)
+                if not text and not any(borders.values()) and fill is None:
+                    continue
+                cells.append(
+                    CellBox(
+                        row=cell.row,
+                        column=cell.column,
+                        last_row=min(last_row, max_row),
+                        last_column=min(last_column, max_col),
+                        text=text,
+                        size=float(cell.font.sz or DEFAULT_FONT_SIZE) if cell.font is not None else DEFAULT_FONT_SIZE,
+                        bold=bool(cell.font is not None and cell.font.b),
+                        horizontal=(cell.alignment.horizontal or "general") if cell.alignment is not None else "general",
+                        vertical=(cell.alignment.vertical or "bottom") if cell.alignment is not None else "bottom",
+                        wrap=bool(cell.alignment is not None and cell.alignment.wrap_text),
+                        numeric=isinstance(cell.value, (int, float)) and not isinstance(cell.value, bool),
+                        fill=fill,
+                        borders=borders,
+                    )
+                )
+        return SheetLayout(
+            column_widths=widths,
+            row_heights=heights,
+            first_row=min_row,
+            first_column=min_col,
+            cells=cells,
+            landscape=sheet.page_setup.orientation == "landscape",
+            center_horizontally=bool(sheet.print_options.horizontalCentered),
+        )
+    finally:
+        workbook.close()
+
+
+def _wrap(text: str, font: str, size: float, width: float) -> List[str]:
+    lines: List[str] = []
+    for paragraph in text.splitlines() or [""]:
+        current = ""
+        for char in paragraph:
+            if current and pdfmetrics.stringWidth(current + char, font, size) > width:
+                lines.append(current)
+                current = char
+            else:
+                current += char
+        lines.append(current)
+    return lines
+
+
+def render_layout(layout: SheetLayout, pdf_path: Path, *, font: Optional[str] = None, title: str = "") -> Path:
+    """Draw ``layout`` on one A4 page, scaled down to fit like Excel's fit-to-page."""
+
+    _require()
+    font = font or register_japanese_font()
+    page_width, page_height = landscape(A4) if layout.landscape else A4
+    available_width = page_width - 2 * MARGIN_POINTS
+    available_height = page_height - 2 * MARGIN_POINTS
+    scale = min(1.0, available_width / max(layout.width, 1.0), available_height / max(layout.height, 1.0))
+    offset_x = MARGIN_POINTS
+    if layout.center_horizontally:
+        offset_x = (page_width - layout.width * scale) / 2
+
+    x_edges = [0.0]
+    for width in layout.column_widths:
+        x_edges.append(x_edges[-1] + width)
+    y_edges = [0.0]
+    for height in layout.row_heights:
+        y_edges.append(y_edges[-1] + height)
+
+    pdf_path = Path(pdf_path)
+    pdf_path.parent.mkdir(parents=True, exist_ok=True)
+    pdf = canvas.Canvas(str(pdf_path), pagesize=(page_width, page_height))
+    if title:
+        pdf.setTitle(title)
+    pdf.translate(offset_x, page_height - MARGIN_POINTS)
+    pdf.scale(scale, scale)
+    pdf.setLineWidth(0.5)
+
+    for box in layout.cells:
+        left = x_edges[box.column - layout.first_column]
+        right = x_edges[box.last_column - layout.first_column + 1]
+        top = -y_edges[box.row - layout.first_row]
+        bottom = -y_edges[box.last_row - layout.first_row + 1]
+        if right <= left or top <= bottom:
+            continue
+        if box.fill is not None:
+            pdf.setFillColorRGB(*box.fill)
+            pdf.rect(left, bottom, right - left, top - bottom, stroke=0, fill=1)
+            pdf.setFillColorRGB(0, 0, 0)
+        edges = {
+            "left": (left, bottom, left, top),
+            "right": (right, bottom, right, top),
+            "top": (left, top, right, top),
+            "bottom": (left, bottom, right, bottom),
+        }
+        for side, enabled in box.borders.items():
+            if enabled:
+                pdf.line(*edges[side])
+        if not box.text:
+            continue
+        inner_width = right - left - 2 * CELL_PADDING
+        lines = _wrap(box.text, font, box.size, inner_width) if box.wrap else (box.text.splitlines() or [""])
+        leading = box.size * 1.2
+        block = leading * len(lines)
+        if box.vertical == "top":
+            baseline = top - CELL_PADDING - box.size
+        elif box.vertical == "center":
+            baseline = (top + bottom) / 2 + block / 2 - box.size
+        else:
+            baseline = bottom + CELL_PADDING + block - leading + box.size * 0.2
+        horizontal = box.horizontal
+        if horizontal == "general":
+            horizontal = "right" if box.numeric else "left"
+        pdf.setFont(font, box.size)
+        for line in lines:
+            if horizontal in ("center", "centerContinuous", "distributed"):
+                pdf.drawCentredString((left + right) / 2, baseline, line)
+            elif horizontal == "right":
+                pdf.drawRightString(right - CELL_PADDING, baseline, line)
+            else:
+                pdf.drawString(left + CELL_PADDING, baseline, line)
+            baseline -= leading
+    pdf.showPage()
+    pdf.save()
+    return pdf_path
+
+
+def render_sheet_pdf(book_path: Path, sheet_name: str, pdf_path: Path) -> Path:
+    return render_layout(load_layout(book_path, sheet_name), pdf_path, title=Path(pdf_path).stem)
+
+
+def read_cell(book_path: Path, sheet_name: str, address: str) -> str:
+    _require()
+    workbook = openpyxl.load_workbook(str(book_path), data_only=True, read_only=True)
+    try:
+        value = workbook[sheet_name][address].value
+    finally:
+        workbook.close()
+    return "" if value is None else str(value).strip()
@@ -2,14 +2,17 @@
 
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
 HEARTBEAT_INTERVAL_MS = 5000
 FORCE_STOP_POLL_MS = 500
 LOG_QUEUE_POLL_MS = 120
+# How long shutdown waits for background writes (archive copy, error_log compaction).
+BACKGROUND_JOIN_SECONDS = float(os.getenv("CHOUJI_BACKGROUND_JOIN_SECONDS", "120"))
 
 
 @dataclass
@@ -35,9 +38,42 @@ class StepAState:
     generated_excel_path: Optional[str] = None
     outlook_draft_entry_id: str = ""
     outlook_draft_store_id: str = ""
+    # Content fingerprints (xlsx_package.sheet_digest) of the inputs the
+    # current artifacts were built from; used to skip work in the E redo loop.
+    pdf_fingerprint: str = ""
+    mail_fingerprint: str = ""
+    draft_pdf_fingerprint: str = ""
+    draft_attachment_name: str = ""
+    draft_sink_name: str = ""
+    rpa_outputs: Optional["RpaOutputs"] = None
     edge_process_pid: Optional[int] = None
 
 
+@dataclass(frozen=True)
+class RpaOutputs:
+    """RPAシート cells the Outlook draft is built from (D3/D12/D25/D26/D27).
+
+    ``source_mtime_ns`` is the RPAブック mtime the values were read at; any
+    later save (Excel edit in Ec, step B writes) makes the snapshot stale.
+    """
+
+    to: str = ""
+    subject: str = ""
+    cc: str = ""
+    bcc: str = ""
+    body: str = ""
+    source_mtime_ns: int = 0
+
+    def is_current(self, book_path: Path) -> bool:
+        try:
+            return Path(book_path).stat().st_mtime_ns == self.source_mtime_ns
+        except OSError:
+            return False
+
+    def mail_fields(self) -> Dict[str, str]:
+        return {"to": self.to, "subject": self.subject, "cc": self.cc, "bcc": self.bcc, "body": self.body}
+
+
 @dataclass
 class MailEnvelope:
     """Lightweight representation of an Outlook mail item."""
@@ -55,9 +91,14 @@ class PathRegistry:
     """Resolves filesystem locations while keeping the user root dynamic."""
 
     home: Path = field(default_factory=Path.home)
+    # Private stand-in for the desktop folder, used while a queued case is
+    # prepared in the background (case_queue); None means the real desktop.
+    workspace: Optional[Path] = None
 
     @property
     def desktop_root(self) -> Path:
+        if self.workspace is not None:
+            return self.workspace
         return self.home / "Desktop" / "【全社標準】弔事対応フォルダ"
 
     @property
@@ -129,6 +170,65 @@ class PathRegistry:
             / "error_log.xlsx"
         )
 
+    @property
+    def title_cache_db(self) -> Path:
+        override = os.getenv("CHOUJI_TITLE_CACHE_DB", "").strip()
+        if override:
+            return Path(override)
+        # A live SQLite file must not sit in the synced folder.
+        return self.local_state_dir / "title_cache.sqlite3"
+
+    @property
+    def run_journal_dir(self) -> Path:
+        override = os.getenv("CHOUJI_RUN_JOURNAL_DIR", "").strip()
+        if override:
+            return Path(override)
+        return self.error_log_book.parent / "run_journal"
+
+    @property
+    def archive_catalog_db(self) -> Path:
+        override = os.getenv("CHOUJI_ARCHIVE_CATALOG_DB", "").strip()
+        if override:
+            return Path(override)
+        # Per PC, like title_cache_db: SQLite must not be shared through OneDrive.
+        return self.local_state_dir / "archive_catalog.sqlite3"
+
+    @property
+    def local_state_dir(self) -> Path:
+        """Per-machine folder outside OneDrive for state that must not be synced."""
+
+        base = os.environ.get("LOCALAPPDATA")
+        root = Path(base) if base else self.home / ".chouji_robo"
+        return root / "chouji_robo"
+
+    @property
+    def positions_snapshot(self) -> Path:
+        override = os.getenv("CHOUJI_POSITIONS_SNAPSHOT", "").strip()
+        if override:
+            return Path(override)
+        return self.local_state_dir / "positions_snapshot.json"
+
+    @property
+    def artifact_manifest(self) -> Path:
+        override = os.getenv("CHOUJI_ARTIFACT_MANIFEST", "").strip()
+        if override:
+            return Path(override)
+        return self.local_state_dir / "artifact_manifest.json"
+
+    @property
+    def checkpoint_dir(self) -> Path:
+        override = os.getenv("CHOUJI_CHECKPOINT_DIR", "").strip()
+        if override:
+            return Path(override)
+        return self.local_state_dir / "checkpoints"
+
+    @property
+    def draft_spool_dir(self) -> Path:
+        override = os.getenv("CHOUJI_DRAFT_SPOOL", "").strip()
+        if override:
+            return Path(override)
+        return self.local_state_dir / "draft_spool"
+
     def company_archive_dir(self, company_name: str) -> Path:
         return (
             self.panasonic_root
@@ -0,0 +1,137 @@
+"""Department-path similarity used to pick the right PHONE APPLI search result."""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+try:  # C-accelerated when available; the pure-Python path gives the same scores.
+    from rapidfuzz import fuzz as _rapidfuzz
+except Exception:  # pragma: no cover - optional dependency
+    _rapidfuzz = None
+
+BACKEND = "rapidfuzz" if _rapidfuzz is not None else "python"
+
+# Org-unit suffixes that end one level of a department path, longest first.
+UNIT_SUFFIXES = (
+    "事業本部",
+    "カンパニー",
+    "センター",
+    "グループ",
+    "ユニット",
+    "チーム",
+    "事業部",
+    "本部",
+    "部門",
+    "部",
+    "課",
+    "室",
+    "係",
+    "社",
+)
+_SEPARATORS = re.compile(r"[\s/／・>＞|｜,，、]+")
+_SEGMENT = re.compile(r".+?(?:" + "|".join(UNIT_SUFFIXES) + r")")
+# After NFKC, so full-width digits (開発１G) are already ASCII here.
+_GROUP_ABBREVIATION = re.compile(r"(?<=[^\x00-\x7f]|[0-9])(?:G|Gr|GR|grp)(?=$|[\s/])")
+
+LEAF_WEIGHT = 0.3
+
+
+@lru_cache(maxsize=4096)
+def normalise_department(text: str) -> str:
+    """NFKC (full/half width), unify separators and expand "G" to グループ."""
+
+    value = unicodedata.normalize("NFKC", text or "").strip()
+    value = _GROUP_ABBREVIATION.sub("グループ", value)
+    value = _SEPARATORS.sub(" ", value)
+    return value.lower().strip()
+
+
+@lru_cache(maxsize=4096)
+def department_segments(text: str) -> Tuple[str, ...]:
+    """Split a department path into levels, e.g. 技術部設計課 -> (技術部, 設計課)."""
+
+    segments: List[str] = []
+    for chunk in normalise_department(text).split(" "):
+        if not chunk:
+            continue
+        position = 0
+        for match in _SEGMENT.finditer(chunk):
+            segments.append(match.group(0))
+            position = match.end()
+        if position < len(chunk):
+            segments.append(chunk[position:])
+    return tuple(segments)
+
+
+def _lcs_length(a: str, b: str) -> int:
+    """Bit-parallel LCS length (Hyyrö), linear in len(b) big-int operations."""
+
+    if not a or not b:
+        return 0
+    masks: dict = {}
+    for index, char in enumerate(a):
+        masks[char] = masks.get(char, 0) | (1 << index)
+    full = (1 << len(a)) - 1
+    row = full
+    for char in b:
+        matches = row & masks.get(char, 0)
+        row = ((row + matches) | (row - matches)) & full
+    return len(a) - bin(row).count("1")
+
+
+def ratio(a: str, b: str) -> float:
+    """Normalised indel similarity in 0..1 (rapidfuzz ``fuzz.ratio`` / 100)."""
+
+    if _rapidfuzz is not None:
+        return _rapidfuzz.ratio(a, b) / 100.0
+    total = len(a) + len(b)
+    if total == 0:
+        return 1.0
+    return 2.0 * _lcs_length(a, b) / total
+
+
+def token_set_ratio(left: Sequence[str], right: Sequence[str]) -> float:
+    """Token-set similarity of two segment lists (rapidfuzz semantics)."""
+
+    if _rapidfuzz is not None:
+        return _rapidfuzz.token_set_ratio(" ".join(left), " ".join(right)) / 100.0
+    tokens_left, tokens_right = set(left), set(right)
+    if not tokens_left or not tokens_right:
+        return 0.0
+    common = " ".join(sorted(tokens_left & tokens_right))
+    only_left = " ".join(sorted(tokens_left - tokens_right))
+    only_right = " ".join(sorted(tokens_right - tokens_left))
+    if common and (not only_left or not only_right):
+        return 1.0
+    combined_left = f"{common} {only_left}".strip()
+    combined_right = f"{common} {only_right}".strip()
+    scores = [ratio(combined_left, combined_right)]
+    if common:
+        scores.extend((ratio(common, combined_left), ratio(common, combined_right)))
+    return max(scores)
+
+
+def department_similarity(department: str, candidate_text: str) -> float:
+    """Score 0..1: token-set over all levels plus the best match of the lowest level.
+
+    The lowest level (課/グループ) is what tells two namesakes apart, so it
+    gets its own weight on top of the whole-path comparison.
+    """
+
+    wanted = department_segments(department)
+    found = department_segments(candidate_text)
+    if not wanted or not found:
+        return 0.0
+    overall = token_set_ratio(wanted, found)
+    leaf = max(ratio(wanted[-1], segment) for segment in found)
+    return (1.0 - LEAF_WEIGHT) * overall + LEAF_WEIGHT * leaf
+
+
+def rank(department: str, texts: Sequence[str]) -> List[Tuple[int, float]]:
+    """Return (index, score) pairs sorted best first; ties keep the page order."""
+
+    scored = [(index, department_similarity(department, text)) for index, text in enumerate(texts)]
+    return sorted(scored, key=lambda item: (-item[1], item[0]))
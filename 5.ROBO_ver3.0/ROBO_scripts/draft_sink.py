@@ -0,0 +1,216 @@
+"""Destinations for the mail draft built in step Eb.
+
+``OutlookDraftSink`` saves into Outlook's Drafts through the robot's
+OutlookSession (the normal interactive run).  ``EmlDraftSink`` writes an
+RFC 5322 ``.eml`` per draft into a spool folder for headless and batch
+runs; Outlook opens such files as unsent drafts (``X-Unsent: 1``) and they
+can be imported in bulk later.  The PDF is base64-encoded straight from
+disk in fixed-size chunks, so memory use does not grow with the attachment.
+
+``CHOUJI_DRAFT_SINK=eml`` selects the spool; the folder is
+``PathRegistry().draft_spool_dir``.
+"""
+
+from __future__ import annotations
+
+import base64
+import logging
+import os
+import re
+import tempfile
+import uuid
+from dataclasses import dataclass
+from email.header import Header
+from email.utils import formataddr, formatdate, getaddresses, make_msgid
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+from urllib.parse import quote
+
+import outlook_session
+from common import PathRegistry
+
+LOGGER = logging.getLogger("chouji_robo.email")
+
+# 57 input bytes -> one 76-character base64 line; read 57 KiB at a time.
+_B64_LINE_BYTES = 57
+_B64_CHUNK_BYTES = _B64_LINE_BYTES * 1024
+CRLF = b"\r\n"
+
+
+@dataclass(frozen=True)
+class Draft:
+    to: str
+    subject: str
+    cc: str = ""
+    bcc: str = ""
+    body: str = ""
+    attachment: Optional[Path] = None
+
+
+@dataclass(frozen=True)
+class DraftRef:
+    """Where a saved draft lives: Outlook EntryID/StoreID, or the .eml path."""
+
+    entry_id: str
+    store_id: str = ""
+    attachment_name: str = ""
+
+
+class OutlookDraftSink:
+    name = "outlook"
+
+    def __init__(self, session: Any) -> None:
+        self.session = session
+
+    def open(self, ref: Optional[DraftRef]) -> Optional[Any]:
+        if ref is None or not ref.entry_id:
+            return None
+        try:
+            item = self.session.get_item(ref.entry_id, ref.store_id)
+        except Exception:
+            LOGGER.info("既存の Outlook 下書きが見つからないため新しく作成します。")
+            return None
+        return None if getattr(item, "Sent", False) else item
+
+    def exists(self, ref: Optional[DraftRef]) -> bool:
+        return self.open(ref) is not None
+
+    def save(self, draft: Draft, ref: Optional[DraftRef] = None, *, fields: bool = True, attachment: bool = True) -> DraftRef:
+        mail = self.open(ref)
+        if mail is None:
+            mail = self.session.create_mail()
+            fields = attachment = True
+            previous = ""
+        else:
+            previous = ref.attachment_name if ref else ""
+        if fields:
+            mail.To = draft.to
+            mail.Subject = draft.subject
+            mail.CC = draft.cc
+            mail.BCC = draft.bcc
+            mail.Body = draft.body
+        if attachment and draft.attachment is not None:
+            attachments = mail.Attachments
+            for index in range(attachments.Count, 0, -1):
+                item = attachments.Item(index)
+                if previous and item.FileName == previous:
+                    item.Delete()
+            attachments.Add(Source=str(draft.attachment))
+        mail.Save()
+        return DraftRef(
+            entry_id=mail.EntryID or "",
+            store_id=getattr(mail, "StoreID", "") or "",
+            attachment_name=draft.attachment.name if draft.attachment is not None else "",
+        )
+
+
+def _header(value: str) -> str:
+    try:
+        value.encode("ascii")
+        return value
+    except UnicodeEncodeError:
+        # Folded lines must use CRLF like the rest of the message.
+        return Header(value, "utf-8").encode(linesep="\r\n")
+
+
+def _addresses(value: str) -> str:
+    # Outlook fields use ";" between recipients; RFC 5322 uses ",".
+    # Only the display name is encoded; the address itself stays readable.
+    parts = []
+    for name, address in getaddresses([(value or "").replace(";", ",")]):
+        if address:
+            parts.append(formataddr((name, address), charset="utf-8"))
+        elif name:
+            parts.append(_header(name))
+    return ", ".join(parts)
+
+
+def _write_base64(source: BinaryIO, target: BinaryIO) -> int:
+    total = 0
+    while True:
+        chunk = source.read(_B64_CHUNK_BYTES)
+        if not chunk:
+            return total
+        total += len(chunk)
+        target.write(base64.encodebytes(chunk).replace(b"\n", CRLF))
+
+
+class EmlDraftSink:
+    name = "eml"
+
+    def __init__(self, spool_dir: Optional[Path] = None, domain: str = "chouji-robo.local") -> None:
+        self.spool_dir = Path(spool_dir) if spool_dir else PathRegistry().draft_spool_dir
+        self.domain = domain
+
+    def exists(self, ref: Optional[DraftRef]) -> bool:
+        return ref is not None and bool(ref.entry_id) and Path(ref.entry_id).exists()
+
+    def _target(self, draft: Draft, ref: Optional[DraftRef]) -> Path:
+        if self.exists(ref):
+            return Path(ref.entry_id)  # type: ignore[union-attr]
+        stem = re.sub(r'[\\/:*?"<>|\s]+', "_", draft.subject).strip("_")[:60] or "draft"
+        return self.spool_dir / f"{stem}_{uuid.uuid4().hex[:12]}.eml"
+
+    def save(self, draft: Draft, ref: Optional[DraftRef] = None, *, fields: bool = True, attachment: bool = True) -> DraftRef:
+        # A file is always rewritten whole; ``fields``/``attachment`` only matter to Outlook.
+        target = self._target(draft, ref)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        handle, temp_name = tempfile.mkstemp(prefix=".draft_", suffix=".tmp", dir=str(target.parent))
+        try:
+            with os.fdopen(handle, "wb") as stream:
+                self._write_message(stream, draft)
+            os.replace(temp_name, target)
+        except BaseException:
+            try:
+                os.unlink(temp_name)
+            except OSError:
+                pass
+            raise
+        return DraftRef(entry_id=str(target), attachment_name=draft.attachment.name if draft.attachment else "")
+
+    def _write_message(self, stream: BinaryIO, draft: Draft) -> None:
+        boundary = f"=_chouji_{uuid.uuid4().hex}"
+        headers = [
+            ("MIME-Version", "1.0"),
+            ("Date", formatdate(localtime=True)),
+            ("Message-ID", make_msgid(domain=self.domain)),
+            ("X-Unsent", "1"),
+            ("To", _addresses(draft.to)),
+            ("Cc", _addresses(draft.cc)),
+            ("Bcc", _addresses(draft.bcc)),
+            ("Subject", _header(draft.subject)),
+            ("Content-Type", f'multipart/mixed; boundary="{boundary}"'),
+        ]
+        for name, value in headers:
+            if value:
+                stream.write(f"{name}: {value}".encode("ascii") + CRLF)
+        stream.write(CRLF)
+
+        stream.write(f"--{boundary}".encode("ascii") + CRLF)
+        stream.write(b'Content-Type: text/plain; charset="utf-8"' + CRLF)
+        stream.write(b"Content-Transfer-Encoding: base64" + CRLF + CRLF)
+        body = draft.body.replace("\r\n", "\n").replace("\n", "\r\n").encode("utf-8")
+        stream.write(base64.encodebytes(body).replace(b"\n", CRLF))
+
+        if draft.attachment is not None:
+            name = draft.attachment.name
+            stream.write(f"--{boundary}".encode("ascii") + CRLF)
+            stream.write(f"Content-Type: application/pdf; name*=UTF-8''{quote(name)}".encode("ascii") + CRLF)
+            stream.write(b"Content-Transfer-Encoding: base64" + CRLF)
+            disposition = f"attachment; filename*=UTF-8''{quote(name)}"
+            stream.write(f"Content-Disposition: {disposition}".encode("ascii") + CRLF + CRLF)
+            with open(draft.attachment, "rb") as source:
+                _write_base64(source, stream)
+        stream.write(f"--{boundary}--".encode("ascii") + CRLF)
+
+
+def create_sink(robot: Any = None) -> Any:
+    kind = os.getenv("CHOUJI_DRAFT_SINK", "outlook").strip().lower()
+    if kind == "eml":
+        return EmlDraftSink()
+    return OutlookDraftSink(outlook_session.for_robot(robot))
+
+
+def for_robot(robot: Any) -> Any:
+    sink = getattr(robot, "draft_sink", None)
+    return sink if sink is not None else create_sink(robot)
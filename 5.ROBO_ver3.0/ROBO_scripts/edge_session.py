@@ -0,0 +1,340 @@
+"""Long-lived Edge browser and msedgedriver reused by Selenium across robot runs."""
+
+from __future__ import annotations
+
+import ctypes
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.error import URLError
+from urllib.request import urlopen
+
+LOGGER = logging.getLogger("chouji_robo.edge_session")
+
+DEFAULT_DEBUG_PORT = int(os.getenv("CHOUJI_EDGE_DEBUG_PORT", "9333"))
+DEFAULT_DRIVER_PORT = int(os.getenv("CHOUJI_EDGE_DRIVER_PORT", "9334"))
+STARTUP_TIMEOUT_SECONDS = 20.0
+PROBE_TIMEOUT_SECONDS = 1.0
+BROWSER_IMAGE = "msedge.exe"
+DRIVER_IMAGE = "msedgedriver.exe"
+# Written by Edge into --user-data-dir: the port and the browser's DevTools path.
+DEVTOOLS_PORT_FILE = "DevToolsActivePort"
+
+# Keep the browser and driver alive after the robot calls os._exit().
+_DETACHED_FLAGS = getattr(subprocess, "DETACHED_PROCESS", 0) | getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+
+
+def default_session_root() -> Path:
+    base = os.environ.get("LOCALAPPDATA")
+    root = Path(base) if base else Path.home() / ".chouji_robo"
+    return root / "chouji_robo" / "edge_session"
+
+
+def find_edge_executable() -> Optional[Path]:
+    override = os.getenv("CHOUJI_EDGE_EXE")
+    candidates = [Path(override)] if override else []
+    for variable in ("PROGRAMFILES(X86)", "PROGRAMFILES", "LOCALAPPDATA"):
+        base = os.environ.get(variable)
+        if base:
+            candidates.append(Path(base) / "Microsoft" / "Edge" / "Application" / "msedge.exe")
+    for candidate in candidates:
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def _http_json(url: str, timeout: float = PROBE_TIMEOUT_SECONDS) -> Optional[Dict[str, Any]]:
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            payload = json.loads(response.read().decode("utf-8"))
+    except (URLError, OSError, ValueError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def probe_browser(port: int) -> Optional[Dict[str, Any]]:
+    """Return /json/version of a browser listening on ``port`` or None."""
+
+    return _http_json(f"http://127.0.0.1:{port}/json/version")
+
+
+def probe_driver(port: int) -> bool:
+    payload = _http_json(f"http://127.0.0.1:{port}/status")
+    return bool(payload and (payload.get("value") or {}).get("ready"))
+
+
+def _windows_process_identity(pid: int) -> Optional[Tuple[str, int]]:
+    kernel32 = ctypes.WinDLL("kernel32")
+    # HANDLE is pointer sized; the default int restype would truncate it on 64-bit Python.
+    kernel32.OpenProcess.restype = ctypes.c_void_p
+    kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+    kernel32.QueryFullProcessImageNameW.argtypes = [
+        ctypes.c_void_p, ctypes.c_ulong, ctypes.c_wchar_p, ctypes.POINTER(ctypes.c_ulong)
+    ]
+    kernel32.GetProcessTimes.argtypes = [ctypes.c_void_p] + [ctypes.POINTER(ctypes.c_ulonglong)] * 4
+    handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+    if not handle:
+        return None
+    try:
+        buffer = ctypes.create_unicode_buffer(1024)
+        size = ctypes.c_ulong(len(buffer))
+        if not kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(size)):
+            return None
+        created, exited, kernel, user = (ctypes.c_ulonglong() for _ in range(4))
+        if not kernel32.GetProcessTimes(
+            handle, ctypes.byref(created), ctypes.byref(exited), ctypes.byref(kernel), ctypes.byref(user)
+        ):
+            return None
+        return Path(buffer.value).name.lower(), created.value
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def process_identity(pid: Optional[int]) -> Optional[Tuple[str, int]]:
+    """Image name (lower case) and creation time of ``pid``, or None when it is gone."""
+
+    if not pid:
+        return None
+    if sys.platform.startswith("win"):
+        return _windows_process_identity(pid)
+    try:
+        name = Path(f"/proc/{pid}/comm").read_text(encoding="utf-8").strip().lower()
+        stat = Path(f"/proc/{pid}/stat").read_text(encoding="utf-8")
+    except OSError:
+        return None
+    # Field 22 (start time) counted after the parenthesised command name.
+    return name, int(stat.rsplit(")", 1)[1].split()[19])
+
+
+def _terminate(pid: int) -> None:
+    if sys.platform.startswith("win"):
+        subprocess.run(["taskkill", "/PID", str(pid), "/F", "/T"], check=False, capture_output=True)
+        return
+    try:
+        os.kill(pid, 9)
+    except OSError:
+        pass
+
+
+def _kill(pid: Optional[int], image: str, created: Optional[int]) -> None:
+    """Kill a process this module started, if ``pid`` still is that process.
+
+    The pid comes from edge_session.json; after a reboot it may belong to
+    anything, so the image name and (when recorded) the creation time must match.
+    """
+
+    identity = process_identity(pid)
+    if identity is None:
+        return
+    name, started = identity
+    if name != image or (created is not None and started != created):
+        LOGGER.info("pid=%s は常駐用に起動したプロセスではないため終了しません (%s)。", pid, name)
+        return
+    _terminate(pid)
+
+
+def _wait_until(check, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return True
+        time.sleep(0.25)
+    return False
+
+
+@dataclass
+class EdgeSessionState:
+    """What the previous run left running; stored next to the profile."""
+
+    browser_pid: Optional[int] = None
+    browser_created: Optional[int] = None
+    browser_port: int = DEFAULT_DEBUG_PORT
+    driver_pid: Optional[int] = None
+    driver_created: Optional[int] = None
+    driver_port: int = DEFAULT_DRIVER_PORT
+    headless: bool = False
+    started_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+    @classmethod
+    def load(cls, path: Path) -> "EdgeSessionState":
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+            return cls(**{key: payload[key] for key in cls.__dataclass_fields__ if key in payload})
+        except (OSError, ValueError, TypeError):
+            return cls()
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(asdict(self), ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+class WarmEdgeSession:
+    """Edge with a persistent profile and remote debugging, plus a resident driver.
+
+    The first run starts both detached; later runs attach over the
+    debugging port so the Microsoft 365 sign-in in the profile is reused,
+    but only when the browser on that port is the one using ``profile_dir``.
+    Dead or mismatched processes are killed and started again; callers fall
+    back to a normal WebDriver launch when ``create_driver`` raises.
+    """
+
+    def __init__(
+        self,
+        *,
+        root: Optional[Path] = None,
+        browser_port: int = DEFAULT_DEBUG_PORT,
+        driver_port: int = DEFAULT_DRIVER_PORT,
+        headless: bool = False,
+        driver_path: Optional[Path] = None,
+    ) -> None:
+        self.root = root or default_session_root()
+        self.profile_dir = self.root / "profile"
+        self.state_path = self.root / "edge_session.json"
+        self.browser_port = browser_port
+        self.driver_port = driver_port
+        self.headless = headless
+        self.driver_path = driver_path
+        self.state = EdgeSessionState.load(self.state_path)
+        self.reused_browser = False
+        self.reused_driver = False
+
+    def _launch_browser(self) -> None:
+        edge = find_edge_executable()
+        if edge is None:
+            raise RuntimeError("msedge.exe が見つかりません。CHOUJI_EDGE_EXE で指定してください。")
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        command = [
+            str(edge),
+            f"--remote-debugging-port={self.browser_port}",
+            f"--user-data-dir={self.profile_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--disable-features=msEdgeDataSharing",
+            "--disable-blink-features=AutomationControlled",
+        ]
+        if self.headless:
+            command += ["--headless=new", "--disable-gpu", "--window-size=1920,1080"]
+        else:
+            command.append("--start-maximized")
+        command.append("about:blank")
+        process = subprocess.Popen(command, creationflags=_DETACHED_FLAGS, close_fds=True)
+        if not _wait_until(lambda: probe_browser(self.browser_port) is not None, STARTUP_TIMEOUT_SECONDS):
+            _terminate(process.pid)
+            raise RuntimeError(f"Edge のリモートデバッグポート {self.browser_port} に接続できません。")
+        if not self._owns_browser(probe_browser(self.browser_port)):
+            _terminate(process.pid)
+            raise RuntimeError(f"ポート {self.browser_port} は常駐用プロファイル以外の Edge が使用しています。")
+        self.state.browser_pid = process.pid
+        self.state.browser_created = (process_identity(process.pid) or (None, None))[1]
+        self.state.browser_port = self.browser_port
+        self.state.headless = self.headless
+        self.state.started_at = datetime.now().isoformat(timespec="seconds")
+        LOGGER.info("常駐用 Edge を起動しました (pid=%s, port=%s)。", process.pid, self.browser_port)
+
+    def _launch_driver(self) -> None:
+        if self.driver_path is None:
+            raise RuntimeError("msedgedriver のパスが不明なため常駐ドライバーを起動できません。")
+        process = subprocess.Popen(
+            [str(self.driver_path), f"--port={self.driver_port}"],
+            creationflags=_DETACHED_FLAGS,
+            close_fds=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if not _wait_until(lambda: probe_driver(self.driver_port), STARTUP_TIMEOUT_SECONDS):
+            _terminate(process.pid)
+            raise RuntimeError(f"msedgedriver (port {self.driver_port}) が応答しません。")
+        self.state.driver_pid = process.pid
+        self.state.driver_created = (process_identity(process.pid) or (None, None))[1]
+        self.state.driver_port = self.driver_port
+        LOGGER.info("常駐用 msedgedriver を起動しました (pid=%s, port=%s)。", process.pid, self.driver_port)
+
+    def _owns_browser(self, version: Optional[Dict[str, Any]]) -> bool:
+        """True when the browser answering on the port was started with ``profile_dir``."""
+
+        try:
+            lines = (self.profile_dir / DEVTOOLS_PORT_FILE).read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return False
+        # The browser path is a new GUID per launch, so a stale file never matches.
+        websocket = str((version or {}).get("webSocketDebuggerUrl", ""))
+        return len(lines) >= 2 and lines[0].strip() == str(self.browser_port) and websocket.endswith(lines[1].strip())
+
+    def ensure_browser(self) -> str:
+        """Return the debugger address of a live browser, starting one if needed."""
+
+        version = probe_browser(self.browser_port)
+        if version is not None and not self._owns_browser(version):
+            raise RuntimeError(f"ポート {self.browser_port} は常駐用プロファイル以外の Edge が使用しています。")
+        if version is not None and self.state.headless == self.headless:
+            self.reused_browser = True
+            LOGGER.info("既存の Edge に接続します (%s)。", version.get("Browser", "-"))
+        else:
+            if version is not None:
+                LOGGER.info("ヘッドレス設定が異なるため常駐 Edge を再起動します。")
+            _kill(self.state.browser_pid, BROWSER_IMAGE, self.state.browser_created)
+            self._launch_browser()
+            self.state.save(self.state_path)
+        return f"127.0.0.1:{self.browser_port}"
+
+    def ensure_driver(self) -> Optional[str]:
+        """Return the URL of a resident msedgedriver, or None to use a local service."""
+
+        if self.driver_path is None:
+            return None
+        if probe_driver(self.driver_port):
+            self.reused_driver = True
+            return f"http://127.0.0.1:{self.driver_port}"
+        _kill(self.state.driver_pid, DRIVER_IMAGE, self.state.driver_created)
+        try:
+            self._launch_driver()
+        except Exception as exc:
+            LOGGER.warning("常駐 msedgedriver を使用できないため通常起動します: %s", exc)
+            return None
+        self.state.save(self.state_path)
+        return f"http://127.0.0.1:{self.driver_port}"
+
+    def create_driver(self, options: Any) -> Any:
+        """Attach a WebDriver session to the warm browser; one restart on failure."""
+
+        from selenium import webdriver
+        from selenium.common.exceptions import WebDriverException
+        from selenium.webdriver.edge.service import Service as EdgeService
+
+        last_error: Optional[Exception] = None
+        for attempt in range(2):
+            try:
+                options.add_experimental_option("debuggerAddress", self.ensure_browser())
+                driver_url = self.ensure_driver()
+                if driver_url:
+                    driver = webdriver.Remote(command_executor=driver_url, options=options)
+                elif self.driver_path is not None:
+                    driver = webdriver.Edge(options=options, service=EdgeService(executable_path=str(self.driver_path)))
+                else:
+                    driver = webdriver.Edge(options=options)
+                driver.execute_script("return 1;")
+                return driver
+            except (WebDriverException, RuntimeError, OSError) as exc:
+                last_error = exc
+                LOGGER.warning("常駐 Edge への接続に失敗しました (%d 回目): %s", attempt + 1, exc)
+                self.shutdown()
+        raise RuntimeError("常駐 Edge セッションを利用できません。") from last_error
+
+    def shutdown(self) -> None:
+        """Stop the resident browser and driver and forget the state."""
+
+        _kill(self.state.browser_pid, BROWSER_IMAGE, self.state.browser_created)
+        _kill(self.state.driver_pid, DRIVER_IMAGE, self.state.driver_created)
+        self.state = EdgeSessionState()
+        self.reused_browser = self.reused_driver = False
+        try:
+            self.state_path.unlink()
+        except OSError:
+            pass
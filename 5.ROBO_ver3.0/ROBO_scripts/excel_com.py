@@ -1,23 +1,128 @@
-"""Thin helpers for interacting with Excel exclusively through COM."""
+"""Thin helpers for interacting with Excel exclusively through COM.
+
+``start_spare_instance`` launches one Excel ahead of time (startup warm-up)
+and parks it marshalled for another thread; the next ``open_workbook`` on
+any thread takes it instead of starting its own.  ``spare_instance_pid``
+lets the Office kill after 確定 leave that Excel alone.
+"""
 
 from __future__ import annotations
 
+import logging
+import threading
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator, List, Sequence, Tuple
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import pythoncom  # type: ignore
+    import win32com.client  # type: ignore
+    import win32process  # type: ignore
+except Exception as exc:  # pragma: no cover - pywin32 is only available on Windows
+    pythoncom = None  # type: ignore[assignment]
+    win32com = None  # type: ignore[assignment]
+    win32process = None  # type: ignore[assignment]
+    PYWIN32_IMPORT_ERROR: Exception | None = exc
+else:
+    PYWIN32_IMPORT_ERROR = None
+
+LOGGER = logging.getLogger("chouji_robo.excel")
+
+_SPARE_LOCK = threading.Lock()
+_SPARE_STREAM = None
+_SPARE_PID: Optional[int] = None
+
+
+def _new_instance(visible: bool = False):
+    excel = win32com.client.DispatchEx("Excel.Application")
+    excel.Visible = visible
+    excel.DisplayAlerts = False
+    return excel
+
+
+def start_spare_instance() -> bool:
+    """Start an Excel for the next ``open_workbook``; False if one is already parked.
+
+    The calling thread's apartment stays initialised so the parked
+    reference remains valid until it is taken.
+    """
+
+    global _SPARE_STREAM, _SPARE_PID
+    if pythoncom is None:
+        raise RuntimeError(f"pywin32 が見つからないため Excel を起動できません: {PYWIN32_IMPORT_ERROR}")
+    with _SPARE_LOCK:
+        if _SPARE_STREAM is not None:
+            return False
+    pythoncom.CoInitialize()
+    excel = _new_instance()
+    try:
+        pid: Optional[int] = win32process.GetWindowThreadProcessId(excel.Hwnd)[1]
+    except Exception as exc:
+        LOGGER.debug("待機用 Excel のプロセス ID を取得できませんでした: %s", exc)
+        pid = None
+    stream = pythoncom.CoMarshalInterThreadInterfaceInStream(pythoncom.IID_IDispatch, excel._oleobj_)
+    with _SPARE_LOCK:
+        if _SPARE_STREAM is None:
+            _SPARE_STREAM = stream
+            _SPARE_PID = pid
+            return True
+    pythoncom.CoGetInterfaceAndReleaseStream(stream, pythoncom.IID_IDispatch)
+    excel.Quit()
+    return False
+
+
+def spare_instance_pid() -> Optional[int]:
+    """Process id of the parked Excel, if one is parked and its pid is known."""
+
+    with _SPARE_LOCK:
+        return _SPARE_PID if _SPARE_STREAM is not None else None
+
+
+def _take_spare_instance(visible: bool):
+    global _SPARE_STREAM, _SPARE_PID
+    with _SPARE_LOCK:
+        stream, _SPARE_STREAM = _SPARE_STREAM, None
+        _SPARE_PID = None
+    if stream is None:
+        return None
+    try:
+        excel = win32com.client.Dispatch(
+            pythoncom.CoGetInterfaceAndReleaseStream(stream, pythoncom.IID_IDispatch)
+        )
+        excel.Visible = visible
+    except Exception as exc:
+        LOGGER.debug("待機中の Excel を使用できないため新しく起動します: %s", exc)
+        return None
+    LOGGER.debug("待機中の Excel を使用します。")
+    return excel
+
 
-import pythoncom  # type: ignore
-import win32com.client  # type: ignore
+def discard_spare_instance() -> None:
+    """Quit the parked Excel, if nobody took it."""
+
+    if pythoncom is None:
+        return
+    pythoncom.CoInitialize()
+    try:
+        excel = _take_spare_instance(False)
+        if excel is not None:
+            try:
+                excel.Quit()
+            except Exception:
+                pass
+            excel = None
+    finally:
+        pythoncom.CoUninitialize()
 
 
 @contextmanager
 def open_workbook(path: Path | str, *, read_only: bool = False, visible: bool = False):
     """Open an Excel workbook via COM and always tear it down safely."""
 
+    if pythoncom is None:
+        raise RuntimeError(f"pywin32 が見つからないため Excel を起動できません: {PYWIN32_IMPORT_ERROR}")
     pythoncom.CoInitialize()
-    excel = win32com.client.DispatchEx("Excel.Application")
-    excel.Visible = visible
-    excel.DisplayAlerts = False
+    excel = _take_spare_instance(visible) or _new_instance(visible)
     workbook = excel.Workbooks.Open(
         str(Path(path)),
         UpdateLinks=False,
@@ -88,6 +193,16 @@ def read_row(sheet, row_idx: int, start_col: int, end_col: int) -> List:
     return [values]
 
 
+def read_block(sheet, start_row: int, start_col: int, end_row: int, end_col: int) -> List[List]:
+    """Read a rectangle with a single Range.Value call and return it row by row."""
+
+    rng = sheet.Range(sheet.Cells(start_row, start_col), sheet.Cells(end_row, end_col))
+    values = rng.Value
+    if not isinstance(values, tuple):
+        return [[values]]
+    return [list(row) if isinstance(row, tuple) else [row] for row in values]
+
+
 def write_row(sheet, row_idx: int, values: Sequence, start_col: int = 1) -> None:
     """Write a contiguous block of values into a row."""
 
@@ -0,0 +1,327 @@
+"""Throttling-aware Microsoft Graph client used by the find_my_boss step."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
+
+from throttling import (
+    AdaptiveConcurrencyLimiter,
+    RequestCoalescer,
+    backoff_delay,
+    get_bucket,
+    parse_retry_after,
+)
+
+LOGGER = logging.getLogger("chouji_robo.find_my_boss.graph")
+
+GRAPH_RESOURCE = "https://graph.microsoft.com"
+GRAPH_API_VERSION = "v1.0"
+GRAPH_SCOPE_DELEGATED = ["User.Read.All", "Directory.Read.All"]
+REQUEST_TIMEOUT_SECONDS = 3
+RETRYABLE_STATUS = frozenset({429, 503, 504})
+
+# Graph allows far more than this per tenant, but dozens of robot PCs start
+# at the same time in the morning, so each process keeps a modest share.
+DEFAULT_RATE_PER_SECOND = 8.0
+DEFAULT_BURST = 16.0
+DEFAULT_MAX_RETRIES = 5
+MAX_BATCH_SIZE = 20
+
+USER_SELECT_PROPERTIES = (
+    "id",
+    "displayName",
+    "mail",
+    "userPrincipalName",
+    "jobTitle",
+    "department",
+    "companyName",
+    "givenName",
+    "surname",
+)
+
+TokenProvider = Callable[[], str]
+
+
+class GraphRequestError(RuntimeError):
+    """Raised when Graph returns a non-retryable error or retries run out."""
+
+    def __init__(self, message: str, status: int = 0, body: Any = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+
+@dataclass
+class GraphClientStats:
+    """Counters exposed for benchmarking the scheduler."""
+
+    requests: int = 0
+    throttled: int = 0
+    retries: int = 0
+    failures: int = 0
+    wait_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "failures": self.failures,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+def env_token_provider(variable: str = "CHOUJI_GRAPH_TOKEN") -> TokenProvider:
+    """Return a provider reading a pre-acquired access token from the environment."""
+
+    def _provider() -> str:
+        token = os.getenv(variable, "").strip()
+        if not token:
+            raise GraphRequestError(f"環境変数 {variable} にアクセストークンが設定されていません。")
+        return token
+
+    return _provider
+
+
+def msal_token_provider(
+    client_id: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+    scopes: Iterable[str] = GRAPH_SCOPE_DELEGATED,
+) -> TokenProvider:
+    """Return a provider using MSAL device-code auth (see test/test_find_my_boss.py)."""
+
+    try:
+        from msal import PublicClientApplication  # type: ignore
+    except Exception as exc:  # pragma: no cover - msal is optional
+        raise ImportError("msal がインストールされていません。pip install msal を実行してください。") from exc
+
+    client_id = client_id or os.getenv("MSAL_CLIENT_ID", "")
+    tenant_id = tenant_id or os.getenv("MSAL_TENANT_ID", "")
+    if not client_id or not tenant_id:
+        raise GraphRequestError("MSAL_CLIENT_ID / MSAL_TENANT_ID が未設定です。")
+    app = PublicClientApplication(client_id=client_id, authority=f"https://login.microsoftonline.com/{tenant_id}")
+    scope_list = list(scopes)
+    lock = threading.Lock()
+
+    def _provider() -> str:
+        with lock:
+            accounts = app.get_accounts()
+            if accounts:
+                result = app.acquire_token_silent(scope_list, account=accounts[0])
+                if result and "access_token" in result:
+                    return result["access_token"]
+            flow = app.initiate_device_flow(scopes=scope_list)
+            if "user_code" not in flow:
+                raise GraphRequestError("デバイスコードの初期化に失敗しました。")
+            LOGGER.info(flow["message"])
+            result = app.acquire_token_by_device_flow(flow)
+            if "access_token" not in result:
+                raise GraphRequestError(f"トークン取得に失敗: {result}")
+            return result["access_token"]
+
+    return _provider
+
+
+class GraphClient:
+    """Graph REST client with a per-tenant token bucket, AIMD concurrency and coalescing."""
+
+    def __init__(
+        self,
+        token_provider: TokenProvider,
+        *,
+        tenant_id: str = "default",
+        base_url: str = GRAPH_RESOURCE,
+        api_version: str = GRAPH_API_VERSION,
+        timeout: float = REQUEST_TIMEOUT_SECONDS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        rate_per_second: float = DEFAULT_RATE_PER_SECOND,
+        burst: float = DEFAULT_BURST,
+        max_concurrency: int = 8,
+        stop_event: Optional[threading.Event] = None,
+    ) -> None:
+        self.token_provider = token_provider
+        self.tenant_id = tenant_id
+        self.base_url = base_url.rstrip("/")
+        self.api_version = api_version
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.bucket = get_bucket(f"graph:{tenant_id}", rate_per_second, burst)
+        self.limiter = AdaptiveConcurrencyLimiter(initial=max(1, max_concurrency // 2), maximum=max_concurrency)
+        self.coalescer = RequestCoalescer()
+        self.stop_event = stop_event
+        self.stats = GraphClientStats()
+
+    def _url(self, path: str, params: Optional[Dict[str, str]] = None) -> str:
+        if path.startswith("http://") or path.startswith("https://"):
+            url = path
+        else:
+            url = f"{self.base_url}/{self.api_version}/{path.lstrip('/')}"
+        if params:
+            url = f"{url}?{urlencode(params, safe='$,')}"
+        return url
+
+    def _send_once(self, method: str, url: str, body: Optional[bytes]) -> tuple[int, Dict[str, str], Any]:
+        headers = {
+            "Authorization": f"Bearer {self.token_provider()}",
+            "Accept": "application/json",
+        }
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        request = Request(url, data=body, headers=headers, method=method)
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                raw = response.read()
+                status = response.status
+                response_headers = dict(response.headers.items())
+        except HTTPError as exc:
+            raw = exc.read() or b""
+            status = exc.code
+            response_headers = dict(exc.headers.items()) if exc.headers else {}
+        payload: Any = None
+        if raw:
+            try:
+                payload = json.loads(raw.decode("utf-8"))
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                payload = raw.decode("utf-8", errors="replace")
+        return status, response_headers, payload
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, str]] = None,
+        json_body: Any = None,
+    ) -> Any:
+        """Send a request, waiting for rate-limit tokens and retrying throttled calls."""
+
+        url = self._url(path, params)
+        body = None if json_body is None else json.dumps(json_body).encode("utf-8")
+        attempt = 0
+        while True:
+            wait_started = time.monotonic()
+            if not self.bucket.acquire(stop_event=self.stop_event):
+                raise GraphRequestError("停止要求を受けたため Graph 呼び出しを中断しました。")
+            with self.limiter.slot():
+                self.stats.add("wait_seconds", time.monotonic() - wait_started)
+                self.stats.add("requests")
+                try:
+                    status, headers, payload = self._send_once(method, url, body)
+                except (URLError, TimeoutError, OSError) as exc:
+                    status, headers, payload = 0, {}, str(exc)
+
+            if 200 <= status < 300:
+                self.limiter.on_success()
+                return payload
+
+            retryable = status in RETRYABLE_STATUS or status == 0
+            if not retryable or attempt >= self.max_retries:
+                if status != 404:
+                    self.stats.add("failures")
+                raise GraphRequestError(
+                    f"Graph 呼び出し失敗: {method} {url} status={status}", status=status, body=payload
+                )
+
+            delay = parse_retry_after(_header(headers, "Retry-After"))
+            if status in (429, 503):
+                self.stats.add("throttled")
+                self.limiter.on_throttle()
+                if delay is not None:
+                    # Retry-After applies to the whole tenant, not only this caller.
+                    self.bucket.pause(delay)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            attempt += 1
+            self.stats.add("retries")
+            LOGGER.debug("Graph status=%s のため %.2f 秒後に再試行します (%d/%d): %s", status, delay, attempt, self.max_retries, url)
+            if self.stop_event is not None:
+                if self.stop_event.wait(delay):
+                    raise GraphRequestError("停止要求を受けたため Graph 呼び出しを中断しました。")
+            else:
+                time.sleep(delay)
+
+    def get(self, path: str, params: Optional[Dict[str, str]] = None) -> Any:
+        """GET with request coalescing: concurrent identical calls share one response."""
+
+        key = self._url(path, params)
+        return self.coalescer.run(key, lambda: self.request("GET", path, params=params))
+
+    def batch(self, requests: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Send up to 20 sub-requests through ``$batch`` and return responses by id.
+
+        Sub-requests answered with 429/503 are re-sent after the longest
+        Retry-After of the round; the others are returned as they are.
+        """
+
+        if len(requests) > MAX_BATCH_SIZE:
+            raise ValueError(f"$batch は最大 {MAX_BATCH_SIZE} 件までです。")
+        pending: Dict[str, Dict[str, Any]] = {str(item["id"]): dict(item) for item in requests}
+        results: Dict[str, Dict[str, Any]] = {}
+        attempt = 0
+        while pending:
+            payload = self.request("POST", "$batch", json_body={"requests": list(pending.values())}) or {}
+            retry_delay: Optional[float] = None
+            for response in payload.get("responses") or []:
+                request_id = str(response.get("id"))
+                if request_id not in pending:
+                    continue
+                status = int(response.get("status") or 0)
+                if status in RETRYABLE_STATUS and attempt < self.max_retries:
+                    delay = parse_retry_after(_header(response.get("headers") or {}, "Retry-After"))
+                    retry_delay = max(retry_delay or 0.0, delay if delay is not None else backoff_delay(attempt))
+                    continue
+                results[request_id] = response
+                del pending[request_id]
+            if not pending:
+                break
+            if retry_delay is None or attempt >= self.max_retries:
+                for request_id in pending:
+                    results[request_id] = {"id": request_id, "status": 0, "body": None}
+                self.stats.add("failures", len(pending))
+                break
+            self.stats.add("throttled")
+            self.stats.add("retries", len(pending))
+            self.limiter.on_throttle()
+            self.bucket.pause(retry_delay)
+            attempt += 1
+            LOGGER.debug("$batch の %d 件がスロットリングされたため %.2f 秒後に再送します。", len(pending), retry_delay)
+        return results
+
+    def stats_snapshot(self) -> Dict[str, float]:
+        data = self.stats.as_dict()
+        data["coalesced"] = self.coalescer.coalesced
+        data["concurrency_limit"] = self.limiter.limit
+        return data
+
+    def get_user(self, upn: str, select: Iterable[str] = USER_SELECT_PROPERTIES) -> Dict[str, Any]:
+        return self.get(f"users/{quote(upn.strip().lower(), safe='@')}", {"$select": ",".join(select)})
+
+    def get_manager(self, upn: str, select: Iterable[str] = USER_SELECT_PROPERTIES) -> Optional[Dict[str, Any]]:
+        try:
+            return self.get(f"users/{quote(upn.strip().lower(), safe='@')}/manager", {"$select": ",".join(select)})
+        except GraphRequestError as exc:
+            if exc.status == 404:
+                return None
+            raise
+
+
+def _header(headers: Dict[str, str], name: str) -> Optional[str]:
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import argparse
 import ctypes
 import logging
 import os
@@ -25,9 +26,14 @@ except Exception:  # pragma: no cover - tkinter should be available on Windows
     tk = None  # type: ignore
     messagebox = None  # type: ignore
 
-from common import FORCE_STOP_POLL_MS, HEARTBEAT_INTERVAL_MS, PathRegistry, StepAState
+import outlook_session
+from case_queue import CaseQueue, parse_tehai_numbers, pending_tehai_numbers
+from checkpoint import Checkpoint
+from common import BACKGROUND_JOIN_SECONDS, FORCE_STOP_POLL_MS, HEARTBEAT_INTERVAL_MS, PathRegistry, StepAState
 from module_loader import load_helper
-from excel_com import get_used_range_bounds, open_workbook, read_row, write_row
+from step_scheduler import StepScheduler
+from warmup import Warmup
+from excel_com import get_used_range_bounds, open_workbook, read_row, spare_instance_pid, write_row
 
 
 class ChoujiRobo:
@@ -39,6 +45,8 @@ class ChoujiRobo:
 
         self.paths = PathRegistry()
         self.state = StepAState()
+        # Shared by Ae/Eb/Ec; one Outlook namespace per COM apartment.
+        self.outlook = outlook_session.create_session()
         self.stop_event = threading.Event()
         self.root = tk.Tk()
         self.root.withdraw()
@@ -61,6 +69,7 @@ class ChoujiRobo:
         self._configure_logging()
         self.current_phase = "initialising"
         self._heartbeat_job: Optional[str] = None
+        self._force_stop_job: Optional[str] = None
         self._wake_lock_active = False
         self._acquire_wake_lock()
 
@@ -71,7 +80,35 @@ class ChoujiRobo:
             "step_b": load_helper("B.find_my_boss"),
             "step_e": load_helper("E.create_email"),
         }
+        # Excel/Outlook/Graph/Edge start while the operator types the 管理番号.
+        self.warmup = Warmup(self)
         self.log_manager = None
+        # Writes that outlive their step; joined by _shutdown before os._exit.
+        self._background: List[threading.Thread] = []
+        self._background_lock = threading.Lock()
+
+    def keep_until_exit(self, worker: threading.Thread) -> threading.Thread:
+        """Have ``_shutdown`` wait for ``worker`` before the process exits."""
+
+        # In place: a queued case calls this from its own thread (see CaseContext).
+        with self._background_lock:
+            self._background[:] = [thread for thread in self._background if thread.is_alive()]
+            self._background.append(worker)
+        return worker
+
+    def _join_background(self) -> None:
+        with self._background_lock:
+            pending = [thread for thread in self._background if thread.is_alive()]
+        if not pending:
+            return
+        self.logger.info("バックグラウンド処理の完了を待っています: %s", ", ".join(thread.name for thread in pending))
+        deadline = time.monotonic() + BACKGROUND_JOIN_SECONDS
+        for thread in pending:
+            thread.join(max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                self.logger.error(
+                    "バックグラウンド処理 %s が %.0f 秒以内に終わらないまま終了します。", thread.name, BACKGROUND_JOIN_SECONDS
+                )
 
     def _configure_logging(self) -> None:
         handler = logging.StreamHandler(sys.stdout)
@@ -83,15 +120,19 @@ class ChoujiRobo:
         for logger in self._managed_loggers:
             logger.addHandler(handler)
 
-    def bootstrap_ui(self) -> None:
+    def bootstrap_ui(self, resume: Optional[str] = None) -> None:
         self.logger.info("弔事ロボット UI 初期化中…")
         log_module = self.helpers["log"]
         self.log_manager = log_module.create_log_window(self.root, self.stop_event)
         for logger in self._managed_loggers:
             logger.addHandler(self.log_manager.handler)
-        self.helpers["initial_form"].build(self)
+        if resume is None:
+            self.helpers["initial_form"].build(self)
+        self.warmup.start()
         self._schedule_heartbeat()
         self._monitor_force_stop()
+        if resume is not None:
+            self._start_resume(resume)
 
     def _schedule_heartbeat(self) -> None:
         if self.stop_event.is_set():
@@ -107,20 +148,36 @@ class ChoujiRobo:
         if self.stop_event.is_set():
             return
         if self.current_phase == "Ef.last_dialog":
+            self._force_stop_job = None
             return
         if self.log_manager and self.log_manager.force_stop_event.is_set():
             self.logger.error("強制停止イベントを受信。プロセスを終了します。")
             self.stop_event.set()
             self._shutdown()
             return
-        self.root.after(FORCE_STOP_POLL_MS, self._monitor_force_stop)
+        self._force_stop_job = self.root.after(FORCE_STOP_POLL_MS, self._monitor_force_stop)
+
+    def _resume_monitoring(self) -> None:
+        """Restart the heartbeat and force-stop polling that Ef's dialog paused (queue mode)."""
+
+        if self.stop_event.is_set():
+            return
+        if self._heartbeat_job is None:
+            self._schedule_heartbeat()
+        if self._force_stop_job is None:
+            self._monitor_force_stop()
 
     def _terminate_office_processes(self) -> None:
+        # The robot's own Excel started by the warm-up is kept (excel_com).
+        spare = spare_instance_pid()
         for process in ("EXCEL.EXE", "OUTLOOK.EXE"):
+            command = ["taskkill", "/F", "/T", "/FI", f"IMAGENAME eq {process}"]
+            if process == "EXCEL.EXE" and spare:
+                command += ["/FI", f"PID ne {spare}"]
             try:
                 creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
                 completed = subprocess.run(
-                    ["taskkill", "/F", "/T", "/IM", process],
+                    command,
                     capture_output=True,
                     check=False,
                     creationflags=creationflags,
@@ -171,11 +228,20 @@ class ChoujiRobo:
             if messagebox is not None:
                 messagebox.showerror("入力エラー", "管理番号を入力してください。")
             return
-        if not raw_value.isdigit():
+        try:
+            numbers = parse_tehai_numbers(raw_value)
+        except ValueError:
+            numbers = []
+        if not numbers or (len(numbers) == 1 and not raw_value.isdigit()):
             self.ui_logger.error("半角数字以外が入力されました: %s", raw_value)
             if messagebox is not None:
                 messagebox.showerror("入力エラー", "管理番号は半角数字のみで入力してください。")
             return
+        if not self._confirm_known_numbers(numbers):
+            return
+        if len(numbers) > 1:
+            self._start_queue(form, numbers)
+            return
 
         self.state.tehai_number = raw_value
         self.ui_logger.info("管理番号 [%s] を受付しました。次工程に進みます。", raw_value)
@@ -186,32 +252,89 @@ class ChoujiRobo:
         form.destroy()
         self._start_background_work()
 
+    def _confirm_known_numbers(self, numbers: List[str]) -> bool:
+        unknown = self.warmup.unknown_numbers(numbers)
+        if not unknown:
+            return True
+        self.ui_logger.warning("管理表に見つからない管理番号があります: %s", ", ".join(unknown))
+        if messagebox is None:
+            return True
+        return messagebox.askyesno(
+            "管理番号の確認",
+            f"管理表に次の管理番号が見つかりません。\n{', '.join(unknown)}\n\nこのまま続けますか？",
+        )
+
+    def _handle_pending_submit(self, form) -> None:
+        try:
+            numbers = pending_tehai_numbers(self)
+        except Exception as exc:
+            self.ui_logger.exception("管理表から未処理の管理番号を取得できませんでした: %s", exc)
+            if messagebox is not None:
+                messagebox.showerror("取得エラー", f"管理表から未処理の管理番号を取得できませんでした。\n{exc}")
+            return
+        if not numbers:
+            self.ui_logger.info("未処理の管理番号はありませんでした。")
+            if messagebox is not None:
+                messagebox.showinfo("未処理なし", "未処理の管理番号はありません。")
+            return
+        if messagebox is not None and not messagebox.askyesno(
+            "一括処理の確認", f"次の {len(numbers)} 件を続けて処理しますか？\n{', '.join(numbers)}"
+        ):
+            return
+        self._start_queue(form, numbers)
+
+    def _start_queue(self, form, numbers: List[str]) -> None:
+        self.ui_logger.info("管理番号 %s を受付しました。順番に処理します。", ", ".join(numbers))
+        form.destroy()
+        worker = threading.Thread(target=self._queue_entrypoint, args=(numbers,), daemon=True)
+        worker.start()
+
     def _start_background_work(self) -> None:
         worker = threading.Thread(target=self._workflow_entrypoint, daemon=True)
         worker.start()
 
-    def _workflow_entrypoint(self) -> None:
+    def _start_resume(self, tehai_number: str) -> None:
+        checkpoint = Checkpoint.load(self, tehai_number)
+        if checkpoint is None:
+            self.ui_logger.warning("管理番号 [%s] のチェックポイントが無いため最初から実行します。", tehai_number)
+            self.state = StepAState(tehai_number=tehai_number, workflow_started_at=datetime.now())
+        else:
+            self.ui_logger.info("管理番号 [%s] を前回の続きから再開します。", tehai_number)
+        self.state.workflow_finished_at = None
+        self.state.workflow_error = ""
+        self.state.workflow_feedback = ""
+        worker = threading.Thread(target=self._workflow_entrypoint, args=(checkpoint,), daemon=True)
+        worker.start()
+
+    def _workflow_entrypoint(self, checkpoint: Optional[Checkpoint] = None) -> None:
+        submitted = time.perf_counter()
+        if checkpoint is None:
+            checkpoint = Checkpoint.for_robot(self)
         try:
             self._terminate_office_processes()
+            self.warmup.handoff()
             self.current_phase = "A.create_RPAsheet"
-            self.helpers["step_a"].run(self)
-            self.logger.info("A. create_RPAsheet finished.")
-
-            if self.stop_event.is_set():
-                self.logger.info("Stop requested; skipping step B.")
-                return
-
-            self.current_phase = "B.find_my_boss"
-            self.helpers["step_b"].run(self)
-            self.logger.info("B. find_my_boss finished.")
-
-            if self.stop_event.is_set():
-                self.logger.info("Stop requested after step B; skipping step E.")
+            # A's sub-steps and B run as one task graph so independent work overlaps.
+            tasks = self.helpers["step_a"].tasks() + self.helpers["step_b"].tasks()
+            restored = checkpoint.restorable(self, tasks) if checkpoint.resumed else set()
+            checkpoint.forget({task.name for task in tasks} - restored)
+            report = StepScheduler(tasks).run(
+                self,
+                restored=restored,
+                on_done=lambda task: checkpoint.task_done(self, task),
+            )
+            lookup = report.runs.get("Ac.KANRI_spreadsheet")
+            if lookup is not None and lookup.finished is not None:
+                self.logger.info("管理番号の確定から管理表の行取得まで %.1f 秒でした。", lookup.finished - submitted)
+            if report.cancelled or self.stop_event.is_set():
+                self.logger.info("Stop requested; skipping step E.")
                 return
+            self.logger.info("A. create_RPAsheet / B. find_my_boss finished.")
 
             self.current_phase = "E.create_email"
-            e_success = self.helpers["step_e"].run(self)
+            e_success = self.helpers["step_e"].run(self, checkpoint=checkpoint)
             if e_success:
+                checkpoint.delete()
                 self.logger.info("E. create_email finished.")
             else:
                 self.logger.warning("E. create_email finished with warnings or errors.")
@@ -223,6 +346,20 @@ class ChoujiRobo:
             )
             self._async_show_error("A workflow error occurred. Please check the log window.")
         finally:
+            self.outlook.close()
+            self.stop_event.set()
+            self.root.after(0, self._shutdown)
+
+    def _queue_entrypoint(self, numbers: List[str]) -> None:
+        try:
+            self._terminate_office_processes()
+            self.warmup.handoff()
+            CaseQueue(self, numbers).run()
+        except Exception as exc:  # pragma: no cover - defensive
+            self.logger.exception("Queue error occurred (phase=%s); stopping robot: %s", self.current_phase, exc)
+            self._async_show_error("A workflow error occurred. Please check the log window.")
+        finally:
+            self.outlook.close()
             self.stop_event.set()
             self.root.after(0, self._shutdown)
 
@@ -377,6 +514,8 @@ class ChoujiRobo:
                 pass
         if not self.stop_event.is_set():
             self.stop_event.set()
+        self.warmup.close()
+        self._join_background()
         self._release_wake_lock()
         self.logger.info("ロボを終了します。")
         try:
@@ -386,14 +525,23 @@ class ChoujiRobo:
             pass
         os._exit(0)
 
-    def start(self) -> None:
-        self.bootstrap_ui()
+    def start(self, resume: Optional[str] = None) -> None:
+        self.bootstrap_ui(resume)
         self.root.mainloop()
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="chouji_ROBO")
+    parser.add_argument(
+        "--resume",
+        metavar="管理番号",
+        help="前回エラーで止まった管理番号を、チェックポイントの続きから実行します",
+    )
+    args = parser.parse_args(argv)
+    if args.resume is not None and not args.resume.isdigit():
+        parser.error("管理番号は半角数字のみで指定してください。")
     robot = ChoujiRobo()
-    robot.start()
+    robot.start(resume=args.resume)
 
 
 if __name__ == "__main__":
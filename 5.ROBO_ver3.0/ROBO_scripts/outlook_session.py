@@ -0,0 +1,344 @@
+"""Outlook MAPI session shared by the robot steps (Ae, Eb, Ec).
+
+Every COM apartment (thread) gets one ``Outlook.Application`` and one MAPI
+namespace.  The session holds a CoInitialize on that thread for as long as
+it lives, so the per-step CoInitialize/CoUninitialize pairs no longer tear
+the apartment down between steps.  Default folders and stores are cached.
+A namespace that stops answering, e.g. after Outlook was restarted, is
+dropped and reconnected once.
+
+``FakeOutlookSession`` keeps drafts in memory so step E can be driven
+without Outlook (Linux, CI, benchmarks).
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+try:
+    import pythoncom  # type: ignore
+    import win32com.client  # type: ignore
+except Exception as exc:  # pragma: no cover - pywin32 is only available on Windows
+    pythoncom = None  # type: ignore[assignment]
+    win32com = None  # type: ignore[assignment]
+    OUTLOOK_IMPORT_ERROR: Optional[Exception] = exc
+else:
+    OUTLOOK_IMPORT_ERROR = None
+
+LOGGER = logging.getLogger("chouji_robo.outlook")
+
+OL_FOLDER_SENT = 5
+OL_FOLDER_INBOX = 6
+OL_FOLDER_DRAFTS = 16
+OL_MAIL_ITEM = 0
+
+HEALTH_CHECK_INTERVAL_SECONDS = 30.0
+
+# HRESULTs raised when the Outlook process behind a proxy is gone.
+DISCONNECTED_HRESULTS = {
+    -2147417848,  # RPC_E_DISCONNECTED
+    -2147023174,  # RPC_S_SERVER_UNAVAILABLE
+    -2147023170,  # RPC_S_CALL_FAILED
+    -2147220995,  # CO_E_OBJNOTCONNECTED
+    -2147221021,  # MK_E_UNAVAILABLE
+}
+
+T = TypeVar("T")
+
+
+def _is_disconnect(exc: BaseException) -> bool:
+    hresult = getattr(exc, "hresult", None)
+    if hresult is None and getattr(exc, "args", None):
+        hresult = exc.args[0]
+    return hresult in DISCONNECTED_HRESULTS
+
+
+@dataclass
+class _Apartment:
+    application: Any
+    namespace: Any
+    com_initialized: bool
+    checked_at: float = 0.0
+    folders: Dict[int, Any] = field(default_factory=dict)
+    stores: Optional[List[Any]] = None
+
+
+class OutlookSession:
+    """Outlook.Application + MAPI namespace per thread, with cached folders."""
+
+    def __init__(self, dispatch: Optional[Callable[[], Any]] = None) -> None:
+        self._dispatch = dispatch or self._dispatch_outlook
+        self._apartments: Dict[int, _Apartment] = {}
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.reconnects = 0
+
+    # -- connection -----------------------------------------------------
+    @staticmethod
+    def _dispatch_outlook() -> Any:
+        if win32com is None:
+            raise RuntimeError(f"pywin32 が見つからないため Outlook にアクセスできません: {OUTLOOK_IMPORT_ERROR}")
+        return win32com.client.Dispatch("Outlook.Application")
+
+    def _connect(self) -> _Apartment:
+        com_initialized = False
+        if pythoncom is not None:
+            try:
+                pythoncom.CoInitialize()
+                com_initialized = True
+            except Exception:
+                pass
+        application = self._dispatch()
+        apartment = _Apartment(application, application.GetNamespace("MAPI"), com_initialized, time.monotonic())
+        self.connects += 1
+        LOGGER.debug("Outlook に接続しました (thread=%s)。", threading.current_thread().name)
+        return apartment
+
+    def _apartment(self) -> _Apartment:
+        key = threading.get_ident()
+        with self._lock:
+            apartment = self._apartments.get(key)
+        if apartment is None:
+            apartment = self._connect()
+        elif time.monotonic() - apartment.checked_at > HEALTH_CHECK_INTERVAL_SECONDS and not self._healthy(apartment):
+            LOGGER.info("Outlook との接続が切れているため再接続します。")
+            apartment = self._reconnect(apartment)
+        with self._lock:
+            self._apartments[key] = apartment
+        return apartment
+
+    @staticmethod
+    def _healthy(apartment: _Apartment) -> bool:
+        try:
+            apartment.namespace.Folders.Count
+        except Exception:
+            return False
+        apartment.checked_at = time.monotonic()
+        return True
+
+    def _reconnect(self, stale: _Apartment) -> _Apartment:
+        fresh = self._connect()
+        # Keep the original CoInitialize; the new one is released right away.
+        if fresh.com_initialized and pythoncom is not None:
+            try:
+                pythoncom.CoUninitialize()
+            except Exception:
+                pass
+        fresh.com_initialized = stale.com_initialized
+        self.reconnects += 1
+        return fresh
+
+    def healthy(self) -> bool:
+        with self._lock:
+            apartment = self._apartments.get(threading.get_ident())
+        return apartment is not None and self._healthy(apartment)
+
+    def call(self, action: Callable[[Any], T]) -> T:
+        """Run ``action(namespace)``; reconnect and retry once if Outlook went away."""
+
+        apartment = self._apartment()
+        try:
+            return action(apartment.namespace)
+        except Exception as exc:
+            if not _is_disconnect(exc):
+                raise
+            LOGGER.info("Outlook が再起動されたため再接続して再試行します: %s", exc)
+            apartment = self._reconnect(apartment)
+            with self._lock:
+                self._apartments[threading.get_ident()] = apartment
+            return action(apartment.namespace)
+
+    # -- accessors ------------------------------------------------------
+    @property
+    def application(self) -> Any:
+        return self._apartment().application
+
+    def namespace(self) -> Any:
+        return self._apartment().namespace
+
+    def default_folder(self, kind: int) -> Any:
+        apartment = self._apartment()
+        folder = apartment.folders.get(kind)
+        if folder is None:
+            folder = self.call(lambda namespace: namespace.GetDefaultFolder(kind))
+            apartment = self._apartment()
+            apartment.folders[kind] = folder
+        return folder
+
+    def stores(self) -> List[Any]:
+        apartment = self._apartment()
+        if apartment.stores is None:
+            def _collect(namespace: Any) -> List[Any]:
+                stores = namespace.Stores
+                return [stores.Item(index) for index in range(1, stores.Count + 1)]
+
+            apartment.stores = self.call(_collect)
+        return apartment.stores
+
+    def get_item(self, entry_id: str, store_id: str = "") -> Any:
+        if store_id:
+            return self.call(lambda namespace: namespace.GetItemFromID(entry_id, store_id))
+        return self.call(lambda namespace: namespace.GetItemFromID(entry_id))
+
+    def create_mail(self) -> Any:
+        return self.call(lambda namespace: namespace.Application.CreateItem(OL_MAIL_ITEM))
+
+    def close(self) -> None:
+        """Release the calling thread's objects and its CoInitialize."""
+
+        with self._lock:
+            apartment = self._apartments.pop(threading.get_ident(), None)
+        if apartment is None:
+            return
+        apartment.folders.clear()
+        apartment.stores = None
+        apartment.namespace = apartment.application = None
+        if apartment.com_initialized and pythoncom is not None:
+            try:
+                pythoncom.CoUninitialize()
+            except Exception:
+                pass
+
+
+# -- fake -------------------------------------------------------------------
+class _FakeAttachment:
+    def __init__(self, owner: "_FakeAttachments", source: str) -> None:
+        self._owner = owner
+        self.PathName = source
+        self.FileName = Path(source).name
+        self.Size = Path(source).stat().st_size if Path(source).exists() else 0
+
+    def Delete(self) -> None:
+        self._owner.items.remove(self)
+
+
+class _FakeAttachments:
+    def __init__(self) -> None:
+        self.items: List[_FakeAttachment] = []
+
+    @property
+    def Count(self) -> int:
+        return len(self.items)
+
+    def Item(self, index: int) -> _FakeAttachment:
+        return self.items[index - 1]
+
+    def Add(self, Source: str) -> _FakeAttachment:
+        attachment = _FakeAttachment(self, str(Source))
+        self.items.append(attachment)
+        return attachment
+
+
+class FakeMailItem:
+    """The subset of Outlook.MailItem the robot uses."""
+
+    def __init__(self, session: "FakeOutlookSession", entry_id: str) -> None:
+        self._session = session
+        self.EntryID = entry_id
+        self.StoreID = FakeOutlookSession.STORE_ID
+        self.To = self.CC = self.BCC = self.Subject = self.Body = ""
+        self.Sent = False
+        self.Attachments = _FakeAttachments()
+        self.saved_at: Optional[datetime] = None
+        self.save_count = 0
+        self.displayed = 0
+
+    def Save(self) -> None:
+        self.save_count += 1
+        self.saved_at = datetime.now()
+        self._session.drafts[self.EntryID] = self
+
+    def Display(self, modal: bool = False) -> None:
+        self.displayed += 1
+
+    def GetInspector(self) -> Any:
+        raise RuntimeError("FakeMailItem has no inspector window.")
+
+
+class _FakeFolders:
+    """An empty Outlook Folders collection."""
+
+    Count = 0
+
+    def Item(self, index: int) -> Any:
+        raise IndexError(index)
+
+
+class FakeOutlookSession:
+    """In-memory stand-in for OutlookSession (no COM, no Outlook).
+
+    It is also its own MAPI namespace (``call`` and ``namespace``), with no
+    stores and no folders, so Ae finds no mail.
+    """
+
+    Folders = _FakeFolders()
+
+    STORE_ID = "FAKE-STORE"
+
+    def __init__(self) -> None:
+        self.drafts: Dict[str, FakeMailItem] = {}
+        self._ids = itertools.count(1)
+        self.connects = 1
+        self.reconnects = 0
+
+    def healthy(self) -> bool:
+        return True
+
+    def call(self, action: Callable[[Any], T]) -> T:
+        return action(self)
+
+    def namespace(self) -> "FakeOutlookSession":
+        return self
+
+    def create_mail(self) -> FakeMailItem:
+        return FakeMailItem(self, f"FAKE{next(self._ids):08d}")
+
+    def get_item(self, entry_id: str, store_id: str = "") -> FakeMailItem:
+        try:
+            return self.drafts[entry_id]
+        except KeyError:
+            raise LookupError(f"EntryID {entry_id} は存在しません。") from None
+
+    def default_folder(self, kind: int) -> Any:
+        items = list(self.drafts.values()) if kind == OL_FOLDER_DRAFTS else []
+        return type("FakeFolder", (), {"Items": items, "Name": f"Folder{kind}"})()
+
+    def stores(self) -> List[Any]:
+        return []
+
+    def close(self) -> None:
+        pass
+
+
+def create_session() -> Any:
+    """OutlookSession, or FakeOutlookSession when CHOUJI_OUTLOOK_BACKEND=fake."""
+
+    if os.getenv("CHOUJI_OUTLOOK_BACKEND", "").strip().lower() == "fake":
+        LOGGER.info("CHOUJI_OUTLOOK_BACKEND=fake のため Outlook を使わずに実行します。")
+        return FakeOutlookSession()
+    return OutlookSession()
+
+
+_DEFAULT_SESSION: Optional[Any] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def for_robot(robot: Any) -> Any:
+    """The robot's session; a process-wide one for helpers run without ChoujiRobo."""
+
+    session = getattr(robot, "outlook", None)
+    if session is not None:
+        return session
+    global _DEFAULT_SESSION
+    with _DEFAULT_LOCK:
+        if _DEFAULT_SESSION is None:
+            _DEFAULT_SESSION = create_session()
+        return _DEFAULT_SESSION
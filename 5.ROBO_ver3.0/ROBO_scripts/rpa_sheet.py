@@ -0,0 +1,222 @@
+"""In-memory copy of RPAシート columns H–N shared by the step B helpers (Bd, Be)."""
+
+from __future__ import annotations
+
+import logging
+import re
+import unicodedata
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import xlsx_package
+from common import PathRegistry, RpaOutputs
+from excel_com import get_used_range_bounds, open_workbook, read_block
+
+LOGGER = logging.getLogger("chouji_robo.rpa_sheet")
+
+DEFAULT_SHEET_NAME = "RPAシート"
+
+LABEL_COL = 8  # H列
+NAME_COL = 9
+EMAIL_COL = 10
+COMPANY_COL = 11
+DEPT_COL = 12
+TITLE_COL = 13  # M列
+MAIL_TARGET_COL = 14  # N列（タグ用）
+FIRST_DATA_ROW = 5
+MAX_CONSECUTIVE_BLANKS = 4
+
+# Cells of RPAシート the email draft is built from (RpaOutputs fields).
+OUTPUT_CELLS = {
+    "to": "D3",
+    "subject": "D12",
+    "cc": "D25",
+    "bcc": "D26",
+    "body": "D27",
+}
+
+Cell = Tuple[int, int]
+
+
+def normalise_cell(value: object) -> str:
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+def normalize_sheet_title(value: str) -> str:
+    if not value:
+        return ""
+    normalized = unicodedata.normalize("NFKC", value)
+    return re.sub(r"\s+", "", normalized).lower()
+
+
+def resolve_sheet(workbook, sheet_name: str = DEFAULT_SHEET_NAME):
+    """Exact name, then NFKC/space-insensitive name, then any "rpa" sheet, then the first."""
+
+    target_normalized = normalize_sheet_title(sheet_name)
+    fallback = None
+    for sheet in workbook.Worksheets:
+        name = str(getattr(sheet, "Name", ""))
+        if name == sheet_name:
+            return sheet
+        normalized = normalize_sheet_title(name)
+        if normalized == target_normalized:
+            return sheet
+        if fallback is None and "rpa" in normalized:
+            fallback = sheet
+    if fallback is not None:
+        LOGGER.debug("指定シート '%s' が見つからないため '%s' を使用します。", sheet_name, getattr(fallback, "Name", ""))
+        return fallback
+    try:
+        first_sheet = workbook.Worksheets(1)
+        LOGGER.debug("指定シートが見つからないため先頭シート '%s' を使用します。", getattr(first_sheet, "Name", ""))
+        return first_sheet
+    except Exception:
+        raise ValueError(f"シート '{sheet_name}' は存在しません。")
+
+
+def find_rpa_book(book_path: Optional[Path] = None) -> Path:
+    registry = PathRegistry()
+    candidates: List[Path] = []
+    if book_path:
+        candidates.append(Path(book_path))
+    candidates.append(Path(registry.rpa_book_destination))
+    candidates.append(Path(registry.rpa_local_book))
+    for candidate in candidates:
+        if candidate.exists():
+            LOGGER.info("[INFO] 使用するブックを検出しました: %s", candidate)
+            return candidate
+    raise FileNotFoundError("RPAシートのブックが見つかりませんでした。--book でパスを指定してください。")
+
+
+def read_outputs(book_path: Optional[Path] = None, sheet_name: str = DEFAULT_SHEET_NAME) -> RpaOutputs:
+    """Read OUTPUT_CELLS from the values Excel cached on its last save (no Excel instance).
+
+    Raises ValueError when a formula cell has no cached result; the caller
+    then has to ask Excel.
+    """
+
+    path = Path(book_path) if book_path else PathRegistry().rpa_book_destination
+    for _ in range(3):
+        mtime = path.stat().st_mtime_ns
+        data = path.read_bytes()
+        if path.stat().st_mtime_ns == mtime:
+            break
+    values = xlsx_package.read_cells(data, sheet_name, OUTPUT_CELLS.values())
+    fields = {key: normalise_cell(values[address]) for key, address in OUTPUT_CELLS.items()}
+    return RpaOutputs(source_mtime_ns=mtime, **fields)
+
+
+def capture_outputs(state, book_path: Optional[Path] = None) -> Optional[RpaOutputs]:
+    """Refresh ``state.rpa_outputs`` after a step saved the book; failures only log."""
+
+    try:
+        state.rpa_outputs = read_outputs(book_path)
+    except Exception as exc:
+        LOGGER.warning("RPAシートの出力セルを読み込めませんでした (メール作成時に再読込します): %s", exc)
+        state.rpa_outputs = None
+    return state.rpa_outputs
+
+
+class RpaSheetModel:
+    """Columns H–N of RPAシート read with one Range.Value and written back once.
+
+    Step B loads the model once and hands it to Bd and Be; their edits only
+    touch memory and are tracked as dirty cells until ``flush`` writes them
+    in a single Excel session.
+    """
+
+    def __init__(
+        self,
+        book_path: Path,
+        sheet_name: str = DEFAULT_SHEET_NAME,
+        values: Optional[Dict[Cell, str]] = None,
+        last_row: int = FIRST_DATA_ROW - 1,
+    ) -> None:
+        self.book_path = Path(book_path)
+        self.sheet_name = sheet_name
+        self._values: Dict[Cell, str] = dict(values or {})
+        self._dirty: Dict[Cell, str] = {}
+        self.last_row = last_row
+
+    @classmethod
+    def load(cls, book_path: Optional[Path] = None, sheet_name: str = DEFAULT_SHEET_NAME) -> "RpaSheetModel":
+        path = find_rpa_book(book_path)
+        LOGGER.info("[STEP] RPAシートの読み込みを開始します: book=%s sheet=%s", path, sheet_name)
+        values: Dict[Cell, str] = {}
+        with open_workbook(path, read_only=True) as workbook:
+            sheet = resolve_sheet(workbook, sheet_name)
+            row_start, row_end, _, _ = get_used_range_bounds(sheet)
+            first_row = max(FIRST_DATA_ROW, row_start)
+            LOGGER.info("[INFO] シートの使用範囲: rows=%s-%s", row_start, row_end)
+            if row_end >= first_row:
+                block = read_block(sheet, first_row, LABEL_COL, row_end, MAIL_TARGET_COL)
+                for offset, row_values in enumerate(block):
+                    for column, value in enumerate(row_values, start=LABEL_COL):
+                        text = normalise_cell(value)
+                        if text:
+                            values[(first_row + offset, column)] = text
+        model = cls(path, sheet_name, values, last_row=row_end)
+        LOGGER.info("[STEP] RPAシートの読み込みが完了しました: 非空セル=%s", len(values))
+        return model
+
+    def get(self, row: int, column: int) -> str:
+        return self._values.get((row, column), "")
+
+    def set(self, row: int, column: int, value: str) -> None:
+        if self._values.get((row, column), "") == value:
+            return
+        self._values[(row, column)] = value
+        self._dirty[(row, column)] = value
+
+    def data_rows(self, is_blank: Callable[[int], bool], max_blank_run: int = MAX_CONSECUTIVE_BLANKS) -> Iterator[int]:
+        """Yield non-blank rows from FIRST_DATA_ROW, stopping after ``max_blank_run`` blanks."""
+
+        blank_run = 0
+        for row in range(FIRST_DATA_ROW, self.last_row + 1):
+            if is_blank(row):
+                blank_run += 1
+                if blank_run >= max_blank_run:
+                    return
+                continue
+            blank_run = 0
+            yield row
+
+    @property
+    def dirty(self) -> Dict[Cell, str]:
+        return dict(self._dirty)
+
+    def flush(self) -> int:
+        """Write dirty cells, one Range per contiguous run in a column; return the count."""
+
+        if not self._dirty:
+            LOGGER.info("[INFO] Excel への変更が無いため、書き込みをスキップします。")
+            return 0
+        with open_workbook(self.book_path) as workbook:
+            sheet = resolve_sheet(workbook, self.sheet_name)
+            for column, first_row, run in self._dirty_runs():
+                if len(run) == 1:
+                    sheet.Cells(first_row, column).Value = run[0]
+                else:
+                    target = sheet.Range(sheet.Cells(first_row, column), sheet.Cells(first_row + len(run) - 1, column))
+                    target.Value = tuple((value,) for value in run)
+            workbook.Save()
+        written = len(self._dirty)
+        LOGGER.info("[STEP] Excel へ %s 件のセル更新を書き込みました。", written)
+        self._dirty.clear()
+        return written
+
+    def _dirty_runs(self) -> Iterator[Tuple[int, int, List[str]]]:
+        for column in sorted({column for _, column in self._dirty}):
+            rows = sorted(row for row, col in self._dirty if col == column)
+            start = previous = rows[0]
+            run = [self._dirty[(start, column)]]
+            for row in rows[1:]:
+                if row == previous + 1:
+                    run.append(self._dirty[(row, column)])
+                else:
+                    yield column, start, run
+                    start, run = row, [self._dirty[(row, column)]]
+                previous = row
+            yield column, start, run
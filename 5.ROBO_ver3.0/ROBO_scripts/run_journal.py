@@ -0,0 +1,311 @@
+"""Append-only run journal behind error_log.xlsx.
+
+Ed appends one JSON line per robot run to ``<machine>.jsonl`` in
+``PathRegistry().run_journal_dir``.  The append does not depend on how many
+runs error_log.xlsx already holds, and robots never write the same file.
+
+``compact`` merges journaled runs that are not in error_log.xlsx yet (same
+start time and machine) in one package pass (``xlsx_package.append_rows``).
+The robot only compacts its own machine's journal, so two PCs compacting
+at the same time never append the same run: OneDrive offers no lock that
+holds between PCs, and an O_EXCL file in the synced folder is not one.
+The whole journal is compared with the workbook every time, so rows lost
+to a sync conflict are written again by the next compaction.  The lock
+(against a second robot process on the same PC) and
+``run_journal_compaction.json`` (when it last ran and how many bytes of
+each journal were merged) live in the local state folder.
+
+``compact_if_due`` runs at the end of every run (Ed) and at start-up (the
+warm-up).  It compacts whenever the journal has lines that were not merged
+yet; ``CHOUJI_RUN_JOURNAL_COMPACT_MINUTES`` only throttles the re-check of
+an already merged journal against the workbook.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import xlsx_package
+from atomic_io import LockTimeout, atomic_write_bytes, file_lock, read_json
+from common import PathRegistry
+
+LOGGER = logging.getLogger("chouji_robo.run_journal")
+
+STATE_FILE = "run_journal_compaction.json"
+LOCK_NAME = "run_journal_compaction"
+COMPACT_INTERVAL_MINUTES = float(os.getenv("CHOUJI_RUN_JOURNAL_COMPACT_MINUTES", "60"))
+BACKGROUND_LOCK_TIMEOUT_SECONDS = 2.0
+
+RunKey = Tuple[datetime, str]
+
+
+def format_duration(start: datetime, end: datetime) -> str:
+    seconds = max(0, int((end - start).total_seconds()))
+    minutes, sec = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{sec:02}"
+
+
+@dataclass(frozen=True)
+class RunRecord:
+    started_at: datetime
+    finished_at: datetime
+    tehai_number: str
+    machine: str
+    success: bool
+    error_message: str = ""
+    feedback: str = ""
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    def to_json(self) -> str:
+        payload = asdict(self)
+        payload["started_at"] = self.started_at.isoformat()
+        payload["finished_at"] = self.finished_at.isoformat()
+        return json.dumps(payload, ensure_ascii=False, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, line: str) -> "RunRecord":
+        payload = json.loads(line)
+        payload["started_at"] = datetime.fromisoformat(payload["started_at"])
+        payload["finished_at"] = datetime.fromisoformat(payload["finished_at"])
+        return cls(**payload)
+
+    def row(self) -> List[Any]:
+        """error_log.xlsx columns A–H."""
+
+        return [
+            self.started_at,
+            self.finished_at,
+            format_duration(self.started_at, self.finished_at),
+            self.tehai_number,
+            self.machine,
+            "〇" if self.success else "✕",
+            "" if self.success else self.error_message,
+            self.feedback,
+        ]
+
+    def key(self) -> RunKey:
+        return self.started_at.replace(microsecond=0), self.machine
+
+
+def journal_path(directory: Path, machine: str) -> Path:
+    name = re.sub(r'[\\/:*?"<>|\s]+', "_", machine or "").strip("_") or "unknown"
+    return Path(directory) / f"{name}.jsonl"
+
+
+class RunJournal:
+    """One machine's journal; each ``append`` is a single fsync'ed line."""
+
+    def __init__(self, directory: Optional[Path] = None, machine: str = "") -> None:
+        self.path = journal_path(Path(directory) if directory else PathRegistry().run_journal_dir, machine)
+
+    def append(self, record: RunRecord) -> Path:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = (record.to_json() + "\n").encode("utf-8")
+        with open(self.path, "ab") as stream:
+            stream.write(line)
+            stream.flush()
+            os.fsync(stream.fileno())
+        return self.path
+
+
+def read_journal(path: Path, offset: int = 0) -> Tuple[List[RunRecord], int]:
+    """Complete lines after ``offset`` and the offset just past the last one."""
+
+    with open(path, "rb") as stream:
+        stream.seek(offset)
+        data = stream.read()
+    # A line still being written (no newline yet) is left for the next pass.
+    end = data.rfind(b"\n") + 1
+    records: List[RunRecord] = []
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(RunRecord.from_json(line.decode("utf-8")))
+        except (ValueError, TypeError, KeyError) as exc:
+            LOGGER.warning("実行ジャーナルの壊れた行を読み飛ばします (%s): %s", path.name, exc)
+    return records, offset + end
+
+
+def _cell_datetime(text: str) -> Optional[datetime]:
+    try:
+        serial = float(text)
+    except ValueError:
+        try:
+            return datetime.fromisoformat(text.strip())
+        except ValueError:
+            return None
+    return xlsx_package.EXCEL_EPOCH + timedelta(seconds=round(serial * 86400))
+
+
+def _logged_runs(workbook: bytes) -> Set[RunKey]:
+    values = xlsx_package.read_sheet_values(workbook, xlsx_package.active_sheet_name(workbook))
+    keys: Set[RunKey] = set()
+    for reference, text in values.items():
+        if not reference.startswith("A") or not reference[1:].isdigit() or reference == "A1":
+            continue
+        started = _cell_datetime(text)
+        if started is not None:
+            keys.add((started.replace(microsecond=0), values.get(f"E{reference[1:]}", "")))
+    return keys
+
+
+def completed_tehai_numbers(workbook_path: Optional[Path] = None, journal_dir: Optional[Path] = None) -> Set[str]:
+    """管理番号 of every successful run, from error_log.xlsx and the journals not yet compacted."""
+
+    registry = PathRegistry()
+    workbook_path = Path(workbook_path or registry.error_log_book)
+    journal_dir = Path(journal_dir or registry.run_journal_dir)
+    numbers: Set[str] = set()
+    if workbook_path.exists():
+        data = workbook_path.read_bytes()
+        values = xlsx_package.read_sheet_values(data, xlsx_package.active_sheet_name(data))
+        for reference, text in values.items():
+            if reference.startswith("F") and reference[1:].isdigit() and text.strip() == "〇":
+                # Rows written by the old openpyxl code may hold the number as a float.
+                number = re.sub(r"\.0$", "", values.get(f"D{reference[1:]}", "").strip())
+                if number:
+                    numbers.add(number)
+    if journal_dir.is_dir():
+        for path in journal_dir.glob("*.jsonl"):
+            records, _ = read_journal(path)
+            numbers.update(record.tehai_number for record in records if record.success and record.tehai_number)
+    return numbers
+
+
+def _journal_paths(journal_dir: Path, machine: Optional[str]) -> List[Path]:
+    if machine is not None:
+        return [journal_path(journal_dir, machine)]
+    return sorted(journal_dir.glob("*.jsonl"))
+
+
+def _has_unmerged(paths: List[Path], merged: Dict[str, int]) -> bool:
+    for path in paths:
+        try:
+            size = path.stat().st_size
+        except OSError:
+            continue
+        if size > merged.get(path.name, 0):
+            return True
+    return False
+
+
+def compact(
+    workbook_path: Optional[Path] = None,
+    journal_dir: Optional[Path] = None,
+    *,
+    machine: Optional[str] = None,
+    lock_timeout: Optional[float] = None,
+    state_dir: Optional[Path] = None,
+) -> int:
+    """Append journaled runs not yet in error_log.xlsx; return the number of rows written.
+
+    With ``machine`` only that machine's journal is read (what the robot
+    does); without it every journal in ``journal_dir`` is merged.
+    """
+
+    registry = PathRegistry()
+    workbook_path = Path(workbook_path or registry.error_log_book)
+    journal_dir = Path(journal_dir or registry.run_journal_dir)
+    state_dir = Path(state_dir or registry.local_state_dir)
+    if not workbook_path.exists():
+        LOGGER.warning("error_log.xlsx が見つからないため実行ジャーナルを反映できません: %s", workbook_path)
+        return 0
+    paths = _journal_paths(journal_dir, machine)
+    lock_args = {} if lock_timeout is None else {"timeout": lock_timeout}
+    with file_lock(state_dir / LOCK_NAME, **lock_args):
+        state = read_json(state_dir / STATE_FILE) or {}
+        merged: Dict[str, int] = dict(state.get("merged_bytes") or {})
+        pending: List[RunRecord] = []
+        read_to: Dict[str, int] = {}
+        for path in paths:
+            if path.exists():
+                records, read_to[path.name] = read_journal(path)
+                pending.extend(records)
+
+        rows: List[List[Any]] = []
+        if pending:
+            data = workbook_path.read_bytes()
+            seen = _logged_runs(data)
+            for record in sorted(pending, key=lambda item: item.started_at):
+                if record.key() in seen:
+                    continue
+                seen.add(record.key())
+                rows.append(record.row())
+            if rows:
+                first_row = xlsx_package.append_rows(data, workbook_path, rows)
+                LOGGER.info("error_log.xlsx に %s 件の実行結果を反映しました (row=%s-)。", len(rows), first_row)
+
+        # Only after the rows are in the workbook: a failed append leaves the lines unmerged.
+        merged.update(read_to)
+        state = {"compacted_at": datetime.now().isoformat(timespec="seconds"), "merged_bytes": merged}
+        atomic_write_bytes(state_dir / STATE_FILE, json.dumps(state, ensure_ascii=False, indent=2).encode("utf-8"))
+    return len(rows)
+
+
+def compact_if_due(
+    workbook_path: Optional[Path] = None,
+    journal_dir: Optional[Path] = None,
+    machine: Optional[str] = None,
+    interval: timedelta = timedelta(minutes=COMPACT_INTERVAL_MINUTES),
+    state_dir: Optional[Path] = None,
+) -> int:
+    """``compact`` when a journal has unmerged lines or the last pass is older than ``interval``.
+
+    A busy lock or an open error_log.xlsx is not an error; the lines stay
+    unmerged and the next call tries again.
+    """
+
+    registry = PathRegistry()
+    state_dir = Path(state_dir or registry.local_state_dir)
+    state = read_json(state_dir / STATE_FILE) or {}
+    paths = _journal_paths(Path(journal_dir or registry.run_journal_dir), machine)
+    if not _has_unmerged(paths, state.get("merged_bytes") or {}):
+        compacted_at = state.get("compacted_at")
+        if compacted_at:
+            try:
+                if datetime.now() - datetime.fromisoformat(compacted_at) < interval:
+                    return 0
+            except ValueError:
+                pass
+    try:
+        return compact(
+            workbook_path,
+            journal_dir,
+            machine=machine,
+            lock_timeout=BACKGROUND_LOCK_TIMEOUT_SECONDS,
+            state_dir=state_dir,
+        )
+    except LockTimeout:
+        LOGGER.info("この PC の別のロボが実行ジャーナルを反映中のため、次回に行います。")
+    except PermissionError as exc:
+        LOGGER.info("error_log.xlsx が開かれているため、実行ジャーナルの反映は次回に行います: %s", exc)
+    return 0
+
+
+def start_compaction(
+    workbook_path: Optional[Path] = None,
+    journal_dir: Optional[Path] = None,
+    machine: Optional[str] = None,
+) -> threading.Thread:
+    """Run ``compact_if_due`` on a thread; the caller must join it before exiting (the robot ends with ``os._exit``)."""
+
+    def _target() -> None:
+        try:
+            compact_if_due(workbook_path, journal_dir, machine)
+        except Exception:
+            LOGGER.exception("実行ジャーナルの error_log.xlsx への反映に失敗しました。")
+
+    worker = threading.Thread(target=_target, name="run-journal-compaction", daemon=False)
+    worker.start()
+    return worker
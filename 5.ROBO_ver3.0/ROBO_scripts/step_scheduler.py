@@ -0,0 +1,383 @@
+"""Run workflow steps as a dependency graph instead of one after another.
+
+Each ``Task`` names the ``StepAState`` fields (or other results, such as a
+file it writes) it reads and produces.  A task starts on a thread pool as
+soon as every producer of its inputs has finished, so steps that do not
+depend on each other overlap.  Inputs nobody produces must already be set
+on ``robot.state`` when the run starts.
+
+- ``extra_inputs`` adds inputs that depend on earlier results (Ae waits for
+  Ad's name_katakana only for PID); it is evaluated once the task's other
+  inputs are ready.
+- ``timeout`` bounds how long the run waits for a task.  A thread cannot be
+  killed, so a timed-out task keeps running in the background while the
+  run goes on (``optional``) or fails with ``StepTimeout``.
+- ``optional`` tasks (warm-ups) may fail or time out; tasks depending on
+  them still run.
+- ``robot.stop_event`` stops new tasks from starting; running required
+  tasks are allowed to finish and the report is marked cancelled.
+- Each task gets a view of the robot whose ``current_phase`` is its own;
+  the robot's ``current_phase`` (heartbeat, error messages) shows the
+  phases of every running task instead of whichever was set last.
+- ``reads``/``writes`` list the files a task reads and modifies; the
+  scheduler does not use them, checkpoint.py does.  ``fingerprint``
+  summarises what a task read when hashing a whole file would be too
+  coarse (Ac: its row of the shared 管理表).  ``run(restored=...)``
+  counts tasks as finished without running them (resume from a
+  checkpoint) and ``on_done`` is called on the caller's thread after each
+  task that completes.
+
+``StepScheduler.run`` returns a ``ScheduleReport`` with per-task timings and
+the critical path, which is also logged.  ``CHOUJI_SCHEDULER_WORKERS`` sets
+the pool size (default 4).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from common import StepAState
+
+LOGGER = logging.getLogger("chouji_robo.scheduler")
+
+DEFAULT_WORKERS = int(os.getenv("CHOUJI_SCHEDULER_WORKERS", "4"))
+POLL_SECONDS = 0.2
+
+_STATE_FIELDS = {item.name for item in fields(StepAState)}
+
+
+class StepTimeout(TimeoutError):
+    """A required task did not finish within its timeout."""
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    run: Callable[[Any], Any]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    extra_inputs: Optional[Callable[[Any], Iterable[str]]] = None
+    timeout: Optional[float] = None
+    optional: bool = False
+    reads: Optional[Callable[[Any], Iterable[Path]]] = None
+    writes: Optional[Callable[[Any], Iterable[Path]]] = None
+    fingerprint: Optional[Callable[[Any], str]] = None
+
+
+@dataclass
+class TaskRun:
+    name: str
+    status: str = "pending"  # pending / running / done / restored / failed / timeout / skipped
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    depends_on: Tuple[str, ...] = ()
+    error: str = ""
+
+    @property
+    def seconds(self) -> float:
+        if self.started is None:
+            return 0.0
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+
+@dataclass
+class ScheduleReport:
+    runs: Dict[str, TaskRun] = field(default_factory=dict)
+    started: float = 0.0
+    finished: float = 0.0
+    cancelled: bool = False
+
+    @property
+    def seconds(self) -> float:
+        return self.finished - self.started
+
+    @property
+    def serial_seconds(self) -> float:
+        """Time the same tasks would have taken one after another."""
+
+        return sum(run.seconds for run in self.runs.values() if run.status == "done")
+
+    def critical_path(self) -> List[TaskRun]:
+        """The chain of tasks that decided the total time, first to last."""
+
+        finished = [run for run in self.runs.values() if run.finished is not None and run.status != "timeout"]
+        if not finished:
+            return []
+        path = [max(finished, key=lambda run: run.finished)]
+        while True:
+            gating = [
+                self.runs[name]
+                for name in path[-1].depends_on
+                if self.runs[name].finished is not None and self.runs[name].status == "done"
+            ]
+            if not gating:
+                break
+            path.append(max(gating, key=lambda run: run.finished))
+        return list(reversed(path))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seconds": round(self.seconds, 3),
+            "serial_seconds": round(self.serial_seconds, 3),
+            "cancelled": self.cancelled,
+            "critical_path": [run.name for run in self.critical_path()],
+            "tasks": {
+                name: {
+                    "status": run.status,
+                    "start": None if run.started is None else round(run.started - self.started, 3),
+                    "seconds": round(run.seconds, 3),
+                    "depends_on": list(run.depends_on),
+                    "error": run.error,
+                }
+                for name, run in self.runs.items()
+            },
+        }
+
+
+class _Phases:
+    """The phase of each running task, shown on the robot as one string."""
+
+    def __init__(self, robot: Any) -> None:
+        self.robot = robot
+        self.closed = False
+        # Shown again while no task is running (e.g. "A.create_RPAsheet").
+        self.idle = getattr(robot, "current_phase", None)
+        self._lock = threading.Lock()
+        self._by_task: Dict[str, str] = {}
+
+    def get(self, task: str) -> Optional[str]:
+        with self._lock:
+            return self._by_task.get(task)
+
+    def set(self, task: str, phase: Optional[str]) -> None:
+        with self._lock:
+            if phase is None:
+                self._by_task.pop(task, None)
+            else:
+                self._by_task[task] = phase
+            # A timed-out task that finishes after the run must not overwrite the next step's phase.
+            if self.closed:
+                return
+            if self._by_task:
+                self.robot.current_phase = " / ".join(self._by_task.values())
+            elif self.idle is not None:
+                self.robot.current_phase = self.idle
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+
+
+class _TaskRobot:
+    """``robot`` as one task sees it: everything but ``current_phase`` is the robot's."""
+
+    def __init__(self, robot: Any, task: str, phases: _Phases) -> None:
+        object.__setattr__(self, "_robot", robot)
+        object.__setattr__(self, "_task", task)
+        object.__setattr__(self, "_phases", phases)
+
+    @property
+    def current_phase(self) -> Optional[str]:
+        return self._phases.get(self._task)
+
+    @current_phase.setter
+    def current_phase(self, value: Optional[str]) -> None:
+        self._phases.set(self._task, value)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._robot, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "current_phase":
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._robot, name, value)
+
+
+def _state_value_missing(state: Any, name: str) -> bool:
+    value = getattr(state, name, None)
+    return value is None or value == "" or value == []
+
+
+class StepScheduler:
+    """Runs a list of ``Task`` in dependency order on a thread pool."""
+
+    def __init__(self, tasks: Sequence[Task], *, max_workers: int = DEFAULT_WORKERS) -> None:
+        self.tasks: Dict[str, Task] = {}
+        self.producers: Dict[str, str] = {}
+        for task in tasks:
+            if task.name in self.tasks:
+                raise ValueError(f"タスク名が重複しています: {task.name}")
+            self.tasks[task.name] = task
+            for output in task.outputs:
+                if output in self.producers:
+                    raise ValueError(f"'{output}' を出力するタスクが複数あります: {self.producers[output]}, {task.name}")
+                self.producers[output] = task.name
+        self.max_workers = max(1, max_workers)
+        self._check_cycles()
+
+    def _dependencies(self, task: Task, names: Iterable[str]) -> Set[str]:
+        return {self.producers[name] for name in names if name in self.producers and self.producers[name] != task.name}
+
+    def dependencies(self, robot: Any = None) -> Dict[str, Set[str]]:
+        """Task name -> names of the tasks it waits for (``extra_inputs`` included when ``robot`` is given)."""
+
+        result: Dict[str, Set[str]] = {}
+        for name, task in self.tasks.items():
+            names = list(task.inputs)
+            if robot is not None and task.extra_inputs is not None:
+                names.extend(task.extra_inputs(robot))
+            result[name] = self._dependencies(task, names)
+        return result
+
+    def _check_cycles(self) -> None:
+        visiting: Set[str] = set()
+        done: Set[str] = set()
+
+        def visit(name: str, chain: List[str]) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"タスクの依存関係が循環しています: {' -> '.join(chain + [name])}")
+            visiting.add(name)
+            for dependency in self._dependencies(self.tasks[name], self.tasks[name].inputs):
+                visit(dependency, chain + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.tasks:
+            visit(name, [])
+
+    def run(
+        self,
+        robot: Any,
+        *,
+        restored: Iterable[str] = (),
+        on_done: Optional[Callable[[Task], None]] = None,
+    ) -> ScheduleReport:
+        state = robot.state
+        for task in self.tasks.values():
+            missing = [
+                name
+                for name in task.inputs
+                if name not in self.producers and name in _STATE_FIELDS and _state_value_missing(state, name)
+            ]
+            if missing:
+                raise RuntimeError(f"{task.name} の入力が設定されていません: {', '.join(missing)}")
+
+        stop_event: Optional[threading.Event] = getattr(robot, "stop_event", None)
+        report = ScheduleReport(runs={name: TaskRun(name) for name in self.tasks}, started=time.perf_counter())
+        for name in restored:
+            if name in report.runs:
+                report.runs[name].status = "restored"
+                LOGGER.info("タスク %s は前回の結果を使用します。", name)
+        waiting_on: Dict[str, Set[str]] = {
+            name: self._dependencies(task, task.inputs) for name, task in self.tasks.items()
+        }
+        extras_added: Set[str] = set()
+        running: Dict[Future, str] = {}
+        failure: Optional[BaseException] = None
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="step")
+        phases = _Phases(robot)
+
+        def settled(name: str) -> bool:
+            return report.runs[name].status in {"done", "restored", "failed", "timeout", "skipped"}
+
+        def call(task: Task) -> Any:
+            report.runs[task.name].started = time.perf_counter()
+            phases.set(task.name, task.name)
+            try:
+                return task.run(_TaskRobot(robot, task.name, phases))
+            finally:
+                phases.set(task.name, None)
+                report.runs[task.name].finished = time.perf_counter()
+
+        try:
+            while True:
+                stopping = failure is not None or (stop_event is not None and stop_event.is_set())
+                if not stopping:
+                    for name, task in self.tasks.items():
+                        run = report.runs[name]
+                        if run.status != "pending" or not all(settled(dep) for dep in waiting_on[name]):
+                            continue
+                        if task.extra_inputs is not None and name not in extras_added:
+                            extras_added.add(name)
+                            extra = self._dependencies(task, task.extra_inputs(robot))
+                            waiting_on[name] |= extra
+                            # Defer only for dependencies still to come (not e.g. restored ones).
+                            if not all(settled(dep) for dep in extra):
+                                continue
+                        run.depends_on = tuple(sorted(waiting_on[name]))
+                        run.status = "running"
+                        LOGGER.debug("タスク %s を開始します。", name)
+                        running[executor.submit(call, task)] = name
+                required_running = any(not self.tasks[name].optional for name in running.values())
+                pending = any(run.status == "pending" for run in report.runs.values())
+                if not running or (not required_running and (stopping or not pending)):
+                    break
+
+                done, _ = wait(list(running), timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    run = report.runs[name]
+                    error = future.exception()
+                    if error is None:
+                        run.status = "done"
+                        LOGGER.info("タスク %s が完了しました (%.1f 秒)。", name, run.seconds)
+                        if on_done is not None:
+                            on_done(self.tasks[name])
+                        continue
+                    run.status = "failed"
+                    run.error = str(error)
+                    if self.tasks[name].optional:
+                        LOGGER.warning("タスク %s に失敗しましたが続行します: %s", name, error)
+                    elif failure is None:
+                        LOGGER.error("タスク %s でエラーが発生しました: %s", name, error)
+                        failure = error
+                now = time.perf_counter()
+                for future, name in list(running.items()):
+                    task, run = self.tasks[name], report.runs[name]
+                    if task.timeout is None or run.started is None or now - run.started < task.timeout:
+                        continue
+                    running.pop(future)
+                    run.status = "timeout"
+                    run.error = f"{task.timeout:.0f} 秒以内に終わりませんでした。"
+                    if task.optional:
+                        LOGGER.warning("タスク %s が %.0f 秒で終わらないため待たずに続行します。", name, task.timeout)
+                    elif failure is None:
+                        failure = StepTimeout(f"{name} が {task.timeout:.0f} 秒以内に終わりませんでした。")
+        finally:
+            phases.close()
+            # Abandoned optional tasks (e.g. a stuck warm-up) keep their thread; do not wait for them.
+            executor.shutdown(wait=False)
+
+        for name, run in report.runs.items():
+            if run.status == "pending":
+                run.status = "skipped"
+        report.finished = time.perf_counter()
+        report.cancelled = failure is None and any(run.status == "skipped" for run in report.runs.values())
+        self._log(report)
+        if failure is not None:
+            raise failure
+        return report
+
+    @staticmethod
+    def _log(report: ScheduleReport) -> None:
+        path = " → ".join(f"{run.name}({run.seconds:.1f}s)" for run in report.critical_path())
+        LOGGER.info(
+            "タスク実行時間 %.1f 秒 (順番に実行した場合 %.1f 秒)。クリティカルパス: %s",
+            report.seconds,
+            report.serial_seconds,
+            path or "-",
+        )
+        skipped = [name for name, run in report.runs.items() if run.status == "skipped"]
+        if skipped:
+            LOGGER.info("実行しなかったタスク: %s", ", ".join(skipped))
@@ -0,0 +1,125 @@
+"""
+archive_catalog_seed.py
+格納カタログ (archive_catalog.sqlite3) を既存フォルダから作成・更新するスクリプトです。
+
+通常は「3. 過去のデータ」フォルダ全体を並列でハッシュ計算して登録します。
+2 回目以降はサイズと更新日時が変わったファイルだけを計算し直します。
+
+--synthetic N を指定すると、一時フォルダに N 件のダミー PDF/xlsx を作って
+  - seed の所要時間 (workers=1 と --workers の比較、2 回目の差分更新)
+  - archive の 1 回目 (コピー) と 2 回目 (同一内容のため省略) の所要時間とコピー方式
+  - 別の接続がロック中の seed は登録 0 件と報告し、ロック解除後の seed で全件登録されること
+を JSON で出力します (Linux でも動作します)。
+
+使い方:
+  python ./archive_catalog_seed.py
+  python ./archive_catalog_seed.py --root "C:\\...\\3. 過去のデータ" --workers 8
+  python ./archive_catalog_seed.py --synthetic 2000 --size-kb 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+from archive_catalog import ArchiveCatalog, archive, seed  # noqa: E402
+from common import PathRegistry  # noqa: E402
+
+
+def build_tree(root: Path, count: int, size_kb: int) -> None:
+    for index in range(count):
+        folder = root / f"{2020 + index % 5}年" / f"{index % 12 + 1:02d}月"
+        folder.mkdir(parents=True, exist_ok=True)
+        suffix = ".pdf" if index % 2 == 0 else ".xlsx"
+        (folder / f"{1000 + index}_テスト株式会社_弔事連絡票{suffix}").write_bytes(os.urandom(size_kb * 1024))
+
+
+def synthetic(count: int, size_kb: int, workers: int) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"files": count, "size_kb": size_kb, "workers": workers}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work = Path(temp_dir)
+        tree = work / "3. 過去のデータ"
+        build_tree(tree, count, size_kb)
+
+        for label, pool_size in (("seed_serial", 1), ("seed_parallel", workers)):
+            catalog = ArchiveCatalog(work / f"{label}.sqlite3")
+            started = time.perf_counter()
+            stats = seed(catalog, tree, workers=pool_size)
+            report[label] = {"seconds": round(time.perf_counter() - started, 3), **stats}
+        started = time.perf_counter()
+        stats = seed(catalog, tree, workers=workers)
+        report["seed_again"] = {"seconds": round(time.perf_counter() - started, 3), **stats}
+
+        case = work / "case"
+        case.mkdir()
+        sources: List[Path] = []
+        for suffix in (".pdf", ".xlsx"):
+            path = case / f"1117_テスト株式会社_弔事連絡票{suffix}"
+            path.write_bytes(os.urandom(size_kb * 1024))
+            sources.append(path)
+        target = work / "99_ロボ弔事格納"
+        for label in ("archive_first", "archive_rerun"):
+            started = time.perf_counter()
+            results = archive(catalog, sources, target, tehai_number="1117", person="ヤマダタロウ", case_date=date.today())
+            report[label] = {
+                "seconds": round(time.perf_counter() - started, 4),
+                "copied": [result.method for result in results if result.copied],
+                "skipped": sum(1 for result in results if not result.copied),
+            }
+        report["lookup_1117"] = [Path(entry.path).name for entry in catalog.find_by_tehai("1117")]
+
+        locked = ArchiveCatalog(work / "locked.sqlite3", timeout=0.2)
+        locked.known_files(str(tree))
+        holder = sqlite3.connect(str(locked.path), isolation_level=None)
+        holder.execute("BEGIN EXCLUSIVE")
+        during = seed(locked, tree, workers=workers)
+        holder.execute("ROLLBACK")
+        holder.close()
+        after = seed(locked, tree, workers=workers)
+        report["locked"] = {
+            "recorded_while_locked": during["recorded"],
+            "recorded_after": after["recorded"],
+            "still_available": locked.available,
+        }
+    return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Seed the archive catalog")
+    parser.add_argument("--root", type=Path, help="走査するフォルダ (省略時は 3. 過去のデータ)")
+    parser.add_argument("--db", type=Path, help="カタログのパス (省略時は PathRegistry().archive_catalog_db)")
+    parser.add_argument("--workers", type=int, default=8, help="ハッシュ計算のスレッド数")
+    parser.add_argument("--synthetic", type=int, default=0, help="ダミーファイル N 件で性能を測定します。")
+    parser.add_argument("--size-kb", type=int, default=200, help="--synthetic のファイルサイズ (KB)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.synthetic:
+        report = synthetic(args.synthetic, args.size_kb, args.workers)
+    else:
+        registry = PathRegistry()
+        root = args.root or registry.error_log_book.parent
+        catalog = ArchiveCatalog(args.db or registry.archive_catalog_db)
+        started = time.perf_counter()
+        report = {"root": str(root), **seed(catalog, root, workers=args.workers)}
+        report["seconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
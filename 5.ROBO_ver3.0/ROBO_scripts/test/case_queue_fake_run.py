@@ -0,0 +1,214 @@
+"""
+case_queue_fake_run.py
+複数の管理番号を続けて処理する case_queue を、Excel・Outlook・画面操作なしで動かすスクリプトです。
+
+A/B/E の代わりに指定秒数だけ待つ仮の処理を使い、
+  - 先読みなし (CHOUJI_PREFETCH_DEPTH=0 相当) と先読みあり (--depth) の合計時間
+  - 各案件が先読みされたか、E の前に先読みの完了をどれだけ待ったか
+  - E の時点でデスクトップの RPAブック.xlsx がその案件のものになっているか
+  - 先読み中の案件が画面のフェーズ表示 (robot.current_phase) を書き換えていないか
+  - E の時点で先読みが動いているか (Ec が Edge をイメージ名でまとめて終了しないこと)
+  - E で登録したバックグラウンド処理 (Ee の格納コピー・Ed の実行ジャーナル反映) が
+    ロボ本体に登録され、終了時に待たれるか
+を JSON で出力します。
+
+--ask に指定した管理番号は Ae のメール選択が必要な案件として扱い、
+先読みでは止まって画面側でやり直すことを確認します。
+--fail に指定した管理番号は B でエラーにし、残りの案件が続けて処理されることを確認します。
+
+Linux でも動作します (openpyxl が必要)。
+
+使い方:
+  python ./case_queue_fake_run.py
+  python ./case_queue_fake_run.py --cases 1117,1118,1119,1120 --a-seconds 1 --b-seconds 1.5 --review-seconds 3
+  python ./case_queue_fake_run.py --ask 1119 --fail 1120
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+import xlsx_package  # noqa: E402
+from case_queue import CaseQueue, OperatorInputRequired  # noqa: E402
+from common import PathRegistry, StepAState  # noqa: E402
+from outlook_session import FakeOutlookSession  # noqa: E402
+
+MARKER_CELL = "A1"
+
+
+class _FakeRoot:
+    def __init__(self) -> None:
+        self.scheduled: List[str] = []
+
+    def after(self, _delay: int, callback: Any) -> None:
+        self.scheduled.append(getattr(callback, "__name__", repr(callback)))
+
+
+class FakeRobot:
+    """ChoujiRobo に必要な属性だけを持つ仮のロボです。"""
+
+    def __init__(self, home: Path) -> None:
+        self.paths = PathRegistry(home=home)
+        self.state = StepAState()
+        self.outlook = FakeOutlookSession()
+        self.stop_event = threading.Event()
+        self.root = _FakeRoot()
+        self.phase_writes: List[Dict[str, str]] = []
+        self._current_phase = ""
+        self._background: List[threading.Thread] = []
+
+    @property
+    def current_phase(self) -> str:
+        return self._current_phase
+
+    @current_phase.setter
+    def current_phase(self, value: str) -> None:
+        self._current_phase = value
+        self.phase_writes.append({"phase": value, "thread": threading.current_thread().name})
+
+    def _resume_monitoring(self) -> None:
+        pass
+
+    def keep_until_exit(self, worker: threading.Thread) -> threading.Thread:
+        # ChoujiRobo と同じく、終了時 (_join_background) に待つスレッドとして控えます。
+        self._background.append(worker)
+        return worker
+
+    def _ensure_directory(self, path: Path) -> None:
+        Path(path).mkdir(parents=True, exist_ok=True)
+
+
+def _write_book(template: bytes, destination: Path, tehai_number: str) -> None:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(io.BytesIO(template))
+    workbook["RPAシート"][MARKER_CELL] = tehai_number
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    workbook.save(str(destination))
+
+
+def run_scenario(args: argparse.Namespace, depth: int, work_dir: Path) -> Dict[str, Any]:
+    import openpyxl
+
+    buffer = io.BytesIO()
+    template = openpyxl.Workbook()
+    template.active.title = "RPAシート"
+    template.save(buffer)
+
+    os.environ["LOCALAPPDATA"] = str(work_dir / "local")
+    robot = FakeRobot(work_dir)
+    seen_in_e: Dict[str, str] = {}
+    prefetching_in_e: Dict[str, bool] = {}
+
+    def run_a(case) -> None:
+        case.current_phase = "A.create_RPAsheet"
+        time.sleep(args.a_seconds)
+        if case.tehai_number in args.ask and not case.interactive:
+            raise OperatorInputRequired("メールの選択が必要です (候補 2 件)。")
+        _write_book(buffer.getvalue(), case.paths.rpa_book_destination, case.tehai_number)
+
+    def run_b(case) -> None:
+        case.current_phase = "B.find_my_boss"
+        time.sleep(args.b_seconds)
+        if case.tehai_number in args.fail:
+            raise RuntimeError("Graph から上長を取得できませんでした (テスト)。")
+
+    def run_e(case) -> bool:
+        case.current_phase = "E.create_email"
+        values = xlsx_package.read_cells(case.paths.rpa_book_destination, "RPAシート", [MARKER_CELL])
+        seen_in_e[case.tehai_number] = values[MARKER_CELL]
+        prefetching_in_e[case.tehai_number] = case.case_queue.prefetching()
+        # Ee の格納コピーの代わり
+        worker = threading.Thread(target=time.sleep, args=(0.05,), name=f"archive-{case.tehai_number}")
+        worker.start()
+        case.keep_until_exit(worker)
+        time.sleep(args.review_seconds)
+        case.current_phase = "Ef.last_dialog"
+        return True
+
+    queue = CaseQueue(
+        robot,
+        args.cases,
+        prefetch_depth=depth,
+        run_a=run_a,
+        run_b=run_b,
+        run_e=run_e,
+        summary_dir=work_dir / "summary",
+    )
+    started = time.perf_counter()
+    results = queue.run()
+    elapsed = time.perf_counter() - started
+    background_writes = [item for item in robot.phase_writes if item["thread"].startswith("case-prefetch")]
+    queue_dir = robot.paths.local_state_dir / "queue"
+    leftovers = sorted(path.name for path in queue_dir.glob("*") if path.is_dir())
+    return {
+        "background_on_robot": sorted(thread.name for thread in robot._background),
+        "background_on_robot_ok": len(robot._background) == len(seen_in_e),
+        "prefetch_depth": depth,
+        "seconds": round(elapsed, 2),
+        "cases": [
+            {
+                "tehai": result.tehai_number,
+                "success": result.success,
+                "prefetched": result.prefetched,
+                "waited_seconds": result.waited_seconds,
+                "book_in_e": seen_in_e.get(result.tehai_number),
+                "prefetching_in_e": prefetching_in_e.get(result.tehai_number),
+                "error": result.error,
+            }
+            for result in results
+        ],
+        "books_match": all(seen_in_e[number] == number for number in seen_in_e),
+        "phase_writes_from_prefetch": len(background_writes),
+        "monitoring_resumed": robot.root.scheduled.count("_resume_monitoring"),
+        "leftover_workspaces": leftovers,
+        "summary_files": sorted(path.name for path in (work_dir / "summary").glob("summary_*.json")),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Drive case_queue with fake A/B/E steps")
+    parser.add_argument("--cases", default="1117,1118,1119,1120", help="管理番号をカンマ区切りで")
+    parser.add_argument("--depth", type=int, default=1, help="先読みする件数")
+    parser.add_argument("--a-seconds", type=float, default=1.0, help="仮の A ステップの所要時間")
+    parser.add_argument("--b-seconds", type=float, default=1.5, help="仮の B ステップの所要時間")
+    parser.add_argument("--review-seconds", type=float, default=3.0, help="仮の E ステップ (確認作業) の所要時間")
+    parser.add_argument("--ask", default="", help="メール選択が必要な管理番号 (カンマ区切り)")
+    parser.add_argument("--fail", default="", help="B でエラーにする管理番号 (カンマ区切り)")
+    args = parser.parse_args(argv)
+    for name in ("cases", "ask", "fail"):
+        setattr(args, name, [item.strip() for item in getattr(args, name).split(",") if item.strip()])
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if importlib.util.find_spec("openpyxl") is None:
+        print("openpyxl をインストールしてください。", file=sys.stderr)
+        return 1
+    report: Dict[str, Any] = {}
+    for label, depth in (("serial", 0), ("prefetch", args.depth)):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            report[label] = run_scenario(args, depth, Path(temp_dir))
+    report["saved_seconds"] = round(report["serial"]["seconds"] - report["prefetch"]["seconds"], 2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    ok = report["prefetch"]["books_match"] and all(report[label]["background_on_robot_ok"] for label in ("serial", "prefetch"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+"""
+cc_rules_replay.py
+Be.Kachou_hantei の CC 判定ルール (cc_rules.json) を過去データで再生し、
+ルール変更で N 列のタグが変わるケースを一覧表示するスクリプトです。
+
+入力 (--cases): 1 行 1 ケースの JSONL
+  {"case": "2024-11-17_001", "rows": [[5, "担当"], [6, "課長"], [7, "部長"]],
+   "positions": ["課長", "部長"], "cells": {"N16": "※二次上司は必要"}}
+  rows は RPAシートの (行番号, M列の役職) で、先頭は本人行です。
+  --cases を省略すると合成データを生成します。
+
+比較:
+  --baseline と --rules の 2 つのルールファイルで評価し、結果が異なるケースを出力します。
+  --baseline 省略時は変更前の固定ロジック (キーワードのタプル) を基準にします。
+
+使い方:
+  python .\\cc_rules_replay.py --synthetic 20000
+  python .\\cc_rules_replay.py --cases .\\cc_cases.jsonl --rules ..\\B.find_my_boss\\cc_rules.json
+  python .\\cc_rules_replay.py --cases .\\cc_cases.jsonl --baseline .\\old_rules.json --rules .\\new_rules.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+import cc_rules  # noqa: E402
+from cc_rules import CaseInput, CcRuleEngine  # noqa: E402
+
+DEFAULT_RULES_PATH = ROBO_SCRIPTS_ROOT / "B.find_my_boss" / "cc_rules.json"
+TITLES = ["担当", "主任", "係長", "課長", "課長代理", "所長", "主幹", "部長", "本部長", "執行役員", "常務", "副社長", "社長", "監査役", ""]
+
+Tags = Dict[int, List[str]]
+
+
+def legacy_tags(case: CaseInput) -> Tags:
+    """The hard-coded logic Be.apply_cc_logic used before cc_rules.json."""
+
+    cc_keywords = ("課長", "所長", "主幹")
+    high_rank_keywords = ("社長", "副社長", "常務", "監査役", "執行役員", "本部長")
+    tags: Tags = {}
+
+    def _tag(row: int, tag: str) -> None:
+        current = tags.setdefault(row, [])
+        if tag not in current:
+            current.append(tag)
+
+    rows = list(case.rows)
+    bosses = rows[1:]
+    cc_row: Optional[int] = None
+    for idx, (row, title) in enumerate(bosses):
+        reference = case.positions[idx] if idx < len(case.positions) and case.positions[idx] else title
+        if reference and any(keyword in reference for keyword in cc_keywords):
+            _tag(row, "ccに含む")
+            cc_row = row
+            break
+    if cc_row is None and bosses:
+        cc_row = bosses[0][0]
+        _tag(cc_row, "ccに含む")
+    if case.cells.get("N16") == "※二次上司は必要" and cc_row is not None:
+        _tag(cc_row + 1, "ccに含む")
+    for row, title in rows:
+        if title and any(keyword in title for keyword in high_rank_keywords):
+            _tag(row, "上位役職")
+    return tags
+
+
+def load_cases(path: Path) -> List[Tuple[str, CaseInput]]:
+    cases: List[Tuple[str, CaseInput]] = []
+    for number, line in enumerate(path.read_text(encoding="utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        payload = json.loads(line)
+        rows = [(int(row), str(title or "")) for row, title in payload.get("rows") or []]
+        case = CaseInput(rows=rows, positions=[str(item or "") for item in payload.get("positions") or []], cells=payload.get("cells") or {})
+        cases.append((str(payload.get("case") or number), case))
+    return cases
+
+
+def synthetic_cases(count: int, seed: int) -> List[Tuple[str, CaseInput]]:
+    rng = random.Random(seed)
+    cases: List[Tuple[str, CaseInput]] = []
+    for number in range(count):
+        depth = rng.randint(1, 8)
+        rows = [(5 + index, rng.choice(TITLES)) for index in range(depth + 1)]
+        positions = [title for _, title in rows[1:]] if rng.random() < 0.7 else []
+        cells = {"N16": "※二次上司は必要"} if rng.random() < 0.2 else {}
+        cases.append((f"synthetic{number:05d}", CaseInput(rows=rows, positions=positions, cells=cells)))
+    return cases
+
+
+def _engine_evaluator(engine: CcRuleEngine) -> Callable[[Sequence[CaseInput]], List[Tags]]:
+    return lambda cases: [result.tags for result in engine.evaluate_many(cases)]
+
+
+def _legacy_evaluator(cases: Sequence[CaseInput]) -> List[Tags]:
+    return [legacy_tags(case) for case in cases]
+
+
+def timed(evaluate: Callable[[Sequence[CaseInput]], List[Tags]], cases: Sequence[CaseInput]) -> Tuple[List[Tags], float]:
+    started = time.perf_counter()
+    results = evaluate(cases)
+    return results, time.perf_counter() - started
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay CC routing rules against historical cases")
+    parser.add_argument("--cases", type=Path, help="過去ケースの JSONL")
+    parser.add_argument("--synthetic", type=int, default=5000, help="--cases 省略時に生成するケース数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", type=Path, help="基準にするルールファイル (省略時は変更前の固定ロジック)")
+    parser.add_argument("--rules", type=Path, default=DEFAULT_RULES_PATH, help="評価するルールファイル")
+    parser.add_argument("--show", type=int, default=20, help="表示する差分ケース数の上限")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    named = load_cases(args.cases) if args.cases else synthetic_cases(args.synthetic, args.seed)
+    cases = [case for _, case in named]
+
+    baseline = _engine_evaluator(CcRuleEngine.load(args.baseline)) if args.baseline else _legacy_evaluator
+    candidate = _engine_evaluator(CcRuleEngine.load(args.rules))
+    expected, baseline_seconds = timed(baseline, cases)
+    actual, candidate_seconds = timed(candidate, cases)
+
+    differences: List[Dict[str, Any]] = []
+    for (name, _), before, after in zip(named, expected, actual):
+        if before != after:
+            differences.append({"case": name, "baseline": before, "rules": after})
+    report = {
+        "cases": len(cases),
+        "automaton": "pyahocorasick" if cc_rules.ahocorasick is not None else "python",
+        "baseline": str(args.baseline or "legacy"),
+        "rules": str(args.rules),
+        "changed_cases": len(differences),
+        "baseline_cases_per_second": round(len(cases) / baseline_seconds) if baseline_seconds else None,
+        "rules_cases_per_second": round(len(cases) / candidate_seconds) if candidate_seconds else None,
+        "examples": differences[: args.show],
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,283 @@
+"""
+checkpoint_fake_run.py
+チェックポイントからの再開 (checkpoint.Checkpoint, main.py --resume) を、
+Excel・Outlook・Edge なしで確認するスクリプトです。
+
+A/B のタスクグラフ (A.create_RPAsheet.tasks() + B.find_my_boss.tasks()) の依存関係と
+読み書きするファイルは本番と同じ定義を使い、各タスクの処理は指定秒数の待機と
+一時フォルダ内のファイルへの書き込みに置き換えます。
+
+  - roundtrip : StepAState (選択したメールを含む) を保存・読み込みして値が戻ることを確認
+  - resume    : B.find_my_boss が失敗した後に再開し、A のタスクが復元されて
+                RPAブックを作る Ag 以降と B (サインインを含む) だけが
+                実行されること、最初からの実行との時間差を出力
+  - kanri_other : 管理表の別の行だけが変更されていれば、Ac が復元されること
+  - kanri_row   : 管理表のこの管理番号の行が変更されていれば、Ac と依存する全タスクが再実行されること
+  - working   : temp_弔事連絡票 が変更されていれば、それを作る Ae とその後のタスクが再実行されること
+
+所要時間は仮の値で、実測値ではありません。pywin32 と openpyxl が必要です (タスク本体は呼び出しません)。
+
+使い方:
+  python ./checkpoint_fake_run.py
+  python ./checkpoint_fake_run.py --scale 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import sys
+import tempfile
+import threading
+import time
+import types
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+from checkpoint import Checkpoint, state_from_dict, state_to_dict  # noqa: E402
+from common import MailEnvelope, RpaOutputs, StepAState  # noqa: E402
+from module_loader import load_helper  # noqa: E402
+from step_scheduler import StepScheduler, Task  # noqa: E402
+
+# 仮の所要時間 (秒)。step_scheduler_fake_run.py と同じ値です。
+DURATIONS = {
+    "Ac.KANRI_spreadsheet": 3.0,
+    "Ad.copy_rpa_book": 2.0,
+    "Ad.tehai_input_sheet": 6.0,
+    "Ae.get_mail": 5.0,
+    "Af.chouji_renraku_hyou": 3.0,
+    "Ag.make_RPA_book": 4.0,
+    "A.finish": 1.0,
+    "B.graph_login": 4.0,
+    "B.edge_warmup": 3.0,
+    "B.find_my_boss": 15.0,
+}
+COMPANY = "テスト株式会社"
+KANRI_ROWS = [
+    # 管理番号 (B), 会社名 (F), PIN (G), メール受信日時 (K)
+    ("1000", "別会社", "7654321", datetime(2024, 4, 30, 15, 0)),
+    ("1117", COMPANY, "1234567", datetime(2024, 5, 1, 9, 30)),
+]
+
+
+def _paths(root: Path) -> Any:
+    source = root / "source"
+    local = root / "local"
+    return types.SimpleNamespace(
+        kanri_report_book=source / "管理表.xlsx",
+        panasonic_rpa_book=lambda: source / "RPAブック下処理.xlsx",
+        company_input_sheet=lambda company: source / f"{company}手配入力シート.xlsx",
+        company_forms_sheet=lambda company: source / f"{company}_Forms転記シート.xlsx",
+        rpa_local_book=local / "RPAブック下処理.xlsx",
+        temp_forms_book=local / "temp_弔事連絡票.xlsx",
+        rpa_book_destination=root / "desktop" / "RPAブック.xlsx",
+        checkpoint_dir=root / "checkpoints",
+    )
+
+
+def _write_kanri(path: Path, rows: List[Any]) -> None:
+    import openpyxl
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["No", "管理番号", "", "", "", "会社名", "PIN", "", "", "", "受信日時"])
+    for number, (tehai, company, pin, mail_time) in enumerate(rows, start=1):
+        sheet.append([number, tehai, "", "", "", company, pin, "", "", "", mail_time])
+    workbook.save(str(path))
+
+
+def _prepare(root: Path) -> Any:
+    paths = _paths(root)
+    paths.kanri_report_book.parent.mkdir(parents=True, exist_ok=True)
+    _write_kanri(paths.kanri_report_book, KANRI_ROWS)
+    for path in (
+        paths.panasonic_rpa_book(),
+        paths.company_input_sheet(COMPANY),
+        paths.company_forms_sheet(COMPANY),
+    ):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(path.name, encoding="utf-8")
+    paths.rpa_local_book.parent.mkdir(parents=True, exist_ok=True)
+    paths.rpa_book_destination.parent.mkdir(parents=True, exist_ok=True)
+    return paths
+
+
+def build_tasks(scale: float, executed: List[str], fail: Optional[str] = None) -> List[Task]:
+    tasks = load_helper("A.create_RPAsheet").tasks() + load_helper("B.find_my_boss").tasks()
+    fake: List[Task] = []
+    for task in tasks:
+        seconds = DURATIONS.get(task.name, 1.0) * scale
+
+        def _run(robot: Any, task: Task = task, seconds: float = seconds) -> None:
+            executed.append(task.name)
+            time.sleep(seconds)
+            if task.name == fail:
+                raise RuntimeError(f"{task.name} で擬似的なエラー")
+            if task.name == "Ac.KANRI_spreadsheet":
+                robot.state.company_name = COMPANY
+                robot.state.pin = "1234567"
+                robot.state.mail_time = datetime(2024, 5, 1, 9, 30)
+            if task.name == "Ae.get_mail":
+                robot.state.selected_mail_entry = MailEnvelope(
+                    "00AA", "【弔事】連絡", "総務", datetime(2024, 5, 1, 9, 31), "本文", raw_item=object()
+                )
+            # 作成するタスクは書き直し、それ以外は追記します (本番の「作成して書き足す」と同じ)。
+            creators = {"Ad.copy_rpa_book", "Ae.get_mail", "Ag.make_RPA_book"}
+            for path in task.writes(robot) if task.writes is not None else ():
+                previous = "" if task.name in creators or not path.exists() else path.read_text(encoding="utf-8")
+                path.write_text(previous + task.name + "\n", encoding="utf-8")
+
+        timeout = task.timeout * scale if task.timeout is not None else None
+        fake.append(replace(task, run=_run, timeout=timeout))
+    return fake
+
+
+def _robot(paths: Any) -> Any:
+    return types.SimpleNamespace(
+        state=StepAState(tehai_number="1117", workflow_started_at=datetime.now()),
+        paths=paths,
+        stop_event=threading.Event(),
+        _safe_str=lambda value: "" if value is None else str(value).strip(),
+    )
+
+
+def run_case(robot: Any, tasks: List[Task], checkpoint: Optional[Checkpoint] = None) -> Dict[str, Any]:
+    """main._workflow_entrypoint の A/B 部分と同じ手順で実行します。"""
+
+    if checkpoint is None:
+        checkpoint = Checkpoint.for_robot(robot)
+    restored = checkpoint.restorable(robot, tasks) if checkpoint.resumed else set()
+    checkpoint.forget({task.name for task in tasks} - restored)
+    started = time.perf_counter()
+    error = ""
+    try:
+        StepScheduler(tasks).run(
+            robot,
+            restored=restored,
+            on_done=lambda task: checkpoint.task_done(robot, task),
+        )
+    except Exception as exc:
+        error = str(exc)
+    else:
+        # 本番では E の完了後に削除します。
+        checkpoint.delete()
+    return {
+        "seconds": round(time.perf_counter() - started, 2),
+        "restored": sorted(restored),
+        "error": error,
+    }
+
+
+def _failed_then_resumed(scale: float, root: Path, change: Optional[str]) -> Dict[str, Any]:
+    paths = _prepare(root)
+    executed: List[str] = []
+    first = run_case(_robot(paths), build_tasks(scale, executed, fail="B.find_my_boss"))
+    if change == "kanri_other":
+        _write_kanri(paths.kanri_report_book, [("1000", "別会社", "1111111", KANRI_ROWS[0][3]), KANRI_ROWS[1]])
+    elif change == "kanri_row":
+        _write_kanri(paths.kanri_report_book, [KANRI_ROWS[0], ("1117", COMPANY, "1234567", datetime(2024, 5, 1, 10, 0))])
+    elif change == "working":
+        paths.temp_forms_book.write_text("手で編集", encoding="utf-8")
+
+    robot = _robot(paths)
+    robot.state = StepAState()
+    checkpoint = Checkpoint.load(robot, "1117")
+    executed.clear()
+    second = run_case(robot, build_tasks(scale, executed), checkpoint)
+    second["executed"] = sorted(executed)
+    second["company_restored"] = robot.state.company_name == COMPANY
+    second["mail_time_restored"] = robot.state.mail_time == datetime(2024, 5, 1, 9, 30)
+    mail = robot.state.selected_mail_entry
+    second["mail_restored"] = mail is not None and mail.subject == "【弔事】連絡" and mail.raw_item is None
+    second["destination"] = paths.rpa_book_destination.read_text(encoding="utf-8").split()
+    return {"first": first, "resume": second}
+
+
+def roundtrip() -> Dict[str, Any]:
+    state = StepAState(
+        tehai_number="1117",
+        company_name=COMPANY,
+        mail_time=datetime(2024, 5, 1, 9, 30),
+        selected_mail_entry=MailEnvelope(
+            entry_id="00AA",
+            subject="【弔事】連絡",
+            sender="総務",
+            received_at=datetime(2024, 5, 1, 9, 31),
+            body="本文",
+            raw_item=object(),
+        ),
+        rpa_outputs=RpaOutputs(),
+        edge_process_pid=4321,
+    )
+    restored = state_from_dict(json.loads(json.dumps(state_to_dict(state), ensure_ascii=False)))
+    mail = restored.selected_mail_entry
+    return {
+        "company": restored.company_name == COMPANY,
+        "mail_time": restored.mail_time == state.mail_time,
+        "mail_subject": mail is not None and mail.subject == "【弔事】連絡",
+        "mail_received_at": mail is not None and mail.received_at == datetime(2024, 5, 1, 9, 31),
+        "raw_item_dropped": mail is not None and mail.raw_item is None,
+        "rpa_outputs": restored.rpa_outputs == state.rpa_outputs,
+        "edge_pid_dropped": restored.edge_process_pid != 4321,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Resume the step A/B task graph from a checkpoint")
+    parser.add_argument("--scale", type=float, default=0.1, help="所要時間に掛ける倍率 (既定 0.1 = 10 倍速)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    try:
+        build_tasks(args.scale, [])
+    except ImportError as exc:
+        print(f"A/B のモジュールを読み込めません (pywin32 が必要です): {exc}", file=sys.stderr)
+        return 1
+    if importlib.util.find_spec("openpyxl") is None:
+        print("openpyxl をインストールしてください。", file=sys.stderr)
+        return 1
+
+    report: Dict[str, Any] = {"scale": args.scale, "roundtrip": roundtrip()}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        full = run_case(_robot(_prepare(root / "full")), build_tasks(args.scale, []))
+        report["full_run_seconds"] = full["seconds"]
+        report["resume"] = _failed_then_resumed(args.scale, root / "resume", None)
+        report["kanri_other"] = _failed_then_resumed(args.scale, root / "kanri_other", "kanri_other")
+        report["kanri_row"] = _failed_then_resumed(args.scale, root / "kanri_row", "kanri_row")
+        report["working"] = _failed_then_resumed(args.scale, root / "working", "working")
+        report["deleted_after_success"] = not (root / "resume" / "checkpoints" / "1117.json").exists()
+
+    resume = report["resume"]["resume"]
+    checks = dict(report["roundtrip"])
+    checks["resume_runs_b_and_its_file_writers"] = set(resume["executed"]) == {
+        "Ag.make_RPA_book",
+        "A.finish",
+        "B.graph_login",
+        "B.find_my_boss",
+    }
+    checks["resume_state_restored"] = all(resume[key] for key in ("company_restored", "mail_time_restored", "mail_restored"))
+    checks["checkpoint_deleted_after_success"] = report["deleted_after_success"]
+    checks["kanri_other_row_keeps_ac"] = "Ac.KANRI_spreadsheet" in report["kanri_other"]["resume"]["restored"]
+    checks["kanri_case_row_reruns_everything"] = {"Ac.KANRI_spreadsheet", "Ae.get_mail", "Ad.tehai_input_sheet"} <= set(
+        report["kanri_row"]["resume"]["executed"]
+    )
+    checks["working_file_rebuilt"] = {"Ae.get_mail", "Af.chouji_renraku_hyou"} <= set(
+        report["working"]["resume"]["executed"]
+    ) and "Ac.KANRI_spreadsheet" not in report["working"]["resume"]["executed"]
+    report["checks"] = checks
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
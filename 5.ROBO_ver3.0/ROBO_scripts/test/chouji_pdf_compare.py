@@ -0,0 +1,190 @@
+"""
+chouji_pdf_compare.py
+chouji_pdf (Excel を使わない 弔事連絡票 の PDF 描画) の所要時間を計測し、
+Excel の ExportAsFixedFormat で作成した見本 PDF と比較するスクリプトです。
+
+比較内容:
+  - 1 件あたりの描画時間、--parallel 件を同時に描画したときの合計時間
+  - ページサイズ
+  - 抽出テキスト (pypdf がある場合): 見本にあって描画結果に無い文字列 / その逆
+
+使い方:
+  python .\\chouji_pdf_compare.py --book "...\\2. RPAブック\\RPAブック.xlsx" --sample "...\\2. RPAブック\\1117 ... 弔事連絡票.pdf"
+  python .\\chouji_pdf_compare.py --synthetic --parallel 8
+
+--sample を省略すると 2. RPAブック フォルダ内の「*弔事連絡票.pdf」を探します。
+--synthetic は罫線・結合セル・日付を含む仮のブックを作成して計測します (見本比較なし)。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+import chouji_pdf  # noqa: E402
+from common import PathRegistry  # noqa: E402
+
+try:
+    from pypdf import PdfReader
+except Exception:  # pragma: no cover - optional dependency
+    PdfReader = None  # type: ignore[assignment]
+
+
+def build_synthetic_book(path: Path, sheet_name: str) -> Path:
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = sheet_name
+    thin = Side(style="thin")
+    box = Border(left=thin, right=thin, top=thin, bottom=thin)
+    sheet.column_dimensions["A"].width = 4
+    sheet.column_dimensions["B"].width = 18
+    for letter in "CDEF":
+        sheet.column_dimensions[letter].width = 14
+    sheet.merge_cells("B2:F2")
+    sheet["B2"] = "弔 事 連 絡 票"
+    sheet["B2"].font = Font(size=18, bold=True)
+    sheet["B2"].alignment = Alignment(horizontal="center", vertical="center")
+    sheet.row_dimensions[2].height = 32
+    rows = [
+        ("手配番号", "T-20241117-001"),
+        ("会社名", "パナソニック テスト株式会社"),
+        ("所属", "くらし事業本部 空質空調社 技術部 設計課"),
+        ("社員氏名", "山田　太郎"),
+        ("続柄", "実父"),
+        ("ご逝去日", datetime(2024, 11, 15)),
+        ("通夜", datetime(2024, 11, 17, 18, 0)),
+        ("告別式", datetime(2024, 11, 18, 11, 0)),
+        ("式場", "〇〇会館 大ホール（〇〇市〇〇町1-2-3）"),
+        ("備考", "供花・弔電は辞退されています。\n香典は受け付けます。"),
+    ]
+    for offset, (label, value) in enumerate(rows):
+        row = 4 + offset
+        sheet.cell(row, 2, label).fill = PatternFill("solid", fgColor="DDEBF7")
+        sheet.cell(row, 3, value)
+        sheet.merge_cells(start_row=row, start_column=3, end_row=row, end_column=6)
+        sheet.cell(row, 3).alignment = Alignment(wrap_text=True, vertical="top")
+        sheet.cell(row, 3).number_format = "yyyy年m月d日"
+        for column in range(2, 7):
+            sheet.cell(row, column).border = box
+    sheet.row_dimensions[13].height = 40
+    sheet.print_area = "A1:F14"
+    rpa = workbook.create_sheet("RPAシート")
+    rpa["D13"] = "1117_テスト株式会社_弔事連絡票"
+    workbook.save(str(path))
+    return path
+
+
+def _render(args: tuple) -> float:
+    book, sheet_name, pdf_path = args
+    started = time.perf_counter()
+    chouji_pdf.render_sheet_pdf(Path(book), sheet_name, Path(pdf_path))
+    return time.perf_counter() - started
+
+
+def _pdf_facts(path: Path) -> Dict[str, Any]:
+    facts: Dict[str, Any] = {"bytes": path.stat().st_size}
+    if PdfReader is None:
+        return facts
+    reader = PdfReader(str(path))
+    page = reader.pages[0]
+    facts["pages"] = len(reader.pages)
+    facts["page_size"] = [round(float(page.mediabox.width)), round(float(page.mediabox.height))]
+    facts["text"] = "\n".join((p.extract_text() or "") for p in reader.pages)
+    return facts
+
+
+def _tokens(text: str) -> Set[str]:
+    return {token for token in text.replace("　", " ").split() if token}
+
+
+def _find_sample() -> Optional[Path]:
+    folder = PathRegistry().rpa_book_dir
+    if not folder.exists():
+        return None
+    matches = sorted(folder.glob("*弔事連絡票.pdf"))
+    return matches[0] if matches else None
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare chouji_pdf output with an Excel-exported sample")
+    parser.add_argument("--book", type=Path, help="RPAブック.xlsx (Excel で保存済みのもの)")
+    parser.add_argument("--sheet", default="弔事連絡票")
+    parser.add_argument("--sample", type=Path, help="Excel で出力した見本 PDF")
+    parser.add_argument("--out", type=Path, help="出力先フォルダ (省略時は一時フォルダ)")
+    parser.add_argument("--parallel", type=int, default=4, help="同時に描画する件数")
+    parser.add_argument("--synthetic", action="store_true", help="仮のブックを作成して計測します。")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if not chouji_pdf.available():
+        print("openpyxl と reportlab をインストールしてください。", file=sys.stderr)
+        return 1
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_dir = args.out or Path(temp_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        if args.synthetic:
+            book = build_synthetic_book(out_dir / "synthetic_RPAブック.xlsx", args.sheet)
+        elif args.book:
+            book = args.book
+        else:
+            book = PathRegistry().rpa_book_destination
+        if not book.exists():
+            print(f"ブックが見つかりません: {book}", file=sys.stderr)
+            return 1
+
+        pdf_path = out_dir / "chouji_pdf_render.pdf"
+        first = _render((str(book), args.sheet, str(pdf_path)))
+        warm = _render((str(book), args.sheet, str(pdf_path)))
+        jobs = [(str(book), args.sheet, str(out_dir / f"parallel_{index}.pdf")) for index in range(args.parallel)]
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.parallel) as pool:
+            per_job = list(pool.map(_render, jobs))
+        parallel_wall = time.perf_counter() - started
+
+        report: Dict[str, Any] = {
+            "book": str(book),
+            "output": str(pdf_path),
+            "first_render_seconds": round(first, 3),
+            "warm_render_seconds": round(warm, 3),
+            "parallel": {"jobs": args.parallel, "wall_seconds": round(parallel_wall, 3), "max_job_seconds": round(max(per_job), 3)},
+        }
+        rendered = _pdf_facts(pdf_path)
+        sample = None if args.synthetic else (args.sample or _find_sample())
+        if sample is not None and sample.exists():
+            expected = _pdf_facts(sample)
+            report["sample"] = str(sample)
+            report["page_size"] = {"sample": expected.get("page_size"), "rendered": rendered.get("page_size")}
+            if "text" in expected and "text" in rendered:
+                want, got = _tokens(expected["text"]), _tokens(rendered["text"])
+                report["text"] = {
+                    "sample_tokens": len(want),
+                    "matched": len(want & got),
+                    "missing": sorted(want - got)[:50],
+                    "extra": sorted(got - want)[:50],
+                }
+            else:
+                report["text"] = "pypdf が無いためテキスト比較を省略しました。"
+        else:
+            report["rendered"] = {key: value for key, value in rendered.items() if key != "text"}
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,180 @@
+"""
+department_match_bench.py
+PHONE APPLI の同姓同名候補から部署名で 1 件を選ぶ処理について、
+旧スコア (difflib.SequenceMatcher で部署文字列全体を比較) と
+department_match (NFKC 正規化 + 階層トークン + token-set/編集距離) の
+正解率と 1 回あたりの処理時間を比較します。
+
+入力:
+  --cases   : phoneappli_replay.py record で保存したケース (candidates を含むもの)。
+              正解は expected_index があればそれ、なければ記録時に選ばれた selected_index です。
+  指定なし  : 全角/半角・区切り文字・「G」表記ゆれ・上位組織の省略を含む合成データ。
+
+使い方:
+  python .\\department_match_bench.py
+  python .\\department_match_bench.py --sets 2000 --candidates 6 --seed 3
+  python .\\department_match_bench.py --cases .\\phoneappli_cases
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+import unicodedata
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+TEST_DIR = Path(__file__).resolve().parent
+if str(TEST_DIR) not in sys.path:
+    sys.path.append(str(TEST_DIR))
+
+import department_match  # noqa: E402
+from module_loader import load_helper  # noqa: E402
+
+HEADQUARTERS = ["空調営業本部", "くらし事業本部", "技術開発本部", "生産本部", "管理本部"]
+DIVISIONS = ["技術部", "企画部", "品質保証部", "営業部", "設計部", "部品開発部"]
+SECTIONS = ["第一課", "第二課", "設計課", "試験課", "システムグループ", "業務グループ"]
+
+# (department, [candidate division texts], index of the right candidate)
+CandidateSet = Tuple[str, List[str], int]
+
+
+def _to_halfwidth_kana(text: str) -> str:
+    """Half-width katakana as pasted from some legacy systems."""
+
+    table = {chr(code): unicodedata.normalize("NFKC", chr(code)) for code in range(0xFF66, 0xFF9E)}
+    reverse = {value: key for key, value in table.items() if len(value) == 1}
+    return "".join(reverse.get(ch, ch) for ch in text)
+
+
+def _variant(rng: random.Random, levels: Sequence[str]) -> str:
+    """Render one department path the way PHONE APPLI or the sheet might."""
+
+    parts = list(levels)
+    if len(parts) > 2 and rng.random() < 0.3:
+        parts = parts[1:]
+    parts = [part.replace("グループ", "G") if rng.random() < 0.4 else part for part in parts]
+    if rng.random() < 0.3:
+        parts = [_to_halfwidth_kana(part) for part in parts]
+    separator = rng.choice([" ", "　", "/", " > ", ""])
+    text = separator.join(parts)
+    if rng.random() < 0.3:
+        text = unicodedata.normalize("NFKC", text).translate({ord(ch): ord(ch) + 0xFEE0 for ch in "0123456789"})
+    return text
+
+
+def synthetic_sets(count: int, candidates: int, seed: int) -> List[CandidateSet]:
+    rng = random.Random(seed)
+    sets: List[CandidateSet] = []
+    for _ in range(count):
+        target = (rng.choice(HEADQUARTERS), rng.choice(DIVISIONS), rng.choice(SECTIONS))
+        # Namesakes are mostly in neighbouring units: same HQ or same division.
+        others: List[Tuple[str, str, str]] = []
+        while len(others) < candidates - 1:
+            other = (
+                target[0] if rng.random() < 0.6 else rng.choice(HEADQUARTERS),
+                target[1] if rng.random() < 0.5 else rng.choice(DIVISIONS),
+                rng.choice(SECTIONS),
+            )
+            if other != target and other not in others:
+                others.append(other)
+        texts = [_variant(rng, other) for other in others]
+        answer = rng.randrange(candidates)
+        texts.insert(answer, _variant(rng, target))
+        department = " ".join(target) if rng.random() < 0.5 else "".join(target[1:])
+        sets.append((department, texts, answer))
+    return sets
+
+
+def recorded_sets(cases_dir: Path) -> List[CandidateSet]:
+    from phoneappli_replay import load_cases
+
+    sets: List[CandidateSet] = []
+    for case in load_cases(cases_dir):
+        candidates = case.get("candidates") or []
+        answer = case.get("expected_index", case.get("selected_index"))
+        if len(candidates) < 2 or answer is None or not case.get("department"):
+            continue
+        indexes = [int(item.get("index", position)) for position, item in enumerate(candidates)]
+        if int(answer) not in indexes:
+            continue
+        texts = [str(item.get("division_text") or item.get("description") or "") for item in candidates]
+        sets.append((str(case["department"]), texts, indexes.index(int(answer))))
+    return sets
+
+
+def legacy_select(department: str, texts: Sequence[str]) -> int:
+    """The scorer Bd used before department_match: whole-string SequenceMatcher."""
+
+    norm_department = department.strip()
+    best_index, best_score = 0, -1.0
+    for index, text in enumerate(texts):
+        score = SequenceMatcher(None, text.strip(), norm_department).ratio() if text else 0.0
+        if score > best_score:
+            best_index, best_score = index, score
+    return best_index
+
+
+def make_current_select(bd: Any) -> Callable[[str, Sequence[str]], int]:
+    def _select(department: str, texts: Sequence[str]) -> int:
+        candidates = [bd.Candidate(container=None, description="", division_text=text, position_preview="", index=i) for i, text in enumerate(texts)]
+        chosen = bd._select_best_candidate(candidates, department)
+        return chosen.index if chosen is not None else 0
+
+    return _select
+
+
+def measure(select: Callable[[str, Sequence[str]], int], sets: Sequence[CandidateSet], repeat: int) -> Dict[str, Any]:
+    correct = sum(1 for department, texts, answer in sets if select(department, texts) == answer)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for department, texts, _answer in sets:
+            select(department, texts)
+    elapsed = time.perf_counter() - started
+    calls = max(1, repeat * len(sets))
+    return {
+        "accuracy": round(correct / len(sets), 4) if sets else None,
+        "correct": correct,
+        "us_per_selection": round(elapsed / calls * 1_000_000, 1),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Department similarity benchmark")
+    parser.add_argument("--cases", help="phoneappli_replay.py で記録したケースのフォルダ")
+    parser.add_argument("--sets", type=int, default=1000, help="合成データの件数")
+    parser.add_argument("--candidates", type=int, default=4, help="合成データ 1 件あたりの候補数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5, help="処理時間計測の繰り返し回数")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    sets = recorded_sets(Path(args.cases)) if args.cases else synthetic_sets(args.sets, args.candidates, args.seed)
+    if not sets:
+        print("比較できる候補セットがありません (candidates を含むケースを記録してください)。", file=sys.stderr)
+        return 1
+    bd = load_helper("Bd.find_job_title")
+    # Logging per candidate would dominate the timing.
+    bd.LOGGER.disabled = True
+    report = {
+        "source": args.cases or "synthetic",
+        "sets": len(sets),
+        "backend": department_match.BACKEND,
+        "legacy": measure(legacy_select, sets, args.repeat),
+        "department_match": measure(make_current_select(bd), sets, args.repeat),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
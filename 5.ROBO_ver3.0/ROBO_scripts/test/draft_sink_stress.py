@@ -0,0 +1,155 @@
+"""
+draft_sink_stress.py
+draft_sink の書き出し性能を測るストレステストです。
+
+既定では 1000 件の下書きを作成し、次を出力します。
+  - eml     : EmlDraftSink (スプールフォルダへ .eml を書き出し)
+  - fake    : OutlookDraftSink + FakeOutlookSession (Outlook COM 呼び出し部分の上限の目安)
+それぞれの件数/秒、1 件あたりの p50/p95、tracemalloc のピークメモリ (別途 10 件で測定)
+(添付を読み込まずに流しているかの確認) と、1 件目の .eml を email パーサーで
+読み戻して宛先・件名・本文・添付が一致するかの検証結果です。
+
+使い方:
+  python ./draft_sink_stress.py
+  python ./draft_sink_stress.py --count 1000 --attachment-mb 5 --workers 4 --spool "C:\\temp\\spool"
+"""
+
+from __future__ import annotations
+
+import argparse
+import email
+import email.policy
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+from draft_sink import Draft, EmlDraftSink, OutlookDraftSink  # noqa: E402
+from outlook_session import FakeOutlookSession  # noqa: E402
+
+
+def _make_attachment(directory: Path, size_mb: float) -> Path:
+    path = directory / "1117_テスト株式会社_弔事連絡票.pdf"
+    remaining = int(size_mb * 1024 * 1024)
+    with open(path, "wb") as stream:
+        stream.write(b"%PDF-1.4\n")
+        while remaining > 0:
+            block = os.urandom(min(remaining, 1024 * 1024))
+            stream.write(block)
+            remaining -= len(block)
+    return path
+
+
+def _draft(index: int, attachment: Path) -> Draft:
+    return Draft(
+        to=f"boss{index}@example.com; jinji@example.com",
+        subject=f"【弔事連絡】テスト株式会社 山田 太郎 様 ご尊父様ご逝去のお知らせ ({index})",
+        cc="kachou@example.com",
+        bcc="archive@example.com",
+        body="関係各位\n\nお疲れ様です。\n下記の通り弔事が発生しましたのでご連絡いたします。\n" * 5,
+        attachment=attachment,
+    )
+
+
+def _peak_memory(sink: Any, attachment: Path, samples: int) -> float:
+    # tracemalloc slows every allocation down, so it is measured on a separate short run.
+    tracemalloc.start()
+    for index in range(samples):
+        sink.save(_draft(index, attachment))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / (1024 * 1024), 2)
+
+
+def _run(sink: Any, count: int, workers: int, attachment: Path) -> Dict[str, Any]:
+    latencies: List[float] = []
+
+    def _one(index: int) -> float:
+        started = time.perf_counter()
+        sink.save(_draft(index, attachment))
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            latencies = list(pool.map(_one, range(count)))
+    else:
+        latencies = [_one(index) for index in range(count)]
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "drafts": count,
+        "seconds": round(elapsed, 3),
+        "drafts_per_second": round(count / elapsed, 1) if elapsed else None,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000, 3),
+        "peak_traced_mb": _peak_memory(sink, attachment, min(count, 10)),
+    }
+
+
+def _verify_eml(path: Path, expected: Draft) -> Dict[str, Any]:
+    with open(path, "rb") as stream:
+        message = email.message_from_binary_file(stream, policy=email.policy.default)
+    body = message.get_body(preferencelist=("plain",))
+    attachments = list(message.iter_attachments())
+    payload = attachments[0].get_payload(decode=True) if attachments else b""
+    return {
+        "to": str(message["To"]),
+        "subject_ok": str(message["Subject"]) == expected.subject,
+        "body_ok": body is not None and body.get_content().replace("\r\n", "\n") == expected.body,
+        "x_unsent": str(message["X-Unsent"]),
+        "attachment_name": attachments[0].get_filename() if attachments else None,
+        "attachment_ok": hashlib.sha256(payload).hexdigest()
+        == hashlib.sha256(expected.attachment.read_bytes()).hexdigest(),  # type: ignore[union-attr]
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Draft sink stress test")
+    parser.add_argument("--count", type=int, default=1000, help="作成する下書きの件数")
+    parser.add_argument("--attachment-mb", type=float, default=1.0, help="添付 PDF のサイズ (MB)")
+    parser.add_argument("--workers", type=int, default=1, help="同時に書き出すスレッド数")
+    parser.add_argument("--spool", type=Path, help=".eml の出力先 (省略時は一時フォルダ)")
+    parser.add_argument("--keep", action="store_true", help="作成した .eml を削除せずに残します。")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work = Path(temp_dir)
+        attachment = _make_attachment(work, args.attachment_mb)
+        spool = args.spool or work / "spool"
+        eml_sink = EmlDraftSink(spool)
+        report: Dict[str, Any] = {
+            "attachment_mb": args.attachment_mb,
+            "workers": args.workers,
+            "eml": _run(eml_sink, args.count, args.workers, attachment),
+            "fake": _run(OutlookDraftSink(FakeOutlookSession()), args.count, args.workers, attachment),
+        }
+        files = sorted(spool.glob("*.eml"))
+        report["eml"]["files"] = len(files)
+        report["eml"]["bytes_per_file"] = files[0].stat().st_size if files else 0
+        if files:
+            sample = eml_sink.save(_draft(0, attachment))
+            report["verify"] = _verify_eml(Path(sample.entry_id), _draft(0, attachment))
+        if not args.keep and args.spool:
+            for path in spool.glob("*.eml"):
+                path.unlink()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
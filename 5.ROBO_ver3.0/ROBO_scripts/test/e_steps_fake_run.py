@@ -0,0 +1,154 @@
+"""
+e_steps_fake_run.py
+Outlook・Excel・画面操作なしで E ステップ (Ea → Eb → Ec → 再作成ループ) を通しで動かすスクリプトです。
+
+  - Outlook は outlook_session.FakeOutlookSession (メモリ上の下書き)
+  - PDF は chouji_pdf (Excel 不使用)、xlsx は xlsx_package で作成
+  - Ec の確認ダイアログは --actions の順に「次に進む / PDF変更」を自動で選択
+  - 「PDF変更」時の修正内容は --edits で指定 (none / mail / sheet / name)
+    name は D13 (ファイル名) を変更し、古い PDF/xlsx が後片付けで消えることを確認します
+  - 出力フォルダには前回の出力 (旧出力.pdf) と、ロボ以外のファイル (メモ.txt, 個人用/) を置いておき、
+    前者だけが削除されることを確認します
+  - Ed/Ee/Ef (ログ書き込み・格納・最終ダイアログ) は呼び出し回数だけ記録
+
+Linux でも動作します (openpyxl と reportlab が必要)。
+
+使い方:
+  python ./e_steps_fake_run.py
+  python ./e_steps_fake_run.py --actions redo,redo,next --edits none,sheet
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+import chouji_pdf  # noqa: E402
+from artifact_manifest import default_cleaner  # noqa: E402
+from common import StepAState  # noqa: E402
+from module_loader import load_helper  # noqa: E402
+from outlook_session import FakeOutlookSession  # noqa: E402
+from xlsx_extract_check import build_synthetic_book  # noqa: E402
+
+
+def _edit_book(book: Path, kind: str, round_no: int) -> None:
+    if kind == "none":
+        return
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(str(book))
+    if kind == "mail":
+        workbook["RPAシート"]["D3"] = f"boss{round_no}@example.com"
+    elif kind == "sheet":
+        workbook["弔事連絡票"]["C12"] = f"〇〇会館 第{round_no}ホール"
+    elif kind == "name":
+        workbook["RPAシート"]["D13"] = f"1117_テスト株式会社_弔事連絡票_{round_no}"
+    workbook.save(str(book))
+
+
+def run_scenario(actions: List[str], edits: List[str], work_dir: Path) -> Dict[str, Any]:
+    os.environ["CHOUJI_ARTIFACT_MANIFEST"] = str(work_dir.parent / f"{work_dir.name}_manifest.json")
+    book = build_synthetic_book(work_dir / "RPAブック.xlsx")
+    (work_dir / "旧出力.pdf").write_bytes(b"%PDF-1.4\n")
+    (work_dir / "メモ.txt").write_text("ロボ以外のファイル", encoding="utf-8")
+    (work_dir / "個人用").mkdir()
+    session = FakeOutlookSession()
+    calls: Dict[str, int] = {"Ed": 0, "Ee": 0, "Ef": 0}
+    passes: List[Dict[str, Any]] = []
+    robot = types.SimpleNamespace(
+        state=StepAState(),
+        paths=types.SimpleNamespace(rpa_book_dir=work_dir, rpa_book_destination=book),
+        outlook=session,
+        root=None,
+        current_phase="",
+        _ensure_directory=lambda path: Path(path).mkdir(parents=True, exist_ok=True),
+        _safe_str=lambda value: "" if value is None else str(value).strip(),
+    )
+
+    ea = load_helper("Ea.create_excel_PDF")
+    ec = load_helper("Ec.show_mail_and_PDF")
+    ea.PDF_RENDERER = "python"
+    script = iter(actions)
+    edit_script = iter(edits)
+    pass_started = [time.perf_counter()]
+
+    def _dialog(_robot) -> str:
+        draft = session.get_item(robot.state.outlook_draft_entry_id)
+        passes.append(
+            {
+                "seconds": round(time.perf_counter() - pass_started[0], 3),
+                "draft": draft.EntryID,
+                "draft_saves": draft.save_count,
+                "attachments": [item.FileName for item in draft.Attachments.items],
+                "to": draft.To,
+            }
+        )
+        return next(script, "next")
+
+    def _edit(_robot) -> None:
+        _edit_book(book, next(edit_script, "none"), len(passes))
+        pass_started[0] = time.perf_counter()
+
+    ec._show_main_dialog = _dialog
+    ec._prompt_pdf_edit = _edit
+    ec._launch_pdf_with_edge = lambda path, _robot: None
+    ec._close_edge = lambda _robot: None
+
+    def _counter(name: str):
+        def _run(_robot, **_kwargs) -> None:
+            calls[name] += 1
+
+        return _run
+
+    load_helper("Ed.error_log").run = _counter("Ed")
+    load_helper("Ee.kakunou").run = _counter("Ee")
+    load_helper("Ef.last_dialog").run = _counter("Ef")
+
+    success = load_helper("E.create_email").run(robot)
+    default_cleaner().wait()
+    return {
+        "success": success,
+        "error": robot.state.workflow_error,
+        "passes": passes,
+        "drafts_created": len(session.drafts),
+        "after_steps": calls,
+        "outputs": sorted(path.name for path in work_dir.iterdir() if path.name != book.name),
+        "manifest": sorted(default_cleaner().owned(work_dir) or []),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Drive step E end-to-end with a fake Outlook session")
+    parser.add_argument("--actions", default="redo,redo,redo,redo,next", help="Ec で選ぶボタン (redo/next) をカンマ区切りで")
+    parser.add_argument("--edits", default="none,mail,sheet,name", help="PDF変更ごとの修正 (none/mail/sheet/name) をカンマ区切りで")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if not chouji_pdf.available():
+        print("openpyxl と reportlab をインストールしてください。", file=sys.stderr)
+        return 1
+    actions = [item.strip() for item in args.actions.split(",") if item.strip()]
+    edits = [item.strip() for item in args.edits.split(",") if item.strip()]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir) / "2. RPAブック"
+        work_dir.mkdir()
+        report = run_scenario(actions, edits, work_dir)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["success"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,359 @@
+"""
+graph_throttle_mock.py
+Microsoft Graph を模したローカルのスロットリング・モックサーバーと、
+graph_client.GraphClient のスケジューラ計測用ベンチマークです。
+
+モックサーバー:
+  - /v1.0/users/{upn} と /v1.0/users/{upn}/manager を合成組織図から返します
+    (user{i}@example.test の上司は user{(i-1)//fanout}@example.test)。
+  - 秒間リクエスト数が --server-rate を超えると 429 + Retry-After を返します。
+  - --error-rate の割合でランダムに 503 を返します。
+  - POST /v1.0/$batch ではサブリクエストごとに上記の判定を行います。
+  - --broken-upn に指定したユーザーの上司取得は常に 500 を返します。
+
+--bench-chains では、取得した上司チェーンが合成組織図どおりかを確認します
+(途中で失敗した上司を欠けたまま返していないか)。--broken-upn を指定すると、
+resolve_many が欠けたチェーンを返さずにエラーになることを確認します。
+
+使い方:
+  python .\\graph_throttle_mock.py --serve --port 8765
+  python .\\graph_throttle_mock.py --bench --users 200 --lookups 1000 --threads 32
+  python .\\graph_throttle_mock.py --bench-chains --users 2000 --lookups 300
+  python .\\graph_throttle_mock.py --bench-chains --error-rate 0.2
+  python .\\graph_throttle_mock.py --bench-chains --broken-upn user5@example.test
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+from graph_client import GraphClient, GraphRequestError  # noqa: E402
+from module_loader import load_helper  # noqa: E402
+
+
+class MockDirectory:
+    """Synthetic org chart: a tree with the given fan-out rooted at user0."""
+
+    def __init__(self, users: int, fanout: int = 4, domain: str = "example.test") -> None:
+        self.users = users
+        self.fanout = max(1, fanout)
+        self.domain = domain
+
+    def index_of(self, upn: str) -> Optional[int]:
+        name = upn.split("@", 1)[0].lower()
+        if not name.startswith("user"):
+            return None
+        try:
+            index = int(name[4:])
+        except ValueError:
+            return None
+        return index if 0 <= index < self.users else None
+
+    def user(self, index: int) -> Dict[str, Any]:
+        depth = 0
+        cursor = index
+        while cursor > 0:
+            cursor = (cursor - 1) // self.fanout
+            depth += 1
+        titles = ["社長", "本部長", "部長", "課長", "主任"]
+        upn = f"user{index}@{self.domain}"
+        return {
+            "id": f"00000000-0000-0000-0000-{index:012d}",
+            "displayName": f"User {index}",
+            "mail": upn,
+            "userPrincipalName": upn,
+            "jobTitle": titles[min(depth, len(titles) - 1)],
+            "department": f"部門{depth}",
+            "companyName": "Example",
+        }
+
+    def manager_of(self, index: int) -> Optional[int]:
+        if index <= 0:
+            return None
+        return (index - 1) // self.fanout
+
+
+class MockGraphServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        directory: MockDirectory,
+        rate: float,
+        error_rate: float,
+        latency: float,
+        broken: Sequence[str] = (),
+    ) -> None:
+        super().__init__(address, MockGraphHandler)
+        self.broken = {upn.lower() for upn in broken}
+        self.directory = directory
+        self.rate = rate
+        self.error_rate = error_rate
+        self.latency = latency
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "throttled": 0, "errors": 0, "ok": 0}
+
+    def admit(self) -> Optional[int]:
+        """Return a Retry-After value when the request exceeds the rate, else None."""
+
+        with self.lock:
+            self.counters["requests"] += 1
+            now = time.monotonic()
+            if now - self.window_start >= 1.0:
+                self.window_start = now
+                self.window_count = 0
+            self.window_count += 1
+            if self.window_count > self.rate:
+                self.counters["throttled"] += 1
+                return 1
+        return None
+
+    def resolve(self, path: str) -> Tuple[int, Any]:
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if len(parts) < 3 or parts[0] != "v1.0" or parts[1] != "users":
+            return 404, {"error": {"code": "Request_ResourceNotFound"}}
+        index = self.directory.index_of(parts[2])
+        if index is None:
+            return 404, {"error": {"code": "Request_ResourceNotFound"}}
+        if len(parts) == 3:
+            return 200, self.directory.user(index)
+        if len(parts) == 4 and parts[3] == "manager":
+            manager = self.directory.manager_of(index)
+            if manager is None:
+                return 404, {"error": {"code": "Request_ResourceNotFound"}}
+            return 200, self.directory.user(manager)
+        return 404, {"error": {"code": "Request_ResourceNotFound"}}
+
+    def handle_batch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        responses = []
+        for item in body.get("requests") or []:
+            request_id = item.get("id")
+            retry_after = self.admit()
+            if retry_after is not None:
+                responses.append({"id": request_id, "status": 429, "headers": {"Retry-After": str(retry_after)}, "body": None})
+                continue
+            path = "/v1.0" + urlparse(str(item.get("url") or "")).path
+            parts = [unquote(part).lower() for part in path.strip("/").split("/")]
+            if len(parts) == 4 and parts[2] in self.broken:
+                with self.lock:
+                    self.counters["errors"] += 1
+                responses.append({"id": request_id, "status": 500, "headers": {}, "body": {"error": {"code": "generalException"}}})
+                continue
+            if self.error_rate and random.random() < self.error_rate:
+                with self.lock:
+                    self.counters["errors"] += 1
+                responses.append({"id": request_id, "status": 503, "headers": {}, "body": {"error": {"code": "serviceNotAvailable"}}})
+                continue
+            status, payload = self.resolve(path)
+            if status == 200:
+                with self.lock:
+                    self.counters["ok"] += 1
+            responses.append({"id": request_id, "status": status, "headers": {}, "body": payload})
+        return {"responses": responses}
+
+
+class MockGraphHandler(BaseHTTPRequestHandler):
+    server: MockGraphServer
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - BaseHTTPRequestHandler API
+        return
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802 - BaseHTTPRequestHandler API
+        retry_after = self.server.admit()
+        if retry_after is not None:
+            self._send_json(429, {"error": {"code": "TooManyRequests"}}, {"Retry-After": str(retry_after)})
+            return
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            with self.server.lock:
+                self.server.counters["errors"] += 1
+            self._send_json(503, {"error": {"code": "serviceNotAvailable"}})
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        status, payload = self.server.resolve(urlparse(self.path).path)
+        if status == 200:
+            with self.server.lock:
+                self.server.counters["ok"] += 1
+        self._send_json(status, payload)
+
+    def do_POST(self) -> None:  # noqa: N802 - BaseHTTPRequestHandler API
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if urlparse(self.path).path.rstrip("/") != "/v1.0/$batch":
+            self._send_json(404, {"error": {"code": "Request_ResourceNotFound"}})
+            return
+        with self.server.lock:
+            self.server.counters["batches"] = self.server.counters.get("batches", 0) + 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self._send_json(200, self.server.handle_batch(body))
+
+
+def start_server(
+    port: int,
+    users: int,
+    fanout: int,
+    rate: float,
+    error_rate: float,
+    latency: float,
+    broken: Sequence[str] = (),
+) -> MockGraphServer:
+    server = MockGraphServer(("127.0.0.1", port), MockDirectory(users, fanout), rate, error_rate, latency, broken)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    server = start_server(args.port, args.users, args.fanout, args.server_rate, args.error_rate, args.latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    client = GraphClient(
+        lambda: "mock-token",
+        tenant_id=f"mock-{server.server_address[1]}",
+        base_url=base_url,
+        timeout=5,
+        rate_per_second=args.client_rate,
+        burst=args.client_rate,
+        max_concurrency=args.threads,
+    )
+    rng = random.Random(args.seed)
+    # A skewed key distribution so that concurrent callers ask for the same UPN.
+    targets = [f"user{min(args.users - 1, int(rng.paretovariate(1.2)) - 1)}@example.test" for _ in range(args.lookups)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(client.get_manager, targets))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    report = {
+        "lookups": len(targets),
+        "distinct_upns": len(set(targets)),
+        "elapsed_seconds": round(elapsed, 3),
+        "lookups_per_second": round(len(targets) / elapsed, 1) if elapsed else None,
+        "resolved": sum(1 for item in results if item),
+        "client": client.stats_snapshot(),
+        "server": dict(server.counters),
+    }
+    return report
+
+
+def run_chain_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Compare resolve_many() against one request per user and level."""
+
+    find_my_boss = load_helper("B.find_my_boss")
+    server = start_server(
+        args.port, args.users, args.fanout, args.server_rate, args.error_rate, args.latency, args.broken_upn
+    )
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    client = GraphClient(
+        lambda: "mock-token",
+        tenant_id=f"mock-chains-{server.server_address[1]}",
+        base_url=base_url,
+        timeout=5,
+        rate_per_second=args.client_rate,
+        burst=args.client_rate,
+    )
+    rng = random.Random(args.seed)
+    emails = [f"user{rng.randrange(args.users)}@example.test" for _ in range(args.lookups)]
+
+    if args.broken_upn:
+        emails.extend(args.broken_upn)
+    started = time.perf_counter()
+    try:
+        chains = find_my_boss.resolve_many(emails, client=client)
+    except GraphRequestError as exc:
+        server.shutdown()
+        return {"error": str(exc), "raised": True, "elapsed_seconds": round(time.perf_counter() - started, 3)}
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    directory = server.directory
+    wrong = 0
+    for upn, chain in chains.items():
+        expected: List[str] = []
+        cursor = directory.manager_of(directory.index_of(upn) or 0)
+        while cursor is not None:
+            expected.append(f"user{cursor}@{directory.domain}")
+            cursor = directory.manager_of(cursor)
+        if [entry["Mail"] for entry in chain] != expected:
+            wrong += 1
+
+    naive_calls = sum(len(chain) + 1 for chain in chains.values())
+    return {
+        "users": len(chains),
+        "elapsed_seconds": round(elapsed, 3),
+        "chain_entries": sum(len(chain) for chain in chains.values()),
+        "naive_manager_calls": naive_calls,
+        "batched_sub_requests": server.counters["requests"],
+        "batches": server.counters.get("batches", 0),
+        "sub_request_errors": server.counters["errors"],
+        "wrong_chains": wrong,
+        "client": client.stats_snapshot(),
+    }
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Graph throttling mock server / scheduler benchmark")
+    parser.add_argument("--serve", action="store_true", help="モックサーバーのみを起動します。")
+    parser.add_argument("--bench", action="store_true", help="モックサーバーに対してベンチマークを実行します。")
+    parser.add_argument("--bench-chains", action="store_true", help="resolve_many の $batch ベンチマークを実行します。")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--server-rate", type=float, default=20.0, help="サーバー側の秒間許容リクエスト数")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="ランダム 503 の割合")
+    parser.add_argument("--latency", type=float, default=0.02, help="応答ごとの人工遅延(秒)")
+    parser.add_argument("--client-rate", type=float, default=15.0, help="クライアント側トークンバケットのレート")
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--broken-upn", action="append", default=[], help="上司取得が常に 500 になるユーザー (複数指定可)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.serve:
+        server = start_server(args.port or 8765, args.users, args.fanout, args.server_rate, args.error_rate, args.latency)
+        print(f"Mock Graph server listening on http://127.0.0.1:{server.server_address[1]}/v1.0")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+    report = run_chain_benchmark(args) if args.bench_chains else run_benchmark(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
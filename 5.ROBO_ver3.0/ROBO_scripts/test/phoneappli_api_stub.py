@@ -0,0 +1,184 @@
+"""
+phoneappli_api_stub.py
+PHONE APPLI 検索 API を模したローカルのスタブサーバーと、
+Bd.find_job_title.PhoneAppliApiClient の動作確認用スクリプトです。
+
+スタブサーバー:
+  - GET /api/search?freeWord=<email> に {"content": [...]} 形式の JSON を返します。
+  - Cookie "SESSION" が現在のセッション値と一致しない場合は 401 を返します。
+  - --expire-after 件ごとにセッションを失効させ、再ログイン処理を確認できます。
+  - HTTP/1.1 keep-alive に対応し、TCP 接続数を数えます。
+
+使い方:
+  python .\\phoneappli_api_stub.py --serve --port 8766
+  python .\\phoneappli_api_stub.py --check --people 40 --expire-after 25
+
+注: ブラウザは起動しません。ログイン処理は「新しいセッション Cookie を払い出す関数」で代用します。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+from module_loader import load_helper  # noqa: E402
+
+POSITIONS = ["部長", "課長", "主任", "担当"]
+
+
+class StubApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], expire_after: int, latency: float) -> None:
+        super().__init__(address, StubApiHandler)
+        self.expire_after = expire_after
+        self.latency = latency
+        self.session = uuid.uuid4().hex
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "connections": 0, "unauthorized": 0, "logins": 0}
+
+    def login(self) -> str:
+        with self.lock:
+            self.counters["logins"] += 1
+            return self.session
+
+    def check(self, cookie_header: str) -> bool:
+        cookies = dict(part.strip().split("=", 1) for part in cookie_header.split(";") if "=" in part)
+        with self.lock:
+            self.counters["requests"] += 1
+            if cookies.get("SESSION") != self.session:
+                self.counters["unauthorized"] += 1
+                return False
+            if self.expire_after and self.counters["requests"] % self.expire_after == 0:
+                self.session = uuid.uuid4().hex
+            return True
+
+
+def contact_record(email: str) -> Dict[str, Any]:
+    index = sum(ord(ch) for ch in email)
+    return {
+        "name": email.split("@", 1)[0],
+        "email": email,
+        "divisions": [
+            {"divisionName": f"テスト事業部 第{index % 4}部", "positionName": POSITIONS[index % len(POSITIONS)]},
+        ],
+    }
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StubApiServer
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.counters["connections"] += 1
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - BaseHTTPRequestHandler API
+        return
+
+    def _send(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802 - BaseHTTPRequestHandler API
+        if not self.server.check(self.headers.get("Cookie", "")):
+            self._send(401, {"error": "unauthorized"})
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        parsed = urlparse(self.path)
+        email = (parse_qs(parsed.query).get("freeWord") or [""])[0]
+        if parsed.path != "/api/search" or not email or email.startswith("missing"):
+            self._send(200, {"content": []})
+            return
+        decoy = dict(contact_record("decoy." + email), email="decoy." + email)
+        self._send(200, {"content": [decoy, contact_record(email)], "totalElements": 2})
+
+
+def start_server(port: int, expire_after: int, latency: float) -> StubApiServer:
+    server = StubApiServer(("127.0.0.1", port), expire_after, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_check(args: argparse.Namespace) -> Dict[str, Any]:
+    bd = load_helper("Bd.find_job_title")
+    server = start_server(args.port, args.expire_after, args.latency)
+    template = f"http://127.0.0.1:{server.server_address[1]}/api/search?freeWord={{email}}&size=30"
+
+    def session_provider(expired: bool) -> Tuple[List[dict], str]:
+        return [{"name": "SESSION", "value": server.login()}], "phoneappli-api-stub"
+
+    client = bd.PhoneAppliApiClient(session_provider, url_template=template, rate_per_second=args.rate)
+    people = [
+        bd.PersonEntry(row=5 + index, label="", name="", email=f"user{index}@example.test", department="第1部", job_title="")
+        for index in range(args.people)
+    ]
+    people.append(bd.PersonEntry(row=5 + args.people, label="", name="", email="missing@example.test", department="", job_title=""))
+
+    started = time.perf_counter()
+    results = client.lookup_many(people)
+    elapsed = time.perf_counter() - started
+    client.close()
+    server.shutdown()
+
+    expected = {person.row: contact_record(person.email)["divisions"][0]["positionName"] for person in people[:-1]}
+    expected[people[-1].row] = None
+    return {
+        "people": len(people),
+        "elapsed_seconds": round(elapsed, 3),
+        "correct": results == expected,
+        "client_requests": client.requests,
+        "client_connections": client.pool.created,
+        "server": dict(server.counters),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="PHONE APPLI search API stub server")
+    parser.add_argument("--serve", action="store_true", help="スタブサーバーのみを起動します。")
+    parser.add_argument("--check", action="store_true", help="PhoneAppliApiClient をスタブに対して実行します。")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--people", type=int, default=40)
+    parser.add_argument("--expire-after", type=int, default=25, help="この件数ごとにセッションを失効させます (0 で無効)。")
+    parser.add_argument("--latency", type=float, default=0.02, help="応答ごとの人工遅延(秒)")
+    parser.add_argument("--rate", type=float, default=50.0, help="クライアント側トークンバケットのレート")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.serve:
+        server = start_server(args.port or 8766, args.expire_after, args.latency)
+        print(f"Stub PHONE APPLI API listening on http://127.0.0.1:{server.server_address[1]}/api/search?freeWord={{email}}")
+        print(f"Session cookie: SESSION={server.session}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+    report = run_check(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["correct"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,232 @@
+"""
+phoneappli_extract_bench.py
+PHONE APPLI 検索結果の読み取り方式とタブプールをオフラインで比較するベンチマークです。
+
+計測内容:
+  - extract: 保存済み HTML (--fixtures) または合成ページ (--synthetic) をヘッドレス Edge で開き、
+    従来の find_elements 方式と execute_script 1 回方式の WebDriver 往復回数・所要時間・結果の一致を比較します。
+  - pool: 応答遅延付きのローカル検索ページ (--latency) に対して、逐次検索とタブプール検索の所要時間を比較します。
+
+使い方:
+  pip install selenium
+  python .\\phoneappli_extract_bench.py extract --synthetic 30
+  python .\\phoneappli_extract_bench.py extract --fixtures .\\fixtures\\phoneappli
+  python .\\phoneappli_extract_bench.py pool --people 15 --tabs 3 --latency 1.5
+
+注: fixtures の HTML は実際の検索結果ページを「名前を付けて保存」したものを想定しています。
+    個人情報を含むため、リポジトリにはコミットしないでください。
+"""
+
+from __future__ import annotations
+
+import argparse
+import html
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlparse
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+from module_loader import load_helper  # noqa: E402
+
+SYNTHETIC_ITEM = """
+<li class="internal-item">
+  <button class="internal-item__column--person" type="button">
+    <div class="_nameColumn_pij2g_22">
+      <span class="_name_pij2g_30">社員 {index}</span>
+      <span class="_positionPaddingLarge_pij2g_49"><span>{position}</span></span>
+    </div>
+  </button>
+  <div class="_divisionColumn_ls35d_22">
+    <div class="_itemText_ls35d_61"><span>{division}</span></div>
+    <div class="_itemText_ls35d_61"><span>{division}</span></div>
+  </div>
+  <div class="internal-item__column--mail"><span>user{index}@example.test</span></div>
+</li>
+"""
+
+# Renders the list after ``delay`` ms, like the SPA does after its search XHR.
+SYNTHETIC_PAGE = """<!DOCTYPE html>
+<html lang="ja"><head><meta charset="utf-8"><title>search</title></head>
+<body><ul id="results"></ul>
+<script>
+setTimeout(function () {{
+  document.getElementById("results").innerHTML = {items};
+}}, {delay});
+</script>
+</body></html>
+"""
+
+
+def synthetic_items(count: int, seed_word: str = "") -> str:
+    positions = ["部長", "課長", "主任", "", "担当"]
+    parts = []
+    for index in range(count):
+        parts.append(
+            SYNTHETIC_ITEM.format(
+                index=index,
+                position=html.escape(positions[index % len(positions)]),
+                division=html.escape(f"テスト事業部 第{index % 4}部 {seed_word}".strip()),
+            )
+        )
+    return "".join(parts)
+
+
+def synthetic_page(count: int, delay_ms: int = 0, seed_word: str = "") -> str:
+    return SYNTHETIC_PAGE.format(items=json.dumps(synthetic_items(count, seed_word), ensure_ascii=False), delay=delay_ms)
+
+
+def count_round_trips(driver: Any) -> Callable[[], int]:
+    """Wrap driver.execute so that every WebDriver command is counted."""
+
+    counter = {"value": 0}
+    original = driver.execute
+
+    def _counting_execute(*args: Any, **kwargs: Any) -> Any:
+        counter["value"] += 1
+        return original(*args, **kwargs)
+
+    driver.execute = _counting_execute
+    return lambda: counter["value"]
+
+
+def _summary(candidates: List[Any]) -> List[Tuple[str, str, str]]:
+    return [(item.description, item.division_text, item.position_preview) for item in candidates]
+
+
+def run_extract(args: argparse.Namespace) -> Dict[str, Any]:
+    bd = load_helper("Bd.find_job_title")
+    client = bd.PhoneAppliClient(headless=True)
+    pages: List[Tuple[str, str]] = []
+    tmp_dir: Optional[Path] = None
+    if args.fixtures:
+        pages = [(path.name, path.resolve().as_uri()) for path in sorted(Path(args.fixtures).glob("*.html"))]
+    else:
+        tmp_dir = Path(args.workdir).resolve()
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fixture = tmp_dir / f"synthetic_{args.synthetic}.html"
+        fixture.write_text(synthetic_page(args.synthetic), encoding="utf-8")
+        pages = [(fixture.name, fixture.as_uri())]
+
+    counter = count_round_trips(client.driver)
+    report: Dict[str, Any] = {"pages": []}
+    try:
+        for name, url in pages:
+            client.driver.get(url)
+            if not client._wait_for_results():
+                report["pages"].append({"page": name, "error": "no results"})
+                continue
+            row: Dict[str, Any] = {"page": name}
+            for mode, collect in (
+                ("elements", client._collect_candidates_elements),
+                ("script", client._collect_candidates_script),
+            ):
+                before = counter()
+                started = time.perf_counter()
+                for _ in range(args.repeat):
+                    candidates = collect()
+                elapsed = (time.perf_counter() - started) / args.repeat
+                row[mode] = {
+                    "candidates": len(candidates),
+                    "round_trips": (counter() - before) // args.repeat,
+                    "milliseconds": round(elapsed * 1000, 1),
+                }
+                row[f"_{mode}_summary"] = _summary(candidates)
+            row["identical"] = row.pop("_elements_summary") == row.pop("_script_summary")
+            report["pages"].append(row)
+    finally:
+        client.keep_browser_open = False
+        client.close()
+    return report
+
+
+class SearchPageServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], results: int, latency: float) -> None:
+        super().__init__(address, SearchPageHandler)
+        self.results = results
+        self.latency = latency
+
+
+class SearchPageHandler(BaseHTTPRequestHandler):
+    server: SearchPageServer
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - BaseHTTPRequestHandler API
+        return
+
+    def do_GET(self) -> None:  # noqa: N802 - BaseHTTPRequestHandler API
+        query = parse_qs(urlparse(self.path).query)
+        word = (query.get("freeWord") or [""])[0]
+        body = synthetic_page(self.server.results, int(self.server.latency * 1000), word).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def run_pool(args: argparse.Namespace) -> Dict[str, Any]:
+    bd = load_helper("Bd.find_job_title")
+    server = SearchPageServer(("127.0.0.1", 0), args.results, args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}/search"
+
+    client = bd.PhoneAppliClient(headless=True, rate_per_second=args.rate)
+    client.search_url = lambda email: f"{base}?freeWord={quote(email, safe='')}"  # type: ignore[method-assign]
+    people = [
+        bd.PersonEntry(row=5 + index, label="", name=f"社員 {index}", email=f"user{index}@example.test", department="第1部", job_title="")
+        for index in range(args.people)
+    ]
+    report: Dict[str, Any] = {"people": len(people), "latency_seconds": args.latency, "tabs": args.tabs}
+    try:
+        started = time.perf_counter()
+        sequential = {person.row: client.lookup_job_title(person.email, person.department) for person in people}
+        report["sequential_seconds"] = round(time.perf_counter() - started, 2)
+
+        started = time.perf_counter()
+        pooled = bd.PhoneAppliTabPool(client, tabs=args.tabs).lookup_many(people)
+        report["pool_seconds"] = round(time.perf_counter() - started, 2)
+        report["identical"] = sequential == pooled
+    finally:
+        client.keep_browser_open = False
+        client.close()
+        server.shutdown()
+    return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="PHONE APPLI extraction / tab pool offline benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    extract = sub.add_parser("extract", help="find_elements 方式と execute_script 方式を比較します。")
+    extract.add_argument("--fixtures", type=Path, help="保存済み検索結果 HTML のフォルダ")
+    extract.add_argument("--synthetic", type=int, default=30, help="合成ページの件数 (--fixtures 未指定時)")
+    extract.add_argument("--workdir", type=Path, default=Path(__file__).with_name("phoneappli_fixtures"))
+    extract.add_argument("--repeat", type=int, default=3)
+
+    pool = sub.add_parser("pool", help="逐次検索とタブプール検索を比較します。")
+    pool.add_argument("--people", type=int, default=15)
+    pool.add_argument("--tabs", type=int, default=3)
+    pool.add_argument("--results", type=int, default=3, help="1 ページあたりの検索結果件数")
+    pool.add_argument("--latency", type=float, default=1.5, help="検索結果描画までの人工遅延(秒)")
+    pool.add_argument("--rate", type=float, default=2.0, help="検索の秒間上限 (トークンバケット)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = run_extract(args) if args.command == "extract" else run_pool(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,451 @@
+"""
+phoneappli_replay.py
+PHONE APPLI の検索結果・プロフィールダイアログを記録し、ローカルで再生して
+Bd.find_job_title.PhoneAppliClient を計測・回帰確認するためのハーネスです。
+
+サブコマンド:
+  record : 実テナントにサインインした Edge で検索し、結果一覧とダイアログの HTML を
+           匿名化して cases/<id>.json に保存します (期待値 = その時点で取得した役職)。
+           候補ごとの部署名と選択した候補も保存し、department_match_bench.py で使用します
+           (説明文の 1 行目 = 氏名は保存しません)。
+  serve  : 記録したケースを SEARCH_URL_TEMPLATE と同じ形の URL で配信します。
+  bench  : 再生サーバーに対しヘッドレス Edge で lookup_job_title を実行し、
+           1 件あたりの所要時間・WebDriver 往復回数・期待値との一致率を出力します。
+  drift  : Bd のセレクタ (ハッシュ付きクラス名 _divisionColumn_ls35d_22 など) が
+           記録 HTML に存在するかを確認し、名前が同じでハッシュだけ変わったクラスを報告します。
+           ブラウザ不要。ドリフトがあれば終了コード 1 を返します。
+
+使い方:
+  python .\\phoneappli_replay.py record --emails .\\emails.txt --out .\\phoneappli_cases
+  python .\\phoneappli_replay.py serve --cases .\\phoneappli_cases --port 8767
+  python .\\phoneappli_replay.py bench --cases .\\phoneappli_cases --repeat 2
+  python .\\phoneappli_replay.py drift --cases .\\phoneappli_cases
+
+emails.txt は 1 行に「メールアドレス,部署名」(部署名は省略可) を記述します。
+注: 匿名化はメールアドレス・電話番号・氏名欄を置き換えますが、保存前に内容を確認してください。
+    記録データはリポジトリにコミットしないでください。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+TEST_DIR = Path(__file__).resolve().parent
+if str(TEST_DIR) not in sys.path:
+    sys.path.append(str(TEST_DIR))
+
+from module_loader import load_helper  # noqa: E402
+
+DEFAULT_CASES_DIR = TEST_DIR / "phoneappli_cases"
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+PHONE_PATTERN = re.compile(r"(?<!\d)(?:\+81[- ]?)?0\d{1,4}-\d{1,4}-\d{3,4}(?!\d)")
+HASHED_CLASS_PATTERN = re.compile(r"_[A-Za-z][A-Za-z0-9]*_[a-z0-9]{5}_\d+")
+PLAIN_CLASS_PATTERN = re.compile(r"\.([A-Za-z_][\w-]*)")
+
+# Runs in the live page before capture: drop scripts/images and blank out
+# name fields.  E-mail addresses and phone numbers are replaced in Python.
+_SANITISE_JS = """
+const [rootSelector] = arguments;
+const root = rootSelector ? document.querySelector(rootSelector) : document.documentElement;
+if (!root) { return null; }
+const copy = root.cloneNode(true);
+copy.querySelectorAll("script, noscript, iframe, img, svg, link[rel='preload']").forEach((el) => el.remove());
+let counter = 0;
+copy.querySelectorAll("[class*='name'] span:not([class*='position']), [class*='Name'] span:not([class*='position'])").forEach((el) => {
+  if (el.children.length === 0 && el.textContent.trim()) { counter += 1; el.textContent = "氏名" + counter; }
+});
+return copy.outerHTML;
+"""
+
+# Injected into replayed result pages: clicking a result's button loads the
+# recorded dialog, close buttons and Esc remove it again.
+_REPLAY_JS = """
+<script>
+(function () {
+  var caseId = %s;
+  function closeDialog() {
+    document.querySelectorAll("[data-replay-dialog]").forEach(function (el) { el.remove(); });
+  }
+  document.addEventListener("keydown", function (ev) { if (ev.key === "Escape") { closeDialog(); } }, true);
+  document.addEventListener("click", function (ev) {
+    var button = ev.target.closest("button");
+    if (!button) { return; }
+    if (button.closest("[data-replay-dialog]")) { closeDialog(); return; }
+    var item = button.closest("li.internal-item");
+    if (!item) { return; }
+    var index = Array.prototype.indexOf.call(document.querySelectorAll("li.internal-item"), item);
+    fetch("/dialog/" + encodeURIComponent(caseId) + "/" + index).then(function (res) {
+      return res.ok ? res.text() : null;
+    }).then(function (html) {
+      if (!html) { return; }
+      var holder = document.createElement("div");
+      holder.setAttribute("data-replay-dialog", "1");
+      holder.innerHTML = html;
+      document.body.appendChild(holder);
+    });
+  }, true);
+})();
+</script>
+"""
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html lang="ja"><head><meta charset="utf-8"><title>replay</title></head>
+<body><input type="text" placeholder="キーワードで検索"></body></html>
+"""
+
+
+class Pseudonymiser:
+    """Replace e-mail addresses and phone numbers consistently inside one case."""
+
+    def __init__(self) -> None:
+        self.emails: Dict[str, str] = {}
+
+    def email(self, value: str) -> str:
+        key = value.lower()
+        if key not in self.emails:
+            self.emails[key] = f"user{len(self.emails) + 1}@example.test"
+        return self.emails[key]
+
+    def text(self, html_text: str) -> str:
+        html_text = EMAIL_PATTERN.sub(lambda match: self.email(match.group(0)), html_text)
+        return PHONE_PATTERN.sub("000-0000-0000", html_text)
+
+
+def load_cases(cases_dir: Path) -> List[Dict[str, Any]]:
+    cases = []
+    for path in sorted(Path(cases_dir).glob("*.json")):
+        try:
+            cases.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError) as exc:
+            print(f"skip {path.name}: {exc}", file=sys.stderr)
+    return cases
+
+
+def _read_email_list(path: Path) -> List[Tuple[str, str]]:
+    entries = []
+    for line in path.read_text(encoding="utf-8-sig").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        email, _, department = line.partition(",")
+        entries.append((email.strip(), department.strip()))
+    return entries
+
+
+def run_record(args: argparse.Namespace) -> Dict[str, Any]:
+    bd = load_helper("Bd.find_job_title")
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    client = bd.PhoneAppliClient(headless=args.headless, rate_per_second=args.rate)
+    client.ensure_ready(login_wait=args.login_wait)
+
+    captured: Dict[str, Any] = {}
+    original_open = client._open_candidate_and_read_position
+    original_extract = client._extract_position_text
+
+    def _open(candidate: Any) -> Optional[str]:
+        captured["index"] = candidate.index
+        return original_open(candidate)
+
+    def _extract() -> Optional[str]:
+        # The dialog stays open until _open_candidate_and_read_position closes it.
+        title = original_extract()
+        captured["dialog"] = client.driver.execute_script(_SANITISE_JS, bd.PROFILE_DIALOG_SELECTOR)
+        return title
+
+    client._open_candidate_and_read_position = _open  # type: ignore[method-assign]
+    client._extract_position_text = _extract  # type: ignore[method-assign]
+
+    recorded = 0
+    try:
+        for number, (email, department) in enumerate(_read_email_list(Path(args.emails)), start=1):
+            captured.clear()
+            client.driver.get(client.search_url(email))
+            candidates = client._collect_candidates()
+            results_html = client.driver.execute_script(_SANITISE_JS, None) or ""
+            title = client.title_from_candidates(candidates, department) if candidates else None
+            names = Pseudonymiser()
+            case = {
+                "case_id": f"case{number:04d}",
+                "email": names.email(email),
+                "department": department,
+                "expected_title": title,
+                "results_html": names.text(results_html),
+                "candidates": [
+                    {"index": c.index, "division_text": c.division_text, "description": names.text("\n".join(c.description.splitlines()[1:]))}
+                    for c in candidates
+                ],
+                "selected_index": captured.get("index"),
+                "dialogs": {},
+            }
+            if captured.get("dialog"):
+                case["dialogs"][str(captured.get("index", 0))] = names.text(captured["dialog"])
+            (out_dir / f"{case['case_id']}.json").write_text(json.dumps(case, ensure_ascii=False, indent=2), encoding="utf-8")
+            recorded += 1
+    finally:
+        client.close()
+    return {"recorded": recorded, "out": str(out_dir)}
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], cases: List[Dict[str, Any]], latency: float) -> None:
+        super().__init__(address, ReplayHandler)
+        self.by_email = {str(case["email"]).lower(): case for case in cases}
+        self.by_id = {str(case["case_id"]): case for case in cases}
+        self.latency = latency
+        self.requests = 0
+
+    @property
+    def base(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server: ReplayServer
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - BaseHTTPRequestHandler API
+        return
+
+    def _send(self, status: int, body: str) -> None:
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:  # noqa: N802 - BaseHTTPRequestHandler API
+        self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        parsed = urlparse(self.path)
+        if parsed.path == "/front/login":
+            self._send(200, LOGIN_PAGE)
+            return
+        if parsed.path == "/front/internalContacts":
+            email = (parse_qs(parsed.query).get("freeWord") or [""])[0].lower()
+            case = self.server.by_email.get(email)
+            if case is None:
+                self._send(200, LOGIN_PAGE.replace("</body>", "<ul></ul></body>"))
+                return
+            page = str(case["results_html"])
+            script = _REPLAY_JS % json.dumps(case["case_id"])
+            page = page.replace("</body>", script + "</body>") if "</body>" in page else page + script
+            self._send(200, page)
+            return
+        parts = [unquote(part) for part in parsed.path.strip("/").split("/")]
+        if len(parts) == 3 and parts[0] == "dialog":
+            case = self.server.by_id.get(parts[1])
+            dialog = (case or {}).get("dialogs", {}).get(parts[2])
+            if dialog:
+                self._send(200, dialog)
+                return
+        self._send(404, "not found")
+
+
+def start_replay(cases: List[Dict[str, Any]], port: int = 0, latency: float = 0.0) -> ReplayServer:
+    server = ReplayServer(("127.0.0.1", port), cases, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_bench(args: argparse.Namespace) -> Dict[str, Any]:
+    from phoneappli_extract_bench import count_round_trips
+
+    bd = load_helper("Bd.find_job_title")
+    cases = load_cases(Path(args.cases))
+    if not cases:
+        return {"error": f"ケースがありません: {args.cases}"}
+    drift = detect_drift(cases, bd)
+    server = start_replay(cases, latency=args.latency)
+    client = bd.PhoneAppliClient(
+        headless=True,
+        base_url=f"{server.base}/front/login",
+        search_url_template=f"{server.base}/front/internalContacts?freeWord={{email}}",
+        extraction_mode=args.extraction_mode,
+        rate_per_second=1000.0,
+        timeout=args.timeout,
+    )
+    counter = count_round_trips(client.driver)
+    latencies: List[float] = []
+    round_trips: List[int] = []
+    mismatches: List[Dict[str, Any]] = []
+    try:
+        client.ensure_ready(login_wait=10)
+        for _ in range(args.repeat):
+            for case in cases:
+                before = counter()
+                started = time.perf_counter()
+                title = client.lookup_job_title(case["email"], case.get("department") or "")
+                latencies.append(time.perf_counter() - started)
+                round_trips.append(counter() - before)
+                if title != case.get("expected_title"):
+                    mismatches.append({"case": case["case_id"], "expected": case.get("expected_title"), "actual": title})
+    finally:
+        client.keep_browser_open = False
+        client.close()
+        server.shutdown()
+    lookups = len(latencies)
+    return {
+        "cases": len(cases),
+        "lookups": lookups,
+        "extraction_mode": args.extraction_mode,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies) * 1000, 1),
+            "p50": round(_percentile(latencies, 0.5) * 1000, 1),
+            "p95": round(_percentile(latencies, 0.95) * 1000, 1),
+        },
+        "round_trips": {"mean": round(statistics.mean(round_trips), 1), "max": max(round_trips)},
+        "accuracy": round(1 - len(mismatches) / lookups, 3),
+        "mismatches": mismatches[:20],
+        "wait_totals_seconds": {name: round(value, 2) for name, value in client.wait_totals.items()},
+        "drift": drift,
+    }
+
+
+class _ClassCollector(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__()
+        self.classes: Set[str] = set()
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        for name, value in attrs:
+            if name == "class" and value:
+                self.classes.update(value.split())
+
+
+def _classes_in(html_text: str) -> Set[str]:
+    collector = _ClassCollector()
+    collector.feed(html_text)
+    return collector.classes
+
+
+def _selector_strings(bd: Any) -> Dict[str, str]:
+    return {
+        "RESULT_SELECTOR": bd.RESULT_SELECTOR,
+        "DIVISION_COLUMN_SELECTORS": ", ".join(bd.DIVISION_COLUMN_SELECTORS),
+        "DIVISION_TEXT_SELECTOR": bd.DIVISION_TEXT_SELECTOR,
+        "POSITION_PREVIEW_SELECTOR": bd.POSITION_PREVIEW_SELECTOR,
+        "PROFILE_BUTTON_SELECTOR": bd.PROFILE_BUTTON_SELECTOR,
+        "PROFILE_DIALOG_SELECTOR": bd.PROFILE_DIALOG_SELECTOR,
+    }
+
+
+def detect_drift(cases: Iterable[Dict[str, Any]], bd: Any) -> Dict[str, Any]:
+    """Compare the class names Bd's selectors rely on with the recorded HTML."""
+
+    seen: Set[str] = set()
+    for case in cases:
+        seen |= _classes_in(str(case.get("results_html") or ""))
+        for dialog in (case.get("dialogs") or {}).values():
+            seen |= _classes_in(str(dialog))
+    hashed_seen = {name for name in seen if HASHED_CLASS_PATTERN.fullmatch(name)}
+
+    # "renamed": same CSS-module name with a new hash (the build changed).
+    # "not_seen": absent, which is expected for fallback selectors or for
+    # dialogs that were never opened, but worth a look when it is new.
+    renamed: List[Dict[str, Any]] = []
+    not_seen: List[Dict[str, str]] = []
+    for constant, selector in _selector_strings(bd).items():
+        for hashed in sorted(set(HASHED_CLASS_PATTERN.findall(selector))):
+            if hashed in seen:
+                continue
+            stem = hashed.split("_")[1]
+            now = sorted(name for name in hashed_seen if name.split("_")[1] == stem)
+            if now:
+                renamed.append({"selector": constant, "class": hashed, "now": now})
+            else:
+                not_seen.append({"selector": constant, "class": hashed})
+        for plain in sorted(set(PLAIN_CLASS_PATTERN.findall(selector))):
+            if HASHED_CLASS_PATTERN.fullmatch(plain) or plain in seen:
+                continue
+            not_seen.append({"selector": constant, "class": plain})
+    return {"classes_seen": len(seen), "renamed": renamed, "not_seen": not_seen}
+
+
+def run_drift(args: argparse.Namespace) -> Tuple[Dict[str, Any], int]:
+    bd = load_helper("Bd.find_job_title")
+    cases = load_cases(Path(args.cases))
+    for path in args.html or []:
+        cases.append({"case_id": Path(path).name, "results_html": Path(path).read_text(encoding="utf-8")})
+    report = detect_drift(cases, bd)
+    report["cases"] = len(cases)
+    return report, 1 if report["renamed"] else 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="PHONE APPLI record / replay harness")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record = sub.add_parser("record", help="実テナントから検索結果を記録します。")
+    record.add_argument("--emails", type=Path, required=True)
+    record.add_argument("--out", type=Path, default=DEFAULT_CASES_DIR)
+    record.add_argument("--headless", action="store_true")
+    record.add_argument("--login-wait", type=int, default=120)
+    record.add_argument("--rate", type=float, default=1.0, help="記録時の検索レート (件/秒)")
+
+    serve = sub.add_parser("serve", help="記録したケースを配信します。")
+    serve.add_argument("--cases", type=Path, default=DEFAULT_CASES_DIR)
+    serve.add_argument("--port", type=int, default=8767)
+    serve.add_argument("--latency", type=float, default=0.0)
+
+    bench = sub.add_parser("bench", help="再生サーバーに対して lookup_job_title を計測します。")
+    bench.add_argument("--cases", type=Path, default=DEFAULT_CASES_DIR)
+    bench.add_argument("--repeat", type=int, default=1)
+    bench.add_argument("--latency", type=float, default=0.05, help="再生サーバーの応答遅延(秒)")
+    bench.add_argument("--timeout", type=int, default=10)
+    bench.add_argument("--extraction-mode", choices=("script", "elements"), default="script")
+
+    drift = sub.add_parser("drift", help="セレクタのドリフトを検出します (ブラウザ不要)。")
+    drift.add_argument("--cases", type=Path, default=DEFAULT_CASES_DIR)
+    drift.add_argument("--html", nargs="*", help="追加で確認する HTML ファイル")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    exit_code = 0
+    if args.command == "serve":
+        server = start_replay(load_cases(Path(args.cases)), args.port, args.latency)
+        print(f"Replay server: {server.base}/front/internalContacts?freeWord={{email}} ({len(server.by_id)} cases)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+    if args.command == "record":
+        report: Dict[str, Any] = run_record(args)
+    elif args.command == "bench":
+        report = run_bench(args)
+    else:
+        report, exit_code = run_drift(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+"""
+positions_snapshot_bench.py
+positions_snapshot.json の保存方法を比較するベンチマークです。
+
+  legacy : 毎回 Path.write_text で上書き (変更前の persist_positions)
+  atomic : atomic_io.write_json_if_changed (内容ハッシュで未変更ならスキップ、
+           ロックファイル + 一時ファイル + os.replace)
+
+複数のロボット (プロセス) が同じフォルダに繰り返し保存し、同時に別プロセスが
+読み込み続けます。実際の書き込み回数・1 回あたりの所要時間 (p50/p95)・
+読み込み側で JSON が壊れていた回数 (torn read) を出力します。
+
+使い方:
+  python .\\positions_snapshot_bench.py
+  python .\\positions_snapshot_bench.py --robots 4 --runs 200 --change-rate 0.1 --dir "C:\\Users\\me\\OneDrive\\tmp"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+from atomic_io import write_json_if_changed  # noqa: E402
+
+POSITIONS = [["課長", "部長", "統括部長"], ["課長", "営業所長", "部長", "統括部長"], ["主任", "課長", "部長"]]
+
+
+def _payload(rng: random.Random, change_rate: float, current: List[str]) -> Dict[str, Any]:
+    positions = rng.choice(POSITIONS) if rng.random() < change_rate else current
+    # Pad like a long manager chain so a torn write is visible to the reader.
+    return {
+        "edge_driver_path": "C:/robo/ROBO_tools/msedgedriver.exe",
+        "generated_at": datetime.now().isoformat(),
+        "positions": list(positions) * 20,
+    }
+
+
+def _writer(mode: str, target: str, runs: int, change_rate: float, seed: int, queue: Any) -> None:
+    rng = random.Random(seed)
+    path = Path(target)
+    latencies: List[float] = []
+    writes = 0
+    current = POSITIONS[0]
+    for _ in range(runs):
+        payload = _payload(rng, change_rate, current)
+        current = payload["positions"][: len(payload["positions"]) // 20]
+        started = time.perf_counter()
+        if mode == "legacy":
+            path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+            writes += 1
+        elif write_json_if_changed(path, payload, ignore=("generated_at",)):
+            writes += 1
+        latencies.append(time.perf_counter() - started)
+    queue.put({"writes": writes, "latencies": latencies})
+
+
+def _reader(target: str, stop: Any, queue: Any) -> None:
+    path = Path(target)
+    reads = torn = 0
+    while not stop.is_set():
+        try:
+            text = path.read_text(encoding="utf-8")
+        except OSError:
+            continue
+        reads += 1
+        try:
+            json.loads(text)
+        except ValueError:
+            torn += 1
+    queue.put({"reads": reads, "torn": torn})
+
+
+def run_mode(mode: str, directory: Path, robots: int, runs: int, change_rate: float) -> Dict[str, Any]:
+    target = directory / f"positions_snapshot_{mode}.json"
+    target.write_text(json.dumps({"positions": POSITIONS[0] * 20}), encoding="utf-8")
+    queue: Any = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    reader = multiprocessing.Process(target=_reader, args=(str(target), stop, queue))
+    reader.start()
+    writers = [
+        multiprocessing.Process(target=_writer, args=(mode, str(target), runs, change_rate, seed, queue))
+        for seed in range(robots)
+    ]
+    started = time.perf_counter()
+    for process in writers:
+        process.start()
+    results = [queue.get() for _ in writers]
+    for process in writers:
+        process.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    read_stats = queue.get()
+    reader.join()
+    latencies = sorted(value for result in results for value in result["latencies"])
+    return {
+        "persist_calls": robots * runs,
+        "file_writes": sum(result["writes"] for result in results),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "reads": read_stats["reads"],
+        "torn_reads": read_stats["torn"],
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="positions_snapshot.json write benchmark")
+    parser.add_argument("--robots", type=int, default=3, help="同時に保存するプロセス数")
+    parser.add_argument("--runs", type=int, default=100, help="プロセスあたりの保存回数")
+    parser.add_argument("--change-rate", type=float, default=0.1, help="positions が変わる確率")
+    parser.add_argument("--dir", type=Path, help="保存先フォルダ (OneDrive 上のフォルダなど)。省略時は一時フォルダ")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directory = args.dir or Path(temp_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        report = {
+            "robots": args.robots,
+            "runs": args.runs,
+            "change_rate": args.change_rate,
+            "legacy": run_mode("legacy", directory, args.robots, args.runs, args.change_rate),
+            "atomic": run_mode("atomic", directory, args.robots, args.runs, args.change_rate),
+        }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,187 @@
+"""
+run_journal_bench.py
+error_log.xlsx への実行結果記録の所要時間を、履歴件数ごとに比較するスクリプトです。
+
+  - workbook : 従来の Ed (openpyxl で全体を読み込み → 空行探索 → 全体を保存)
+  - journal  : run_journal.RunJournal.append (1 行追記)
+  - compact  : 複数台分のジャーナルを error_log.xlsx に反映する 1 回分の処理
+
+最後に、反映後のブックを openpyxl で読み直して、行数・日時セル・書式 (列幅、
+見出しの太字、日時の表示形式) が保たれているかと、もう一度 compact しても
+行が重複しないかを確認します。また、同期の競合で反映前のブックに戻った場合に、
+端末ごとの compact (ロボと同じく自端末のジャーナルのみ) で失われた行が
+書き直されるかと、compact_if_due が直前に反映したばかりでも
+未反映の行があれば (ロボの実行終了時・起動時) すぐに反映することを確認します。
+Linux でも動作します (openpyxl が必要)。
+
+使い方:
+  python ./run_journal_bench.py
+  python ./run_journal_bench.py --history 100,1000,5000 --machines 3 --runs 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+import run_journal  # noqa: E402
+from run_journal import RunJournal, RunRecord  # noqa: E402
+
+HEADERS = ["開始", "終了", "所要時間", "手配番号", "端末", "結果", "エラー内容", "FB"]
+
+
+def build_error_log(path: Path, history: int) -> Path:
+    from openpyxl import Workbook
+    from openpyxl.styles import Font
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "log"
+    sheet.append(HEADERS)
+    for cell in sheet[1]:
+        cell.font = Font(bold=True)
+    sheet.column_dimensions["A"].width = 20
+    sheet.column_dimensions["G"].width = 40
+    started = datetime(2024, 1, 1, 9, 0, 0)
+    for index in range(history):
+        start = started + timedelta(hours=index)
+        sheet.append([start, start + timedelta(minutes=7), "00:07:00", f"T{index:06d}", "PC-OLD", "〇", "", ""])
+        sheet.cell(row=index + 2, column=1).number_format = "yyyy/mm/dd hh:mm:ss"
+        sheet.cell(row=index + 2, column=2).number_format = "yyyy/mm/dd hh:mm:ss"
+    workbook.save(str(path))
+    return path
+
+
+def _record(machine: str, index: int) -> RunRecord:
+    start = datetime(2026, 10, 1, 8, 0, 0) + timedelta(minutes=index * 13)
+    return RunRecord(
+        started_at=start,
+        finished_at=start + timedelta(minutes=6, seconds=index % 60),
+        tehai_number=f"N{index:05d}",
+        machine=machine,
+        success=index % 5 != 0,
+        error_message="Outlook が応答しません" if index % 5 == 0 else "",
+        feedback="特になし" if index % 3 == 0 else "",
+    )
+
+
+def workbook_append(path: Path, record: RunRecord) -> None:
+    """The former Ed.error_log write path."""
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path)
+    sheet = workbook.active
+    row = 2
+    while not all(sheet.cell(row=row, column=col).value in (None, "") for col in range(1, 9)):
+        row += 1
+    for column, value in enumerate(record.row(), start=1):
+        sheet.cell(row=row, column=column).value = value
+    workbook.save(path)
+
+
+def _median_ms(samples: List[float]) -> float:
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def measure(history: int, machines: int, runs: int, work: Path) -> Dict[str, Any]:
+    case = work / f"h{history}"
+    case.mkdir()
+    book = build_error_log(case / "error_log.xlsx", history)
+    baseline = build_error_log(case / "baseline.xlsx", history)
+    journal_dir = case / "run_journal"
+
+    legacy: List[float] = []
+    for index in range(min(runs, 5)):
+        started = time.perf_counter()
+        workbook_append(baseline, _record("PC-LEGACY", index))
+        legacy.append(time.perf_counter() - started)
+
+    appends: List[float] = []
+    for machine_no in range(machines):
+        journal = RunJournal(journal_dir, f"PC-{machine_no:02d}")
+        for index in range(runs):
+            record = _record(journal.path.stem, index)
+            started = time.perf_counter()
+            journal.append(record)
+            appends.append(time.perf_counter() - started)
+
+    state_dir = case / "local_state"
+    before = book.read_bytes()
+    started = time.perf_counter()
+    written = run_journal.compact(book, journal_dir, state_dir=state_dir)
+    compact_seconds = time.perf_counter() - started
+    again = run_journal.compact(book, journal_dir, state_dir=state_dir)
+    check = verify(book, history, machines * runs)
+    # 同期の競合で反映前のブックが残った場合: 各端末の compact で自分の行が戻ります。
+    book.write_bytes(before)
+    restored = sum(
+        run_journal.compact(book, journal_dir, machine=f"PC-{machine_no:02d}", state_dir=state_dir)
+        for machine_no in range(machines)
+    )
+    # 反映直後の実行: 間隔 (既定 60 分) 内でも未反映の行があれば反映し、無ければ何もしません。
+    machine = "PC-00"
+    RunJournal(journal_dir, machine).append(_record(machine, runs))
+    due_with_new_line = run_journal.compact_if_due(book, journal_dir, machine, state_dir=state_dir)
+    due_without_new_line = run_journal.compact_if_due(book, journal_dir, machine, state_dir=state_dir)
+    return {
+        "history_rows": history,
+        "workbook_append_ms": _median_ms(legacy),
+        "journal_append_ms": _median_ms(appends),
+        "compact_ms": round(compact_seconds * 1000, 1),
+        "compacted_rows": written,
+        "second_compact_rows": again,
+        "rows_restored_after_lost_write": restored,
+        "new_line_merged_within_interval": due_with_new_line == 1,
+        "nothing_to_merge_within_interval": due_without_new_line == 0,
+        "check": check,
+    }
+
+
+def verify(book: Path, history: int, added: int) -> Dict[str, Any]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(book)
+    sheet = workbook.active
+    last = sheet.max_row
+    first_new = history + 2
+    return {
+        "rows_ok": last == history + 1 + added,
+        "dates_ok": isinstance(sheet.cell(row=first_new, column=1).value, datetime),
+        "number_format": sheet.cell(row=first_new, column=1).number_format,
+        "header_bold": bool(sheet["A1"].font.bold),
+        "width_A": sheet.column_dimensions["A"].width,
+        "last_row": [sheet.cell(row=last, column=col).value for col in range(3, 9)],
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run journal vs whole-workbook rewrite")
+    parser.add_argument("--history", default="100,1000,5000", help="既存の履歴件数 (カンマ区切り)")
+    parser.add_argument("--machines", type=int, default=3, help="ジャーナルを書く端末数")
+    parser.add_argument("--runs", type=int, default=20, help="端末ごとの実行回数")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    sizes = [int(item) for item in args.history.split(",") if item.strip()]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        report = [measure(size, args.machines, args.runs, Path(temp_dir)) for size in sizes]
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
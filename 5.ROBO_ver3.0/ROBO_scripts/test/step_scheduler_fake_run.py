@@ -0,0 +1,149 @@
+"""
+step_scheduler_fake_run.py
+A/B のタスクグラフ (A.create_RPAsheet.tasks() + B.find_my_boss.tasks()) を、
+各タスクの処理を指定秒数の待機に置き換えて step_scheduler で実行するスクリプトです。
+
+  - normal : 全タスクを実行し、合計時間・順番に実行した場合の時間・クリティカルパスを出力
+  - pid    : 会社名が PID のとき Ae が Ad (カタカナ氏名) を待つことを確認
+  - stuck  : Edge のウォームアップが終わらなくても、B がそれを待たずに始まることを確認
+  - phase  : 同時に動くタスクの表示 (robot.current_phase) が、実行中のすべてのタスクを示すことを確認
+  - stop   : 途中で stop_event をセットし、実行中のタスクだけ終えて残りを実行しないことを確認
+
+依存関係は本番と同じ定義を使います (pywin32 が必要です。タスク本体は呼び出しません)。
+
+使い方:
+  python ./step_scheduler_fake_run.py
+  python ./step_scheduler_fake_run.py --scale 0.2
+  python ./step_scheduler_fake_run.py --durations "Ae.get_mail=12,B.find_my_boss=20"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+import types
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+from common import StepAState  # noqa: E402
+from module_loader import load_helper  # noqa: E402
+from step_scheduler import StepScheduler, Task  # noqa: E402
+
+# 仮の所要時間 (秒)。実測値ではありません。--durations で上書きできます。
+DEFAULT_DURATIONS = {
+    "Ac.KANRI_spreadsheet": 3.0,
+    "Ad.copy_rpa_book": 2.0,
+    "Ad.tehai_input_sheet": 6.0,
+    "Ae.get_mail": 5.0,
+    "Af.chouji_renraku_hyou": 3.0,
+    "Ag.make_RPA_book": 4.0,
+    "A.finish": 1.0,
+    "B.graph_login": 4.0,
+    "B.edge_warmup": 3.0,
+    "B.find_my_boss": 15.0,
+}
+
+
+def build_tasks(durations: Dict[str, float], scale: float, company: str, stuck: bool) -> List[Task]:
+    tasks = load_helper("A.create_RPAsheet").tasks() + load_helper("B.find_my_boss").tasks()
+    fake: List[Task] = []
+    for task in tasks:
+        seconds = durations.get(task.name, 1.0) * scale
+
+        def _run(robot: Any, name: str = task.name, seconds: float = seconds) -> None:
+            # 本番のタスクと同じく、開始時に自分のフェーズを設定します。
+            robot.current_phase = name
+            if name == "B.edge_warmup" and stuck:
+                time.sleep(seconds * 100)
+                return
+            time.sleep(seconds)
+            if name == "Ac.KANRI_spreadsheet":
+                robot.state.company_name = company
+                robot.state.pin = "1234567"
+
+        timeout = task.timeout * scale if task.timeout is not None else None
+        fake.append(replace(task, run=_run, timeout=timeout))
+    return fake
+
+
+class _Robot(types.SimpleNamespace):
+    """ハートビートの代わりに、表示されたフェーズをすべて控えます。"""
+
+    @property
+    def current_phase(self) -> str:
+        return self.phases[-1]
+
+    @current_phase.setter
+    def current_phase(self, value: str) -> None:
+        self.phases.append(value)
+
+
+def _robot() -> Any:
+    robot = _Robot(
+        state=StepAState(tehai_number="1117"),
+        stop_event=threading.Event(),
+        _safe_str=lambda value: "" if value is None else str(value).strip(),
+        phases=[],
+    )
+    robot.current_phase = "A.create_RPAsheet"
+    return robot
+
+
+def scenario(tasks: List[Task], stop_after: Optional[float] = None) -> Dict[str, Any]:
+    robot = _robot()
+    if stop_after is not None:
+        threading.Timer(stop_after, robot.stop_event.set).start()
+    report = StepScheduler(tasks).run(robot).to_dict()
+    report["phases_shown"] = robot.phases
+    return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the step A/B task graph with sleeping stand-ins")
+    parser.add_argument("--scale", type=float, default=0.1, help="所要時間に掛ける倍率 (既定 0.1 = 10 倍速)")
+    parser.add_argument("--durations", default="", help="タスク名=秒 をカンマ区切りで (既定値を上書き)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    durations = dict(DEFAULT_DURATIONS)
+    for item in filter(None, (part.strip() for part in args.durations.split(","))):
+        name, _, seconds = item.partition("=")
+        durations[name.strip()] = float(seconds)
+    try:
+        build_tasks(durations, args.scale, "テスト株式会社", False)
+    except ImportError as exc:
+        print(f"A/B のモジュールを読み込めません (pywin32 が必要です): {exc}", file=sys.stderr)
+        return 1
+
+    scale = args.scale
+    report = {
+        "scale": scale,
+        "normal": scenario(build_tasks(durations, scale, "テスト株式会社", False)),
+        "pid": scenario(build_tasks(durations, scale, "PID", False)),
+        "stuck": scenario(build_tasks(durations, scale, "テスト株式会社", True)),
+        "stop": scenario(build_tasks(durations, scale, "テスト株式会社", False), stop_after=8.0 * scale),
+    }
+    stuck = report["stuck"]["tasks"]
+    phases = report["normal"]["phases_shown"]
+    report["checks"] = {
+        "b_does_not_wait_for_edge_warmup": "B.edge_warmup" not in stuck["B.find_my_boss"]["depends_on"]
+        and stuck["B.find_my_boss"]["status"] == "done",
+        "phase_shows_concurrent_tasks": any("Ac.KANRI_spreadsheet" in item and " / " in item for item in phases),
+        "phase_back_to_step_when_idle": phases[-1] == "A.create_RPAsheet",
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if all(report["checks"].values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+"""
+warmup_fake_run.py
+起動時の準備 (warmup.Warmup) を、Excel・Outlook・PowerShell なしで動かすスクリプトです。
+
+1. 準備の順序
+   Excel の起動・Outlook の起動・Graph サインインを記録だけする仮の処理に置き換え、
+     - 管理番号の入力中 (確定前) に Outlook の準備が始まらないこと
+       (操作者が使っている Outlook は、確定後に Office を終了してから起動します)
+     - 確定後 (handoff) に Outlook の準備が始まること
+     - 確定せずに閉じた場合 (キャンセル) は Outlook の準備が行われないこと
+   を確認します。所要時間の短縮は、本番のログ
+   「管理番号の確定から管理表の行取得まで N 秒でした。」で実測してください。
+
+2. 管理表の索引
+   --rows 行の管理表を作成して KanriIndex を作る時間を計測し、
+   Ac と同じ規則で行を特定できること、保存し直すと古い索引として扱われることを確認します。
+
+Linux でも動作します (openpyxl が必要)。
+
+使い方:
+  python ./warmup_fake_run.py
+  python ./warmup_fake_run.py --rows 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+from warmup import KanriIndex, Warmup  # noqa: E402
+
+
+def order_check(typing_seconds: float, submit: bool) -> Dict[str, Any]:
+    """Which warm-ups ran before 確定, after it, or not at all (cancel)."""
+
+    events: List[str] = []
+    lock = threading.Lock()
+
+    def _job(name: str):
+        def _run() -> None:
+            with lock:
+                events.append(f"{name}:{phase['now']}")
+
+        return _run
+
+    phase = {"now": "typing"}
+    robot = types.SimpleNamespace(helpers={})
+    warmup = Warmup(robot, {name: _job(name) for name in ("excel", "outlook", "graph")}, enabled=True)
+    warmup.start()
+    time.sleep(typing_seconds)
+    if submit:
+        # ChoujiRobo._workflow_entrypoint: Office を終了してから handoff します。
+        phase["now"] = "after_reset"
+        warmup.handoff()
+        time.sleep(0.2)
+    warmup.close()
+    time.sleep(0.1)
+    return {
+        "events": sorted(events),
+        "outlook_status": warmup.results["outlook"].status,
+    }
+
+
+def index_check(rows: int, work_dir: Path) -> Dict[str, Any]:
+    import openpyxl
+
+    path = work_dir / "kanri.xlsx"
+    workbook = openpyxl.Workbook()
+    first = workbook.active
+    first.title = "2024"
+    second = workbook.create_sheet("2025")
+    for sheet, offset in ((first, 0), (second, rows)):
+        sheet.append(["No", "管理番号", "", "", "", "会社名", "PIN"])
+        for number in range(rows):
+            sheet.append([number, 100000 + offset + number, "", "", "", "テスト", str(number)])
+    second.append([0, "1-2", "", "", "", "テスト", "x"])
+    workbook.save(str(path))
+
+    started = time.perf_counter()
+    index = KanriIndex.build(path)
+    build_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    located = index.locate(str(100000 + rows + rows // 2))
+    locate_seconds = time.perf_counter() - started
+    checks = {
+        "first_sheet": index.locate(str(100000 + 5)) == ("2024", 7),
+        "second_sheet": located == ("2025", rows // 2 + 2),
+        "prefix_match": index.locate("1000") == ("2024", 2),
+        "text_cell": index.locate("12") == ("2025", rows + 2),
+        "missing": index.locate("999999999") is None,
+        "fresh": index.fresh(),
+    }
+    time.sleep(0.01)
+    workbook.save(str(path))
+    os.utime(path, None)
+    checks["stale_after_save"] = not index.fresh()
+    return {
+        "rows": rows * 2,
+        "build_seconds": round(build_seconds, 3),
+        "locate_ms": round(locate_seconds * 1000, 2),
+        "checks": checks,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check the startup warm-up order and the 管理表 index")
+    parser.add_argument("--typing", type=float, default=0.3, help="管理番号の入力にかかる秒数")
+    parser.add_argument("--rows", type=int, default=5000, help="索引の確認に使う管理表の 1 シートあたりの行数")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if importlib.util.find_spec("openpyxl") is None:
+        print("openpyxl をインストールしてください。", file=sys.stderr)
+        return 1
+    submitted = order_check(args.typing, submit=True)
+    cancelled = order_check(args.typing, submit=False)
+    report: Dict[str, Any] = {"submitted": submitted, "cancelled": cancelled}
+    report["order_checks"] = {
+        "no_outlook_before_submit": "outlook:typing" not in submitted["events"],
+        "excel_warmed_while_typing": "excel:typing" in submitted["events"],
+        "outlook_after_reset": "outlook:after_reset" in submitted["events"],
+        "cancel_skips_outlook": cancelled["outlook_status"] == "skipped"
+        and not any(event.startswith("outlook") for event in cancelled["events"]),
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        report["kanri_index"] = index_check(args.rows, Path(temp_dir))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    ok = all(report["order_checks"].values()) and all(report["kanri_index"]["checks"].values())
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
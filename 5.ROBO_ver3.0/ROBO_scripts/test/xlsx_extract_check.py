@@ -0,0 +1,257 @@
+"""
+xlsx_extract_check.py
+xlsx_package.extract_sheet (Excel を使わない 弔事連絡票 の xlsx 書き出し) の結果が
+これまでの Worksheet.Copy() + SaveAs で作成した xlsx と同じ内容かを確認するスクリプトです。
+
+比較内容 (openpyxl で両方を読み込み):
+  - シート構成 (弔事連絡票 1 枚だけか)
+  - セルの値 (数式はキャッシュ値)、表示形式、フォント、罫線、塗りつぶし、配置
+  - 結合セル、列幅、行高、印刷範囲
+  - 共有文字列に他シート (RPAシート) の文字列が残っていないか
+  - 抽出 1 回あたりの所要時間
+
+使い方:
+  python .\\xlsx_extract_check.py --book "...\\2. RPAブック\\RPAブック.xlsx" --reference "...\\2. RPAブック\\1117 ... 弔事連絡票.xlsx"
+  python .\\xlsx_extract_check.py --synthetic
+
+--reference を省略すると 2. RPAブック フォルダ内の「*弔事連絡票.xlsx」を探します。
+--synthetic は数式・結合セルを含む仮のブックを作成し、openpyxl で保存したシート単体を基準に比較します。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROBO_SCRIPTS_ROOT = Path(__file__).resolve().parent.parent
+if str(ROBO_SCRIPTS_ROOT) not in sys.path:
+    sys.path.append(str(ROBO_SCRIPTS_ROOT))
+
+import xlsx_package  # noqa: E402
+from common import PathRegistry  # noqa: E402
+
+try:
+    import openpyxl
+except Exception:  # pragma: no cover - optional dependency
+    openpyxl = None  # type: ignore[assignment]
+
+SHEET_NAME = "弔事連絡票"
+FORMULA_CELL = "C15"
+FORMULA_RESULT = "1117_テスト株式会社_弔事連絡票"
+
+
+def build_synthetic_book(path: Path) -> Path:
+    """chouji_pdf_compare の仮ブックに、他シートを参照する数式 (キャッシュ値付き) を追加します。"""
+
+    from chouji_pdf_compare import build_synthetic_book as build_base
+
+    build_base(path, SHEET_NAME)
+    workbook = openpyxl.load_workbook(str(path))
+    workbook[SHEET_NAME][FORMULA_CELL] = "=RPAシート!D13"
+    workbook["RPAシート"]["D3"] = "boss@example.com"
+    workbook.save(str(path))
+
+    # openpyxl は数式の計算結果を保存せず文字列も inlineStr で書くため、Excel 保存後と同じ形に直します。
+    with zipfile.ZipFile(path) as archive:
+        parts = {info.filename: archive.read(info.filename) for info in archive.infolist()}
+    sheet_xml = parts["xl/worksheets/sheet1.xml"].decode("utf-8")
+    sheet_xml = re.sub(
+        r'<c r="' + FORMULA_CELL + r'"([^>]*)><f>(.*?)</f><v\s*/?>(?:</v>)?',
+        lambda m: f'<c r="{FORMULA_CELL}"{m.group(1)} t="str"><f>{m.group(2)}</f><v>{FORMULA_RESULT}</v>',
+        sheet_xml,
+    )
+    parts["xl/worksheets/sheet1.xml"] = sheet_xml.encode("utf-8")
+    _use_shared_strings(parts)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in parts.items():
+            archive.writestr(name, data)
+    return path
+
+
+def _use_shared_strings(parts: Dict[str, bytes]) -> None:
+    """openpyxl の inlineStr を Excel と同じ共有文字列 (xl/sharedStrings.xml) に置き換えます。"""
+
+    table: Dict[str, int] = {}
+
+    def _shared(match: "re.Match[str]") -> str:
+        index = table.setdefault(match.group(2), len(table))
+        return f'<c{match.group(1)} t="s"><v>{index}</v></c>'
+
+    for name in [name for name in parts if name.startswith("xl/worksheets/sheet")]:
+        text = parts[name].decode("utf-8")
+        text = re.sub(r'<c([^>]*?) t="inlineStr"><is><t[^>]*>(.*?)</t></is></c>', _shared, text, flags=re.S)
+        parts[name] = text.encode("utf-8")
+    items = "".join(f"<si><t>{value}</t></si>" for value in table)
+    parts["xl/sharedStrings.xml"] = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        f'count="{len(table)}" uniqueCount="{len(table)}">{items}</sst>'
+    ).encode("utf-8")
+    rels = parts["xl/_rels/workbook.xml.rels"].decode("utf-8")
+    rels = rels.replace(
+        "</Relationships>",
+        '<Relationship Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+        'Target="sharedStrings.xml" Id="rIdSst" /></Relationships>',
+    )
+    parts["xl/_rels/workbook.xml.rels"] = rels.encode("utf-8")
+    types = parts["[Content_Types].xml"].decode("utf-8")
+    types = types.replace(
+        "</Types>",
+        '<Override PartName="/xl/sharedStrings.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml" /></Types>',
+    )
+    parts["[Content_Types].xml"] = types.encode("utf-8")
+
+
+def build_reference(book: Path, destination: Path) -> Path:
+    """openpyxl で他シートを削除して保存したもの (--synthetic 用の基準)。"""
+
+    workbook = openpyxl.load_workbook(str(book), data_only=True)
+    for sheet in list(workbook.worksheets):
+        if sheet.title != SHEET_NAME:
+            workbook.remove(sheet)
+    if FORMULA_CELL and workbook[SHEET_NAME][FORMULA_CELL].value is None:
+        workbook[SHEET_NAME][FORMULA_CELL] = FORMULA_RESULT
+    workbook.save(str(destination))
+    return destination
+
+
+def _style(cell) -> tuple:
+    border = cell.border
+    return (
+        cell.number_format,
+        cell.font.name,
+        float(cell.font.size or 0),
+        bool(cell.font.bold),
+        tuple(getattr(side, "style", None) for side in (border.left, border.right, border.top, border.bottom)),
+        cell.fill.fill_type,
+        getattr(cell.fill.fgColor, "rgb", None) if cell.fill.fill_type else None,
+        cell.alignment.horizontal,
+        cell.alignment.vertical,
+        bool(cell.alignment.wrap_text),
+    )
+
+
+def _describe(path: Path) -> Dict[str, Any]:
+    workbook = openpyxl.load_workbook(str(path), data_only=True)
+    try:
+        sheet = workbook[SHEET_NAME]
+        cells: Dict[str, Any] = {}
+        styles: Dict[str, tuple] = {}
+        for row in sheet.iter_rows():
+            for cell in row:
+                if getattr(cell, "coordinate", None) is None:
+                    continue
+                if cell.value is not None:
+                    cells[cell.coordinate] = cell.value if not hasattr(cell.value, "isoformat") else cell.value.isoformat()
+                styles[cell.coordinate] = _style(cell)
+        return {
+            "sheets": list(workbook.sheetnames),
+            "cells": cells,
+            "styles": styles,
+            "merged": sorted(str(rng) for rng in sheet.merged_cells.ranges),
+            "widths": {key: round(dim.width or 0, 2) for key, dim in sheet.column_dimensions.items() if dim.width},
+            "heights": {key: round(dim.height or 0, 2) for key, dim in sheet.row_dimensions.items() if dim.height},
+            "print_area": str(sheet.print_area or ""),
+        }
+    finally:
+        workbook.close()
+
+
+def _shared_strings(path: Path) -> List[str]:
+    with zipfile.ZipFile(path) as archive:
+        if "xl/sharedStrings.xml" not in archive.namelist():
+            return []
+        text = archive.read("xl/sharedStrings.xml").decode("utf-8")
+    return re.findall(r"<t[^>]*>(.*?)</t>", text, re.S)
+
+
+def compare(extracted: Path, reference: Path, foreign: List[str]) -> Dict[str, Any]:
+    got, want = _describe(extracted), _describe(reference)
+    report: Dict[str, Any] = {"sheets": got["sheets"], "single_sheet": got["sheets"] == [SHEET_NAME]}
+    value_diff = {
+        key: {"reference": want["cells"].get(key), "extracted": got["cells"].get(key)}
+        for key in sorted(set(got["cells"]) | set(want["cells"]))
+        if got["cells"].get(key) != want["cells"].get(key)
+    }
+    style_diff = sorted(
+        key for key in set(got["styles"]) & set(want["styles"]) if got["styles"][key] != want["styles"][key]
+    )
+    report["cells"] = {"compared": len(want["cells"]), "different": value_diff}
+    report["styles"] = {"compared": len(set(got["styles"]) & set(want["styles"])), "different": style_diff[:50]}
+    for key in ("merged", "widths", "heights", "print_area"):
+        report[key] = "一致" if got[key] == want[key] else {"reference": want[key], "extracted": got[key]}
+    leaked = [text for text in _shared_strings(extracted) if text in foreign]
+    report["foreign_strings"] = leaked
+    report["equivalent"] = (
+        report["single_sheet"]
+        and not value_diff
+        and not style_diff
+        and all(report[key] == "一致" for key in ("merged", "widths", "heights", "print_area"))
+        and not leaked
+    )
+    return report
+
+
+def _find_reference() -> Optional[Path]:
+    folder = PathRegistry().rpa_book_dir
+    if not folder.exists():
+        return None
+    matches = sorted(folder.glob("*弔事連絡票.xlsx"))
+    return matches[0] if matches else None
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check xlsx_package.extract_sheet against the Excel Copy()+SaveAs output")
+    parser.add_argument("--book", type=Path, help="RPAブック.xlsx (Excel で保存済みのもの)")
+    parser.add_argument("--reference", type=Path, help="Worksheet.Copy() + SaveAs で作成した xlsx")
+    parser.add_argument("--repeat", type=int, default=20, help="所要時間の計測回数")
+    parser.add_argument("--synthetic", action="store_true", help="仮のブックを作成して確認します。")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if openpyxl is None:
+        print("openpyxl をインストールしてください。", file=sys.stderr)
+        return 1
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_dir = Path(temp_dir)
+        if args.synthetic:
+            book = build_synthetic_book(out_dir / "synthetic_RPAブック.xlsx")
+            reference = build_reference(book, out_dir / "reference.xlsx")
+        else:
+            book = args.book or PathRegistry().rpa_book_destination
+            reference = args.reference or _find_reference()
+        if not book.exists() or reference is None or not reference.exists():
+            print(f"ブックまたは比較対象が見つかりません: {book}, {reference}", file=sys.stderr)
+            return 1
+
+        snapshot = book.read_bytes()
+        extracted = out_dir / "extracted.xlsx"
+        timings = []
+        for _ in range(max(1, args.repeat)):
+            started = time.perf_counter()
+            xlsx_package.extract_sheet(snapshot, SHEET_NAME, extracted)
+            timings.append(time.perf_counter() - started)
+        foreign = list(xlsx_package.read_sheet_values(snapshot, "RPAシート").values())
+        own = set(xlsx_package.read_sheet_values(snapshot, SHEET_NAME).values())
+        report = {
+            "book": str(book),
+            "reference": str(reference),
+            "extract_ms": {"min": round(min(timings) * 1000, 2), "max": round(max(timings) * 1000, 2)},
+        }
+        report.update(compare(extracted, reference, [text for text in foreign if text not in own]))
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    return 0 if report["equivalent"] else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,200 @@
+"""Rate limiting, adaptive concurrency and request coalescing primitives."""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+LOGGER = logging.getLogger("chouji_robo.throttling")
+
+T = TypeVar("T")
+
+MAX_BACKOFF_SECONDS = 30.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate`` tokens/sec."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for ``seconds`` (used for Retry-After)."""
+
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + max(0.0, seconds))
+            self._tokens = 0.0
+            # Refill counts from the end of the pause, not its start.
+            self._updated = self._paused_until
+
+    def acquire(
+        self,
+        tokens: float = 1.0,
+        *,
+        timeout: Optional[float] = None,
+        stop_event: Optional[threading.Event] = None,
+    ) -> bool:
+        """Block until ``tokens`` are available; False on timeout or stop."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    self._refill(now)
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        return True
+                    wait = (tokens - self._tokens) / self.rate
+                else:
+                    wait = self._paused_until - now
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+_BUCKETS: Dict[str, TokenBucket] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def get_bucket(key: str, rate: float, capacity: Optional[float] = None) -> TokenBucket:
+    """Return the process-wide bucket registered under ``key`` (e.g. a tenant id)."""
+
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate, capacity)
+            _BUCKETS[key] = bucket
+        return bucket
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit: grows on success, halves when throttled."""
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self._limit = float(min(self.maximum, max(self.minimum, initial)))
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def on_success(self) -> None:
+        with self._cond:
+            # Additive increase: one extra slot per "limit" successful calls.
+            self._limit = min(float(self.maximum), self._limit + 1.0 / max(1.0, self._limit))
+            self._cond.notify_all()
+
+    def on_throttle(self) -> None:
+        with self._cond:
+            previous = self.limit
+            self._limit = max(float(self.minimum), self._limit / 2.0)
+            if self.limit != previous:
+                LOGGER.debug("同時実行数を %s -> %s に縮小しました。", previous, self.limit)
+
+
+class RequestCoalescer:
+    """Share one in-flight call between concurrent callers using the same key."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.coalesced = 0
+
+    def run(self, key: str, func: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """Convert a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    try:
+        target = parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        return None
+    if target.tzinfo is None:
+        target = target.replace(tzinfo=timezone.utc)
+    current = now or datetime.now(timezone.utc)
+    return max(0.0, (target - current).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = MAX_BACKOFF_SECONDS) -> float:
+    """Exponential backoff with full jitter for the given 0-based attempt."""
+
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
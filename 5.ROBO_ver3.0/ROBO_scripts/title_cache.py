@@ -0,0 +1,231 @@
+"""SQLite store of job titles looked up by Bd.find_job_title, kept per PC (PathRegistry.title_cache_db)."""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+LOGGER = logging.getLogger("chouji_robo.title_cache")
+
+DEFAULT_TTL_DAYS = float(os.getenv("CHOUJI_TITLE_CACHE_TTL_DAYS", "30"))
+BUSY_TIMEOUT_SECONDS = 15.0
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS titles (
+    email       TEXT PRIMARY KEY,
+    title       TEXT NOT NULL,
+    department  TEXT NOT NULL DEFAULT '',
+    source      TEXT NOT NULL DEFAULT '',
+    fetched_at  TEXT NOT NULL,
+    changed_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS titles_fetched_at ON titles (fetched_at);
+"""
+
+
+def _is_busy(exc: BaseException) -> bool:
+    """SQLITE_BUSY / SQLITE_LOCKED: another connection holds the lock, the file itself is fine."""
+
+    message = str(exc).lower()
+    return isinstance(exc, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+@dataclass(frozen=True)
+class CachedTitle:
+    email: str
+    title: str
+    department: str
+    source: str
+    fetched_at: datetime
+    changed_at: datetime
+
+    def is_fresh(self, ttl: timedelta, now: Optional[datetime] = None) -> bool:
+        return (now or datetime.now()) - self.fetched_at <= ttl
+
+
+# (email, title, department, source)
+TitleRecord = Tuple[str, str, str, str]
+
+
+def _key(email: str) -> str:
+    return (email or "").strip().lower()
+
+
+class TitleCache:
+    """email -> (title, department, source, fetched_at) with a TTL.
+
+    Every operation opens a short-lived connection with a rollback journal
+    and ``BEGIN IMMEDIATE`` writes, so a second robot process on the same PC
+    only waits briefly for the lock.  The file lives in the local state
+    folder: a live SQLite file synced by OneDrive between PCs gets corrupted.
+    A SQLite error disables or skips the cache rather than stopping step B -
+    titles can always be looked up again - but ``put_many`` reports what was
+    actually stored.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        ttl: timedelta = timedelta(days=DEFAULT_TTL_DAYS),
+        timeout: float = BUSY_TIMEOUT_SECONDS,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.timeout = timeout
+        self.available = True
+        self._initialised = False
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        if not self._initialised:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                conn.executescript(_SCHEMA)
+                conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._initialised = True
+        return conn
+
+    @contextmanager
+    def _session(self, write: bool = False, *, swallow: bool = True) -> Iterator[Optional[sqlite3.Connection]]:
+        if not self.available:
+            yield None
+            return
+        try:
+            conn = self._connect()
+        except (sqlite3.Error, OSError) as exc:
+            if _is_busy(exc):
+                LOGGER.warning("役職キャッシュ %s は使用中のため今回は使用しません: %s", self.path, exc)
+            else:
+                LOGGER.warning("役職キャッシュ %s を開けないため無効化します: %s", self.path, exc)
+                self.available = False
+            yield None
+            return
+        try:
+            if write:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            if write:
+                conn.execute("COMMIT")
+        except sqlite3.Error as exc:
+            LOGGER.warning("役職キャッシュ %s の操作に失敗しました: %s", self.path, exc)
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            if not swallow:
+                raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_entry(row: Sequence[str]) -> CachedTitle:
+        email, title, department, source, fetched_at, changed_at = row
+        return CachedTitle(
+            email=email,
+            title=title,
+            department=department,
+            source=source,
+            fetched_at=datetime.fromisoformat(fetched_at),
+            changed_at=datetime.fromisoformat(changed_at),
+        )
+
+    def get_many(self, people: Iterable[Tuple[str, str]]) -> Dict[str, CachedTitle]:
+        """Return fresh entries for (email, department) pairs, keyed by lowercase email.
+
+        An entry whose department differs from the one on the sheet is
+        treated as stale: a transfer usually comes with a new title.
+        """
+
+        wanted = {_key(email): (department or "").strip() for email, department in people if _key(email)}
+        if not wanted:
+            return {}
+        found: Dict[str, CachedTitle] = {}
+        now = datetime.now()
+        with self._session() as conn:
+            if conn is None:
+                return {}
+            keys = list(wanted)
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = conn.execute(
+                    "SELECT email, title, department, source, fetched_at, changed_at "
+                    f"FROM titles WHERE email IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for row in rows:
+                    entry = self._row_to_entry(row)
+                    department = wanted.get(entry.email, "")
+                    if not entry.is_fresh(self.ttl, now):
+                        continue
+                    if department and entry.department and department != entry.department:
+                        LOGGER.info("部署が変わっているためキャッシュを使用しません: %s (%s -> %s)", entry.email, entry.department, department)
+                        continue
+                    found[entry.email] = entry
+        return found
+
+    def get(self, email: str, department: str = "") -> Optional[CachedTitle]:
+        return self.get_many([(email, department)]).get(_key(email))
+
+    def put_many(self, records: Iterable[TitleRecord]) -> int:
+        """Upsert titles; ``changed_at`` only moves when the title itself changes."""
+
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [
+            (_key(email), title.strip(), (department or "").strip(), source or "", now, now)
+            for email, title, department, source in records
+            if _key(email) and title and title.strip()
+        ]
+        if not rows:
+            return 0
+        try:
+            stored = self._upsert(rows)
+        except sqlite3.Error:
+            # Already logged by _session; nothing was committed.
+            return 0
+        return len(rows) if stored else 0
+
+    def _upsert(self, rows: Sequence[Tuple[str, str, str, str, str, str]]) -> bool:
+        with self._session(write=True, swallow=False) as conn:
+            if conn is None:
+                return False
+            previous: Dict[str, str] = {}
+            keys = [row[0] for row in rows]
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                previous.update(conn.execute(f"SELECT email, title FROM titles WHERE email IN ({placeholders})", chunk).fetchall())
+            changed = [(row[0], previous[row[0]], row[1]) for row in rows if row[0] in previous and previous[row[0]] != row[1]]
+            conn.executemany(
+                """
+                INSERT INTO titles (email, title, department, source, fetched_at, changed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(email) DO UPDATE SET
+                    changed_at = CASE WHEN titles.title = excluded.title THEN titles.changed_at ELSE excluded.changed_at END,
+                    title = excluded.title,
+                    department = excluded.department,
+                    source = excluded.source,
+                    fetched_at = excluded.fetched_at
+                """,
+                rows,
+            )
+            for email, before, after in changed:
+                LOGGER.info("役職キャッシュ: 役職の変更を検出しました: %s (%s -> %s)", email, before, after)
+            return True
+
+    def purge_expired(self) -> int:
+        cutoff = (datetime.now() - self.ttl).isoformat(timespec="seconds")
+        with self._session(write=True) as conn:
+            if conn is None:
+                return 0
+            return conn.execute("DELETE FROM titles WHERE fetched_at < ?", (cutoff,)).rowcount
+        return 0
@@ -0,0 +1,271 @@
+"""Speculative warm-ups while the operator types the 管理番号.
+
+``Warmup.start`` (from ``ChoujiRobo.bootstrap_ui``) runs these jobs, each on
+its own worker thread.  None of them touches the Excel or Outlook the
+operator is using to look up the 管理番号: the workflow still kills those
+only after 確定, as before.
+
+- ``excel``: one robot-owned Excel (DispatchEx) parked in excel_com for the
+  next ``open_workbook`` (Ac).  Its pid is spared by the kill after 確定.
+- ``graph``: Ba -LoginOnly; step B's sign-in task reuses the result.
+- ``run_journal``: merges this PC's run journal lines that an earlier run
+  left out of error_log.xlsx (run_journal.compact_if_due), on a thread the
+  robot joins before it exits.
+- ``edge``: the resident Edge and msedgedriver (Bd.warm_up).
+- ``kanri``: where each 管理番号 is in the 管理表, read from the saved file
+  without Excel.  Trusted only while the file's size and mtime are
+  unchanged; Ac goes straight to the row and the form warns about numbers
+  that are not in it.
+
+``handoff`` is called once the workflow has killed Office after 確定.  It
+starts the jobs in ``AFTER_RESET_JOBS``: ``outlook`` (MAPI logon and the
+same folder walk as Ae, so Outlook is up with its stores open while Ac
+reads the 管理表; COM objects cannot cross threads, so Ae still connects
+itself, to an Outlook that is already up).  Jobs still running are picked
+up by whoever needs them (the Graph sign-in and the Edge start-up wait for
+one already in progress).  ``close`` (robot shutdown, including a cancel
+on the form) quits an Excel nobody took and kills a PowerShell still
+signing in; the resident Edge stays, as after a normal run.
+``CHOUJI_WARMUP=0`` turns the warm-ups off.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import excel_com
+import run_journal
+import xlsx_package
+from module_loader import load_helper
+
+LOGGER = logging.getLogger("chouji_robo.warmup")
+
+ENABLED = os.getenv("CHOUJI_WARMUP", "1").strip().lower() not in {"0", "false", "no", "off"}
+# Started by handoff, after the workflow has killed the operator's Office.
+AFTER_RESET_JOBS = ("outlook",)
+
+
+def _normalize_tehai(value: Any) -> str:
+    # Same rule as Ac: the digits of the cell, ignoring a trailing ".0" from a number cell.
+    text = re.sub(r"\.0$", "", unicodedata.normalize("NFKC", "" if value is None else str(value)).strip())
+    digits = "".join(ch for ch in text if ch.isdigit())
+    return digits or text
+
+
+@dataclass
+class KanriIndex:
+    """Column B of every 管理表 sheet, as of the file's size and mtime."""
+
+    path: Path
+    size: int
+    mtime_ns: int
+    sheets: Dict[str, List[Tuple[int, str]]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, path: Path, workbook_values: Optional[Dict[str, Dict[str, str]]] = None) -> "KanriIndex":
+        stat = path.stat()
+        index = cls(path, stat.st_size, stat.st_mtime_ns)
+        if workbook_values is None:
+            workbook_values = xlsx_package.read_workbook_values(path)
+        for sheet, values in workbook_values.items():
+            rows = []
+            for reference, text in values.items():
+                if reference.startswith("B") and reference[1:].isdigit() and int(reference[1:]) >= 2:
+                    rows.append((int(reference[1:]), _normalize_tehai(text)))
+            index.sheets[sheet] = sorted(rows)
+        return index
+
+    def fresh(self) -> bool:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) == (self.size, self.mtime_ns)
+
+    def locate(self, tehai_number: str) -> Optional[Tuple[str, int]]:
+        """(sheet, row) Ac would pick: per sheet in order, an exact match first, then a prefix match."""
+
+        target = _normalize_tehai(tehai_number)
+        if not target:
+            return None
+        for sheet, rows in self.sheets.items():
+            for row, value in rows:
+                if value == target:
+                    return sheet, row
+            for row, value in rows:
+                if value and value.startswith(target):
+                    return sheet, row
+        return None
+
+
+@dataclass
+class WarmupJob:
+    name: str
+    status: str = "pending"  # pending / running / done / failed / skipped
+    started: Optional[float] = None
+    seconds: float = 0.0
+    error: str = ""
+
+
+class Warmup:
+    """Runs the warm-up jobs in the background and hands their results to the workflow."""
+
+    def __init__(
+        self,
+        robot: Any,
+        jobs: Optional[Dict[str, Callable[[], Any]]] = None,
+        *,
+        enabled: bool = ENABLED,
+    ) -> None:
+        self.robot = robot
+        self.enabled = enabled
+        self._jobs = jobs
+        self.results: Dict[str, WarmupJob] = {}
+        self.kanri: Optional[KanriIndex] = None
+        self._deferred: Dict[str, Callable[[], Any]] = {}
+        self._cancel = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._started = 0.0
+
+    def _default_jobs(self) -> Dict[str, Callable[[], Any]]:
+        # Helpers are loaded here, on the UI thread, rather than by the workers.
+        mail = load_helper("Ae.get_mail")
+        job_title = load_helper("Bd.find_job_title")
+        step_b = self.robot.helpers["step_b"]
+        return {
+            "excel": self._start_excel,
+            "outlook": lambda: self._warm_outlook(mail),
+            "graph": step_b.warm_graph_login,
+            "edge": job_title.warm_up,
+            "kanri": self._build_kanri_index,
+            "run_journal": self._compact_run_journal,
+        }
+
+    # -- jobs -----------------------------------------------------------
+    def _start_excel(self) -> None:
+        excel_com.start_spare_instance()
+        if self._cancel.is_set():
+            excel_com.discard_spare_instance()
+
+    def _warm_outlook(self, mail: Any) -> None:
+        session = self.robot.outlook
+        try:
+            sources = mail._gather_mail_sources(session, LOGGER)
+            LOGGER.debug("Outlook のメールフォルダ %d 件を確認しました。", len(sources))
+        finally:
+            session.close()
+
+    def _build_kanri_index(self) -> None:
+        index = KanriIndex.build(self.robot.paths.kanri_report_book)
+        self.kanri = index
+        LOGGER.debug("管理表の管理番号 %d 件を読み込みました。", sum(len(rows) for rows in index.sheets.values()))
+
+    def _compact_run_journal(self) -> None:
+        worker = run_journal.start_compaction(machine=self.robot._machine_identifier())
+        self.robot.keep_until_exit(worker)
+
+    # -- lifecycle ------------------------------------------------------
+    def start(self) -> None:
+        if not self.enabled or self._executor is not None:
+            return
+        jobs = self._jobs if self._jobs is not None else self._default_jobs()
+        self._started = time.perf_counter()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(jobs)), thread_name_prefix="warmup")
+        for name, job in jobs.items():
+            self.results[name] = WarmupJob(name)
+            if name in AFTER_RESET_JOBS:
+                self._deferred[name] = job
+            else:
+                self._executor.submit(self._run, name, job)
+        LOGGER.info("管理番号の入力を待つ間に準備を始めます: %s", ", ".join(name for name in jobs if name not in self._deferred))
+
+    def _run(self, name: str, job: Callable[[], Any]) -> None:
+        result = self.results[name]
+        try:
+            if self._cancel.is_set():
+                result.status = "skipped"
+                return
+            result.status = "running"
+            result.started = time.perf_counter()
+            job()
+            result.status = "done"
+            LOGGER.debug("準備 %s が完了しました (%.1f 秒)。", name, time.perf_counter() - result.started)
+        except Exception as exc:
+            result.status = "failed"
+            result.error = str(exc)
+            LOGGER.warning("準備 %s に失敗しました (処理は続行できます): %s", name, exc)
+        finally:
+            if result.started is not None:
+                result.seconds = round(time.perf_counter() - result.started, 3)
+
+    def handoff(self) -> None:
+        """Called by the workflow after it killed Office; starts ``AFTER_RESET_JOBS``."""
+
+        if self._executor is None:
+            return
+        deferred, self._deferred = self._deferred, {}
+        for name, job in deferred.items():
+            self._executor.submit(self._run, name, job)
+        ready = [name for name, job in self.results.items() if job.status == "done"]
+        busy = [name for name, job in self.results.items() if job.status in {"pending", "running"}]
+        LOGGER.info(
+            "起動から %.1f 秒で開始: 準備済み %s / 準備中 %s",
+            time.perf_counter() - self._started,
+            ", ".join(ready) or "-",
+            ", ".join(busy) or "-",
+        )
+
+    def close(self) -> None:
+        """Tear down what nobody took: the parked Excel and a PowerShell still running."""
+
+        self._cancel.set()
+        for name in self._deferred:
+            self.results[name].status = "skipped"
+        self._deferred = {}
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        executor.shutdown(wait=False)
+        try:
+            excel_com.discard_spare_instance()
+        except Exception as exc:
+            LOGGER.debug("待機中の Excel を終了できませんでした: %s", exc)
+        stop_powershell = getattr(self.robot.helpers.get("step_b"), "stop_powershell", None)
+        if stop_powershell is not None:
+            stop_powershell()
+
+    # -- 管理表 index ---------------------------------------------------
+    def _index_for(self, path: Optional[Path]) -> Optional[KanriIndex]:
+        index = self.kanri
+        if index is None or (path is not None and Path(path) != index.path) or not index.fresh():
+            return None
+        return index
+
+    def locate(self, tehai_number: str, path: Optional[Path] = None) -> Optional[Tuple[str, int]]:
+        """Sheet and row of ``tehai_number`` in the 管理表, if the index is still current."""
+
+        index = self._index_for(path)
+        return index.locate(tehai_number) if index is not None else None
+
+    def unknown_numbers(self, numbers: Iterable[str]) -> List[str]:
+        """Numbers the current 管理表 does not contain; empty when the index is missing or stale."""
+
+        index = self._index_for(None)
+        if index is None:
+            return []
+        return [number for number in numbers if index.locate(number) is None]
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            name: {"status": job.status, "seconds": job.seconds, "error": job.error}
+            for name, job in self.results.items()
+        }
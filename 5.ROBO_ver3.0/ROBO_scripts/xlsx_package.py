@@ -0,0 +1,484 @@
+"""Excel-free operations on the .xlsx zip package (single-sheet extraction, row appends).
+
+Edits are done on the XML text rather than through an XML library so the
+namespace prefixes Excel relies on (``mc:Ignorable="x14ac xr ..."``) are
+kept byte for byte.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import posixpath
+import re
+import zipfile
+from datetime import date, datetime
+from html import escape, unescape
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from atomic_io import atomic_write_bytes, payload_digest
+
+Source = Union[Path, str, bytes]
+
+_SHEET_TAG = re.compile(r"<sheet\b[^>]*/>")
+_RELATIONSHIP_TAG = re.compile(r"<Relationship\b[^>]*/>")
+_OVERRIDE_TAG = re.compile(r"<Override\b[^>]*/>")
+_DEFINED_NAME = re.compile(r"<definedName\b([^>]*)>(.*?)</definedName>", re.S)
+_FORMULA = re.compile(r"<f\b[^>]*/>|<f\b[^>]*>.*?</f>", re.S)
+_CELL = re.compile(r"<c\b([^>]*?)(?:/>|>(.*?)</c>)", re.S)
+_VALUE = re.compile(r"<v>(.*?)</v>", re.S)
+_SHARED_ITEM = re.compile(r"<si>.*?</si>|<si/>", re.S)
+_SST_OPEN = re.compile(r"<sst\b[^>]*>")
+_TEXT_RUN = re.compile(r"<t\b[^>]*>(.*?)</t>|<t\b[^>]*/>", re.S)
+_VIEW_STATE = re.compile(r"<sheetViews>.*?</sheetViews>|<v>.*?</v>|<is>.*?</is>", re.S)
+_SHEET_DATA = re.compile(r"<sheetData\s*/>|<sheetData>(.*?)</sheetData>", re.S)
+_ROW = re.compile(r"<row\b([^>]*?)(?:/>|>(.*?)</row>)", re.S)
+_DIMENSION = re.compile(r'<dimension ref="([^"]*)"\s*/>')
+_REFERENCE = re.compile(r"([A-Z]+)(\d+)")
+_ESCAPED_CHAR = re.compile(r"_x([0-9A-Fa-f]{4})_")
+_TABLE_REF = re.compile(r'(<(?:table|autoFilter)\b[^>]*\sref=")([A-Z]+\d+):([A-Z]+)(\d+)(")')
+
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+CALC_CHAIN_TYPE = "/calcChain"
+
+
+def _attr(tag: str, name: str) -> Optional[str]:
+    match = re.search(r'(?:^|\s)' + re.escape(name) + r'="([^"]*)"', tag)
+    return unescape(match.group(1)) if match else None
+
+
+def _set_attr(attrs: str, name: str, value: str) -> str:
+    """Set ``name`` inside an attribute string such as ``' r="A1" t="s"'``."""
+
+    pattern = re.compile(r'\s' + re.escape(name) + r'="[^"]*"')
+    if pattern.search(attrs):
+        return pattern.sub(f' {name}="{value}"', attrs)
+    return f'{attrs} {name}="{value}"'
+
+
+def _resolve(base_dir: str, target: str) -> str:
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(base_dir, target))
+
+
+def _rels_path(part: str) -> str:
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", name + ".rels")
+
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index
+
+
+def _column_letters(index: int) -> str:
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _read_package(source: Source) -> Dict[str, Tuple[zipfile.ZipInfo, bytes]]:
+    data = source if isinstance(source, bytes) else Path(source).read_bytes()
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        return {info.filename: (info, archive.read(info.filename)) for info in archive.infolist()}
+
+
+def _sheet_parts(parts: Dict[str, Tuple[zipfile.ZipInfo, bytes]]) -> List[Tuple[str, str, str]]:
+    """(name, relationship id, part path) for every sheet in workbook order."""
+
+    workbook = parts["xl/workbook.xml"][1].decode("utf-8")
+    rels = parts["xl/_rels/workbook.xml.rels"][1].decode("utf-8")
+    targets = {_attr(tag, "Id"): _resolve("xl", _attr(tag, "Target") or "") for tag in _RELATIONSHIP_TAG.findall(rels)}
+    sheets = []
+    for tag in _SHEET_TAG.findall(workbook):
+        rel_match = re.search(r'\s[\w]+:id="([^"]+)"', tag)
+        rel_id = rel_match.group(1) if rel_match else ""
+        sheets.append((_attr(tag, "name") or "", rel_id, targets.get(rel_id, "")))
+    return sheets
+
+
+def _shared_strings(parts: Dict[str, Tuple[zipfile.ZipInfo, bytes]]) -> Tuple[Optional[str], str, List[str]]:
+    rels = parts["xl/_rels/workbook.xml.rels"][1].decode("utf-8")
+    for tag in _RELATIONSHIP_TAG.findall(rels):
+        if (_attr(tag, "Type") or "").endswith("/sharedStrings"):
+            path = _resolve("xl", _attr(tag, "Target") or "")
+            if path in parts:
+                text = parts[path][1].decode("utf-8")
+                header = _SST_OPEN.search(text)
+                return path, header.group(0) if header else "<sst>", _SHARED_ITEM.findall(text)
+    return None, "", []
+
+
+def _decode_escapes(text: str) -> str:
+    # OOXML writes characters XML cannot hold as _xHHHH_ (CR is _x000D_); _x005F_ is a literal "_".
+    return _ESCAPED_CHAR.sub(lambda match: chr(int(match.group(1), 16)), text)
+
+
+def _item_text(item: str) -> str:
+    return _decode_escapes("".join(unescape(match.group(1) or "") for match in _TEXT_RUN.finditer(item)))
+
+
+def _com_text(kind: Optional[str], text: str) -> str:
+    """``text`` as ``str(Range.Value)`` gives it: numbers are floats, booleans True/False."""
+
+    if kind in (None, "n"):
+        try:
+            return str(float(text))
+        except ValueError:
+            return text
+    if kind == "b":
+        return str(text == "1")
+    return text
+
+
+def _values_only(sheet_xml: str, used: Dict[int, int]) -> str:
+    """Drop formulas (keep cached results) and renumber shared-string references."""
+
+    def _cell(match: "re.Match[str]") -> str:
+        attrs, body = match.group(1), match.group(2)
+        if body is None:
+            return match.group(0)
+        body = _FORMULA.sub("", body)
+        kind = _attr(attrs, "t")
+        if kind == "s":
+            value = _VALUE.search(body)
+            if value is not None:
+                old = int(value.group(1))
+                new = used.setdefault(old, len(used))
+                body = body.replace(value.group(0), f"<v>{new}</v>", 1)
+        elif kind == "str":
+            value = _VALUE.search(body)
+            text = value.group(1) if value else ""
+            attrs = _set_attr(attrs, "t", "inlineStr")
+            body = f'<is><t xml:space="preserve">{text}</t></is>'
+        if not body.strip():
+            return f"<c{attrs}/>"
+        return f"<c{attrs}>{body}</c>"
+
+    return _CELL.sub(_cell, sheet_xml)
+
+
+def extract_sheet(source: Source, sheet_name: str, destination: Path, *, values_only: bool = True) -> Path:
+    """Write a workbook containing only ``sheet_name`` from the package ``source``.
+
+    Equivalent to ``Worksheet.Copy()`` + ``SaveAs`` for what the operator
+    sees: formatting, merges, print settings, images and cached values are
+    kept; formulas are replaced by their values (a copy made by Excel keeps
+    them as external links to RPAブック.xlsx instead).  The shared-string
+    table is rebuilt so no text from the other sheets is carried over.
+    """
+
+    parts = _read_package(source)
+    sheets = _sheet_parts(parts)
+    names = [name for name, _, _ in sheets]
+    if sheet_name not in names:
+        raise ValueError(f"シート '{sheet_name}' がブックにありません: {names}")
+    index = names.index(sheet_name)
+    keep_rel = sheets[index][1]
+    removed = [(name, rel_id, path) for name, rel_id, path in sheets if rel_id != keep_rel]
+    removed_paths = {path for _, _, path in removed}
+    removed_paths |= {_rels_path(path) for path in removed_paths}
+
+    workbook = parts["xl/workbook.xml"][1].decode("utf-8")
+    for _, rel_id, _ in removed:
+        workbook = re.sub(r"<sheet\b[^>]*\s[\w]+:id=\"" + re.escape(rel_id) + r"\"[^>]*/>", "", workbook)
+
+    def _defined_name(match: "re.Match[str]") -> str:
+        attrs, body = match.group(1), match.group(2)
+        local = _attr(attrs, "localSheetId")
+        if local is not None:
+            if int(local) != index:
+                return ""
+            attrs = _set_attr(attrs, "localSheetId", "0")
+        referenced = unescape(body)
+        if any(f"'{name}'!" in referenced or f"{name}!" in referenced for name, _, _ in removed):
+            return ""
+        return f"<definedName{attrs}>{body}</definedName>"
+
+    workbook = _DEFINED_NAME.sub(_defined_name, workbook)
+    workbook = re.sub(r"<definedNames>\s*</definedNames>", "", workbook)
+    workbook = re.sub(r'\s(?:activeTab|firstSheet)="\d+"', "", workbook)
+
+    rels = parts["xl/_rels/workbook.xml.rels"][1].decode("utf-8")
+    removed_rel_ids = {rel_id for _, rel_id, _ in removed}
+    for tag in _RELATIONSHIP_TAG.findall(rels):
+        # calcChain lists cells of the dropped sheets; Excel rebuilds it on open.
+        is_calc_chain = (_attr(tag, "Type") or "").endswith(CALC_CHAIN_TYPE)
+        if is_calc_chain:
+            removed_paths.add(_resolve("xl", _attr(tag, "Target") or ""))
+        if is_calc_chain or _attr(tag, "Id") in removed_rel_ids:
+            rels = rels.replace(tag, "")
+
+    content_types = parts["[Content_Types].xml"][1].decode("utf-8")
+    for tag in _OVERRIDE_TAG.findall(content_types):
+        if (_attr(tag, "PartName") or "").lstrip("/") in removed_paths:
+            content_types = content_types.replace(tag, "")
+
+    replacements: Dict[str, bytes] = {
+        "xl/workbook.xml": workbook.encode("utf-8"),
+        "xl/_rels/workbook.xml.rels": rels.encode("utf-8"),
+        "[Content_Types].xml": content_types.encode("utf-8"),
+    }
+    sheet_path = sheets[index][2]
+    if values_only:
+        sst_path, sst_header, strings = _shared_strings(parts)
+        used: Dict[int, int] = {}
+        sheet_xml = _values_only(parts[sheet_path][1].decode("utf-8"), used)
+        replacements[sheet_path] = sheet_xml.encode("utf-8")
+        if sst_path is not None:
+            ordered = sorted(used.items(), key=lambda item: item[1])
+            items = [strings[old] if old < len(strings) else "<si><t/></si>" for old, _ in ordered]
+            header = re.sub(r'\s(?:count|uniqueCount)="\d+"', "", sst_header).rstrip(">")
+            header = f'{header} count="{len(items)}" uniqueCount="{len(items)}">'
+            sst = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' + header + "".join(items) + "</sst>"
+            replacements[sst_path] = sst.encode("utf-8")
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, (info, data) in parts.items():
+            if name in removed_paths:
+                continue
+            archive.writestr(info, replacements.get(name, data), compress_type=zipfile.ZIP_DEFLATED)
+    destination = Path(destination)
+    atomic_write_bytes(destination, buffer.getvalue())
+    return destination
+
+
+def _sheet_values(
+    parts: Dict[str, Tuple[zipfile.ZipInfo, bytes]],
+    sheet_name: str,
+    uncached: Optional[List[str]] = None,
+    com_values: bool = False,
+) -> Dict[str, str]:
+    sheets = {name: path for name, _, path in _sheet_parts(parts)}
+    if sheet_name not in sheets:
+        raise ValueError(f"シート '{sheet_name}' がブックにありません。")
+    _, _, strings = _shared_strings(parts)
+    values: Dict[str, str] = {}
+    for match in _CELL.finditer(parts[sheets[sheet_name]][1].decode("utf-8")):
+        attrs, body = match.group(1), match.group(2) or ""
+        reference = _attr(attrs, "r")
+        if not reference:
+            continue
+        kind = _attr(attrs, "t")
+        if kind == "inlineStr":
+            text = _item_text(body)
+        else:
+            value = _VALUE.search(body)
+            if value is None:
+                if uncached is not None and _FORMULA.search(body):
+                    uncached.append(reference)
+                continue
+            text = unescape(value.group(1))
+            if kind == "s":
+                position = int(text)
+                text = _item_text(strings[position]) if position < len(strings) else ""
+            elif kind == "str":
+                text = _decode_escapes(text)
+            elif com_values:
+                text = _com_text(kind, text)
+        if text != "":
+            values[reference] = text
+    return values
+
+
+def read_sheet_values(source: Source, sheet_name: str) -> Dict[str, str]:
+    """Cached cell values of ``sheet_name`` as {"A1": text}, resolving shared strings."""
+
+    return _sheet_values(_read_package(source), sheet_name)
+
+
+def read_workbook_values(source: Source) -> Dict[str, Dict[str, str]]:
+    """``read_sheet_values`` for every sheet, reading the package once."""
+
+    parts = _read_package(source)
+    return {name: _sheet_values(parts, name) for name, _, _ in _sheet_parts(parts)}
+
+
+def read_cells(source: Source, sheet_name: str, addresses: Iterable[str]) -> Dict[str, str]:
+    """Cached values of ``addresses``; ValueError if one is a formula Excel never calculated.
+
+    Values read as ``str(Range.Value)`` would, so they can replace a COM read.
+    """
+
+    wanted = list(addresses)
+    uncached: List[str] = []
+    values = _sheet_values(_read_package(source), sheet_name, uncached, com_values=True)
+    missing = [address for address in wanted if address in uncached]
+    if missing:
+        raise ValueError(f"数式の計算結果が保存されていないセルがあります: {missing}")
+    return {address: values.get(address, "") for address in wanted}
+
+
+def sheet_digest(source: Source, sheet_name: str, addresses: Optional[Iterable[str]] = None) -> str:
+    """Content fingerprint of ``sheet_name``.
+
+    With ``addresses`` only those cells' values count.  Otherwise every value
+    plus the layout (sheet XML without selection/scroll state, and the style
+    table) is included, so a formatting-only edit also changes the digest.
+    Excel re-saving an unchanged book keeps the digest stable.
+    """
+
+    parts = _read_package(source)
+    values = _sheet_values(parts, sheet_name)
+    if addresses is not None:
+        return payload_digest({address: values.get(address, "") for address in addresses})
+    sheet_path = {name: path for name, _, path in _sheet_parts(parts)}[sheet_name]
+    layout = _VIEW_STATE.sub("", parts[sheet_path][1].decode("utf-8"))
+    styles = parts.get("xl/styles.xml", (None, b""))[1]
+    return payload_digest(
+        {
+            "values": values,
+            "layout": hashlib.sha256(layout.encode("utf-8")).hexdigest(),
+            "styles": hashlib.sha256(styles).hexdigest(),
+        }
+    )
+
+
+def active_sheet_name(source: Source) -> str:
+    """Name of the sheet Excel opens on (``workbookView activeTab``), i.e. openpyxl's ``wb.active``."""
+
+    parts = _read_package(source)
+    return _active_sheet(parts)
+
+
+def _active_sheet(parts: Dict[str, Tuple[zipfile.ZipInfo, bytes]]) -> str:
+    workbook = parts["xl/workbook.xml"][1].decode("utf-8")
+    match = re.search(r'<workbookView\b[^>]*\sactiveTab="(\d+)"', workbook)
+    sheets = _sheet_parts(parts)
+    index = int(match.group(1)) if match else 0
+    return sheets[index if index < len(sheets) else 0][0]
+
+
+def _cell_xml(reference: str, value: Any, style: Optional[str]) -> str:
+    attrs = f' r="{reference}"' + (f' s="{style}"' if style else "")
+    if value is None or value == "":
+        return f"<c{attrs}/>" if style else ""
+    if isinstance(value, bool):
+        return f'<c{attrs} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (datetime, date)):
+        if not style:
+            # Without a date number format a serial would show as a bare number.
+            return _cell_xml(reference, value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat(), None)
+        moment = value if isinstance(value, datetime) else datetime(value.year, value.month, value.day)
+        serial = (moment - EXCEL_EPOCH).total_seconds() / 86400
+        return f"<c{attrs}><v>{serial!r}</v></c>"
+    if isinstance(value, (int, float)):
+        return f"<c{attrs}><v>{value!r}</v></c>"
+    return f'<c{attrs} t="inlineStr"><is><t xml:space="preserve">{escape(str(value), quote=False)}</t></is></c>'
+
+
+def _row_cells(body: str) -> Dict[int, Tuple[str, str]]:
+    """{column: (attrs, whole cell xml)} of a row body."""
+
+    cells: Dict[int, Tuple[str, str]] = {}
+    for match in _CELL.finditer(body or ""):
+        reference = _REFERENCE.match(_attr(match.group(1), "r") or "")
+        if reference:
+            cells[_column_index(reference.group(1))] = (match.group(1), match.group(0))
+    return cells
+
+
+def _has_value(cell_xml: str) -> bool:
+    return "<v>" in cell_xml or "<is>" in cell_xml
+
+
+def append_rows(
+    source: Source, destination: Path, rows: Sequence[Sequence[Any]], *, sheet_name: Optional[str] = None
+) -> int:
+    """Append ``rows`` below the last filled row of ``sheet_name`` (default: the active sheet).
+
+    Only that sheet's XML (and a table covering the data) changes; every
+    other part is copied as is.  New cells take the style of the same column
+    in the last filled row, so dates keep their number format; text is
+    written as inline strings so the shared-string table is untouched.
+    Formatted but empty rows left below the data are filled in place.
+    Returns the row number of the first appended row.
+    """
+
+    parts = _read_package(source)
+    name = sheet_name or _active_sheet(parts)
+    sheet_paths = {sheet: path for sheet, _, path in _sheet_parts(parts)}
+    if name not in sheet_paths:
+        raise ValueError(f"シート '{name}' がブックにありません。")
+    sheet_path = sheet_paths[name]
+    sheet_xml = parts[sheet_path][1].decode("utf-8")
+    data_match = _SHEET_DATA.search(sheet_xml)
+    if data_match is None:
+        raise ValueError(f"シート '{name}' に sheetData がありません。")
+    width = max((len(row) for row in rows), default=0)
+
+    existing: Dict[int, Tuple[str, Dict[int, Tuple[str, str]], str]] = {}
+    for match in _ROW.finditer(data_match.group(1) or ""):
+        number = int(_attr(match.group(1), "r") or 0)
+        existing[number] = (match.group(1), _row_cells(match.group(2) or ""), match.group(0))
+    filled = [
+        number
+        for number, (_, cells, _) in existing.items()
+        if any(_has_value(cell) for column, (_, cell) in cells.items() if column <= width)
+    ]
+    last = max(filled, default=1)
+    first = last + 1
+    if not rows:
+        return first
+    template = {column: _attr(attrs, "s") for column, (attrs, _) in existing.get(last, ("", {}, ""))[1].items()} if last > 1 else {}
+
+    output: Dict[int, str] = {number: xml for number, (_, _, xml) in existing.items()}
+    for offset, values in enumerate(rows):
+        number = first + offset
+        row_attrs, old_cells, _ = existing.get(number, (f' r="{number}"', {}, ""))
+        row_attrs = re.sub(r'\sspans="[^"]*"', "", row_attrs)
+        cells: Dict[int, str] = {column: xml for column, (_, xml) in old_cells.items() if column > width}
+        for column in range(1, width + 1):
+            value = values[column - 1] if column <= len(values) else None
+            style = template.get(column) or (_attr(old_cells[column][0], "s") if column in old_cells else None)
+            xml = _cell_xml(f"{_column_letters(column)}{number}", value, style)
+            if xml:
+                cells[column] = xml
+        output[number] = f"<row{row_attrs}>" + "".join(cells[column] for column in sorted(cells)) + "</row>"
+    end = first + len(rows) - 1
+    sheet_data = "<sheetData>" + "".join(output[number] for number in sorted(output)) + "</sheetData>"
+    sheet_xml = sheet_xml[: data_match.start()] + sheet_data + sheet_xml[data_match.end() :]
+
+    def _dimension(match: "re.Match[str]") -> str:
+        start, _, stop = match.group(1).partition(":")
+        stop_ref = _REFERENCE.match(stop or start)
+        if stop_ref is None:
+            return match.group(0)
+        column = max(_column_index(stop_ref.group(1)), width)
+        row = max(int(stop_ref.group(2)), end)
+        return f'<dimension ref="{start}:{_column_letters(column)}{row}"/>'
+
+    replacements: Dict[str, bytes] = {sheet_path: _DIMENSION.sub(_dimension, sheet_xml, count=1).encode("utf-8")}
+
+    # A table (ListObject) that ended at the old last row grows with the data.
+    sheet_rels = _rels_path(sheet_path)
+    if sheet_rels in parts:
+        for tag in _RELATIONSHIP_TAG.findall(parts[sheet_rels][1].decode("utf-8")):
+            if not (_attr(tag, "Type") or "").endswith("/table"):
+                continue
+            table_path = _resolve(posixpath.dirname(sheet_path), _attr(tag, "Target") or "")
+            if table_path not in parts:
+                continue
+
+            def _extend(match: "re.Match[str]") -> str:
+                if int(match.group(4)) != last:
+                    return match.group(0)
+                return f"{match.group(1)}{match.group(2)}:{match.group(3)}{end}{match.group(5)}"
+
+            table_xml = parts[table_path][1].decode("utf-8")
+            replacements[table_path] = _TABLE_REF.sub(_extend, table_xml).encode("utf-8")
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for part, (info, data) in parts.items():
+            archive.writestr(info, replacements.get(part, data), compress_type=zipfile.ZIP_DEFLATED)
+    atomic_write_bytes(Path(destination), buffer.getvalue())
+    return first
@@ -24,6 +24,41 @@ def _import_win32():
         return None
 
 
+_OUTLOOK_SESSION = None
+
+
+def _outlook_session():
+    """ROBO_scripts の OutlookSession をケース間で使い回す (見つからなければ None)。"""
+    global _OUTLOOK_SESSION
+    if _OUTLOOK_SESSION is not None:
+        return _OUTLOOK_SESSION
+    path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "..", "5.ROBO_ver3.0", "ROBO_scripts", "outlook_session.py"
+    )
+    try:
+        import importlib.util
+
+        spec = importlib.util.spec_from_file_location("robo_outlook_session", path)
+        if spec is None or spec.loader is None:
+            return None
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)  # type: ignore[attr-defined]
+        _OUTLOOK_SESSION = mod.OutlookSession()
+        return _OUTLOOK_SESSION
+    except Exception as e:
+        print(f"[3.get_mail_result] OutlookSession を読み込めないため直接接続します: {e}")
+        return None
+
+
+def _sent_folder(w32):
+    session = _outlook_session()
+    if session is not None:
+        return session.default_folder(5)  # 送信済みアイテム
+    outlook = w32.Dispatch("Outlook.Application")
+    mapi = outlook.GetNamespace("MAPI")
+    return mapi.GetDefaultFolder(5)  # 送信済みアイテム
+
+
 def _best_mail_match(sent_items, keyword: str, target: str):
     best = None
     best_score = -1.0
@@ -168,9 +203,7 @@ def run(tehai_number: int, timestamp: str, sheet_name: Optional[str] = None, wee
     if not d27:
         print("[3.get_mail_result] D27 が空です。キーワードのみで検索します")
 
-    outlook = w32.Dispatch("Outlook.Application")
-    mapi = outlook.GetNamespace("MAPI")
-    sent = mapi.GetDefaultFolder(5)  # 送信済みアイテム
+    sent = _sent_folder(w32)
     items = sent.Items
     try:
         items.Sort("[SentOn]", True)